@@ -0,0 +1,60 @@
+"""add_scenario_sweep_job_table
+
+Revision ID: 9a4e2c7b5d13
+Revises: 6f1b7a2d9c10
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "9a4e2c7b5d13"
+down_revision = "6f1b7a2d9c10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "scenariosweepjob",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("job_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("job_name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(
+                "pending",
+                "running",
+                "success",
+                "failed",
+                "cancelled",
+                name="materialbalancejobstatus",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column("variant_count", sa.Integer(), nullable=False),
+        sa.Column("input_data", sa.JSON(), nullable=True),
+        sa.Column("result_data", sa.JSON(), nullable=True),
+        sa.Column("summary_data", sa.JSON(), nullable=True),
+        sa.Column("error_message", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_scenariosweepjob_job_id"), "scenariosweepjob", ["job_id"], unique=True
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_scenariosweepjob_job_id"), table_name="scenariosweepjob")
+    op.drop_table("scenariosweepjob")
@@ -0,0 +1,55 @@
+"""add_calculation_queue_table
+
+Revision ID: b3d81f6a2e47
+Revises: 9a4e2c7b5d13
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "b3d81f6a2e47"
+down_revision = "9a4e2c7b5d13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "calculationqueueentry",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("job_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("job_kind", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("queued", "running", name="calculationqueuestatus"),
+            nullable=False,
+        ),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("max_concurrency", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("options", sa.JSON(), nullable=True),
+        sa.Column("worker_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_calculationqueueentry_job_id"), "calculationqueueentry", ["job_id"], unique=True
+    )
+    op.create_index(
+        op.f("ix_calculationqueueentry_status"), "calculationqueueentry", ["status"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_calculationqueueentry_status"), table_name="calculationqueueentry")
+    op.drop_index(op.f("ix_calculationqueueentry_job_id"), table_name="calculationqueueentry")
+    op.drop_table("calculationqueueentry")
+    sa.Enum(name="calculationqueuestatus").drop(op.get_bind())
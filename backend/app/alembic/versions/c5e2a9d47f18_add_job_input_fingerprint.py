@@ -0,0 +1,48 @@
+"""add_job_input_fingerprint
+
+Revision ID: c5e2a9d47f18
+Revises: b3d81f6a2e47
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = "c5e2a9d47f18"
+down_revision = "b3d81f6a2e47"
+branch_labels = None
+depends_on = None
+
+JOB_TABLES = (
+    "materialbalancejob",
+    "asm1slimjob",
+    "asm1job",
+    "asm3job",
+    "udmjob",
+    "scenariosweepjob",
+)
+
+
+def upgrade():
+    for table in JOB_TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                "input_fingerprint",
+                sqlmodel.sql.sqltypes.AutoString(length=64),
+                nullable=True,
+            ),
+        )
+        op.create_index(
+            op.f(f"ix_{table}_input_fingerprint"), table, ["input_fingerprint"], unique=False
+        )
+
+
+def downgrade():
+    for table in JOB_TABLES:
+        op.drop_index(op.f(f"ix_{table}_input_fingerprint"), table_name=table)
+        op.drop_column(table, "input_fingerprint")
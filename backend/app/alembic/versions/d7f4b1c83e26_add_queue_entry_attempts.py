@@ -0,0 +1,28 @@
+"""add_queue_entry_attempts
+
+Revision ID: d7f4b1c83e26
+Revises: c5e2a9d47f18
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d7f4b1c83e26"
+down_revision = "c5e2a9d47f18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "calculationqueueentry",
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_column("calculationqueueentry", "attempts")
@@ -0,0 +1,28 @@
+"""add_queue_entry_heartbeat
+
+Revision ID: e6c9a4f2b851
+Revises: d7f4b1c83e26
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e6c9a4f2b851"
+down_revision = "d7f4b1c83e26"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "calculationqueueentry",
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("calculationqueueentry", "heartbeat_at")
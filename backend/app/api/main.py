@@ -12,6 +12,7 @@ from app.api.routes import (
     login,
     material_balance,
     private,
+    scenario_sweeps,
     stats,
     udm,
     udm_hybrid_configs,
@@ -37,6 +38,7 @@ api_router.include_router(asm1slim.router, prefix="/asm1slim", tags=["asm1slim"]
 api_router.include_router(asm1.router, prefix="/asm1", tags=["asm1"])
 api_router.include_router(asm3.router, prefix="/asm3", tags=["asm3"])
 api_router.include_router(udm.router, prefix="/udm", tags=["udm"])
+api_router.include_router(scenario_sweeps.router, prefix="/scenario-sweeps", tags=["scenario-sweeps"])
 api_router.include_router(udm_hybrid_configs.router)
 api_router.include_router(udm_flowcharts.router)
 api_router.include_router(udm_models.router)
@@ -4,6 +4,7 @@ import asyncio
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 
 from app.api.deps import (
@@ -12,11 +13,15 @@ from app.api.deps import (
     get_current_active_superuser,
 )
 from app.models import (
+    CalculationJobExtendRequest,
     MaterialBalanceInput,
     MaterialBalanceResult,
     MaterialBalanceResultSummary,
     MaterialBalanceTimeSeriesQuery,
     MaterialBalanceTimeSeriesResponse,
+    MaterialBalanceExportQuery,
+    ResultDownsampleMethod,
+    ResultExportFormat,
     MaterialBalanceValidationRequest,
     MaterialBalanceValidationResponse,
     ASM1SlimJob,
@@ -26,14 +31,21 @@ from app.models import (
     MaterialBalanceJobStatus,
     Message,
 )
-from app.services.asm1slim_service import ASM1SlimService
+from app.services.calculation_queue import cancel_calculation, submit_calculation
 from app.services.data_conversion_service import DataConversionService
+from app.services.result_export import build_export_response
+from app.services.result_store import (
+    delete_result,
+    load_result_data,
+    open_result,
+    read_partial_results,
+)
 from app.services.time_segment_validation import validate_time_segments
+from app.services.warm_start import WarmStartError, continuation_flowchart
 
 router = APIRouter()
 
 # Initialize services
-asm1slim_service = ASM1SlimService()
 data_conversion_service = DataConversionService()
 
 
@@ -69,11 +81,13 @@ def create_calculation_job(
     session.refresh(job)
     
     # Start background calculation
-    background_tasks.add_task(
-        asm1slim_service.run_calculation,
+    submit_calculation(
         session,
-        job_id,
-        calculation_input
+        background_tasks,
+        job_kind="asm1slim",
+        job_id=job_id,
+        owner=current_user,
+        input_data=calculation_input,
     )
     
     return ASM1SlimJobPublic(
@@ -156,11 +170,13 @@ def create_calculation_job_from_flowchart(
         session.refresh(job)
         
         # Start background calculation
-        background_tasks.add_task(
-            asm1slim_service.run_calculation,
+        submit_calculation(
             session,
-            job_id,
-            calculation_input
+            background_tasks,
+            job_kind="asm1slim",
+            job_id=job_id,
+            owner=current_user,
+            input_data=calculation_input,
         )
         
         return ASM1SlimJobPublic(
@@ -238,6 +254,7 @@ def get_calculation_result_summary(
         solver_method=summary_data.get('solver_method', None),
         segment_count=summary_data.get("segment_count"),
         parameter_change_event_count=summary_data.get("parameter_change_event_count"),
+        profile=summary_data.get("profile"),
         error_message=job.error_message,
     )
 
@@ -276,42 +293,19 @@ def get_calculation_final_values(
             detail="ASM1slim calculation result data not found"
         )
     
-    result_data = job.result_data
-    node_data = result_data.get('node_data', {})
-    edge_data = result_data.get('edge_data', {})
+    reader = open_result(job.result_data)
     
-    # Extract final values (last timestamp)
+    # Extract final values (last timestamp) without loading the full series
     final_values = {
-        'nodes': {},
-        'edges': {}
+        'nodes': {node_id: reader.node_values(node_id, -1) for node_id in reader.node_ids},
+        'edges': {edge_id: reader.edge_values(edge_id, -1) for edge_id in reader.edge_ids},
     }
     
-    # Get final node values
-    for node_id, data in node_data.items():
-        final_values['nodes'][node_id] = {}
-        for param_name, values in data.items():
-            # Skip label field as it's not time series data
-            if param_name == "label":
-                continue
-            if values and len(values) > 0:
-                final_values['nodes'][node_id][param_name] = values[-1]  # Get last value
-            else:
-                final_values['nodes'][node_id][param_name] = 0.0
-    
-    # Get final edge values
-    for edge_id, data in edge_data.items():
-        final_values['edges'][edge_id] = {}
-        for param_name, values in data.items():
-            if values and len(values) > 0:
-                final_values['edges'][edge_id][param_name] = values[-1]  # Get last value
-            else:
-                final_values['edges'][edge_id][param_name] = 0.0
-    
     return {
         'job_id': job_id,
         'final_values': final_values,
-        'timestamps': result_data.get('timestamps', []),
-        'summary': result_data.get('summary', {})
+        'timestamps': reader.timestamps_slice(0, reader.time_points),
+        'summary': job.result_data.get('summary', {})
     }
 
 
@@ -355,59 +349,37 @@ def get_calculation_timeseries(
             detail="ASM1slim calculation result data not found"
         )
     
-    result_data = job.result_data
-    timestamps = result_data.get('timestamps', [])
-    node_data = result_data.get('node_data', {})
-    edge_data = result_data.get('edge_data', {})
+    reader = open_result(job.result_data)
     
     # Filter by time range
     start_idx = 0
-    end_idx = len(timestamps)
+    end_idx = reader.time_points
     
     if start_time is not None:
-        start_idx = next((i for i, t in enumerate(timestamps) if t >= start_time), 0)
+        start_idx = reader.search_time(start_time)
+        if start_idx == reader.time_points:
+            start_idx = 0
     if end_time is not None:
-        end_idx = next((i for i, t in enumerate(timestamps) if t > end_time), len(timestamps))
+        end_idx = reader.search_time(end_time, side="right")
     
     # Apply pagination
     total_points = end_idx - start_idx
     start_page_idx = start_idx + (page - 1) * page_size
     end_page_idx = min(start_idx + page * page_size, end_idx)
-    
-    # Filter data
-    filtered_timestamps = timestamps[start_page_idx:end_page_idx]
-    filtered_node_data = {}
-    filtered_edge_data = {}
-    
-    # Filter node data
-    if node_ids:
-        for node_id in node_ids:
-            if node_id in node_data:
-                filtered_node_data[node_id] = {}
-                for param_name, values in node_data[node_id].items():
-                    if param_name == "label":
-                        continue
-                    filtered_node_data[node_id][param_name] = values[start_page_idx:end_page_idx]
-    else:
-        for node_id, data in node_data.items():
-            filtered_node_data[node_id] = {}
-            for param_name, values in data.items():
-                if param_name == "label":
-                    continue
-                filtered_node_data[node_id][param_name] = values[start_page_idx:end_page_idx]
-    
-    # Filter edge data
-    if edge_ids:
-        for edge_id in edge_ids:
-            if edge_id in edge_data:
-                filtered_edge_data[edge_id] = {}
-                for param_name, values in edge_data[edge_id].items():
-                    filtered_edge_data[edge_id][param_name] = values[start_page_idx:end_page_idx]
-    else:
-        for edge_id, data in edge_data.items():
-            filtered_edge_data[edge_id] = {}
-            for param_name, values in data.items():
-                filtered_edge_data[edge_id][param_name] = values[start_page_idx:end_page_idx]
+    rows = slice(start_page_idx, end_page_idx)
+    
+    # Filter data, reading only the rows of the requested page
+    filtered_timestamps = reader.timestamps_slice(start_page_idx, end_page_idx)
+    filtered_node_data = {
+        node_id: reader.node_values(node_id, rows)
+        for node_id in (node_ids or reader.node_ids)
+        if node_id in reader.node_ids
+    }
+    filtered_edge_data = {
+        edge_id: reader.edge_values(edge_id, rows)
+        for edge_id in (edge_ids or reader.edge_ids)
+        if edge_id in reader.edge_ids
+    }
     
     return MaterialBalanceTimeSeriesResponse(
         job_id=job_id,
@@ -425,6 +397,95 @@ def get_calculation_timeseries(
     )
 
 
+@router.get("/result/{job_id}/export", response_class=StreamingResponse)
+def export_calculation_timeseries(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+    start_time: Optional[float] = Query(None, description="开始时间 (小时)"),
+    end_time: Optional[float] = Query(None, description="结束时间 (小时)"),
+    node_ids: Optional[List[str]] = Query(None, description="指定节点ID列表"),
+    edge_ids: Optional[List[str]] = Query(None, description="指定边ID列表"),
+    parameters: Optional[List[str]] = Query(None, description="指定参数名列表"),
+    export_format: ResultExportFormat = Query(
+        ResultExportFormat.ndjson, alias="format", description="导出格式: ndjson/csv/arrow"
+    ),
+    target_points: Optional[int] = Query(None, ge=3, description="降采样目标点数"),
+    downsample: ResultDownsampleMethod = Query(
+        ResultDownsampleMethod.lttb, description="降采样方法: lttb/minmax"
+    ),
+) -> Any:
+    """
+    流式导出时间序列（NDJSON/CSV/Arrow），支持筛选和降采样
+    """
+    statement = select(ASM1SlimJob).where(
+        ASM1SlimJob.job_id == job_id,
+        ASM1SlimJob.owner_id == current_user.id
+    )
+    job = session.exec(statement).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail="ASM1slim calculation job not found"
+        )
+    
+    if job.status != MaterialBalanceJobStatus.success:
+        raise HTTPException(
+            status_code=400,
+            detail=f"ASM1slim calculation not completed successfully. Status: {job.status}"
+        )
+    
+    if not job.result_data:
+        raise HTTPException(
+            status_code=404,
+            detail="ASM1slim calculation result data not found"
+        )
+    
+    query = MaterialBalanceExportQuery(
+        format=export_format,
+        start_time=start_time,
+        end_time=end_time,
+        node_ids=node_ids,
+        edge_ids=edge_ids,
+        parameters=parameters,
+        target_points=target_points,
+        downsample=downsample,
+    )
+    try:
+        return build_export_response(job_id, job.result_data, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/result/{job_id}/partial", response_model=Dict[str, Any])
+def get_partial_results(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+    since: int = Query(0, ge=0, description="从该序号起的增量帧"),
+) -> Any:
+    """
+    获取运行中ASM1 Slim任务已推送的部分结果增量帧，供晚加入或漏收的 WebSocket 客户端补读
+    """
+    statement = select(ASM1SlimJob).where(
+        ASM1SlimJob.job_id == job_id,
+        ASM1SlimJob.owner_id == current_user.id
+    )
+    job = session.exec(statement).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        "frames": read_partial_results(job_id, since),
+    }
+
+
 @router.get("/status/{job_id}", response_model=ASM1SlimJobPublic)
 def get_calculation_status(
     *,
@@ -456,7 +517,50 @@ def get_calculation_status(
         started_at=job.started_at,
         completed_at=job.completed_at,
         error_message=job.error_message,
-        result_data=job.result_data,
+        result_data=load_result_data(job.result_data),
+    )
+
+
+
+@router.post("/cancel/{job_id}", response_model=ASM1SlimJobPublic)
+def cancel_calculation_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+) -> Any:
+    """
+    取消ASM1slim计算任务
+    """
+    statement = select(ASM1SlimJob).where(
+        ASM1SlimJob.job_id == job_id,
+        ASM1SlimJob.owner_id == current_user.id
+    )
+    job = session.exec(statement).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail="ASM1slim calculation job not found"
+        )
+    
+    if not cancel_calculation(session, job_kind="asm1slim", job_id=job_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job cannot be cancelled. Current status: {job.status}",
+        )
+    session.refresh(job)
+    
+    return ASM1SlimJobPublic(
+        id=job.id,
+        job_id=job.job_id,
+        job_name=job.job_name,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+        error_message=job.error_message,
+        result_data=load_result_data(job.result_data),
     )
 
 
@@ -583,10 +687,47 @@ def delete_calculation_job(
     
     session.delete(job)
     session.commit()
+    delete_result(job_id)
     
     return Message(message="ASM1slim calculation job deleted successfully")
 
 
+@router.post("/jobs/{job_id}/extend", response_model=ASM1SlimJobPublic)
+def extend_calculation_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    job_id: str,
+    extend_request: CalculationJobExtendRequest,
+) -> Any:
+    """
+    从已完成的ASM1slim计算任务的最终状态继续计算
+    """
+    statement = select(ASM1SlimJob).where(
+        ASM1SlimJob.job_id == job_id,
+        ASM1SlimJob.owner_id == current_user.id
+    )
+    job = session.exec(statement).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="ASM1slim calculation job not found")
+    if job.status != MaterialBalanceJobStatus.success:
+        raise HTTPException(status_code=400, detail="Only completed jobs can be extended")
+
+    try:
+        flowchart_data = continuation_flowchart(job.input_data, job.job_id, extend_request.hours)
+    except WarmStartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return create_calculation_job_from_flowchart(
+        session=session,
+        current_user=current_user,
+        background_tasks=background_tasks,
+        flowchart_data=flowchart_data,
+    )
+
+
 @router.get("/jobs/{job_id}/input-data", response_model=ASM1SlimJobInputDataResponse)
 def get_job_input_data(
     *,
@@ -612,6 +753,6 @@ def get_job_input_data(
     return ASM1SlimJobInputDataResponse(
         job_id=job.job_id,
         input_data=job.input_data or {},
-        result_data=job.result_data or {},
+        result_data=load_result_data(job.result_data) or {},
         status=job.status,
     )
@@ -4,6 +4,7 @@ import asyncio
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 
 from app.api.deps import (
@@ -12,11 +13,15 @@ from app.api.deps import (
     get_current_active_superuser,
 )
 from app.models import (
+    CalculationJobExtendRequest,
     MaterialBalanceInput,
     MaterialBalanceResult,
     MaterialBalanceResultSummary,
     MaterialBalanceTimeSeriesQuery,
     MaterialBalanceTimeSeriesResponse,
+    MaterialBalanceExportQuery,
+    ResultDownsampleMethod,
+    ResultExportFormat,
     MaterialBalanceValidationRequest,
     MaterialBalanceValidationResponse,
     MaterialBalanceJob,
@@ -26,14 +31,21 @@ from app.models import (
     MaterialBalanceJobStatus,
     Message,
 )
-from app.services.material_balance_service import MaterialBalanceService
+from app.services.calculation_queue import cancel_calculation, submit_calculation
 from app.services.data_conversion_service import DataConversionService
+from app.services.result_export import build_export_response
+from app.services.result_store import (
+    delete_result,
+    load_result_data,
+    open_result,
+    read_partial_results,
+)
 from app.services.time_segment_validation import validate_time_segments
+from app.services.warm_start import WarmStartError, continuation_flowchart
 
 router = APIRouter()
 
 # Initialize services
-material_balance_service = MaterialBalanceService()
 data_conversion_service = DataConversionService()
 
 
@@ -75,11 +87,73 @@ def create_calculation_job(
     session.refresh(job)
     
     # Start background calculation
-    background_tasks.add_task(
-        material_balance_service.run_calculation,
+    submit_calculation(
+        session,
+        background_tasks,
+        job_kind="material_balance",
+        job_id=job_id,
+        owner=current_user,
+        input_data=calculation_input,
+    )
+    
+    return MaterialBalanceJobPublic(
+        id=job.id,
+        job_id=job.job_id,
+        job_name=job.job_name,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+        error_message=job.error_message,
+    )
+
+
+@router.post("/calculate-steady-state", response_model=MaterialBalanceJobPublic)
+def create_steady_state_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    calculation_input: MaterialBalanceInput,
+) -> Any:
+    """
+    创建物料平衡稳态计算任务（直接求解稳态，不做时间积分）
+    """
+    # Generate unique job ID
+    job_id = str(uuid4())
+    
+    # Generate job name with timestamp
+    current_time = datetime.now().strftime("%Y%m%d%H%M")
+    job_name = f"unknown_steady_{current_time}"
+    
+    # Create job record
+    # Prefer the original flowchart data when it is provided
+    if calculation_input.original_flowchart_data:
+        input_data = calculation_input.original_flowchart_data
+    else:
+        input_data = calculation_input.model_dump()
+    
+    job = MaterialBalanceJob(
+        job_id=job_id,
+        job_name=job_name,
+        status=MaterialBalanceJobStatus.pending,
+        input_data=input_data,
+        owner_id=current_user.id,
+    )
+    
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    
+    # Start background calculation
+    submit_calculation(
         session,
-        job_id,
-        calculation_input
+        background_tasks,
+        job_kind="material_balance",
+        job_id=job_id,
+        owner=current_user,
+        input_data=calculation_input,
+        steady_state=True,
     )
     
     return MaterialBalanceJobPublic(
@@ -155,11 +229,13 @@ def create_calculation_job_from_flowchart(
         session.commit()
         session.refresh(job)
 
-        background_tasks.add_task(
-            material_balance_service.run_calculation,
+        submit_calculation(
             session,
-            job_id,
-            calculation_input,
+            background_tasks,
+            job_kind="material_balance",
+            job_id=job_id,
+            owner=current_user,
+            input_data=calculation_input,
         )
 
         return MaterialBalanceJobPublic(
@@ -252,6 +328,7 @@ def get_calculation_result_summary(
         solver_method=summary.get("solver_method"),
         segment_count=summary.get("segment_count"),
         parameter_change_event_count=summary.get("parameter_change_event_count"),
+        profile=summary.get("profile"),
         error_message=job.error_message,
     )
 
@@ -284,39 +361,18 @@ def get_calculation_final_values(
     if not job.result_data:
         raise HTTPException(status_code=404, detail="Result data not found")
     
-    result_data = job.result_data
-    timestamps = result_data.get("timestamps", [])
-    node_data = result_data.get("node_data", {})
-    edge_data = result_data.get("edge_data", {})
+    reader = open_result(job.result_data)
     
-    if not timestamps:
+    if not reader.time_points:
         raise HTTPException(status_code=404, detail="No time series data found")
     
-    # 鎻愬彇姣忎釜鑺傜偣鍜岃竟鐨勬渶鍚庝竴浣嶆暟鎹?
-    final_node_data = {}
-    for node_id, data in node_data.items():
-        final_node_data[node_id] = {}
-        for param_name, values in data.items():
-            # 璺宠繃label瀛楁锛屽洜涓哄畠涓嶆槸鏃堕棿搴忓垪鏁版嵁
-            if param_name == "label":
-                continue
-            if values and len(values) > 0:
-                final_node_data[node_id][param_name] = values[-1]  # 鑾峰彇鏁扮粍鐨勬渶鍚庝竴浣?
-            else:
-                final_node_data[node_id][param_name] = 0.0
-    
-    final_edge_data = {}
-    for edge_id, data in edge_data.items():
-        final_edge_data[edge_id] = {}
-        for param_name, values in data.items():
-            if values and len(values) > 0:
-                final_edge_data[edge_id][param_name] = values[-1]  # 鑾峰彇鏁扮粍鐨勬渶鍚庝竴浣?
-            else:
-                final_edge_data[edge_id][param_name] = 0.0
+    # Only the last row of each series is read from the result store
+    final_node_data = {node_id: reader.node_values(node_id, -1) for node_id in reader.node_ids}
+    final_edge_data = {edge_id: reader.edge_values(edge_id, -1) for edge_id in reader.edge_ids}
     
     return {
         "job_id": job_id,
-        "final_time": timestamps[-1] if timestamps else 0.0,
+        "final_time": float(reader.timestamps[-1]),
         "node_data": final_node_data,
         "edge_data": final_edge_data,
         "status": job.status
@@ -373,6 +429,89 @@ def get_calculation_timeseries(
     )
 
 
+@router.get("/result/{job_id}/export", response_class=StreamingResponse)
+def export_calculation_timeseries(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+    start_time: Optional[float] = Query(None, description="开始时间 (小时)"),
+    end_time: Optional[float] = Query(None, description="结束时间 (小时)"),
+    node_ids: Optional[List[str]] = Query(None, description="指定节点ID列表"),
+    edge_ids: Optional[List[str]] = Query(None, description="指定边ID列表"),
+    parameters: Optional[List[str]] = Query(None, description="指定参数名列表"),
+    export_format: ResultExportFormat = Query(
+        ResultExportFormat.ndjson, alias="format", description="导出格式: ndjson/csv/arrow"
+    ),
+    target_points: Optional[int] = Query(None, ge=3, description="降采样目标点数"),
+    downsample: ResultDownsampleMethod = Query(
+        ResultDownsampleMethod.lttb, description="降采样方法: lttb/minmax"
+    ),
+) -> Any:
+    """
+    流式导出时间序列（NDJSON/CSV/Arrow），支持筛选和降采样
+    """
+    statement = select(MaterialBalanceJob).where(
+        MaterialBalanceJob.job_id == job_id,
+        MaterialBalanceJob.owner_id == current_user.id
+    )
+    job = session.exec(statement).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status != MaterialBalanceJobStatus.success:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Job is not completed successfully. Status: {job.status}"
+        )
+    
+    if not job.result_data:
+        raise HTTPException(status_code=404, detail="Result data not found")
+    
+    query = MaterialBalanceExportQuery(
+        format=export_format,
+        start_time=start_time,
+        end_time=end_time,
+        node_ids=node_ids,
+        edge_ids=edge_ids,
+        parameters=parameters,
+        target_points=target_points,
+        downsample=downsample,
+    )
+    try:
+        return build_export_response(job_id, job.result_data, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/result/{job_id}/partial", response_model=Dict[str, Any])
+def get_partial_results(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+    since: int = Query(0, ge=0, description="从该序号起的增量帧"),
+) -> Any:
+    """
+    获取运行中物料平衡任务已推送的部分结果增量帧，供晚加入或漏收的 WebSocket 客户端补读
+    """
+    statement = select(MaterialBalanceJob).where(
+        MaterialBalanceJob.job_id == job_id,
+        MaterialBalanceJob.owner_id == current_user.id
+    )
+    job = session.exec(statement).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        "frames": read_partial_results(job_id, since),
+    }
+
+
 @router.get("/status/{job_id}", response_model=MaterialBalanceJobPublic)
 def get_calculation_status(
     *,
@@ -404,6 +543,45 @@ def get_calculation_status(
     )
 
 
+
+@router.post("/cancel/{job_id}", response_model=MaterialBalanceJobPublic)
+def cancel_calculation_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+) -> Any:
+    """
+    取消物料平衡计算任务
+    """
+    statement = select(MaterialBalanceJob).where(
+        MaterialBalanceJob.job_id == job_id,
+        MaterialBalanceJob.owner_id == current_user.id
+    )
+    job = session.exec(statement).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if not cancel_calculation(session, job_kind="material_balance", job_id=job_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job cannot be cancelled. Current status: {job.status}",
+        )
+    session.refresh(job)
+    
+    return MaterialBalanceJobPublic(
+        id=job.id,
+        job_id=job.job_id,
+        job_name=job.job_name,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+        error_message=job.error_message,
+    )
+
+
 @router.post("/validate", response_model=MaterialBalanceValidationResponse)
 def validate_calculation_input(
     *,
@@ -505,10 +683,47 @@ def delete_calculation_job(
     
     session.delete(job)
     session.commit()
+    delete_result(job_id)
     
     return Message(message="Job deleted successfully")
 
 
+@router.post("/jobs/{job_id}/extend", response_model=MaterialBalanceJobPublic)
+def extend_calculation_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    job_id: str,
+    extend_request: CalculationJobExtendRequest,
+) -> Any:
+    """
+    从已完成的物料平衡计算任务的最终状态继续计算
+    """
+    statement = select(MaterialBalanceJob).where(
+        MaterialBalanceJob.job_id == job_id,
+        MaterialBalanceJob.owner_id == current_user.id
+    )
+    job = session.exec(statement).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != MaterialBalanceJobStatus.success:
+        raise HTTPException(status_code=400, detail="Only completed jobs can be extended")
+
+    try:
+        flowchart_data = continuation_flowchart(job.input_data, job.job_id, extend_request.hours)
+    except WarmStartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return create_calculation_job_from_flowchart(
+        session=session,
+        current_user=current_user,
+        background_tasks=background_tasks,
+        flowchart_data=flowchart_data,
+    )
+
+
 @router.get("/jobs/{job_id}/input-data", response_model=MaterialBalanceJobInputDataResponse)
 def get_job_input_data(
     *,
@@ -537,6 +752,6 @@ def get_job_input_data(
     return MaterialBalanceJobInputDataResponse(
         job_id=job_id,
         input_data=job.input_data,
-        result_data=job.result_data,
+        result_data=load_result_data(job.result_data),
         status=job.status
     )
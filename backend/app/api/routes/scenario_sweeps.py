@@ -0,0 +1,255 @@
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from sqlmodel import func, select
+
+from app.api.deps import CurrentUser, SessionDep
+from app.material_balance.exceptions import InvalidInputError
+from app.material_balance.sweep import apply_variant, generate_variants
+from app.models import (
+    MaterialBalanceJobStatus,
+    Message,
+    ScenarioSweepJob,
+    ScenarioSweepJobPublic,
+    ScenarioSweepJobsPublic,
+    ScenarioSweepRequest,
+    ScenarioSweepVariantResponse,
+)
+from app.services.calculation_queue import cancel_calculation, submit_calculation
+from app.services.data_conversion_service import DataConversionService
+from app.services.time_segment_validation import validate_time_segments
+
+router = APIRouter()
+
+# Initialize services
+data_conversion_service = DataConversionService()
+
+
+def _to_public(job: ScenarioSweepJob) -> ScenarioSweepJobPublic:
+    return ScenarioSweepJobPublic(
+        id=job.id,
+        job_id=job.job_id,
+        job_name=job.job_name,
+        status=job.status,
+        variant_count=job.variant_count,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        completed_at=job.completed_at,
+        error_message=job.error_message,
+        summary_data=job.summary_data,
+    )
+
+
+def _get_owned_job(session: SessionDep, current_user: CurrentUser, job_id: str) -> ScenarioSweepJob:
+    statement = select(ScenarioSweepJob).where(
+        ScenarioSweepJob.job_id == job_id,
+        ScenarioSweepJob.owner_id == current_user.id,
+    )
+    job = session.exec(statement).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("", response_model=ScenarioSweepJobPublic)
+def create_scenario_sweep_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    sweep_request: ScenarioSweepRequest,
+) -> Any:
+    """
+    创建参数扫描任务：同一流程图的所有参数变体在一次批量求解中计算
+    """
+    flowchart_data = sweep_request.flowchart_data
+    calculation_params = flowchart_data.get("calculationParameters", {})
+    time_segment_errors = validate_time_segments(
+        time_segments=flowchart_data.get(
+            "timeSegments",
+            flowchart_data.get("time_segments"),
+        ),
+        total_hours=calculation_params.get("hours"),
+        edge_ids=[
+            str(edge.get("id"))
+            for edge in flowchart_data.get("edges", [])
+            if isinstance(edge, dict) and edge.get("id") is not None
+        ],
+        parameter_names=[
+            str(param.get("name"))
+            for param in flowchart_data.get("customParameters", [])
+            if isinstance(param, dict) and param.get("name") is not None
+        ],
+    )
+    if time_segment_errors:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "code": "TIME_SEGMENT_VALIDATION_FAILED",
+                "errors": time_segment_errors,
+            },
+        )
+
+    try:
+        calculation_input = data_conversion_service.convert_flowchart_to_material_balance_input(
+            flowchart_data=flowchart_data,
+            calculation_params=calculation_params,
+        )
+        variants = generate_variants(
+            sweep_request.parameters,
+            sweep_request.mode,
+            sweep_request.samples,
+            sweep_request.seed,
+        )
+        # Fail fast on unknown nodes/edges/parameter names
+        apply_variant(calculation_input, sweep_request.parameters, variants[0])
+    except InvalidInputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to process flowchart data: {str(e)}",
+        )
+
+    job_id = str(uuid4())
+    current_time = datetime.now().strftime("%Y%m%d%H%M")
+    flowchart_name = flowchart_data.get("name", "unknown") or "unknown"
+
+    job = ScenarioSweepJob(
+        job_id=job_id,
+        job_name=f"{flowchart_name}_sweep_{current_time}",
+        status=MaterialBalanceJobStatus.pending,
+        variant_count=len(variants),
+        input_data=sweep_request.model_dump(mode="json"),
+        owner_id=current_user.id,
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+
+    submit_calculation(
+        session,
+        background_tasks,
+        job_kind="scenario_sweep",
+        job_id=job_id,
+        owner=current_user,
+        input_data=calculation_input,
+        parameters=[param.model_dump(mode="json") for param in sweep_request.parameters],
+        variants=variants,
+        include_trajectories=sweep_request.include_trajectories,
+    )
+
+    return _to_public(job)
+
+
+@router.get("", response_model=ScenarioSweepJobsPublic)
+def get_scenario_sweep_jobs(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = Query(0, ge=0, description="跳过的记录数"),
+    limit: int = Query(100, ge=1, le=1000, description="返回的记录数"),
+) -> Any:
+    """
+    获取用户的参数扫描任务列表
+    """
+    statement = (
+        select(ScenarioSweepJob)
+        .where(ScenarioSweepJob.owner_id == current_user.id)
+        .order_by(ScenarioSweepJob.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    jobs = session.exec(statement).all()
+    count_statement = (
+        select(func.count())
+        .select_from(ScenarioSweepJob)
+        .where(ScenarioSweepJob.owner_id == current_user.id)
+    )
+    count = session.exec(count_statement).one()
+
+    return ScenarioSweepJobsPublic(data=[_to_public(job) for job in jobs], count=count)
+
+
+@router.get("/{job_id}", response_model=ScenarioSweepJobPublic)
+def get_scenario_sweep_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+) -> Any:
+    """
+    获取参数扫描任务状态和变体汇总表
+    """
+    return _to_public(_get_owned_job(session, current_user, job_id))
+
+
+@router.get("/{job_id}/variants/{variant_index}", response_model=ScenarioSweepVariantResponse)
+def get_scenario_sweep_variant(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+    variant_index: int,
+) -> Any:
+    """
+    获取单个变体的参数取值和结果
+    """
+    job = _get_owned_job(session, current_user, job_id)
+    if job.status != MaterialBalanceJobStatus.success or not job.result_data:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job is not completed successfully. Current status: {job.status}",
+        )
+
+    variants = job.result_data.get("variants", [])
+    if not 0 <= variant_index < len(variants):
+        raise HTTPException(status_code=404, detail="Variant not found")
+    variant = variants[variant_index]
+
+    return ScenarioSweepVariantResponse(
+        job_id=job_id,
+        variant_index=variant_index,
+        overrides=variant["overrides"],
+        final_values=variant["final_values"],
+        timestamps=job.result_data.get("timestamps"),
+        node_data=variant.get("node_data"),
+    )
+
+
+@router.post("/{job_id}/cancel", response_model=ScenarioSweepJobPublic)
+def cancel_scenario_sweep_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+) -> Any:
+    """
+    取消参数扫描任务
+    """
+    job = _get_owned_job(session, current_user, job_id)
+    if not cancel_calculation(session, job_kind="scenario_sweep", job_id=job_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job cannot be cancelled. Current status: {job.status}",
+        )
+    session.refresh(job)
+    return _to_public(job)
+
+
+@router.delete("/{job_id}", response_model=Message)
+def delete_scenario_sweep_job(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    job_id: str,
+) -> Any:
+    """
+    删除参数扫描任务
+    """
+    job = _get_owned_job(session, current_user, job_id)
+    session.delete(job)
+    session.commit()
+    return Message(message="Job deleted successfully")
@@ -121,6 +121,50 @@ class Settings(BaseSettings):
     
     # 文件上传配置
     UPLOAD_DIR: str = "temp/uploads"
+    # 计算结果时间序列的列式存储目录
+    RESULT_STORE_DIR: str = "temp/results"
+
+    # 计算任务工作进程配置（0 表示在 Web 进程内后台执行）
+    CALCULATION_WORKERS: int = 2
+    CALCULATION_TORCH_THREADS: int = 1
+    CALCULATION_PIN_CPUS: bool = False
+    CALCULATION_QUEUE_POLL_SECONDS: float = 1.0
+    # 运行中任务的心跳间隔；本机工作进程按 PID 判断是否存活，其他主机的任务心跳超时后重新排队
+    CALCULATION_HEARTBEAT_SECONDS: float = 15.0
+    CALCULATION_HEARTBEAT_TIMEOUT_SECONDS: int = 120
+    # 取消后的检查间隔与强制终止工作进程前的宽限期
+    CALCULATION_CANCEL_POLL_SECONDS: float = 1.0
+    CALCULATION_CANCEL_GRACE_SECONDS: float = 10.0
+    # 每个工作进程缓存的已转换模型运行时（张量与编译后的 UDM 表达式）数量，0 表示不缓存
+    CALCULATION_RUNTIME_CACHE_SIZE: int = 16
+    # 分时段计算的时段轨迹快照：只改动后面的时段时，从最后一个未改动的时段边界续算；目录留空表示关闭
+    CALCULATION_SNAPSHOT_DIR: str = "temp/segment_snapshots"
+    CALCULATION_SNAPSHOT_MAX_MB: int = 1024
+    # 长时段按模拟小时分块积分，每块结束后保存检查点；工作进程意外退出的任务重新排队并从最后一个检查点续算（0 表示不分块）
+    CALCULATION_CHECKPOINT_HOURS: float = 24.0
+    CALCULATION_MAX_RESUMES: int = 2
+    # 预计轨迹超过该大小（MB）时逐段写入结果目录下的磁盘文件并以内存映射读取，单段输出不超过 CHUNK_MB；0 表示始终在内存中
+    CALCULATION_SPILL_THRESHOLD_MB: int = 256
+    CALCULATION_SPILL_CHUNK_MB: int = 32
+    # 计算进度（模拟时长、RHS 次数、预计剩余时间）通过 WebSocket 推送的最小间隔（秒），0 表示不推送
+    CALCULATION_PROGRESS_INTERVAL_SECONDS: float = 1.0
+    # 每个积分块完成后降采样推送的部分结果点数（增量帧同时写入结果目录供晚加入的客户端补读），0 表示不推送
+    CALCULATION_PARTIAL_RESULT_POINTS: int = 64
+    # 输入完全相同的任务直接复用已完成的结果，排队中的相同任务合并为一次计算
+    CALCULATION_DEDUPLICATE_RESULTS: bool = True
+    # 按用户类型的队列优先级和同时运行任务数上限
+    CALCULATION_USER_PRIORITY: dict[str, int] = {
+        "basic": 0,
+        "pro": 10,
+        "ultra": 20,
+        "enterprise": 30,
+    }
+    CALCULATION_USER_CONCURRENCY: dict[str, int] = {
+        "basic": 1,
+        "pro": 2,
+        "ultra": 4,
+        "enterprise": 8,
+    }
     
     # Redis配置
     REDIS_HOST: str = "localhost"
@@ -28,6 +28,8 @@ class SimpleWebSocketManager:
         # 全局消息队列，用于跨线程消息传递
         self._message_queue: asyncio.Queue = asyncio.Queue()
         self._message_processor_task: Optional[asyncio.Task] = None
+        # 后台任务所在的事件循环；其他线程通过它把消息放入队列
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
     def _generate_connection_id(self) -> str:
         """生成唯一的连接ID"""
@@ -97,7 +99,8 @@ class SimpleWebSocketManager:
         """向指定任务的所有连接广播消息"""
         async with self._lock:
             if task_id not in self.active_connections:
-                logger.warning(f"[SimpleWebSocket] 任务 {task_id} 没有活跃连接")
+                # 进度消息在无人订阅时也会持续产生，不记为警告
+                logger.debug(f"[SimpleWebSocket] 任务 {task_id} 没有活跃连接")
                 return
             
             connections = self.active_connections[task_id].copy()
@@ -148,9 +151,30 @@ class SimpleWebSocketManager:
         }
         await self.broadcast_to_task(message, task_id)
     
-    def send_progress_from_thread(self, task_id: str, progress: float, message: str, status: str = "running"):
-        """从其他线程发送进度更新（线程安全）"""
+    def _put_from_thread(self, item: dict):
+        """把消息放入队列：asyncio.Queue 不是线程安全的，其他线程需经事件循环转交"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(self._message_queue.put_nowait, item)
+                return
+        self._message_queue.put_nowait(item)
+
+    def send_progress_from_thread(
+        self,
+        task_id: str,
+        progress: float,
+        message: str,
+        status: str = "running",
+        details: Optional[dict] = None,
+    ):
+        """从其他线程发送进度更新（线程安全），details 为附加字段（如模拟时长、预计剩余时间）"""
         progress_data = {
+            **(details or {}),
             "progress": progress,
             "message": message,
             "status": status
@@ -158,19 +182,31 @@ class SimpleWebSocketManager:
         
         # 将消息放入队列，由消息处理器异步处理
         try:
-            self._message_queue.put_nowait({
+            self._put_from_thread({
                 "type": "progress_update",
                 "task_id": task_id,
                 "data": progress_data
             })
-            logger.info(f"[SimpleWebSocket] 进度消息已加入队列: task_id={task_id}, progress={progress}")
+            logger.debug(f"[SimpleWebSocket] 进度消息已加入队列: task_id={task_id}, progress={progress}")
         except Exception as e:
             logger.error(f"[SimpleWebSocket] 加入消息队列失败: task_id={task_id}, error={e}")
     
+    def send_partial_result_from_thread(self, task_id: str, frame: dict):
+        """从其他线程推送部分结果增量帧（线程安全），frame 带序号 seq"""
+        try:
+            self._put_from_thread({
+                "type": "partial_result",
+                "task_id": task_id,
+                "data": frame
+            })
+            logger.debug(f"[SimpleWebSocket] 部分结果已加入队列: task_id={task_id}, seq={frame.get('seq')}")
+        except Exception as e:
+            logger.error(f"[SimpleWebSocket] 加入消息队列失败: task_id={task_id}, error={e}")
+
     def send_task_complete_from_thread(self, task_id: str, result_data: dict):
         """从其他线程发送任务完成通知（线程安全）"""
         try:
-            self._message_queue.put_nowait({
+            self._put_from_thread({
                 "type": "task_complete",
                 "task_id": task_id,
                 "data": result_data
@@ -182,7 +218,7 @@ class SimpleWebSocketManager:
     def send_task_error_from_thread(self, task_id: str, error_data: dict):
         """从其他线程发送任务错误通知（线程安全）"""
         try:
-            self._message_queue.put_nowait({
+            self._put_from_thread({
                 "type": "task_error",
                 "task_id": task_id,
                 "data": error_data
@@ -283,6 +319,7 @@ class SimpleWebSocketManager:
     
     async def start_background_tasks(self):
         """启动后台任务"""
+        self._loop = asyncio.get_running_loop()
         if not self._cleanup_task:
             self._cleanup_task = asyncio.create_task(self.cleanup_stale_connections())
         if not self._ping_task:
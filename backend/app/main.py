@@ -12,6 +12,7 @@ from app.core.config import settings
 from app.core.exception_handlers import setup_exception_handlers
 from app.core.simple_websocket_manager import simple_websocket_manager
 from app.core.logging_config import setup_logging
+from app.services.calculation_queue import calculation_worker_pool
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -53,6 +54,8 @@ async def startup_event():
     """应用启动事件"""
     # 启动简化的WebSocket后台任务
     await simple_websocket_manager.start_background_tasks()
+    # 启动计算工作进程池
+    await calculation_worker_pool.start()
 
 
 @app.on_event("shutdown")
@@ -60,3 +63,5 @@ async def shutdown_event():
     """应用关闭事件"""
     # 停止简化的WebSocket后台任务
     await simple_websocket_manager.stop_background_tasks()
+    # 停止计算工作进程池
+    await calculation_worker_pool.stop()
@@ -1,14 +1,81 @@
-import torch
-
-from .common import safe_div, monod, inhibition
+from typing import NamedTuple
 
+import torch
 
-def reaction(params: torch.Tensor, C: torch.Tensor) -> torch.Tensor:
+from .common import monod, safe_div
+
+
+class ASM1Params(NamedTuple):
+    """ASM1 per-node constants derived once from the 19-column parameter matrix.
+
+    Each field is a contiguous [G] tensor. ``reaction_prepared`` unpacks them
+    by position, so a plain tuple in the same order works too.
+    """
+
+    K_S: torch.Tensor
+    K_OH: torch.Tensor
+    K_NO: torch.Tensor
+    K_NH: torch.Tensor
+    K_OA: torch.Tensor
+    K_x: torch.Tensor
+    n_h: torch.Tensor
+    Y_H: torch.Tensor
+    f_P: torch.Tensor
+    i_XB: torch.Tensor
+    u_H_24: torch.Tensor       # u_H / 24 (d^-1 -> h^-1)
+    u_A_24: torch.Tensor       # u_A / 24
+    decay_H: torch.Tensor      # -b_H / 24
+    decay_A: torch.Tensor      # -b_A / 24
+    hydrolysis: torch.Tensor   # -K_h / 24
+    ammonification: torch.Tensor  # -K_a / 24
+    anoxic_NO: torch.Tensor    # (1 - Y_H) / 2.86 * (-1 / Y_H) * n_g
+    S_per_NO: torch.Tensor     # 2.86 / (1 - Y_H)
+    inv_Y_H: torch.Tensor      # 1 / Y_H
+    inv_Y_A: torch.Tensor      # 1 / Y_A
+    NH_per_BA: torch.Tensor    # -(i_XB + 1 / Y_A)
+    ND_per_BAr: torch.Tensor   # i_XB - f_P * i_XP
+
+
+def prepare(params: torch.Tensor) -> ASM1Params:
+    """Hoist the parameter-only math of ``reaction`` out of the RHS."""
+    u_H, K_S, K_OH, K_NO, n_g, b_H, u_A, K_NH, K_OA, b_A, \
+    Y_H, Y_A, i_XB, i_XP, f_P, n_h, K_a, K_h, K_x = (
+        column.contiguous() for column in params.unbind(dim=1)
+    )
+    one = params.new_tensor(1.0)
+    inv_Y_H = safe_div(one, Y_H)
+    inv_Y_A = safe_div(one, Y_A)
+    return ASM1Params(
+        K_S=K_S,
+        K_OH=K_OH,
+        K_NO=K_NO,
+        K_NH=K_NH,
+        K_OA=K_OA,
+        K_x=K_x,
+        n_h=n_h,
+        Y_H=Y_H,
+        f_P=f_P,
+        i_XB=i_XB,
+        u_H_24=u_H / 24.0,
+        u_A_24=u_A / 24.0,
+        decay_H=-b_H / 24.0,
+        decay_A=-b_A / 24.0,
+        hydrolysis=-K_h / 24.0,
+        ammonification=-K_a / 24.0,
+        anoxic_NO=safe_div(one - Y_H, params.new_tensor(2.86)) * -inv_Y_H * n_g,
+        S_per_NO=safe_div(params.new_tensor(2.86), one - Y_H),
+        inv_Y_H=inv_Y_H,
+        inv_Y_A=inv_Y_A,
+        NH_per_BA=-(i_XB + inv_Y_A),
+        ND_per_BAr=i_XB - f_P * i_XP,
+    )
+
+
+def reaction_prepared(prepared: ASM1Params, C: torch.Tensor) -> torch.Tensor:
     # Extract the relevant variables from the matrix
     X_BH = C[:, 0]
     X_BA = C[:, 1]
     X_S = C[:, 2]
-    X_i = C[:, 3]
     X_ND = C[:, 4]
     S_O = C[:, 5]
     S_S = C[:, 6]
@@ -17,96 +84,70 @@ def reaction(params: torch.Tensor, C: torch.Tensor) -> torch.Tensor:
     S_ND = C[:, 9]
     S_ALK = C[:, 10]
 
-    u_H, K_S, K_OH, K_NO, n_g, b_H, u_A, K_NH, K_OA, b_A, \
-    Y_H, Y_A, i_XB, i_XP, f_P, n_h, K_a, K_h, K_x = params.unbind(dim=1)
+    K_S, K_OH, K_NO, K_NH, K_OA, K_x, n_h, Y_H, f_P, i_XB, u_H_24, u_A_24, \
+    decay_H, decay_A, hydrolysis, ammonification, anoxic_NO, S_per_NO, \
+    inv_Y_H, inv_Y_A, NH_per_BA, ND_per_BAr = prepared
 
-    # 使用安全除法计算所有Monod/抑制函数
+    # 使用安全除法计算所有Monod/抑制函数（KOH 与 KOHa 共用分母）
     KS = monod(S_S, K_S)
-    KOH = monod(S_O, K_OH)
-    KOHa = inhibition(S_O, K_OH)
+    O_den = (K_OH + S_O).clamp_min(1e-12)
+    KOH = S_O / O_den
+    KOHa = K_OH / O_den
     KNO = monod(S_NO, K_NO)
     KNH = monod(S_NH, K_NH)
     KOA = monod(S_O, K_OA)
 
     # 对特定条件进行覆盖（不在torch.where中写除法）
-    KS = torch.where(S_S < 5, torch.zeros_like(KS), KS)
-    KOH = torch.where(S_O < 0.01, torch.zeros_like(KOH), KOH)
-    KOHa = torch.where(S_O < 1.5, KOHa, torch.zeros_like(KOHa))
-    u_A = torch.where((S_O < 0.5) | (S_ALK < 0.5), torch.zeros_like(u_A), u_A)
-
-    # 计算KXS和KXND，先安全算比值，再条件覆盖
-    ratio_XS_XBH = safe_div(X_S, X_BH)
-    ratio_XND_XBH = safe_div(X_ND, X_BH)
-
-    KXS = X_BH.new_tensor(1.0) - safe_div(K_x, K_x + ratio_XS_XBH)
-    KXND = X_BH.new_tensor(1.0) - safe_div(K_x, K_x + ratio_XND_XBH)
-
-    # 对X_BH==0的位置进行显式覆盖
-    KXS = torch.where(X_BH <= 0, torch.zeros_like(KXS), KXS)
-    KXND = torch.where(X_BH <= 0, torch.zeros_like(KXND), KXND)
+    KS = torch.where(S_S < 5, 0.0, KS)
+    KOH = torch.where(S_O < 0.01, 0.0, KOH)
+    KOHa = torch.where(S_O < 1.5, KOHa, 0.0)
 
-    # 使用安全除法处理常数除法
-    dX_BHmax = safe_div(u_H * X_BH, X_BH.new_tensor(24.0))
-    dX_BAmax = safe_div(u_A * X_BA, X_BH.new_tensor(24.0))
+    # 计算KXS和KXND，先安全算比值，再条件覆盖（X_BH<=0 时为 0）
+    no_biomass = X_BH <= 0
+    KXS = torch.where(no_biomass, 0.0, 1.0 - safe_div(K_x, K_x + safe_div(X_S, X_BH)))
+    KXND = torch.where(no_biomass, 0.0, 1.0 - safe_div(K_x, K_x + safe_div(X_ND, X_BH)))
 
-    # 计算dS_NO0，使用安全除法
-    factor1 = safe_div(X_BH.new_tensor(1.0) - Y_H, X_BH.new_tensor(2.86))
-    factor2 = safe_div(-X_BH.new_tensor(1.0), Y_H)
-    dS_NO0 = factor1 * (factor2 * torch.min(torch.min(KS, KOHa), KNO) * n_g * dX_BHmax)
+    dX_BHmax = u_H_24 * X_BH
+    dX_BAmax = torch.where((S_O < 0.5) | (S_ALK < 0.5), 0.0, u_A_24 * X_BA)
 
-    # 计算dS_S0，使用安全除法
-    dS_S0 = dS_NO0 * safe_div(X_BH.new_tensor(2.86), X_BH.new_tensor(1.0) - Y_H)
+    dS_NO0 = anoxic_NO * torch.min(torch.min(KS, KOHa), KNO) * dX_BHmax
+    dS_S0 = dS_NO0 * S_per_NO
 
     dX_BH1 = torch.min(KS, KOH) * dX_BHmax
     dX_BH2 = -dS_S0 * Y_H
-    dX_BHr = -safe_div(b_H * X_BH, X_BH.new_tensor(24.0))
+    dX_BHr = decay_H * X_BH
 
     dX_BA1 = torch.min(KNH, KOA) * dX_BAmax
-    dX_BAr = -safe_div(b_A * X_BA, X_BH.new_tensor(24.0))
+    dX_BAr = decay_A * X_BA
+    decay = dX_BHr + dX_BAr
 
-    dX_S1 = -dX_BH1 / Y_H
-    dX_S2 = -dS_S0
-    dX_S3 = safe_div(-K_h * KXS * (KOH * X_BH + n_h * KOHa * KNO * X_BH), X_BH.new_tensor(24.0))
+    # 异养菌水解的驱动项（好氧 + 缺氧）
+    hydrolysis_drive = hydrolysis * (KOH * X_BH + n_h * KOHa * KNO * X_BH)
+    dX_S3 = hydrolysis_drive * KXS
+    dX_ND3 = hydrolysis_drive * KXND
 
-    dX_i = f_P * dX_BHr + f_P * dX_BAr
+    dS_ND1 = ammonification * S_ND * X_BH  # 4-1 溶解有机氮增长速率-异养菌消耗
+    dS_S1 = -inv_Y_H * dX_BH1  # 6-1 溶解有机物增长速率-异养菌好氧生长
+    dS_NO2 = inv_Y_A * dX_BA1  # 2-2 硝化硝态氮增长速率
 
-    dX_ND1 = i_XB * (dX_BHr + dX_BAr)
-    dX_ND2 = (i_XB - f_P * i_XP) * dX_BAr
-    dX_ND3 = -safe_div(K_h * KXND * (KOH * X_BH + n_h * KOHa * KNO * X_BH), X_BH.new_tensor(24.0))
-
-    dS_ND1 = -safe_div(K_a * S_ND * X_BH, X_BH.new_tensor(24.0))  # 4-1 溶解有机氮增长速率-异养菌消耗
-    dS_ND2 = -dX_ND3  # 4-2 溶解有机氮增长速率-异养菌水解颗粒有机氮
-
-    dS_S1 = -safe_div(X_BH.new_tensor(1.0), Y_H) * dX_BH1  # 6-1 溶解有机物增长速率-异养菌好氧生长
-    dS_S2 = dS_S0
-    dS_S3 = -dX_S3  # 6-3 溶解有机物增长速率-颗粒有机物的异养菌水解
-
-    dS_NO1 = dS_NO0
-    dS_NO2 = safe_div(X_BH.new_tensor(1.0), Y_A) * dX_BA1  # 2-2 硝化硝态氮增长速率
-
-    dS_NH1 = -(i_XB + safe_div(X_BH.new_tensor(1.0), Y_A)) * dX_BA1  # 5-1 氨氮增长速率-自养菌好氧生长
+    dS_NH1 = NH_per_BA * dX_BA1  # 5-1 氨氮增长速率-自养菌好氧生长
     dS_NH2 = -i_XB * dX_BH1  # 5-2 氨氮增长速率-异养菌好氧生长
     dS_NH3 = -i_XB * dX_BH2  # 5-3 氨氮增长速率-异养菌缺氧生长
-    dS_NH4 = -dS_ND1  # 5-4 氨氮增长速率-溶解有机氮异养菌水解
-
-    dS_ALK1 = dS_NH2 / 14
-    dS_ALK2 = dS_NH3 / 14 - dS_NO1 / 14
-    dS_ALK3 = dS_NH1 / 14 - dS_NO2 / 14
-    dS_ALK4 = - dS_ND1 / 14
-
-    dS_O1 = dS_S1 + dX_BH1
-    dS_O2 = -4.57 * dS_NO2 + dX_BA1
 
     dX_BH = dX_BH1 + dX_BH2 + dX_BHr
     dX_BA = dX_BA1 + dX_BAr
-    dS_S = dS_S1 + dS_S2 + dS_S3
-    dS_NO = dS_NO1 + dS_NO2
-    dS_NH = dS_NH1 + dS_NH2 + dS_NH3 + dS_NH4
-    dS_ND = dS_ND1 + dS_ND2
-    dX_S = dX_S1 + dX_S2 + dX_S3
-    dX_i = f_P * dX_BHr + f_P * dX_BAr
-    dX_ND = dX_ND1 + dX_ND2 + dX_ND3
-    dS_Alk = dS_ALK1 + dS_ALK2 + dS_ALK3 + dS_ALK4
-    dS_O = dS_O1 + dS_O2
+    dX_S = dS_S1 - dS_S0 + dX_S3
+    dX_i = f_P * decay
+    dX_ND = i_XB * decay + ND_per_BAr * dX_BAr + dX_ND3
+    dS_O = dS_S1 + dX_BH1 - 4.57 * dS_NO2 + dX_BA1
+    dS_S = dS_S1 + dS_S0 - dX_S3
+    dS_NO = dS_NO0 + dS_NO2
+    dS_NH = dS_NH1 + dS_NH2 + dS_NH3 - dS_ND1
+    dS_ND = dS_ND1 - dX_ND3
+    dS_Alk = (dS_NH2 + dS_NH3 - dS_NO0 + dS_NH1 - dS_NO2 - dS_ND1) / 14
 
     return torch.stack([dX_BH, dX_BA, dX_S, dX_i, dX_ND, dS_O, dS_S, dS_NO, dS_NH, dS_ND, dS_Alk], dim=1)
+
+
+def reaction(params: torch.Tensor, C: torch.Tensor) -> torch.Tensor:
+    return reaction_prepared(prepare(params), C)
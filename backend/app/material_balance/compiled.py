@@ -0,0 +1,148 @@
+"""Compiled kernels for the fused ODE right-hand side.
+
+Opt-in through ``CalculationParameters.rhs_backend``:
+
+- ``eager``: plain PyTorch (default);
+- ``torchscript``: ``torch.jit.trace``, built in milliseconds, about 2x
+  faster on the kinetics;
+- ``inductor``: ``torch.compile``, tens of seconds to build, several times
+  faster afterwards.
+
+Sparse transport and the native ASM kinetics are compiled for the shapes of
+one plant. The kernels are cached per process by
+``(backend, kernel, nodes, components, edges, dtype, device)``. A worker
+therefore pays the build once for all later jobs on a plant of that size.
+If a kernel fails to build or to run, that kernel falls back to eager and
+stays eager.
+"""
+
+import logging
+import warnings
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import torch
+
+from .profiles import ProfiledEdges
+from .reactions import FusedBalance, KineticsModule
+from .transport import sparse_transport
+
+logger = logging.getLogger(__name__)
+
+RHS_BACKENDS = ("eager", "torchscript", "inductor")
+
+_KERNEL_CACHE: Dict[Tuple[Any, ...], Callable[..., Any]] = {}
+
+
+class _FallbackKernel:
+    """Compiled kernel that switches to the eager function after a failure."""
+
+    def __init__(self, name: str, compiled: Callable[..., Any], eager: Callable[..., Any]):
+        self.name = name
+        self.compiled = compiled
+        self.eager = eager
+
+    def __call__(self, *args: torch.Tensor) -> Any:
+        if self.compiled is self.eager:
+            return self.eager(*args)
+        try:
+            return self.compiled(*args)
+        except Exception:
+            logger.warning(
+                "Compiled %s kernel failed, using eager from now on", self.name, exc_info=True
+            )
+            self.compiled = self.eager
+            return self.eager(*args)
+
+
+def _build(
+    backend: str, fn: Callable[..., Any], example_inputs: Sequence[Any]
+) -> Callable[..., Any]:
+    if backend == "torchscript":
+        with warnings.catch_warnings():
+            # Deprecated in favour of torch.compile, but far cheaper to build
+            warnings.simplefilter("ignore", FutureWarning)
+            return torch.jit.trace(fn, tuple(example_inputs), check_trace=False)
+    compiled = torch.compile(fn, dynamic=False)
+    # Compile now rather than inside the first solver step
+    compiled(*example_inputs)
+    return compiled
+
+
+def compiled_kernel(
+    backend: str,
+    name: str,
+    signature: Tuple[int, int, int],
+    fn: Callable[..., Any],
+    example_inputs: Sequence[Any],
+) -> Callable[..., Any]:
+    """Return ``fn`` compiled with ``backend``, building it on the first request.
+
+    Args:
+        backend: one of ``RHS_BACKENDS`` other than ``eager``
+        name: kernel name, e.g. ``transport`` or a model type
+        signature: ``(nodes, components, edges)`` of the plant
+        fn: eager function
+        example_inputs: inputs with the shapes of the real ones; the last one
+            must be a tensor (prepared kinetics parameters are tuples)
+    """
+    reference = example_inputs[-1]
+    key = (backend, name, *signature, reference.dtype, reference.device)
+    kernel = _KERNEL_CACHE.get(key)
+    if kernel is None:
+        try:
+            kernel = _FallbackKernel(name, _build(backend, fn, example_inputs), fn)
+        except Exception:
+            logger.warning(
+                "Could not compile %s kernel with %s, using eager", name, backend, exc_info=True
+            )
+            kernel = fn
+        _KERNEL_CACHE[key] = kernel
+    return kernel
+
+
+def clear_kernel_cache() -> None:
+    _KERNEL_CACHE.clear()
+
+
+def compile_balance(
+    balance: FusedBalance,
+    *,
+    backend: str,
+    n_components: int,
+    dtype: torch.dtype,
+    sparse_bundle: Optional[dict] = None,
+    edge_profile: Optional[ProfiledEdges] = None,
+) -> FusedBalance:
+    """Swap the transport and kinetics of ``balance`` for compiled kernels.
+
+    With ``edge_profile`` the edge values are interpolated eagerly at each
+    ``t`` and passed to the same compiled transport kernel.
+    """
+    if backend == "eager":
+        return balance
+
+    n_nodes = balance.boundary.shape[0]
+    device = balance.boundary.device
+    n_edges = int(sparse_bundle["src"].shape[0]) if sparse_bundle is not None else 0
+    signature = (n_nodes, n_components, n_edges)
+    concentrations = torch.zeros(n_nodes, n_components, dtype=dtype, device=device)
+
+    if sparse_bundle is not None:
+        edges = tuple(
+            sparse_bundle[name] for name in ("src", "dst", "q", "a", "b", "delta_Q")
+        )
+        transport = compiled_kernel(
+            backend, "transport", signature, sparse_transport, (concentrations, *edges)
+        )
+        if edge_profile is None:
+            balance.transport = lambda t, y: transport(y, *edges)
+        else:
+            balance.transport = lambda t, y: transport(y, *edges[:2], *edge_profile(t))
+
+    for module in balance.modules:
+        if isinstance(module, KineticsModule):
+            example = (module.params, concentrations[: module.node_indices.shape[0]])
+            module.kinetics = compiled_kernel(
+                backend, module.name, signature, module.model.kinetics, example
+            )
+    return balance
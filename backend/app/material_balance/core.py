@@ -12,8 +12,8 @@
 import numpy as np
 import torch
 from torchdiffeq import odeint
-import functools
 from typing import Tuple, Dict, List, Any, Optional
+from contextlib import nullcontext
 import uuid
 import time
 
@@ -28,6 +28,7 @@ from .exceptions import (
     MaterialBalanceError,
     InvalidInputError,
     CalculationError,
+    CalculationCancelledError,
     ConvergenceError,
     DimensionMismatchError,
     NegativeVolumeError
@@ -39,8 +40,59 @@ from .asm import (
     asm2d_rates,
     asm2d_dC_dt,
 )
-from .udm_engine import UDMNodeRuntime, build_udm_runtime_payload
-from .udm_ode import udm_ode_balance
+from .udm_engine import (
+    UDMBatchRuntime,
+    UDMNodeRuntime,
+    build_udm_batch_runtime,
+    build_udm_runtime_payload,
+)
+from .reactions import FusedBalance, build_reaction_modules
+from .transport import (
+    EdgeBundle,
+    dense_edge_tensors,
+    edge_bundle,
+    empty_edge_bundle,
+    sparse_transport,
+)
+from .compiled import compile_balance
+from .profiles import EdgeProfiles, ProfiledEdges
+from .runtime_cache import RuntimeCache, runtime_cache, structural_key
+from .profiling import SolverProfile
+from .progress import ProgressPublisher, ProgressTracker, progress_publisher
+from .segment_snapshots import SegmentSnapshotStore, base_key, chain_key, segment_snapshots
+from .trajectory_sink import (
+    MemorySink,
+    Trajectory,
+    TrajectorySink,
+    TrajectorySinks,
+    trajectory_sinks,
+)
+from .cancellation import CancellationToken
+from .result_frame import VOLUME_PARAMETER, ResultFrame
+from .implicit import (
+    STIFF_SOLVER_METHODS,
+    build_jacobian_structure,
+    odeint_implicit,
+    solve_steady_state,
+)
+
+_STEADY_STATE_MIN_TOLERANCE = 1e-5
+# torchdiffeq solvers that march on a fixed grid (others pick their own steps)
+_FIXED_GRID_SOLVER_METHODS = ("euler", "rk4")
+_ADAPTIVE_SOLVER_METHODS = ("adaptive_heun",)
+
+
+def _fixed_grid_stage_times(grid: torch.Tensor, method: str) -> torch.Tensor:
+    """RHS times of torchdiffeq's fixed-grid steppers on ``grid``.
+
+    Uses the same float ops as ``rk4_alt_step_func`` so the values match the
+    ``t`` the RHS receives bit for bit.
+    """
+    t0 = grid[:-1]
+    if method == "euler":
+        return t0
+    dt = grid[1:] - t0
+    return torch.cat([t0, t0 + dt * (1.0 / 3.0), t0 + dt * (2.0 / 3.0), grid[1:]])
 
 
 class MaterialBalanceCalculator:
@@ -60,8 +112,23 @@ class MaterialBalanceCalculator:
         """
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.dtype = torch.float32
+        # Debug only: dense N x N transport (_balance_param) instead of edge lists
+        self.dense_transport = False
+        # Converted inputs shared across jobs of this process; None disables it
+        self.runtime_cache: Optional[RuntimeCache] = runtime_cache
+        # Stored segment trajectories for reruns that only change later segments
+        self.segment_snapshots: Optional[SegmentSnapshotStore] = segment_snapshots
+        # Memory or spill-to-disk storage of the trajectory; None keeps it in memory
+        self.trajectory_sinks: Optional[TrajectorySinks] = trajectory_sinks
+        # Live progress of jobs run with a cancel token; None disables it
+        self.progress_publisher: Optional[ProgressPublisher] = progress_publisher
     
-    def calculate(self, input_data: MaterialBalanceInput) -> MaterialBalanceResult:
+    def calculate(
+        self,
+        input_data: MaterialBalanceInput,
+        cancel_token: Optional[CancellationToken] = None,
+        materialize: bool = True,
+    ) -> MaterialBalanceResult:
         """涓昏璁＄畻鏂规硶銆?
         
         鎵ц瀹屾暣鐨勭墿鏂欏钩琛¤绠楁祦绋嬶紝鍖呮嫭鏁版嵁楠岃瘉銆佸紶閲忚浆鎹€?
@@ -69,6 +136,9 @@ class MaterialBalanceCalculator:
         
         Args:
             input_data: 鍖呭惈鑺傜偣銆佽竟鍜屽弬鏁扮殑杈撳叆鏁版嵁
+            cancel_token: optional token checked before every RHS evaluation
+            materialize: False skips building the per-node JSON lists; the
+                trajectory is then only available as ``result.frame``
             
         Returns:
             MaterialBalanceResult: 鍖呭惈鏃堕棿搴忓垪鏁版嵁鐨勮绠楃粨鏋?
@@ -84,22 +154,40 @@ class MaterialBalanceCalculator:
             self._validate_input(input_data)
             
             # Convert input to tensors
-            tensors = self._convert_to_tensors(input_data)
+            tensors = self._cached_tensors(input_data)
             
             # Run calculation
+            profile = SolverProfile()
+            progress = (
+                self.progress_publisher.tracker(cancel_token.job_id, input_data.parameters.hours)
+                if self.progress_publisher is not None and cancel_token is not None
+                else None
+            )
             calculation_output = self._run_calculation(
                 tensors,
                 input_data.parameters,
                 input_data,
+                cancel_token=cancel_token,
+                progress=progress,
+                profile=profile,
             )
+            if progress is not None:
+                progress.finish()
             
             # Convert results back to structured format
-            result = self._convert_results(
-                calculation_output,
-                input_data,
-                job_id,
-                start_time,
-            )
+            with profile.section("conversion"):
+                result = self._convert_results(
+                    calculation_output,
+                    input_data,
+                    job_id,
+                    start_time,
+                    materialize=materialize,
+                )
+            result.summary["profile"] = profile.report()
+            if result.summary["profile"].get("floor_accepted_steps"):
+                # Accuracy was given up at the step floor somewhere in the run
+                result.summary["convergence_status"] = "converged_at_step_floor"
+                result.summary["floor_accepted_steps"] = result.summary["profile"]["floor_accepted_steps"]
             
             return result
             
@@ -110,6 +198,55 @@ class MaterialBalanceCalculator:
             else:
                 raise CalculationError(f"Unexpected error during calculation: {error_msg}") from e
     
+    def calculate_steady_state(
+        self,
+        input_data: MaterialBalanceInput,
+        cancel_token: Optional[CancellationToken] = None,
+        materialize: bool = True,
+    ) -> MaterialBalanceResult:
+        """Solve the flowsheet directly for its steady state.
+
+        Same input and result format as ``calculate``. The result holds two
+        points: the initial state at t=0 and the steady state at
+        ``parameters.hours``. The flows come from the time segment active at
+        the end of the horizon. ``summary["steady_state"]`` records the
+        iteration count and the final scaled residual.
+
+        Raises:
+            ConvergenceError: when no steady state is found within
+                ``parameters.max_iterations`` iterations
+        """
+        job_id = str(uuid.uuid4())
+        start_time = time.time()
+
+        try:
+            self._validate_input(input_data)
+            tensors = self._cached_tensors(input_data)
+            profile = SolverProfile()
+            calculation_output = self._solve_steady_state(
+                tensors,
+                input_data.parameters,
+                input_data,
+                cancel_token=cancel_token,
+                profile=profile,
+            )
+            with profile.section("conversion"):
+                result = self._convert_results(
+                    calculation_output,
+                    input_data,
+                    job_id,
+                    start_time,
+                    materialize=materialize,
+                )
+            result.summary["steady_state"] = calculation_output["steady_state"]
+            result.summary["profile"] = profile.report()
+            return result
+
+        except Exception as e:
+            if isinstance(e, MaterialBalanceError):
+                raise
+            raise CalculationError(f"Unexpected error during calculation: {str(e)}") from e
+
     def _validate_input(self, input_data: MaterialBalanceInput) -> None:
         """楠岃瘉杈撳叆鏁版嵁鐨勪竴鑷存€с€?
         
@@ -135,6 +272,89 @@ class MaterialBalanceCalculator:
         return num / den.clamp_min(eps)
 
 
+    def _cached_tensors(self, input_data: MaterialBalanceInput) -> Dict[str, Any]:
+        """``_convert_to_tensors`` through the per-process runtime cache.
+
+        The returned bundle may be shared with other jobs; do not modify it.
+        A warm start replaces ``V_liq``/``x0`` on a copy, so the cache key
+        stays structural.
+        """
+        if self.runtime_cache is None:
+            return self._apply_warm_start(self._convert_to_tensors(input_data), input_data)
+        key = structural_key(
+            input_data.nodes,
+            input_data.edges,
+            self._get_original_parameter_names(input_data),
+            dtype=self.dtype,
+            device=self.device,
+        )
+        tensors = self.runtime_cache.get_or_build(key, lambda: self._convert_to_tensors(input_data))
+        return self._apply_warm_start(tensors, input_data)
+
+    def _apply_warm_start(
+        self, tensors: Dict[str, Any], input_data: MaterialBalanceInput
+    ) -> Dict[str, Any]:
+        """Seed the reactor nodes' ``V_liq``/``x0`` from ``warm_start_state``.
+
+        Nodes are matched by id and components by name, so the new flowchart
+        may reorder them. Inlets and outlets keep their own values: the inlets
+        are the boundary conditions of the new run.
+        """
+        state = getattr(input_data, "warm_start_state", None)
+        if state is None:
+            if getattr(input_data, "warm_start_from_job_id", None):
+                raise InvalidInputError(
+                    f"Warm start state of job {input_data.warm_start_from_job_id} was not loaded"
+                )
+            return tensors
+
+        parameter_names = self._resolve_parameter_names(
+            input_data=input_data, n_components=tensors["x0"].shape[1]
+        )
+        node_index = {node_id: i for i, node_id in enumerate(state.node_ids)}
+        component_index = {name: j for j, name in enumerate(state.parameter_names)}
+        targets = [
+            i for i, node in enumerate(input_data.nodes) if not (node.is_inlet or node.is_outlet)
+        ]
+        missing_nodes = [
+            input_data.nodes[i].node_id for i in targets if input_data.nodes[i].node_id not in node_index
+        ]
+        if missing_nodes:
+            raise InvalidInputError(
+                f"Warm start job {state.source_job_id} has no state for nodes: {', '.join(missing_nodes)}"
+            )
+        missing_components = [name for name in parameter_names if name not in component_index]
+        if missing_components:
+            raise InvalidInputError(
+                f"Warm start job {state.source_job_id} has no state for components: "
+                f"{', '.join(missing_components)}"
+            )
+
+        rows = torch.tensor(
+            [node_index[input_data.nodes[i].node_id] for i in targets], dtype=torch.long
+        )
+        columns = torch.tensor([component_index[name] for name in parameter_names], dtype=torch.long)
+        target_index = torch.tensor(targets, dtype=torch.long, device=self.device)
+        volumes = torch.tensor(state.volumes, dtype=self.dtype)
+        concentrations = torch.tensor(state.concentrations, dtype=self.dtype).reshape(
+            len(state.node_ids), len(state.parameter_names)
+        )
+
+        V_liq = tensors["V_liq"].clone()
+        x0 = tensors["x0"].clone()
+        V_liq[target_index] = volumes[rows].to(self.device)
+        x0[target_index] = concentrations[rows][:, columns].to(self.device)
+        return {**tensors, "V_liq": V_liq, "x0": x0}
+
+    def _time_origin(self, input_data: MaterialBalanceInput) -> float:
+        """Hour the run starts at: the end of its warm-start job, else 0.
+
+        Segments stay relative to the job start. Reported times and edge
+        profiles use the continued clock, so a daily profile keeps its phase.
+        """
+        state = getattr(input_data, "warm_start_state", None)
+        return float(state.start_hour) if state is not None else 0.0
+
     def _convert_to_tensors(self, input_data: MaterialBalanceInput) -> Dict[str, Any]:
         """Convert validated input data into tensor structures."""
         nodes = input_data.nodes
@@ -230,6 +450,13 @@ class MaterialBalanceCalculator:
             device=device,
             dtype=dtype,
         )
+        udm_batch_runtime = build_udm_batch_runtime(
+            udm_runtime_payload,
+            n_nodes=n_nodes,
+            n_components=n_components,
+            device=device,
+            dtype=dtype,
+        )
 
 
         # 2) 鑺傜偣鏄犲皠
@@ -237,25 +464,15 @@ class MaterialBalanceCalculator:
 
         # 3) 鑻ユ棤杈癸紝浠嶈繑鍥炰竴鑷寸粨鏋?
         if not edges:
-            Q_out = torch.zeros(n_nodes, n_nodes, dtype=dtype, device=device)
-            prop_a = torch.ones(n_nodes, n_nodes, n_components, dtype=dtype, device=device)
-            prop_b = torch.zeros(n_nodes, n_nodes, n_components, dtype=dtype, device=device)
-            sparse_bundle = {
-                "src": torch.empty(0, dtype=torch.long, device=device),
-                "dst": torch.empty(0, dtype=torch.long, device=device),
-                "q":   torch.empty(0, dtype=dtype, device=device),
-                "a":   torch.empty(0, n_components, dtype=dtype, device=device),
-                "b":   torch.empty(0, n_components, dtype=dtype, device=device),
-                "shape": (n_nodes, n_nodes),
-            }
+            sparse_bundle = empty_edge_bundle(n_nodes, n_components, dtype=dtype, device=device)
             return {
                 "V_liq": V_liq, "x0": x0,
-                "Q_out": Q_out, "prop_a": prop_a, "prop_b": prop_b,
                 "node_map": node_map, "compute_mask": compute_mask,
                 "asm1slim_mask": asm1slim_mask, "asm1slim_params": asm1slim_params,
                 "asm1_mask": asm1_mask, "asm1_params": asm1_params,
                 "asm3_mask": asm3_mask, "asm3_params": asm3_params,
                 "udm_mask": udm_mask, "udm_runtime_payload": udm_runtime_payload,
+                "udm_batch_runtime": udm_batch_runtime,
                 "sparse_bundle": sparse_bundle
             }
 
@@ -285,28 +502,12 @@ class MaterialBalanceCalculator:
         a_edge = torch.tensor([_norm_a(e) for e in edges], dtype=dtype, device=device)  # [E, r]
         b_edge = torch.tensor([_norm_b(e) for e in edges], dtype=dtype, device=device)  # [E, r]
 
-        # 5) 绋犲瘑寮犻噺涓€娆℃€у啓鍏ワ紙濡傚瓨鍦ㄩ噸澶?(src,dst)锛孮_out 绱姞鏇寸ǔ濡ワ級
-        Q_out = torch.zeros(n_nodes, n_nodes, dtype=dtype, device=device)
-        Q_out.index_put_((src, dst), q_vals, accumulate=True)
-
-        prop_a = torch.ones(n_nodes, n_nodes, n_components, dtype=dtype, device=device)
-        prop_b = torch.zeros(n_nodes, n_nodes, n_components, dtype=dtype, device=device)
-        prop_a[src, dst, :] = a_edge
-        prop_b[src, dst, :] = b_edge
-
-        # 6) 绋€鐤忓寘锛堜緵绋€鐤?ODE 璺緞浣跨敤锛岄伩鍏嶅悗缁?nonzero 鎵弿锛?
-        sparse_bundle = {
-            "src": src, "dst": dst, "q": q_vals,
-            "a": a_edge, "b": b_edge,
-            "shape": (n_nodes, n_nodes),
-        }
+        # 5) Edge lists only; no N x N dense tensors (see transport.py)
+        sparse_bundle = edge_bundle(src, dst, q_vals, a_edge, b_edge, n_nodes=n_nodes)
 
         return {
             "V_liq": V_liq,
             "x0": x0,
-            "Q_out": Q_out,
-            "prop_a": prop_a,
-            "prop_b": prop_b,
             "node_map": node_map,
             "compute_mask": compute_mask,
             "asm1slim_mask": asm1slim_mask,
@@ -317,6 +518,7 @@ class MaterialBalanceCalculator:
             "asm3_params": asm3_params, 
             "udm_mask": udm_mask,
             "udm_runtime_payload": udm_runtime_payload,
+            "udm_batch_runtime": udm_batch_runtime,
             "sparse_bundle": sparse_bundle,
         }
     
@@ -325,8 +527,12 @@ class MaterialBalanceCalculator:
         tensors: Dict[str, torch.Tensor],
         params: CalculationParameters,
         input_data: MaterialBalanceInput,
+        cancel_token: Optional[CancellationToken] = None,
+        progress: Optional[ProgressTracker] = None,
+        profile: Optional[SolverProfile] = None,
     ) -> Dict[str, Any]:
         """Run material balance simulation, supporting optional time segments."""
+        sink: Optional[TrajectorySink] = None
         try:
             V_liq = tensors["V_liq"]
             x0 = tensors["x0"]
@@ -341,19 +547,49 @@ class MaterialBalanceCalculator:
             asm3_mask = tensors.get("asm3_mask", None)
             udm_mask = tensors.get("udm_mask", None)
             udm_runtime_payload = tensors.get("udm_runtime_payload", None)
+            udm_batch_runtime = tensors.get("udm_batch_runtime", None)
 
             base_state = self._merge_tensors(V_liq, x0).unsqueeze(0)
             segments = self._prepare_segments(input_data, params.hours)
+            n_nodes, n_state = base_state.shape[1], base_state.shape[2]
+            report_hours = self._report_stride(params) / params.steps_per_hour
+            sink = (
+                self.trajectory_sinks.open(
+                    int(params.hours / report_hours) + len(segments),
+                    n_nodes,
+                    n_state,
+                    len(input_data.edges),
+                )
+                if self.trajectory_sinks is not None
+                else MemorySink()
+            )
+            store = self.segment_snapshots
+            if store is not None and store.enabled and store.checkpoint_hours:
+                segments = self._checkpoint_chunks(segments, params, store.checkpoint_hours)
+            if sink.spills:
+                # Bound each span's solver output, not just the total. These
+                # spans are not checkpoints: storing them would copy the
+                # spilled trajectory into the snapshot store
+                segments = self._checkpoint_chunks(
+                    segments,
+                    params,
+                    self.trajectory_sinks.chunk_rows(n_nodes, n_state) * report_hours,
+                    spill_only=True,
+                )
             parameter_names = self._resolve_parameter_names(
                 input_data=input_data,
                 n_components=x0.shape[1],
             )
+            profiles = EdgeProfiles.from_input(
+                input_data, parameter_names, dtype=self.dtype, device=self.device
+            )
+            if progress is not None:
+                progress.start_stream(
+                    [node.node_id for node in input_data.nodes],
+                    [*parameter_names, VOLUME_PARAMETER],
+                )
 
-            segment_results: List[torch.Tensor] = []
-            combined_timestamps: List[float] = []
-            edge_flow_series: Dict[str, List[float]] = {
-                edge.edge_id: [] for edge in input_data.edges
-            }
+            appended_rows = 0
             segment_markers: List[float] = []
             parameter_change_events: List[Dict[str, Any]] = []
 
@@ -361,8 +597,21 @@ class MaterialBalanceCalculator:
             prev_a_edge: Optional[torch.Tensor] = None
             prev_b_edge: Optional[torch.Tensor] = None
             current_state = base_state
+            time_origin = self._time_origin(input_data)
+            snapshot_key: Optional[str] = None
+            if (
+                self.segment_snapshots is not None
+                and self.segment_snapshots.enabled
+                and len(segments) > 1
+            ):
+                snapshot_key = base_key(
+                    input_data, parameter_names, dtype=self.dtype, device=self.device
+                )
+            reused_segments = 0
 
             for segment_index, segment in enumerate(segments):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
                 q_vals, a_edge, b_edge = self._resolve_segment_edge_values(
                     input_data=input_data,
                     segment=segment,
@@ -374,8 +623,9 @@ class MaterialBalanceCalculator:
                     prev_q_vals is not None
                     and prev_a_edge is not None
                     and prev_b_edge is not None
+                    and not segment.get("continues", False)
                 ):
-                    boundary_hour = float(segment["start_hour"])
+                    boundary_hour = time_origin + float(segment["start_hour"])
                     segment_markers.append(boundary_hour)
                     parameter_change_events.extend(
                         self._build_parameter_change_events(
@@ -391,40 +641,60 @@ class MaterialBalanceCalculator:
                         )
                     )
 
-                Q_out, prop_a, prop_b, runtime_sparse_bundle = (
-                    self._build_runtime_edge_tensors(
-                        tensors=tensors,
-                        q_vals=q_vals,
-                        a_edge=a_edge,
-                        b_edge=b_edge,
-                    )
+                runtime_sparse_bundle = self._build_runtime_edge_bundle(
+                    tensors=tensors,
+                    q_vals=q_vals,
+                    a_edge=a_edge,
+                    b_edge=b_edge,
+                )
+                edge_profile = self._segment_edge_profile(
+                    profiles, segment, input_data, parameter_names, runtime_sparse_bundle, time_origin
                 )
 
                 segment_hours = float(segment["end_hour"] - segment["start_hour"])
-                segment_result = self._run_hours(
-                    segment_hours,
-                    current_state,
-                    Q_out,
-                    len(V_liq),
-                    params.steps_per_hour,
-                    prop_a,
-                    prop_b,
-                    params.solver_method,
-                    params.tolerance,
-                    compute_mask,
-                    asm1slim_params=asm1slim_params,
-                    asm1slim_mask=asm1slim_mask,
-                    asm1_params=asm1_params,
-                    asm1_mask=asm1_mask,
-                    asm3_params=asm3_params,
-                    asm3_mask=asm3_mask,
-                    udm_mask=udm_mask,
-                    udm_runtime_payload=udm_runtime_payload,
-                    sparse_bundle=runtime_sparse_bundle,
-                    sampling_interval_hours=getattr(
-                        params, "sampling_interval_hours", None
-                    ),
-                )
+                segment_result = None
+                if segment.get("spill_only"):
+                    # Later keys would need this span's rows to be reused
+                    snapshot_key = None
+                if snapshot_key is not None:
+                    snapshot_key = chain_key(snapshot_key, segment)
+                    segment_result = self.segment_snapshots.load(snapshot_key, self.device)
+                if progress is not None:
+                    progress.start_span(segment["start_hour"])
+                if segment_result is not None:
+                    reused_segments += 1
+                else:
+                    segment_result = self._run_hours(
+                        segment_hours,
+                        current_state,
+                        len(V_liq),
+                        params.steps_per_hour,
+                        params.solver_method,
+                        params.tolerance,
+                        compute_mask,
+                        asm1slim_params=asm1slim_params,
+                        asm1slim_mask=asm1slim_mask,
+                        asm1_params=asm1_params,
+                        asm1_mask=asm1_mask,
+                        asm3_params=asm3_params,
+                        asm3_mask=asm3_mask,
+                        udm_mask=udm_mask,
+                        udm_runtime_payload=udm_runtime_payload,
+                        udm_batch_runtime=udm_batch_runtime,
+                        sparse_bundle=runtime_sparse_bundle,
+                        sampling_interval_hours=getattr(
+                            params, "sampling_interval_hours", None
+                        ),
+                        rhs_backend=getattr(params, "rhs_backend", "eager"),
+                        cancel_token=cancel_token,
+                        edge_profile=edge_profile,
+                        progress=progress,
+                        profile=profile,
+                    )
+                    if snapshot_key is not None:
+                        self.segment_snapshots.save(snapshot_key, segment_result)
+                if progress is not None:
+                    progress.advance(segment["end_hour"])
 
                 segment_relative_timestamps = self._generate_segment_timestamps(
                     hours=segment_hours,
@@ -434,7 +704,7 @@ class MaterialBalanceCalculator:
                     ),
                 )
                 segment_absolute_timestamps = [
-                    float(segment["start_hour"] + ts)
+                    float(time_origin + segment["start_hour"] + ts)
                     for ts in segment_relative_timestamps
                 ]
 
@@ -443,31 +713,32 @@ class MaterialBalanceCalculator:
                     segment_absolute_timestamps = segment_absolute_timestamps[1:]
 
                 if segment_result.shape[0] > 0:
-                    segment_results.append(segment_result)
-                    combined_timestamps.extend(segment_absolute_timestamps)
-                    for edge_index, edge in enumerate(input_data.edges):
-                        edge_flow_value = float(q_vals[edge_index].item())
-                        edge_flow_series[edge.edge_id].extend(
-                            [edge_flow_value] * len(segment_absolute_timestamps)
+                    if edge_profile is not None:
+                        segment_flows = edge_profile.flows(
+                            torch.tensor(segment_absolute_timestamps, dtype=torch.float64, device=self.device)
+                        ).cpu().numpy()
+                    else:
+                        segment_flows = np.broadcast_to(
+                            q_vals.cpu().numpy(),
+                            (len(segment_absolute_timestamps), len(input_data.edges)),
                         )
+                    sink.append(segment_result, segment_absolute_timestamps, segment_flows)
+                    appended_rows += segment_result.shape[0]
+                    if progress is not None:
+                        progress.span_result(segment_absolute_timestamps, segment_result)
                     current_state = segment_result[-1:].clone()
 
                 prev_q_vals = q_vals
                 prev_a_edge = a_edge
                 prev_b_edge = b_edge
 
-            if segment_results:
-                result_tensor = torch.cat(segment_results, dim=0)
-            else:
+            if not appended_rows:
                 # Safety fallback for degenerate segments.
                 result_tensor = self._run_hours(
                     params.hours,
                     base_state,
-                    tensors["Q_out"],
                     len(V_liq),
                     params.steps_per_hour,
-                    tensors["prop_a"],
-                    tensors["prop_b"],
                     params.solver_method,
                     params.tolerance,
                     compute_mask,
@@ -479,34 +750,149 @@ class MaterialBalanceCalculator:
                     asm3_mask=asm3_mask,
                     udm_mask=udm_mask,
                     udm_runtime_payload=udm_runtime_payload,
+                    udm_batch_runtime=udm_batch_runtime,
                     sparse_bundle=sparse_bundle,
                     sampling_interval_hours=getattr(
                         params, "sampling_interval_hours", None
                     ),
+                    rhs_backend=getattr(params, "rhs_backend", "eager"),
+                    cancel_token=cancel_token,
+                    profile=profile,
                 )
-                combined_timestamps = self._generate_segment_timestamps(
-                    hours=params.hours,
-                    steps_per_hour=params.steps_per_hour,
-                    sampling_interval_hours=getattr(
-                        params, "sampling_interval_hours", None
+                combined_timestamps = [
+                    time_origin + ts
+                    for ts in self._generate_segment_timestamps(
+                        hours=params.hours,
+                        steps_per_hour=params.steps_per_hour,
+                        sampling_interval_hours=getattr(
+                            params, "sampling_interval_hours", None
+                        ),
+                    )
+                ]
+                sink.append(
+                    result_tensor,
+                    combined_timestamps,
+                    np.broadcast_to(
+                        np.asarray([edge.flow_rate for edge in input_data.edges], dtype=np.float64),
+                        (len(combined_timestamps), len(input_data.edges)),
                     ),
                 )
-                for edge in input_data.edges:
-                    edge_flow_series[edge.edge_id] = [
-                        edge.flow_rate
-                    ] * len(combined_timestamps)
 
             return {
-                "result_tensor": result_tensor,
-                "timestamps": combined_timestamps,
-                "edge_flow_series": edge_flow_series,
+                "trajectory": sink.finish(),
                 "segment_markers": segment_markers,
                 "parameter_change_events": parameter_change_events,
+                "reused_segments": reused_segments,
             }
 
+        except CalculationCancelledError:
+            if sink is not None:
+                sink.discard()
+            raise
         except Exception as e:
+            if sink is not None:
+                sink.discard()
             raise CalculationError(f"ODE calculation failed: {str(e)}") from e
 
+    def _solve_steady_state(
+        self,
+        tensors: Dict[str, torch.Tensor],
+        params: CalculationParameters,
+        input_data: MaterialBalanceInput,
+        cancel_token: Optional[CancellationToken] = None,
+        profile: Optional[SolverProfile] = None,
+    ) -> Dict[str, Any]:
+        """Steady-state counterpart of ``_run_calculation``."""
+        V_liq = tensors["V_liq"]
+        x0 = tensors["x0"]
+        segments = self._prepare_segments(input_data, params.hours)
+        parameter_names = self._resolve_parameter_names(
+            input_data=input_data,
+            n_components=x0.shape[1],
+        )
+        q_vals, a_edge, b_edge = self._resolve_segment_edge_values(
+            input_data=input_data,
+            segment=segments[-1],
+            sparse_bundle=tensors.get("sparse_bundle", None),
+            parameter_names=parameter_names,
+        )
+        runtime_sparse_bundle = self._build_runtime_edge_bundle(
+            tensors=tensors,
+            q_vals=q_vals,
+            a_edge=a_edge,
+            b_edge=b_edge,
+        )
+        profiles = EdgeProfiles.from_input(
+            input_data, parameter_names, dtype=self.dtype, device=self.device
+        )
+        time_origin = self._time_origin(input_data)
+        edge_profile = self._segment_edge_profile(
+            profiles, segments[-1], input_data, parameter_names, runtime_sparse_bundle, time_origin
+        )
+        if edge_profile is not None:
+            # A steady state needs constant inputs: hold the profiles at the end time
+            runtime_sparse_bundle = edge_profile.bundle_at(
+                float(segments[-1]["end_hour"] - segments[-1]["start_hour"])
+            )
+            q_vals = runtime_sparse_bundle["q"]
+
+        ode_fn, _ = self._build_ode_function(
+            m=len(V_liq),
+            compute_mask=tensors["compute_mask"],
+            asm1slim_params=tensors.get("asm1slim_params", None),
+            asm1slim_mask=tensors.get("asm1slim_mask", None),
+            asm1_params=tensors.get("asm1_params", None),
+            asm1_mask=tensors.get("asm1_mask", None),
+            asm3_params=tensors.get("asm3_params", None),
+            asm3_mask=tensors.get("asm3_mask", None),
+            udm_mask=tensors.get("udm_mask", None),
+            udm_runtime_payload=tensors.get("udm_runtime_payload", None),
+            udm_batch_runtime=tensors.get("udm_batch_runtime", None),
+            sparse_bundle=runtime_sparse_bundle,
+            rhs_backend=getattr(params, "rhs_backend", "eager"),
+            profile=profile,
+        )
+        if cancel_token is not None:
+            ode_fn = cancel_token.wrap(ode_fn)
+        if profile is not None:
+            ode_fn = profile.wrap(ode_fn)
+
+        initial_state = self._merge_tensors(V_liq, x0)
+        structure = build_jacobian_structure(
+            runtime_sparse_bundle,
+            n_nodes=initial_state.shape[0],
+            n_state=initial_state.shape[1],
+            device=initial_state.device,
+        )
+        # float32 RHS: residuals below ~1e-5 relative are round-off.
+        tolerance = max(params.tolerance, _STEADY_STATE_MIN_TOLERANCE)
+        with profile.section("integration") if profile is not None else nullcontext():
+            solution = solve_steady_state(
+                ode_fn,
+                initial_state,
+                rtol=tolerance,
+                atol=tolerance,
+                structure=structure,
+                initial_step=1.0 / params.steps_per_hour,
+                max_iterations=params.max_iterations,
+            )
+
+        return {
+            "result_tensor": torch.stack([initial_state, solution.state]),
+            "timestamps": [time_origin, time_origin + float(params.hours)],
+            "edge_flow_series": {
+                edge.edge_id: [float(q_vals[index].item())] * 2
+                for index, edge in enumerate(input_data.edges)
+            },
+            "segment_markers": [],
+            "parameter_change_events": [],
+            "steady_state": {
+                "iterations": solution.iterations,
+                "scaled_residual": solution.residual_norm,
+                "pseudo_time_hours": solution.pseudo_time,
+            },
+        }
+
     def _prepare_segments(
         self, input_data: MaterialBalanceInput, total_hours: float
     ) -> List[Dict[str, Any]]:
@@ -555,6 +941,60 @@ class MaterialBalanceCalculator:
 
         return parsed_segments
 
+    def _report_stride(self, params: CalculationParameters) -> int:
+        """Solver grid steps between two reported time points."""
+        sampling_interval_hours = getattr(params, "sampling_interval_hours", None)
+        if sampling_interval_hours is not None and sampling_interval_hours > 0:
+            return max(int(sampling_interval_hours * params.steps_per_hour), 1)
+        return 1
+
+    def _checkpoint_chunks(
+        self,
+        segments: List[Dict[str, Any]],
+        params: CalculationParameters,
+        chunk_hours: Optional[float],
+        spill_only: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Split segments into integration chunks of about ``chunk_hours``.
+
+        Chunk lengths are whole multiples of the reporting interval on the
+        ``steps_per_hour`` grid, so the chunks report the same time points
+        as the unsplit segment. Chunks after the first carry
+        ``continues=True``: their start is not a segment boundary. With
+        ``spill_only`` every chunk but the last of a segment is marked
+        ``spill_only``: it ends where no snapshot is taken.
+        """
+        if not chunk_hours or chunk_hours <= 0:
+            return segments
+        steps_per_hour = params.steps_per_hour
+        stride = self._report_stride(params)
+        chunk_steps = max(round(chunk_hours * steps_per_hour / stride), 1) * stride
+
+        chunks: List[Dict[str, Any]] = []
+        for segment in segments:
+            start_hour = float(segment["start_hour"])
+            total_steps = (float(segment["end_hour"]) - start_hour) * steps_per_hour
+            if total_steps <= chunk_steps or abs(total_steps - round(total_steps)) > 1e-6:
+                # Off-grid segment ends would move the reported time points
+                chunks.append(segment)
+                continue
+            for offset in range(0, round(total_steps), chunk_steps):
+                end_step = min(offset + chunk_steps, round(total_steps))
+                chunks.append(
+                    {
+                        **segment,
+                        "start_hour": start_hour + offset / steps_per_hour,
+                        "end_hour": (
+                            float(segment["end_hour"])
+                            if end_step == round(total_steps)
+                            else start_hour + end_step / steps_per_hour
+                        ),
+                        "continues": offset > 0 or segment.get("continues", False),
+                        "spill_only": spill_only and end_step != round(total_steps),
+                    }
+                )
+        return chunks
+
     def _resolve_parameter_names(
         self, input_data: MaterialBalanceInput, n_components: int
     ) -> List[str]:
@@ -634,53 +1074,56 @@ class MaterialBalanceCalculator:
 
         return q_vals, a_edge, b_edge
 
-    def _build_runtime_edge_tensors(
+    def _build_runtime_edge_bundle(
         self,
         tensors: Dict[str, torch.Tensor],
         q_vals: torch.Tensor,
         a_edge: torch.Tensor,
         b_edge: torch.Tensor,
-    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, Dict[str, Any]]:
-        Q_out = torch.zeros_like(tensors["Q_out"])
-        prop_a = torch.ones_like(tensors["prop_a"])
-        prop_b = torch.zeros_like(tensors["prop_b"])
-
-        sparse_bundle = tensors.get("sparse_bundle", None)
-        if sparse_bundle is None or q_vals.numel() == 0:
-            runtime_sparse_bundle = {
-                "src": torch.empty(0, dtype=torch.long, device=self.device),
-                "dst": torch.empty(0, dtype=torch.long, device=self.device),
-                "q": torch.empty(0, dtype=self.dtype, device=self.device),
-                "a": a_edge,
-                "b": b_edge,
-                "shape": tuple(Q_out.shape),
-            }
-            return Q_out, prop_a, prop_b, runtime_sparse_bundle
-
-        src = sparse_bundle["src"]
-        dst = sparse_bundle["dst"]
-        Q_out.index_put_((src, dst), q_vals, accumulate=True)
-        prop_a[src, dst, :] = a_edge
-        prop_b[src, dst, :] = b_edge
-
-        runtime_sparse_bundle = {
-            "src": src,
-            "dst": dst,
-            "q": q_vals,
-            "a": a_edge,
-            "b": b_edge,
-            "shape": sparse_bundle["shape"],
-        }
-        return Q_out, prop_a, prop_b, runtime_sparse_bundle
+    ) -> EdgeBundle:
+        """Edge bundle of one segment; only the O(E) edge lists are rebuilt."""
+        sparse_bundle = tensors["sparse_bundle"]
+        n_nodes = sparse_bundle["shape"][0]
+        if q_vals.numel() == 0:
+            return empty_edge_bundle(
+                n_nodes, a_edge.shape[1], dtype=self.dtype, device=self.device
+            )
+        return edge_bundle(
+            sparse_bundle["src"], sparse_bundle["dst"], q_vals, a_edge, b_edge, n_nodes=n_nodes
+        )
 
-    def _generate_segment_timestamps(
+    def _segment_edge_profile(
+        self,
+        profiles: Optional[EdgeProfiles],
+        segment: Dict[str, Any],
+        input_data: MaterialBalanceInput,
+        parameter_names: List[str],
+        sparse_bundle: EdgeBundle,
+        time_origin: float = 0.0,
+    ) -> Optional[ProfiledEdges]:
+        """Time-varying edge values of one segment, minus its constant overrides."""
+        if profiles is None or sparse_bundle["src"].numel() == 0:
+            return None
+        segment_profiles = profiles.without_overrides(segment, input_data, parameter_names)
+        if segment_profiles is None:
+            return None
+        return ProfiledEdges(sparse_bundle, segment_profiles, time_origin + float(segment["start_hour"]))
+
+    def _reporting_grid(
         self,
         hours: float,
         steps_per_hour: int,
         sampling_interval_hours: Optional[float],
-    ) -> List[float]:
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Return ``(solver_grid, report_times)`` for one integration span.
+
+        ``solver_grid`` is the fine ``steps_per_hour`` grid the fixed-step
+        solvers march on. ``report_times`` is the subset the result keeps:
+        every ``sampling_interval_hours`` plus the final time, or the whole
+        grid when no sampling interval applies.
+        """
         total_steps = int(hours * steps_per_hour) + 1
-        full_timestamps = torch.linspace(0, hours, total_steps, device=self.device)
+        solver_grid = torch.linspace(0, hours, total_steps, device=self.device)
         if sampling_interval_hours is not None and sampling_interval_hours > 0:
             sampling_interval = int(sampling_interval_hours * steps_per_hour)
             if sampling_interval > 1:
@@ -694,8 +1137,17 @@ class MaterialBalanceCalculator:
                             torch.tensor([total_steps - 1], device=self.device),
                         ]
                     )
-                return full_timestamps[sample_indices].cpu().numpy().tolist()
-        return full_timestamps.cpu().numpy().tolist()
+                return solver_grid, solver_grid[sample_indices]
+        return solver_grid, solver_grid
+
+    def _generate_segment_timestamps(
+        self,
+        hours: float,
+        steps_per_hour: int,
+        sampling_interval_hours: Optional[float],
+    ) -> List[float]:
+        _, report_times = self._reporting_grid(hours, steps_per_hour, sampling_interval_hours)
+        return report_times.cpu().numpy().tolist()
 
     def _build_parameter_change_events(
         self,
@@ -748,32 +1200,17 @@ class MaterialBalanceCalculator:
     def _balance_param_sparse(
         self,
         C: torch.Tensor,                    # [m, r]
-        bundle: dict                        # {'src','dst','q','a','b','shape'}
+        bundle: EdgeBundle                  # {'src','dst','q','a','b','delta_Q','shape'}
     ) -> Tuple[torch.Tensor, torch.Tensor]:
-        src = bundle["src"]                 # [E]
-        dst = bundle["dst"]                 # [E]
-        q   = bundle["q"]                   # [E]
-        a   = bundle["a"]                   # [E, r]
-        b   = bundle["b"]                   # [E, r]
-        m, n = bundle["shape"]
-        r = C.size(1)
-
-        # 1) 杈逛笂璁＄畻 C_out 涓?m_edge锛堜笉鏋勯€?m脳n脳r锛?
-        C_edge = C[src] * a + b             # [E, r]
-        m_edge = q.unsqueeze(1) * C_edge    # [E, r]
-
-        # 2) 鑱氬悎鍒扮粨鐐癸紙鍑?鎸?src 鑱氬悎锛涘叆=鎸?dst 鑱氬悎锛?
-        device, dtype = C.device, C.dtype
-        sum_m_out = torch.zeros((m, r), device=device, dtype=dtype).index_add_(0, src, m_edge)
-        sum_m_in  = torch.zeros((n, r), device=device, dtype=dtype).index_add_(0, dst, m_edge)
-
-        # 3) 璐ㄩ噺/浣撶Н骞宠　澧為噺
-        delta_m = sum_m_in - sum_m_out      # [m, r]锛堥€氬父 m==n锛?
-        sum_Q_out = torch.zeros(m, device=device, dtype=dtype).index_add_(0, src, q)
-        sum_Q_in  = torch.zeros(n, device=device, dtype=dtype).index_add_(0, dst, q)
-        delta_Q = sum_Q_in - sum_Q_out      # [m]
-
-        return delta_m, delta_Q
+        return sparse_transport(
+            C,
+            bundle["src"],
+            bundle["dst"],
+            bundle["q"],
+            bundle["a"],
+            bundle["b"],
+            bundle["delta_Q"],
+        )
 
     # Legacy wrappers kept for backward compatibility with existing call sites.
     def _asm1slim(self, ASMparam: torch.tensor, C0_matrix: torch.tensor):
@@ -825,282 +1262,121 @@ class MaterialBalanceCalculator:
         
         return delta_m, delta_Q, C_out, m_out, sum_m_out
     
-    def _ode_balance(self, t: float, y_extended: torch.Tensor, m: int, prop_a: torch.Tensor, prop_b: torch.Tensor,
-                    Q_out: torch.Tensor, compute_mask: torch.Tensor, sparse_bundle: dict = None ) -> torch.Tensor:
-        """鐗╂枡鍜屼綋绉钩琛＄殑ODE鍑芥暟銆?
-        
-        瀹氫箟寰垎鏂圭▼绯荤粺锛屾弿杩扮郴缁熶腑鍚勮妭鐐圭殑娴撳害鍜屼綋绉殢鏃堕棿鐨勫彉鍖栥€?
-        璇ュ嚱鏁拌ODE姹傝В鍣ㄨ皟鐢ㄤ互璁＄畻瀵兼暟銆備娇鐢ㄦ帺鐮佽繘琛屽紶閲忓寲璁＄畻銆?
-        鏀寔绋€鐤忕煩闃佃绠椼€?
-        
-        Args:
-            t: 褰撳墠鏃堕棿
-            y_extended: 鎵╁睍鐘舵€佸悜閲忥紙娴撳害+浣撶Н锛?
-            m: 鑺傜偣鏁伴噺
-            prop_a: 娴撳害姣斾緥鍥犲瓙
-            prop_b: 娴撳害鍋忕Щ鍥犲瓙
-            Q_out: 娴侀噺鐭╅樀
-            compute_mask: 璁＄畻鎺╃爜锛孴rue琛ㄧず闇€瑕佽绠楃殑鑺傜偣
-            
-        Returns:
-            鐘舵€佸悜閲忕殑鏃堕棿瀵兼暟
-        """
-        y = y_extended[:, :-1]  # Concentration matrix
-        V_liq = y_extended[:, -1]  # Volume vector
-        
-        # Ensure non-negative values (clamp already prevents negative volumes)
-        y = torch.clamp(y, min=0)
-        V_liq = torch.clamp(V_liq, min=1e-6)  # Prevent zero volume
-        
-        if sparse_bundle is not None:
-            delta_m, delta_Q = self._balance_param_sparse(y, sparse_bundle)
-        else:
-            # 鍏煎鍘熻嚧瀵嗗疄鐜?
-            delta_m, delta_Q, *_ = self._balance_param(y, Q_out, prop_a, prop_b)[:2]
-        
-        dy_extended = torch.zeros_like(y_extended)
-        
-        # Apply material balance equations only to internal nodes (where mask is True)
-        # Concentration changes
-        dilution_term = -y * delta_Q.unsqueeze(-1) / V_liq.unsqueeze(-1)
-        concentration_change = delta_m / V_liq.unsqueeze(-1) + dilution_term
-            
-        # Apply mask: only update internal nodes
-        mask_expanded = compute_mask.unsqueeze(-1).expand_as(concentration_change)
-        dy_extended[:, :-1] = torch.where(mask_expanded, concentration_change, torch.zeros_like(concentration_change))
-        
-        # Volume changes: only for internal nodes
-        dy_extended[:, -1] = torch.where(compute_mask, delta_Q, torch.zeros_like(delta_Q))
-        
-        return dy_extended
-
-    def _asm1slim_ode_balance(self, t: float, y_extended: torch.Tensor, m: int, prop_a: torch.Tensor, prop_b: torch.Tensor,
-
-                    Q_out: torch.Tensor, compute_mask: torch.Tensor, asm1slim_params: torch.Tensor, asm1slim_mask: torch.Tensor, sparse_bundle: dict = None ) -> torch.Tensor:
-
-
-        """鐗╂枡鍜屼綋绉钩琛＄殑ODE鍑芥暟銆?
-        
-        瀹氫箟寰垎鏂圭▼绯荤粺锛屾弿杩扮郴缁熶腑鍚勮妭鐐圭殑娴撳害鍜屼綋绉殢鏃堕棿鐨勫彉鍖栥€?
-        璇ュ嚱鏁拌ODE姹傝В鍣ㄨ皟鐢ㄤ互璁＄畻瀵兼暟銆備娇鐢ㄦ帺鐮佽繘琛屽紶閲忓寲璁＄畻銆?
-        鏀寔绋€鐤忕煩闃佃绠椼€?
-        
-        Args:
-            t: 褰撳墠鏃堕棿
-            y_extended: 鎵╁睍鐘舵€佸悜閲忥紙娴撳害+浣撶Н锛?
-            m: 鑺傜偣鏁伴噺
-            prop_a: 娴撳害姣斾緥鍥犲瓙
-            prop_b: 娴撳害鍋忕Щ鍥犲瓙
-            Q_out: 娴侀噺鐭╅樀
-            compute_mask: 璁＄畻鎺╃爜锛孴rue琛ㄧず闇€瑕佽绠楃殑鑺傜偣
-            
-        Returns:
-            鐘舵€佸悜閲忕殑鏃堕棿瀵兼暟
-        """
-        y = y_extended[:, :-1]  # Concentration matrix
-        V_liq = y_extended[:, -1]  # Volume vector
-        
-        # Ensure non-negative values (clamp already prevents negative volumes)
-        y = torch.clamp(y, min=0)
-        V_liq = torch.clamp(V_liq, min=1e-6)  # Prevent zero volume
-        
-        if sparse_bundle is not None:
-            delta_m, delta_Q = self._balance_param_sparse(y, sparse_bundle)
-        else:
-            # 鍏煎鍘熻嚧瀵嗗疄鐜?
-            delta_m, delta_Q, *_ = self._balance_param(y, Q_out, prop_a, prop_b)[:2]
-        
-        dy_extended = torch.zeros_like(y_extended)
-        
-        # Apply material balance equations only to internal nodes (where mask is True)
-        # Concentration changes
-        dilution_term = -y * delta_Q.unsqueeze(-1) / V_liq.unsqueeze(-1)
-        concentration_change = delta_m / V_liq.unsqueeze(-1) + dilution_term
-
-        # Add ASM1 Slim reaction terms for ASM1 Slim nodes
-        if asm1slim_params is not None and asm1slim_mask.any():
-            # Get ASM1 Slim nodes concentrations
-            asm1slim_concentrations = y[asm1slim_mask]  # [n_asm1slim_nodes, n_components]
-            
-            # Get ASM1 Slim parameters for only ASM1 Slim nodes
-            asm1slim_params_filtered = asm1slim_params[asm1slim_mask]  # [n_asm1slim_nodes, 7]
-            
-            # Calculate ASM1 Slim reaction rates
-            asm_reaction_rates = asm1slim_reaction(asm1slim_params_filtered, asm1slim_concentrations)  # [n_asm1slim_nodes, n_components]
-            
-            # Add reaction terms to concentration changes for ASM1 Slim nodes
-            asm1slim_mask_expanded = asm1slim_mask.unsqueeze(-1).expand_as(concentration_change)
-            asm_reaction_change = torch.zeros_like(concentration_change)
-            asm_reaction_change[asm1slim_mask] = asm_reaction_rates
-            
-            concentration_change = concentration_change + asm_reaction_change
-    
-        
-        # Apply mask: only update internal nodes
-        mask_expanded = compute_mask.unsqueeze(-1).expand_as(concentration_change)
-        dy_extended[:, :-1] = torch.where(mask_expanded, concentration_change, torch.zeros_like(concentration_change))
-
-        # 杩欓噷涓嶈€冭檻婧惰В姘х殑鍙樺寲锛屾墍浠ヨ涓?
-        dy_extended[:, 0] = torch.zeros_like(dy_extended[:, 0])
-
-        
-        # Volume changes: only for internal nodes
-        dy_extended[:, -1] = torch.where(compute_mask, delta_Q, torch.zeros_like(delta_Q))
-        
-        return dy_extended
-
-    def _asm1_ode_balance(self, t: float, y_extended: torch.Tensor, m: int, prop_a: torch.Tensor, prop_b: torch.Tensor,
-
-                    Q_out: torch.Tensor, compute_mask: torch.Tensor, asm1_params: torch.Tensor, asm1_mask: torch.Tensor, sparse_bundle: dict = None ) -> torch.Tensor:
-
-
-        """鐗╂枡鍜屼綋绉钩琛＄殑ODE鍑芥暟銆?
-        
-        瀹氫箟寰垎鏂圭▼绯荤粺锛屾弿杩扮郴缁熶腑鍚勮妭鐐圭殑娴撳害鍜屼綋绉殢鏃堕棿鐨勫彉鍖栥€?
-        璇ュ嚱鏁拌ODE姹傝В鍣ㄨ皟鐢ㄤ互璁＄畻瀵兼暟銆備娇鐢ㄦ帺鐮佽繘琛屽紶閲忓寲璁＄畻銆?
-        鏀寔绋€鐤忕煩闃佃绠椼€?
-        
-        Args:
-            t: 褰撳墠鏃堕棿
-            y_extended: 鎵╁睍鐘舵€佸悜閲忥紙娴撳害+浣撶Н锛?
-            m: 鑺傜偣鏁伴噺
-            prop_a: 娴撳害姣斾緥鍥犲瓙
-            prop_b: 娴撳害鍋忕Щ鍥犲瓙
-            Q_out: 娴侀噺鐭╅樀
-            compute_mask: 璁＄畻鎺╃爜锛孴rue琛ㄧず闇€瑕佽绠楃殑鑺傜偣
-            
-        Returns:
-            鐘舵€佸悜閲忕殑鏃堕棿瀵兼暟
+    def _integrate(
+        self,
+        ode_fn,
+        x0: torch.Tensor,
+        t0: torch.Tensor,
+        method: str,
+        tolerance: float,
+        sparse_bundle: Optional[dict] = None,
+        solver_grid: Optional[torch.Tensor] = None,
+        breakpoints: Optional[torch.Tensor] = None,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> torch.Tensor:
+        """Integrate ode_fn with torchdiffeq, or the implicit stiff solvers.
+
+        Returns the states at the times in ``t0`` only. When ``solver_grid`` is
+        given, ``t0`` is a subset of it: fixed-step solvers still march on the
+        whole grid and implicit solvers start from its spacing, but only the
+        requested points are kept. Adaptive solvers choose their own steps and
+        interpolate at ``t0`` either way. ``breakpoints`` are times where the
+        RHS is not smooth: adaptive solvers step onto them and the stiff
+        solvers restart there. The stiff solvers add their step and Jacobian
+        counts to ``stats``.
         """
-        y = y_extended[:, :-1]  # Concentration matrix
-        V_liq = y_extended[:, -1]  # Volume vector
-        
-        # Ensure non-negative values (clamp already prevents negative volumes)
-        y = torch.clamp(y, min=0)
-        V_liq = torch.clamp(V_liq, min=1e-6)  # Prevent zero volume
-        
-        if sparse_bundle is not None:
-            delta_m, delta_Q = self._balance_param_sparse(y, sparse_bundle)
-        else:
-            # 鍏煎鍘熻嚧瀵嗗疄鐜?
-            delta_m, delta_Q, *_ = self._balance_param(y, Q_out, prop_a, prop_b)[:2]
-        
-        dy_extended = torch.zeros_like(y_extended)
-        
-        # Apply material balance equations only to internal nodes (where mask is True)
-        # Concentration changes
-        dilution_term = -y * delta_Q.unsqueeze(-1) / V_liq.unsqueeze(-1)
-        concentration_change = delta_m / V_liq.unsqueeze(-1) + dilution_term
-
-        # Add ASM1 reaction terms for ASM1 nodes
-        if asm1_params is not None and asm1_mask.any():
-            # Get ASM1 nodes concentrations
-            asm1_concentrations = y[asm1_mask]  # [n_asm1_nodes, n_components]
-            
-            # Get ASM1 parameters for only ASM1 nodes
-            asm1_params_filtered = asm1_params[asm1_mask]  # [n_asm1_nodes, 19]
-            
-            # Calculate ASM1 reaction rates
-            asm_reaction_rates = asm1_reaction(asm1_params_filtered, asm1_concentrations)  # [n_asm1_nodes, n_components]
-            
-            # Add reaction terms to concentration changes for ASM1 nodes
-            asm1_mask_expanded = asm1_mask.unsqueeze(-1).expand_as(concentration_change)
-            asm_reaction_change = torch.zeros_like(concentration_change)
-            asm_reaction_change[asm1_mask] = asm_reaction_rates
-            
-            concentration_change = concentration_change + asm_reaction_change
-    
-        
-        # Apply mask: only update internal nodes
-        mask_expanded = compute_mask.unsqueeze(-1).expand_as(concentration_change)
-        dy_extended[:, :-1] = torch.where(mask_expanded, concentration_change, torch.zeros_like(concentration_change))
-
-        # 杩欓噷涓嶈€冭檻婧惰В姘х殑鍙樺寲锛屾墍浠ヨ涓?
-        dy_extended[:, 5] = torch.zeros_like(dy_extended[:, 5])
-
-        
-        # Volume changes: only for internal nodes
-        dy_extended[:, -1] = torch.where(compute_mask, delta_Q, torch.zeros_like(delta_Q))
-        
-        return dy_extended
-    
-    def _asm3_ode_balance(self, t: float, y_extended: torch.Tensor, m: int, prop_a: torch.Tensor, prop_b: torch.Tensor,
-
-                    Q_out: torch.Tensor, compute_mask: torch.Tensor, asm3_params: torch.Tensor, asm3_mask: torch.Tensor, sparse_bundle: dict = None ) -> torch.Tensor:
-
+        method = str(getattr(method, "value", method))
+        step_size = None
+        if solver_grid is not None and solver_grid.shape[0] > 1:
+            step_size = float(solver_grid[1] - solver_grid[0])
+        if breakpoints is not None and breakpoints.numel() == 0:
+            breakpoints = None
+        if method in STIFF_SOLVER_METHODS and breakpoints is not None:
+            return self._integrate_pieces(
+                ode_fn, x0, t0, method, tolerance, sparse_bundle, solver_grid, breakpoints, stats
+            )
+        if method in STIFF_SOLVER_METHODS:
+            structure = build_jacobian_structure(
+                sparse_bundle,
+                n_nodes=x0.shape[0],
+                n_state=x0.shape[1],
+                device=x0.device,
+            )
+            return odeint_implicit(
+                ode_fn,
+                x0,
+                t0,
+                method=method,
+                rtol=tolerance,
+                atol=tolerance,
+                structure=structure,
+                step_size=step_size,
+                stats=stats,
+            )
+        options = None
+        if method in _FIXED_GRID_SOLVER_METHODS and solver_grid is not None:
+            options = {"grid_constructor": lambda func, y0, t: solver_grid}
+        elif method in _ADAPTIVE_SOLVER_METHODS and breakpoints is not None:
+            options = {"jump_t": breakpoints}
+        return odeint(
+            ode_fn, x0, t0, method=method, rtol=tolerance, atol=tolerance, options=options
+        )
 
-        """鐗╂枡鍜屼綋绉钩琛＄殑ODE鍑芥暟銆?
-        
-        瀹氫箟寰垎鏂圭▼绯荤粺锛屾弿杩扮郴缁熶腑鍚勮妭鐐圭殑娴撳害鍜屼綋绉殢鏃堕棿鐨勫彉鍖栥€?
-        璇ュ嚱鏁拌ODE姹傝В鍣ㄨ皟鐢ㄤ互璁＄畻瀵兼暟銆備娇鐢ㄦ帺鐮佽繘琛屽紶閲忓寲璁＄畻銆?
-        鏀寔绋€鐤忕煩闃佃绠椼€?
-        
-        Args:
-            t: 褰撳墠鏃堕棿
-            y_extended: 鎵╁睍鐘舵€佸悜閲忥紙娴撳害+浣撶Н锛?
-            m: 鑺傜偣鏁伴噺
-            prop_a: 娴撳害姣斾緥鍥犲瓙
-            prop_b: 娴撳害鍋忕Щ鍥犲瓙
-            Q_out: 娴侀噺鐭╅樀
-            compute_mask: 璁＄畻鎺╃爜锛孴rue琛ㄧず闇€瑕佽绠楃殑鑺傜偣
-            
-        Returns:
-            鐘舵€佸悜閲忕殑鏃堕棿瀵兼暟
+    def _integrate_pieces(
+        self,
+        ode_fn,
+        x0: torch.Tensor,
+        t0: torch.Tensor,
+        method: str,
+        tolerance: float,
+        sparse_bundle: Optional[dict],
+        solver_grid: Optional[torch.Tensor],
+        breakpoints: torch.Tensor,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> torch.Tensor:
+        """Run a stiff solver piece by piece between ``breakpoints``.
+
+        Like a segment boundary, each breakpoint restarts the step size and
+        the Jacobian, but the RHS is kept. A piece ends one ulp before its
+        breakpoint, so a step profile is seen from the left until it switches.
         """
-        y = y_extended[:, :-1]  # Concentration matrix
-        V_liq = y_extended[:, -1]  # Volume vector
-        
-        # Ensure non-negative values (clamp already prevents negative volumes)
-        y = torch.clamp(y, min=0)
-        V_liq = torch.clamp(V_liq, min=1e-6)  # Prevent zero volume
-        
-        if sparse_bundle is not None:
-            delta_m, delta_Q = self._balance_param_sparse(y, sparse_bundle)
-        else:
-            # 鍏煎鍘熻嚧瀵嗗疄鐜?
-            delta_m, delta_Q, *_ = self._balance_param(y, Q_out, prop_a, prop_b)[:2]
-        
-        dy_extended = torch.zeros_like(y_extended)
-        
-        # Apply material balance equations only to internal nodes (where mask is True)
-        # Concentration changes
-        dilution_term = -y * delta_Q.unsqueeze(-1) / V_liq.unsqueeze(-1)
-        concentration_change = delta_m / V_liq.unsqueeze(-1) + dilution_term
-
-        # Add ASM3 reaction terms for ASM3 nodes
-        if asm3_params is not None and asm3_mask.any():
-            # Get ASM3 nodes concentrations
-            asm3_concentrations = y[asm3_mask]  # [n_asm3_nodes, n_components]
-            
-            # Get ASM3 parameters for only ASM3 nodes
-            asm3_params_filtered = asm3_params[asm3_mask]  # [n_asm3_nodes, 37]
-            
-            # Calculate ASM3 reaction rates
-            asm_reaction_rates = asm3_reaction(asm3_params_filtered, asm3_concentrations)  # [n_asm3_nodes, n_components]
-            
-            # Add reaction terms to concentration changes for ASM3 nodes
-            asm3_mask_expanded = asm3_mask.unsqueeze(-1).expand_as(concentration_change)
-            asm_reaction_change = torch.zeros_like(concentration_change)
-            asm_reaction_change[asm3_mask] = asm_reaction_rates
-            
-            concentration_change = concentration_change + asm_reaction_change
-    
-        
-        # Apply mask: only update internal nodes
-        mask_expanded = compute_mask.unsqueeze(-1).expand_as(concentration_change)
-        dy_extended[:, :-1] = torch.where(mask_expanded, concentration_change, torch.zeros_like(concentration_change))
-
-        # 杩欓噷涓嶈€冭檻婧惰В姘х殑鍙樺寲锛屾墍浠ヨ涓?
-        dy_extended[:, 6] = torch.zeros_like(dy_extended[:, 6])
-
-        
-        # Volume changes: only for internal nodes
-        dy_extended[:, -1] = torch.where(compute_mask, delta_Q, torch.zeros_like(delta_Q))
-        
-        return dy_extended
+        breakpoints = breakpoints.to(t0)
+        # Breakpoints within float noise of an output time snap onto it
+        nearest = torch.searchsorted(t0, breakpoints).clamp(1, t0.shape[0] - 1)
+        snap = torch.where(
+            (breakpoints - t0[nearest - 1]).abs() < (t0[nearest] - breakpoints).abs(),
+            nearest - 1,
+            nearest,
+        )
+        noise = 1e-6 * float(t0[-1] - t0[0])
+        breakpoints = torch.where(
+            (t0[snap] - breakpoints).abs() <= noise, t0[snap], breakpoints
+        )
+        inner = breakpoints[(breakpoints > t0[0]) & (breakpoints < t0[-1])]
+        bounds = torch.unique(torch.cat([t0[:1], inner, t0[-1:]]))
+
+        states = [x0.unsqueeze(0)]
+        y = x0
+        for lower, upper in zip(bounds[:-1], bounds[1:], strict=True):
+            last = bool(upper == t0[-1])
+            end = upper if last else torch.nextafter(upper, lower)
+            inside = t0[(t0 > lower) & (t0 < upper)]
+            piece = self._integrate(
+                ode_fn,
+                y,
+                torch.cat([lower.reshape(1), inside, end.reshape(1)]),
+                method,
+                tolerance,
+                sparse_bundle,
+                solver_grid=solver_grid,
+                stats=stats,
+            )
+            y = piece[-1]
+            reported = bool((t0 == upper).any())
+            states.append(piece[1:] if reported else piece[1:-1])
+        return torch.cat(states)
 
-    def _run_hours(self, hours: float, x0: torch.Tensor, Q_out: torch.Tensor, 
-                  m: int, steps: int, prop_a: torch.Tensor, prop_b: torch.Tensor,
+    def _run_hours(self, hours: float, x0: torch.Tensor, m: int, steps: int,
                   method: str = 'rk4', tolerance: float = 1e-3, 
                   compute_mask: torch.Tensor = None, asm1slim_params: torch.Tensor = None, 
                   asm1slim_mask: torch.Tensor = None, sparse_bundle: dict = None,
@@ -1108,7 +1384,13 @@ class MaterialBalanceCalculator:
                   asm3_params: torch.Tensor = None, asm3_mask: torch.Tensor = None,
                   udm_mask: torch.Tensor = None,
                   udm_runtime_payload: List[UDMNodeRuntime] = None,
-                  sampling_interval_hours: float = None) -> torch.Tensor:
+                  sampling_interval_hours: float = None,
+                  udm_batch_runtime: Optional[UDMBatchRuntime] = None,
+                  rhs_backend: str = "eager",
+                  cancel_token: Optional[CancellationToken] = None,
+                  edge_profile: Optional[ProfiledEdges] = None,
+                  progress: Optional[ProgressTracker] = None,
+                  profile: Optional[SolverProfile] = None) -> torch.Tensor:
 
         """杩愯鎸囧畾灏忔椂鏁扮殑妯℃嫙銆?
         
@@ -1117,11 +1399,8 @@ class MaterialBalanceCalculator:
         Args:
             hours: 妯℃嫙鏃堕棿锛堝皬鏃讹級
             x0: 鍒濆鐘舵€?
-            Q_out: 娴侀噺鐭╅樀
             m: 鑺傜偣鏁伴噺
             steps: 姣忓皬鏃剁殑姝ユ暟
-            prop_a: 娴撳害姣斾緥鍥犲瓙
-            prop_b: 娴撳害鍋忕Щ鍥犲瓙
             method: 姹傝В鍣ㄦ柟娉?
             tolerance: 姹傝В绮惧害
             compute_mask: 璁＄畻鎺╃爜锛孴rue琛ㄧず闇€瑕佽绠楃殑鑺傜偣
@@ -1142,159 +1421,141 @@ class MaterialBalanceCalculator:
             raise ValueError("compute_mask is required and cannot be None")
         
         x0 = x0[-1, :]
-        t0 = torch.linspace(0, hours, int(hours * steps) + 1, device=self.device)
-
-        if asm1slim_params is not None and asm1slim_mask.any():
-
-            ode_modified = functools.partial(
-                self._asm1slim_ode_balance,
-                Q_out=Q_out, m=m, prop_a=prop_a, prop_b=prop_b,
-                compute_mask=compute_mask,
-                asm1slim_params=asm1slim_params,
-                asm1slim_mask=asm1slim_mask,
-                sparse_bundle=sparse_bundle
-            )
-            try:
-                x = odeint(ode_modified, x0, t0, method=method, rtol=tolerance, atol=tolerance)
-                # 鎶妜涓皬浜?鐨勫厓绱犻兘鏀规垚0
-                x = torch.clamp(x, min=0)
-                
-                # 搴旂敤閲囨牱閫昏緫
-                if sampling_interval_hours is not None and sampling_interval_hours > 0:
-                    sampling_interval = int(sampling_interval_hours * steps)
-                    if sampling_interval > 1:
-                        # 鐢熸垚閲囨牱绱㈠紩
-                        sample_indices = torch.arange(0, x.shape[0], sampling_interval, device=self.device)
-                        # 纭繚鍖呭惈鏈€鍚庝竴涓椂闂寸偣
-                        if sample_indices[-1] != x.shape[0] - 1:
-                            sample_indices = torch.cat([sample_indices, torch.tensor([x.shape[0] - 1], device=self.device)])
-                        # 瀵瑰紶閲忚繘琛岄噰鏍?
-                        x = x[sample_indices]
-                
-                return x
-            except Exception as e:
-                raise ConvergenceError(f"ODE solver failed to converge: {str(e)}") from e
-        
-        elif asm1_params is not None and asm1_mask.any():
-            ode_modified = functools.partial(
-                self._asm1_ode_balance,
-                Q_out=Q_out, m=m, prop_a=prop_a, prop_b=prop_b,
-                compute_mask=compute_mask,
-                asm1_params=asm1_params,
-                asm1_mask=asm1_mask,
-                sparse_bundle=sparse_bundle
-            )
-            try:
-                x = odeint(ode_modified, x0, t0, method=method, rtol=tolerance, atol=tolerance)
-                # 鎶妜涓皬浜?鐨勫厓绱犻兘鏀规垚0
-                x = torch.clamp(x, min=0)
-                
-                # 搴旂敤閲囨牱閫昏緫
-                if sampling_interval_hours is not None and sampling_interval_hours > 0:
-                    sampling_interval = int(sampling_interval_hours * steps)
-                    if sampling_interval > 1:
-                        # 鐢熸垚閲囨牱绱㈠紩
-                        sample_indices = torch.arange(0, x.shape[0], sampling_interval, device=self.device)
-                        # 纭繚鍖呭惈鏈€鍚庝竴涓椂闂寸偣
-                        if sample_indices[-1] != x.shape[0] - 1:
-                            sample_indices = torch.cat([sample_indices, torch.tensor([x.shape[0] - 1], device=self.device)])
-                        # 瀵瑰紶閲忚繘琛岄噰鏍?
-                        x = x[sample_indices]
-                
-                return x
-            except Exception as e:
-                raise ConvergenceError(f"ODE solver failed to converge: {str(e)}") from e
-
-        elif asm3_params is not None and asm3_mask.any():
-            ode_modified = functools.partial(
-                self._asm3_ode_balance,
-                Q_out=Q_out, m=m, prop_a=prop_a, prop_b=prop_b,
-                compute_mask=compute_mask,
-                asm3_params=asm3_params,
-                asm3_mask=asm3_mask,
-                sparse_bundle=sparse_bundle
-            )
-            try:
-                x = odeint(ode_modified, x0, t0, method=method, rtol=tolerance, atol=tolerance)
-                # 鎶妜涓皬浜?鐨勫厓绱犻兘鏀规垚0
-                x = torch.clamp(x, min=0)
-                
-                # 搴旂敤閲囨牱閫昏緫
-                if sampling_interval_hours is not None and sampling_interval_hours > 0:
-                    sampling_interval = int(sampling_interval_hours * steps)
-                    if sampling_interval > 1:
-                        # 鐢熸垚閲囨牱绱㈠紩
-                        sample_indices = torch.arange(0, x.shape[0], sampling_interval, device=self.device)
-                        # 纭繚鍖呭惈鏈€鍚庝竴涓椂闂寸偣
-                        if sample_indices[-1] != x.shape[0] - 1:
-                            sample_indices = torch.cat([sample_indices, torch.tensor([x.shape[0] - 1], device=self.device)])
-                        # 瀵瑰紶閲忚繘琛岄噰鏍?
-                        x = x[sample_indices]
-                
-                return x
-            except Exception as e:
-                raise ConvergenceError(f"ODE solver failed to converge: {str(e)}") from e        
-
-        elif udm_mask is not None and udm_mask.any() and udm_runtime_payload:
-            ode_modified = functools.partial(
-                udm_ode_balance,
-                Q_out=Q_out,
-                m=m,
-                prop_a=prop_a,
-                prop_b=prop_b,
-                compute_mask=compute_mask,
-                udm_mask=udm_mask,
-                udm_runtime_payload=udm_runtime_payload,
-                sparse_bundle=sparse_bundle,
-                balance_param=self._balance_param,
-                balance_param_sparse=self._balance_param_sparse,
+        # Only the sampled points are requested from the solver, so the
+        # trajectory is O(hours / sampling interval), not O(hours * steps)
+        solver_grid, t0 = self._reporting_grid(hours, steps, sampling_interval_hours)
+
+        ode_modified, clamp_output = self._build_ode_function(
+            m=m,
+            compute_mask=compute_mask,
+            asm1slim_params=asm1slim_params, asm1slim_mask=asm1slim_mask,
+            asm1_params=asm1_params, asm1_mask=asm1_mask,
+            asm3_params=asm3_params, asm3_mask=asm3_mask,
+            udm_mask=udm_mask,
+            udm_runtime_payload=udm_runtime_payload,
+            udm_batch_runtime=udm_batch_runtime,
+            sparse_bundle=sparse_bundle,
+            rhs_backend=rhs_backend,
+            edge_profile=edge_profile,
+            profile=profile,
+        )
+        method_name = str(getattr(method, "value", method))
+        if edge_profile is not None and method_name in _FIXED_GRID_SOLVER_METHODS:
+            edge_profile.tabulate(_fixed_grid_stage_times(solver_grid, method_name))
+        if cancel_token is not None:
+            # Checkpoint before every RHS evaluation, whatever the solver
+            ode_modified = cancel_token.wrap(ode_modified)
+        if progress is not None:
+            ode_modified = progress.wrap(ode_modified)
+        if profile is not None:
+            # Outermost, so torchdiffeq finds the step callbacks on it
+            ode_modified = profile.wrap(
+                ode_modified,
+                "fixed" if method_name in _FIXED_GRID_SOLVER_METHODS
+                else "adaptive" if method_name in _ADAPTIVE_SOLVER_METHODS
+                else None,
             )
-            try:
-                x = odeint(ode_modified, x0, t0, method=method, rtol=tolerance, atol=tolerance)
+
+        try:
+            with profile.section("integration") if profile is not None else nullcontext():
+                x = self._integrate(
+                    ode_modified,
+                    x0,
+                    t0,
+                    method,
+                    tolerance,
+                    sparse_bundle,
+                    solver_grid=solver_grid,
+                    breakpoints=edge_profile.breakpoints(hours) if edge_profile is not None else None,
+                    stats=profile.counts if profile is not None else None,
+                )
+            if clamp_output:
+                # Reaction models cannot hold negative concentrations
                 x = torch.clamp(x, min=0)
 
-                if sampling_interval_hours is not None and sampling_interval_hours > 0:
-                    sampling_interval = int(sampling_interval_hours * steps)
-                    if sampling_interval > 1:
-                        sample_indices = torch.arange(0, x.shape[0], sampling_interval, device=self.device)
-                        if sample_indices[-1] != x.shape[0] - 1:
-                            sample_indices = torch.cat([sample_indices, torch.tensor([x.shape[0] - 1], device=self.device)])
-                        x = x[sample_indices]
+            return x
+        except CalculationCancelledError:
+            raise
+        except Exception as e:
+            raise ConvergenceError(f"ODE solver failed to converge: {str(e)}") from e
+
+    def _build_ode_function(
+        self,
+        *,
+        m: int,
+        compute_mask: torch.Tensor,
+        sparse_bundle: EdgeBundle,
+        asm1slim_params: Optional[torch.Tensor] = None,
+        asm1slim_mask: Optional[torch.Tensor] = None,
+        asm1_params: Optional[torch.Tensor] = None,
+        asm1_mask: Optional[torch.Tensor] = None,
+        asm3_params: Optional[torch.Tensor] = None,
+        asm3_mask: Optional[torch.Tensor] = None,
+        udm_mask: Optional[torch.Tensor] = None,
+        udm_runtime_payload: Optional[List[UDMNodeRuntime]] = None,
+        udm_batch_runtime: Optional[UDMBatchRuntime] = None,
+        rhs_backend: str = "eager",
+        edge_profile: Optional[ProfiledEdges] = None,
+        profile: Optional[SolverProfile] = None,
+    ) -> Tuple[Any, bool]:
+        """Build the fused ODE right-hand side for every reaction model in use.
+
+        Returns ``(ode_fn, clamp_output)``. ``ode_fn(t, y)`` is the RHS shared by
+        the transient and steady-state solvers. ``clamp_output`` says whether the
+        states should be clamped to be non-negative (any reaction model present).
+        With ``rhs_backend`` other than ``eager`` the transport and kinetics run
+        as cached compiled kernels (see ``compiled.py``). Transport always runs
+        on the edge lists of ``sparse_bundle`` unless ``self.dense_transport``
+        is set for debugging. ``edge_profile`` makes the edge values a
+        function of ``t`` (see ``profiles.py``). ``profile`` times the
+        transport and every reaction module (see ``profiling.py``).
+        """
+        n_components = sparse_bundle["a"].shape[1]
+        modules = build_reaction_modules(
+            {
+                "asm1slim": (asm1slim_mask, asm1slim_params),
+                "asm1": (asm1_mask, asm1_params),
+                "asm3": (asm3_mask, asm3_params),
+            },
+            n_components=n_components,
+            udm_mask=udm_mask,
+            udm_runtime_payload=udm_runtime_payload,
+            udm_batch_runtime=udm_batch_runtime,
+        )
 
-                return x
-            except Exception as e:
-                raise ConvergenceError(f"ODE solver failed to converge: {str(e)}") from e
+        compiled_bundle: Optional[EdgeBundle] = sparse_bundle
+        if self.dense_transport:
+            dense = dense_edge_tensors(sparse_bundle, n_components)
+            compiled_bundle = None
 
+            def transport(t: torch.Tensor, y: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+                Q_out, prop_a, prop_b = dense
+                if edge_profile is not None:
+                    Q_out, prop_a, prop_b = dense_edge_tensors(
+                        edge_profile.bundle_at(t), n_components
+                    )
+                return self._balance_param(y, Q_out, prop_a, prop_b)[:2]
+        elif edge_profile is None:
+            def transport(_t: torch.Tensor, y: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+                return self._balance_param_sparse(y, sparse_bundle)
         else:
+            def transport(t: torch.Tensor, y: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+                return sparse_transport(
+                    y, sparse_bundle["src"], sparse_bundle["dst"], *edge_profile(t)
+                )
+
+        balance = compile_balance(
+            FusedBalance(transport, compute_mask, modules, n_components),
+            backend=str(getattr(rhs_backend, "value", rhs_backend)),
+            n_components=n_components,
+            dtype=sparse_bundle["q"].dtype,
+            sparse_bundle=compiled_bundle,
+            edge_profile=edge_profile,
+        )
+        if profile is not None:
+            profile.instrument(balance)
+        return balance, bool(modules)
 
-            ode_modified = functools.partial(
-                self._ode_balance,
-                Q_out=Q_out, m=m, prop_a=prop_a, prop_b=prop_b,
-                compute_mask=compute_mask,
-                sparse_bundle=sparse_bundle
-            )
-        
-            try:
-                x = odeint(ode_modified, x0, t0, method=method, rtol=tolerance, atol=tolerance)
-                # 鎶妜涓皬浜?鐨勫厓绱犻兘鏀规垚0
-                # x = torch.clamp(x, min=0)
-                
-                # 搴旂敤閲囨牱閫昏緫
-                if sampling_interval_hours is not None and sampling_interval_hours > 0:
-                    sampling_interval = int(sampling_interval_hours * steps)
-                    if sampling_interval > 1:
-                        # 鐢熸垚閲囨牱绱㈠紩
-                        sample_indices = torch.arange(0, x.shape[0], sampling_interval, device=self.device)
-                        # 纭繚鍖呭惈鏈€鍚庝竴涓椂闂寸偣
-                        if sample_indices[-1] != x.shape[0] - 1:
-                            sample_indices = torch.cat([sample_indices, torch.tensor([x.shape[0] - 1], device=self.device)])
-                        # 瀵瑰紶閲忚繘琛岄噰鏍?
-                        x = x[sample_indices]
-                
-                return x
-            except Exception as e:
-                raise ConvergenceError(f"ODE solver failed to converge: {str(e)}") from e
-    
     def _merge_tensors(self, V_liq: torch.Tensor, x0: torch.Tensor) -> torch.Tensor:
         """鍚堝苟浣撶Н鍜屾祿搴﹀紶閲忋€?
         
@@ -1338,11 +1599,95 @@ class MaterialBalanceCalculator:
         input_data: MaterialBalanceInput,
         job_id: str,
         start_time: float,
+        materialize: bool = True,
     ) -> MaterialBalanceResult:
-        """Convert tensor results to structured output."""
-        result_tensor = calculation_output["result_tensor"]
+        """Convert tensor results to structured output.
 
-        concentrations, volumes = self._split_tensors(result_tensor)
+        The result always carries a ``ResultFrame``. With ``materialize=False``
+        the per-node JSON lists are not built and ``timestamps``/``node_data``/
+        ``edge_data`` stay empty; callers read ``result.frame`` instead.
+        """
+        trajectory: Optional[Trajectory] = calculation_output.get("trajectory")
+        if trajectory is None:
+            trajectory = self._tensor_trajectory(calculation_output, input_data)
+        # [T, nodes, components + 1], volume in the last column like the ODE
+        # state; a memory map when the trajectory was spilled to disk
+        states = trajectory.states
+        n_steps = states.shape[0]
+        original_param_names = self._get_original_parameter_names(input_data)
+        node_labels = self._get_node_labels(input_data)
+        parameter_names = [
+            original_param_names[j] if j < len(original_param_names) else f"concentration_{j}"
+            for j in range(states.shape[2] - 1)
+        ]
+
+        frame = ResultFrame(
+            timestamps=trajectory.timestamps,
+            states=states,
+            node_ids=[node.node_id for node in input_data.nodes],
+            node_labels=[node_labels.get(node.node_id, node.node_id) for node in input_data.nodes],
+            parameter_names=[*parameter_names, VOLUME_PARAMETER],
+            edge_ids=[edge.edge_id for edge in input_data.edges],
+            edge_flows=trajectory.edge_flows,
+            spill_dir=trajectory.spill_dir,
+        )
+
+        segment_markers = calculation_output.get("segment_markers") or []
+        parameter_change_events = calculation_output.get("parameter_change_events") or []
+
+        calculation_time = time.time() - start_time
+        final_volumes = states[-1, :, -1]
+
+        mass_balance_error = self._calculate_mass_balance_error(
+            torch.from_numpy(np.array(states[-1:])), input_data
+        )
+
+        summary = {
+            "total_time": input_data.parameters.hours,
+            "total_steps": n_steps,
+            "calculation_time_seconds": calculation_time,
+            "convergence_status": "converged",
+            "final_mass_balance_error": mass_balance_error,
+            "final_total_volume": float(final_volumes.sum()),
+            "solver_method": input_data.parameters.solver_method,
+            "segment_count": len(getattr(input_data, "time_segments", [])) or 1,
+            "parameter_change_event_count": len(parameter_change_events),
+        }
+        if calculation_output.get("reused_segments"):
+            summary["reused_segments"] = calculation_output["reused_segments"]
+        warm_start_state = getattr(input_data, "warm_start_state", None)
+        if warm_start_state is not None:
+            summary["warm_start"] = {
+                "source_job_id": warm_start_state.source_job_id,
+                "start_hour": warm_start_state.start_hour,
+            }
+
+        if not materialize:
+            return MaterialBalanceResult(
+                job_id=job_id,
+                status="success",
+                segment_markers=segment_markers,
+                parameter_change_events=parameter_change_events,
+                summary=summary,
+                frame=frame,
+            )
+        return MaterialBalanceResult(
+            job_id=job_id,
+            status="success",
+            timestamps=frame.timestamps_list(),
+            node_data=frame.node_data(),
+            edge_data=frame.edge_data(),
+            segment_markers=segment_markers,
+            parameter_change_events=parameter_change_events,
+            summary=summary,
+            frame=frame,
+        )
+
+    def _tensor_trajectory(
+        self, calculation_output: Dict[str, Any], input_data: MaterialBalanceInput
+    ) -> Trajectory:
+        """``Trajectory`` of an output that carries a ``result_tensor`` (steady state)."""
+        result_tensor = calculation_output["result_tensor"]
 
         timestamps = calculation_output.get("timestamps")
         n_steps = result_tensor.shape[0]
@@ -1379,94 +1724,20 @@ class MaterialBalanceCalculator:
                     0, input_data.parameters.hours, n_steps, device=self.device
                 ).cpu().numpy().tolist()
 
-        concentrations_np = concentrations.cpu().numpy()
-        volumes_np = volumes.cpu().numpy()
-
-        node_data = {}
-        original_param_names = self._get_original_parameter_names(input_data)
-        node_labels = self._get_node_labels(input_data)
-
-        for i, node in enumerate(input_data.nodes):
-            if i < volumes_np.shape[1]:
-                volume_data = volumes_np[:, i].tolist()
-            else:
-                volume_data = [node.initial_volume] * len(timestamps)
-
-            if i < concentrations_np.shape[1]:
-                if len(concentrations_np.shape) > 2:
-                    concentration_dict = {}
-                    for j in range(concentrations_np.shape[2]):
-                        param_name = (
-                            original_param_names[j]
-                            if j < len(original_param_names)
-                            else f"concentration_{j}"
-                        )
-                        concentration_dict[param_name] = concentrations_np[:, i, j].tolist()
-                else:
-                    param_name = (
-                        original_param_names[0]
-                        if original_param_names
-                        else "concentration_0"
-                    )
-                    concentration_dict = {param_name: concentrations_np[:, i].tolist()}
-            else:
-                concentration_dict = {}
-                for j in range(len(node.initial_concentrations)):
-                    param_name = (
-                        original_param_names[j]
-                        if j < len(original_param_names)
-                        else f"concentration_{j}"
-                    )
-                    concentration_dict[param_name] = [
-                        node.initial_concentrations[j]
-                    ] * len(timestamps)
-
-            node_label = node_labels.get(node.node_id, node.node_id)
-            node_data[node.node_id] = {
-                "label": node_label,
-                "volume": volume_data,
-                **concentration_dict,
-            }
-
-        edge_data = {}
         edge_flow_series = calculation_output.get("edge_flow_series") or {}
-        for edge in input_data.edges:
+        edge_flows = np.empty((n_steps, len(input_data.edges)), dtype=np.float64)
+        for k, edge in enumerate(input_data.edges):
             flow_series = edge_flow_series.get(edge.edge_id)
-            if not isinstance(flow_series, list) or len(flow_series) != len(timestamps):
-                flow_series = [edge.flow_rate] * len(timestamps)
-            edge_data[edge.edge_id] = {
-                "flow_rate": flow_series,
-            }
-
-        segment_markers = calculation_output.get("segment_markers") or []
-        parameter_change_events = calculation_output.get("parameter_change_events") or []
-
-        calculation_time = time.time() - start_time
-        final_volumes = volumes_np[-1, :]
-
-        mass_balance_error = self._calculate_mass_balance_error(result_tensor, input_data)
-
-        summary = {
-            "total_time": input_data.parameters.hours,
-            "total_steps": n_steps,
-            "calculation_time_seconds": calculation_time,
-            "convergence_status": "converged",
-            "final_mass_balance_error": mass_balance_error,
-            "final_total_volume": float(final_volumes.sum()),
-            "solver_method": input_data.parameters.solver_method,
-            "segment_count": len(getattr(input_data, "time_segments", [])) or 1,
-            "parameter_change_event_count": len(parameter_change_events),
-        }
+            if isinstance(flow_series, list) and len(flow_series) == n_steps:
+                edge_flows[:, k] = flow_series
+            else:
+                edge_flows[:, k] = edge.flow_rate
 
-        return MaterialBalanceResult(
-            job_id=job_id,
-            status="success",
-            timestamps=timestamps,
-            node_data=node_data,
-            edge_data=edge_data,
-            segment_markers=segment_markers,
-            parameter_change_events=parameter_change_events,
-            summary=summary,
+        return Trajectory(
+            timestamps=np.asarray(timestamps, dtype=np.float64),
+            # Zero-copy view of the solver output
+            states=result_tensor.detach().cpu().numpy(),
+            edge_flows=edge_flows,
         )
 
     def _get_original_parameter_names(self, input_data):
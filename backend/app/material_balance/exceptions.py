@@ -7,6 +7,7 @@
 - 输入错误异常（InvalidInputError）
 - 计算错误异常（CalculationError）
 - 收敛错误异常（ConvergenceError）
+- 计算取消异常（CalculationCancelledError）
 - 维度不匹配异常（DimensionMismatchError）
 - 负体积错误异常（NegativeVolumeError）
 """
@@ -47,6 +48,15 @@ class ConvergenceError(CalculationError):
     pass
 
 
+class CalculationCancelledError(CalculationError):
+    """计算被取消（用户取消或超时）时抛出的异常。
+    
+    由求解过程中的协作取消检查点抛出，用于尽快释放
+    仍在执行中的计算线程或进程。
+    """
+    pass
+
+
 class DimensionMismatchError(InvalidInputError):
     """张量维度不匹配预期值时抛出的异常。
     
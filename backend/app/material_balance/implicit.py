@@ -0,0 +1,472 @@
+"""Implicit (stiff) integration for the material balance ODE system.
+
+The RHS Jacobian is assembled with reverse-mode autograd from a single forward
+pass. Each structurally independent group of node rows gets one VJP. The node
+coupling pattern comes from the edge list in ``sparse_bundle``: a node's
+derivative depends only on its own state and on the states of the nodes that
+feed it. The Jacobian is kept sparse and factorized with a sparse LU.
+
+Two modes are provided:
+
+- ``bdf``: adaptive variable-order BDF (scipy). The Jacobian is only
+  re-evaluated when Newton convergence degrades. Best for smooth kinetics.
+- ``rosenbrock``: linearly implicit ROS2 W-method. It keeps second order with
+  a stale Jacobian, so one Jacobian is reused for several steps and refreshed
+  after a rejected step. The factorization is also reused while the step
+  stays within a small ratio of the factorized one. Internal steps adapt
+  between output points, and a floor on the step size lets it ride through
+  the switching terms (``torch.where`` thresholds) in the ASM kinetics
+  instead of stalling. Steps accepted at the floor above tolerance are
+  counted as ``floor_accepted_steps``. A step whose error is a sizeable
+  part of the whole state is not a switching term: it shrinks on below the
+  floor, and raises ``ConvergenceError`` if it stays that large.
+
+The same Jacobian drives ``solve_steady_state``. It uses pseudo-transient
+continuation: damped Newton steps on ``rhs(y) = 0`` whose pseudo time step
+grows as the residual falls.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+import torch
+from scipy.integrate import solve_ivp
+from scipy.sparse.linalg import splu
+
+from .exceptions import ConvergenceError
+
+# solver_method value -> integration scheme
+STIFF_SOLVER_METHODS: Dict[str, str] = {
+    "bdf": "BDF",
+    "rosenbrock": "ROS2",
+}
+
+# ROS2 (Verwer et al., 1999): L-stable, order 2 for any Jacobian approximation.
+_ROS2_GAMMA = 1.0 + 1.0 / np.sqrt(2.0)
+# A factorized I - gamma*h'*J is reused for steps h within this ratio of h'.
+# As a W-method ROS2 stays order 2 with the matrix h'/h * J in place of J.
+_LU_REUSE_RATIO = 1.5
+
+RHSFunction = Callable[[torch.Tensor, torch.Tensor], torch.Tensor]
+
+
+@dataclass
+class JacobianStructure:
+    """Node-block sparsity of d(dy/dt)/dy for a state of shape [n_nodes, n_state]."""
+
+    n_nodes: int
+    n_state: int
+    colors: List[torch.Tensor]  # row nodes seeded together, per color
+    column_owner: List[torch.Tensor]  # [n_nodes] per color: seeded row node depending on each column, -1 if none
+
+    @property
+    def size(self) -> int:
+        return self.n_nodes * self.n_state
+
+    @property
+    def vjp_count(self) -> int:
+        return len(self.colors) * self.n_state
+
+
+def build_jacobian_structure(
+    sparse_bundle: Optional[dict],
+    *,
+    n_nodes: int,
+    n_state: int,
+    device: torch.device,
+) -> JacobianStructure:
+    """Greedy row coloring of the node coupling graph described by ``sparse_bundle``."""
+    dependencies: List[set] = [{node} for node in range(n_nodes)]
+    if sparse_bundle is None:
+        # Dense fallback: every node may feed every other node.
+        dependencies = [set(range(n_nodes)) for _ in range(n_nodes)]
+    else:
+        for src, dst in zip(
+            sparse_bundle["src"].tolist(), sparse_bundle["dst"].tolist(), strict=True
+        ):
+            dependencies[int(dst)].add(int(src))
+
+    color_columns: List[set] = []
+    color_rows: List[List[int]] = []
+    for node in range(n_nodes):
+        columns = dependencies[node]
+        for color, used_columns in enumerate(color_columns):
+            if used_columns.isdisjoint(columns):
+                used_columns.update(columns)
+                color_rows[color].append(node)
+                break
+        else:
+            color_columns.append(set(columns))
+            color_rows.append([node])
+
+    colors: List[torch.Tensor] = []
+    column_owner: List[torch.Tensor] = []
+    for rows in color_rows:
+        owner = [-1] * n_nodes
+        for row in rows:
+            for column in dependencies[row]:
+                owner[column] = row
+        colors.append(torch.tensor(rows, dtype=torch.long, device=device))
+        column_owner.append(torch.tensor(owner, dtype=torch.long, device=device))
+
+    return JacobianStructure(
+        n_nodes=n_nodes,
+        n_state=n_state,
+        colors=colors,
+        column_owner=column_owner,
+    )
+
+
+def _row_gradients(dy: torch.Tensor, y_var: torch.Tensor, seeds: torch.Tensor) -> torch.Tensor:
+    """Return seeds[k] @ J for every seed, batched through vmap when possible."""
+    if not dy.requires_grad:
+        return torch.zeros_like(seeds)
+    try:
+        (gradients,) = torch.autograd.grad(
+            dy, y_var, seeds, retain_graph=True, is_grads_batched=True
+        )
+        return gradients
+    except RuntimeError:
+        # Ops without a batching rule: one backward pass per seed.
+        gradients = []
+        for seed in seeds:
+            (gradient,) = torch.autograd.grad(
+                dy, y_var, seed, retain_graph=True, allow_unused=True
+            )
+            gradients.append(torch.zeros_like(y_var) if gradient is None else gradient)
+        return torch.stack(gradients)
+
+
+def assemble_jacobian(
+    rhs: RHSFunction,
+    t: torch.Tensor,
+    y: torch.Tensor,
+    structure: JacobianStructure,
+) -> sp.csc_matrix:
+    """Assemble the sparse Jacobian of ``rhs`` at ``(t, y)`` from compressed VJPs."""
+    n_state = structure.n_state
+    size = structure.size
+    if structure.vjp_count == 0:
+        return sp.csc_matrix((size, size))
+
+    seeds = torch.zeros(structure.vjp_count, *y.shape, dtype=y.dtype, device=y.device)
+    for color, nodes in enumerate(structure.colors):
+        for component in range(n_state):
+            seeds[color * n_state + component, nodes, component] = 1.0
+
+    with torch.enable_grad():
+        y_var = y.detach().clone().requires_grad_(True)
+        gradients = _row_gradients(rhs(t, y_var), y_var, seeds)
+
+    state_offsets = torch.arange(n_state, device=y.device)
+    rows: List[torch.Tensor] = []
+    cols: List[torch.Tensor] = []
+    values: List[torch.Tensor] = []
+    for color, owner in enumerate(structure.column_owner):
+        col_nodes = torch.nonzero(owner >= 0, as_tuple=False).squeeze(-1)
+        row_nodes = owner[col_nodes]
+        col_index = (col_nodes.unsqueeze(1) * n_state + state_offsets).reshape(-1)
+        for component in range(n_state):
+            rows.append((row_nodes * n_state + component).repeat_interleave(n_state))
+            cols.append(col_index)
+            values.append(gradients[color * n_state + component][col_nodes].reshape(-1))
+
+    return sp.csc_matrix(
+        (
+            torch.cat(values).detach().cpu().double().numpy(),
+            (
+                torch.cat(rows).cpu().numpy(),
+                torch.cat(cols).cpu().numpy(),
+            ),
+        ),
+        shape=(size, size),
+    )
+
+
+def odeint_implicit(
+    rhs: RHSFunction,
+    y0: torch.Tensor,
+    t: torch.Tensor,
+    *,
+    method: str,
+    rtol: float,
+    atol: float,
+    structure: JacobianStructure,
+    jacobian_reuse_steps: int = 10,
+    step_size: Optional[float] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> torch.Tensor:
+    """Integrate ``dy/dt = rhs(t, y)`` with an implicit stiff method.
+
+    Mirrors ``torchdiffeq.odeint``: returns the states at every time in ``t``
+    as a tensor of shape ``[len(t), *y0.shape]``. ``step_size`` is the
+    nominal internal step when ``t`` is a sparse reporting grid; by default
+    the spacing of ``t`` is used. ``stats`` (a ``defaultdict(int)``) is
+    incremented with ``jacobian_evaluations`` and ``lu_decompositions``, and
+    for ``rosenbrock`` with ``accepted_steps``, ``rejected_steps`` and
+    ``floor_accepted_steps`` (accepted above tolerance at the step floor).
+    """
+    if stats is None:
+        stats = defaultdict(int)
+    if method not in STIFF_SOLVER_METHODS:
+        raise ValueError(f"Unsupported stiff solver method: {method}")
+    if t.numel() == 1:
+        return y0.unsqueeze(0)
+    if method == "rosenbrock":
+        return _odeint_rosenbrock(
+            rhs,
+            y0,
+            t,
+            rtol=rtol,
+            atol=atol,
+            structure=structure,
+            jacobian_reuse_steps=jacobian_reuse_steps,
+            step_size=step_size,
+            stats=stats,
+        )
+    return _odeint_bdf(
+        rhs, y0, t, method=method, rtol=rtol, atol=atol, structure=structure, stats=stats
+    )
+
+
+def _odeint_rosenbrock(
+    rhs: RHSFunction,
+    y0: torch.Tensor,
+    t: torch.Tensor,
+    *,
+    rtol: float,
+    atol: float,
+    structure: JacobianStructure,
+    jacobian_reuse_steps: int,
+    stats: Dict[str, int],
+    step_size: Optional[float] = None,
+    min_step_fraction: float = 1.0 / 16.0,
+    floor_error_limit: float = 100.0,
+    gross_error_limit: float = 0.1,
+) -> torch.Tensor:
+    shape, dtype, device = y0.shape, y0.dtype, y0.device
+    identity = sp.identity(structure.size, format="csc")
+    for name in ("accepted_steps", "rejected_steps", "floor_accepted_steps"):
+        stats.setdefault(name, 0)
+
+    def _f(t_value: float, y_flat: np.ndarray) -> np.ndarray:
+        state = torch.as_tensor(y_flat, dtype=dtype, device=device).reshape(shape)
+        with torch.no_grad():
+            dy = rhs(torch.tensor(t_value, dtype=dtype, device=device), state)
+        return dy.detach().cpu().double().numpy().reshape(-1)
+
+    times = t.detach().cpu().double().numpy()
+    y = y0.detach().cpu().double().numpy().reshape(-1)
+    outputs = [y.copy()]
+    jacobian = None
+    lu = None
+    lu_h = None
+    accepted_since_jacobian = 0
+    h = float(times[1] - times[0]) if step_size is None else step_size
+
+    for step in range(1, times.shape[0]):
+        t_current, t_target = float(times[step - 1]), float(times[step])
+        min_step = (t_target - t_current if step_size is None else step_size) * min_step_fraction
+        while t_target - t_current > min_step * 1e-6:
+            # Clipping onto an output point does not shrink the nominal step h
+            step_h = min(h, t_target - t_current)
+            if jacobian is None or accepted_since_jacobian >= jacobian_reuse_steps:
+                state = torch.as_tensor(y, dtype=dtype, device=device).reshape(shape)
+                jacobian = assemble_jacobian(
+                    rhs, torch.tensor(t_current, dtype=dtype, device=device), state, structure
+                )
+                lu = None
+                accepted_since_jacobian = 0
+                stats["jacobian_evaluations"] += 1
+            if lu is None or not 1.0 / _LU_REUSE_RATIO <= step_h / lu_h <= _LU_REUSE_RATIO:
+                lu = splu((identity - (_ROS2_GAMMA * step_h) * jacobian).tocsc())
+                lu_h = step_h
+                stats["lu_decompositions"] += 1
+
+            k1 = lu.solve(_f(t_current, y))
+            k2 = lu.solve(_f(t_current + step_h, y + step_h * k1) - 2.0 * k1)
+            y_next = y + step_h * (1.5 * k1 + 0.5 * k2)
+            # Embedded estimate: ROS2 minus the linearly implicit Euler step y + h*k1.
+            estimate = 0.5 * step_h * (k1 + k2)
+            magnitude = np.maximum(np.abs(y), np.abs(y_next))
+            error = float(np.sqrt(np.mean((estimate / (atol + rtol * magnitude)) ** 2)))
+            if not np.isfinite(error):
+                raise ConvergenceError(
+                    f"Implicit solver (rosenbrock) diverged at t={t_current:.6g}"
+                )
+
+            # A switching term leaves an error whatever the step. At the step
+            # floor moderate errors are accepted and counted, larger ones one
+            # floor further down. An error beyond gross_error_limit of the
+            # whole state is no switching term: it shrinks down to a hard
+            # floor and fails there. The norm of the whole state keeps
+            # components near zero from passing as gross.
+            relative_error = float(np.linalg.norm(estimate) / (np.linalg.norm(magnitude) + atol))
+            hard_floor = min_step * min_step_fraction**2
+            if relative_error > gross_error_limit:
+                if step_h <= hard_floor:
+                    raise ConvergenceError(
+                        f"Implicit solver (rosenbrock) cannot meet the tolerance at t={t_current:.6g}: "
+                        f"local error {relative_error:.3g} of the state at the minimum step {step_h:.3g} h"
+                    )
+                floor = hard_floor
+            elif error <= floor_error_limit:
+                floor = min_step
+            else:
+                floor = min_step * min_step_fraction
+            if error <= 1.0 or step_h <= floor:
+                y = y_next
+                t_current += step_h
+                accepted_since_jacobian += 1
+                stats["accepted_steps"] += 1
+                if error > 1.0:
+                    stats["floor_accepted_steps"] += 1
+                    # Smaller steps would not help, e.g. after a gross error
+                    h = max(h, floor)
+                else:
+                    growth = 2.0 if error == 0.0 else min(2.0, 0.9 / np.sqrt(error))
+                    if growth >= 1.2 and step_h == h:
+                        h *= growth
+            else:
+                stats["rejected_steps"] += 1
+                h = max(step_h * max(0.2, 0.9 / np.sqrt(error)), floor)
+                if accepted_since_jacobian > 0:
+                    # A stale Jacobian is the usual culprit: refresh before retrying.
+                    jacobian = None
+        outputs.append(y.copy())
+
+    states = torch.as_tensor(np.stack(outputs), dtype=dtype, device=device)
+    return states.reshape(-1, *shape)
+
+
+def _odeint_bdf(
+    rhs: RHSFunction,
+    y0: torch.Tensor,
+    t: torch.Tensor,
+    *,
+    method: str,
+    rtol: float,
+    atol: float,
+    structure: JacobianStructure,
+    stats: Dict[str, int],
+) -> torch.Tensor:
+    shape, dtype, device = y0.shape, y0.dtype, y0.device
+
+    def _to_state(y_flat: np.ndarray) -> torch.Tensor:
+        return torch.as_tensor(y_flat, dtype=dtype, device=device).reshape(shape)
+
+    def _fun(t_value: float, y_flat: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            dy = rhs(torch.tensor(t_value, dtype=dtype, device=device), _to_state(y_flat))
+        return dy.detach().cpu().double().numpy().reshape(-1)
+
+    def _jac(t_value: float, y_flat: np.ndarray) -> sp.csc_matrix:
+        return assemble_jacobian(
+            rhs,
+            torch.tensor(t_value, dtype=dtype, device=device),
+            _to_state(y_flat),
+            structure,
+        )
+
+    t_eval = t.detach().cpu().double().numpy()
+    solution = solve_ivp(
+        _fun,
+        t_span=(float(t_eval[0]), float(t_eval[-1])),
+        y0=y0.detach().cpu().double().numpy().reshape(-1),
+        method=STIFF_SOLVER_METHODS[method],
+        t_eval=t_eval,
+        rtol=rtol,
+        atol=atol,
+        jac=_jac,
+    )
+    if solution.status < 0 or solution.y.shape[1] != t_eval.shape[0]:
+        raise ConvergenceError(f"Implicit solver ({method}) failed: {solution.message}")
+    # solve_ivp does not report its steps
+    stats["jacobian_evaluations"] += solution.njev
+    stats["lu_decompositions"] += solution.nlu
+
+    states = torch.as_tensor(solution.y.T, dtype=dtype, device=device)
+    return states.reshape(-1, *shape)
+
+
+@dataclass
+class SteadyStateSolution:
+    """Result of ``solve_steady_state``."""
+
+    state: torch.Tensor
+    iterations: int
+    residual_norm: float
+    pseudo_time: float
+
+
+def solve_steady_state(
+    rhs: RHSFunction,
+    y0: torch.Tensor,
+    *,
+    rtol: float,
+    atol: float,
+    structure: JacobianStructure,
+    initial_step: float,
+    max_iterations: int,
+    max_step: float = 1e8,
+) -> SteadyStateSolution:
+    """Solve ``rhs(y) = 0`` by pseudo-transient continuation from ``y0``.
+
+    Each iteration is a linearly implicit Euler step: it solves
+    ``(I / dt - J) dy = rhs(y)`` and keeps states non-negative. ``dt`` follows
+    switched evolution relaxation (``dt *= |r_prev| / |r|``), which turns into
+    Newton's method near the solution. A component held at zero by a negative
+    rate counts as balanced. Converged once every remaining residual satisfies
+    ``|rhs_i| <= atol + rtol * |y_i|`` (units per hour).
+    """
+    shape, dtype, device = y0.shape, y0.dtype, y0.device
+    identity = sp.identity(structure.size, format="csc")
+    t = torch.tensor(0.0, dtype=dtype, device=device)
+
+    def _residual(y_flat: np.ndarray) -> np.ndarray:
+        state = torch.as_tensor(y_flat, dtype=dtype, device=device).reshape(shape)
+        with torch.no_grad():
+            dy = rhs(t, state).detach().cpu().double().numpy().reshape(-1)
+        return np.where((y_flat <= 0.0) & (dy < 0.0), 0.0, dy)
+
+    y = np.maximum(y0.detach().cpu().double().numpy().reshape(-1), 0.0)
+    residual = _residual(y)
+    scaled = residual / (atol + rtol * np.abs(y))
+    dt = initial_step
+    pseudo_time = 0.0
+    iterations = 0
+
+    while np.max(np.abs(scaled)) > 1.0:
+        if iterations >= max_iterations:
+            raise ConvergenceError(
+                f"Steady state not reached after {iterations} iterations "
+                f"(scaled residual {np.max(np.abs(scaled)):.3g}). Kinetics with "
+                "switching thresholds may have no exact steady state; run a "
+                "transient calculation instead."
+            )
+        state = torch.as_tensor(y, dtype=dtype, device=device).reshape(shape)
+        jacobian = assemble_jacobian(rhs, t, state, structure)
+        step = splu((identity / dt - jacobian).tocsc()).solve(residual)
+        if not np.all(np.isfinite(step)):
+            raise ConvergenceError(
+                f"Steady state iteration diverged after {iterations} iterations"
+            )
+
+        y = np.maximum(y + step, 0.0)
+        pseudo_time += dt
+        iterations += 1
+        previous_norm = float(np.linalg.norm(scaled))
+        residual = _residual(y)
+        scaled = residual / (atol + rtol * np.abs(y))
+        ratio = previous_norm / max(float(np.linalg.norm(scaled)), 1e-300)
+        dt = min(dt * float(np.clip(ratio, 0.5, 10.0)), max_step)
+
+    return SteadyStateSolution(
+        state=torch.as_tensor(y, dtype=dtype, device=device).reshape(shape),
+        iterations=iterations,
+        residual_norm=float(np.max(np.abs(scaled))),
+        pseudo_time=pseudo_time,
+    )
@@ -10,9 +10,12 @@
 - 结果数据模型（MaterialBalanceResult）
 """
 
-from typing import List, Dict, Optional, Any, Union
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Any, Dict, List, Literal, Optional, Union
+
 import torch
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from .result_frame import ResultFrame
 
 
 class NodeData(BaseModel):
@@ -103,6 +106,61 @@ class TimeSegment(BaseModel):
         return v
 
 
+class EdgeProfileFactor(BaseModel):
+    a: Optional[List[float]] = None
+    b: Optional[List[float]] = None
+
+
+class EdgeProfile(BaseModel):
+    """边流量/系数的时间序列，在右端函数内按时间插值。"""
+    hours: List[float]
+    flow: Optional[List[float]] = None
+    factors: Dict[str, EdgeProfileFactor] = Field(default_factory=dict)
+    interpolation: Literal["linear", "step"] = "linear"
+    period_hours: Optional[float] = Field(default=None, gt=0)
+
+    @field_validator("hours")
+    @classmethod
+    def validate_hours(cls, v):
+        if not v:
+            raise ValueError("Profile hours cannot be empty")
+        if v[0] < 0:
+            raise ValueError("Profile hours must be >= 0")
+        if any(later <= earlier for earlier, later in zip(v, v[1:], strict=False)):
+            raise ValueError("Profile hours must be strictly increasing")
+        return v
+
+    @field_validator("flow")
+    @classmethod
+    def validate_flow(cls, v, info):
+        hours = info.data.get("hours")
+        if v is not None and hours is not None:
+            if len(v) != len(hours):
+                raise ValueError("Profile flow must have one value per hour")
+            if any(flow < 0 for flow in v):
+                raise ValueError("Profile flow must be >= 0")
+        return v
+
+    @field_validator("factors")
+    @classmethod
+    def validate_factors(cls, v, info):
+        hours = info.data.get("hours")
+        if hours is not None:
+            for name, factor in v.items():
+                for series in (factor.a, factor.b):
+                    if series is not None and len(series) != len(hours):
+                        raise ValueError(f"Profile factor {name} must have one value per hour")
+        return v
+
+    @field_validator("period_hours")
+    @classmethod
+    def validate_period(cls, v, info):
+        hours = info.data.get("hours")
+        if v is not None and hours and hours[-1] >= v:
+            raise ValueError("Profile hours must lie within one period")
+        return v
+
+
 class CalculationParameters(BaseModel):
     """物料平衡计算的参数配置。
     
@@ -115,6 +173,7 @@ class CalculationParameters(BaseModel):
     tolerance: float = Field(default=1e-3, description="Solver tolerance")
     max_iterations: int = Field(default=1000, description="Maximum solver iterations")
     sampling_interval_hours: Optional[float] = Field(default=None, description="Sampling interval in hours for data storage optimization")
+    rhs_backend: str = Field(default="eager", description="ODE right-hand side execution: eager, torchscript or inductor")
     
     @field_validator('solver_method')
     @classmethod
@@ -123,11 +182,20 @@ class CalculationParameters(BaseModel):
         
         确保选择的求解器方法在支持的列表中。
         """
-        allowed_methods = ['scipy_solver', 'rk4', 'euler', 'adaptive_heun']
+        allowed_methods = ['scipy_solver', 'rk4', 'euler', 'adaptive_heun', 'bdf', 'rosenbrock']
         if v not in allowed_methods:
             raise ValueError(f"Solver method must be one of {allowed_methods}")
         return v
 
+    @field_validator('rhs_backend')
+    @classmethod
+    def validate_rhs_backend(cls, v):
+        """验证右端函数执行后端的有效性。"""
+        allowed_backends = ['eager', 'torchscript', 'inductor']
+        if v not in allowed_backends:
+            raise ValueError(f"RHS backend must be one of {allowed_backends}")
+        return v
+
 
 class MaterialBalanceInput(BaseModel):
     """物料平衡计算的输入数据模型。
@@ -139,6 +207,7 @@ class MaterialBalanceInput(BaseModel):
     edges: List[EdgeData]
     parameters: CalculationParameters
     time_segments: List[TimeSegment] = Field(default_factory=list)
+    edge_profiles: Dict[str, EdgeProfile] = Field(default_factory=dict)
     original_flowchart_data: Optional[Dict[str, Any]] = Field(default=None, description="Original flowchart data for preserving parameter names")
     
     @field_validator('nodes')
@@ -186,6 +255,17 @@ class MaterialBalanceInput(BaseModel):
 
         return v
 
+    @field_validator('edge_profiles')
+    @classmethod
+    def validate_edge_profiles(cls, v, info):
+        """验证边时间序列引用的边存在。"""
+        if 'edges' in info.data:
+            edge_ids = {edge.edge_id for edge in info.data['edges']}
+            for edge_id in v:
+                if edge_id not in edge_ids:
+                    raise ValueError(f"Edge profile references unknown edge: {edge_id}")
+        return v
+
 
 class TimeSeriesData(BaseModel):
     """单个实体（节点或边）的时间序列数据模型。
@@ -205,11 +285,13 @@ class MaterialBalanceResult(BaseModel):
     """
     job_id: str
     status: str = Field(description="Calculation status: success, failed, running")
-    timestamps: List[float] = Field(description="Time points array")
+    timestamps: List[float] = Field(default_factory=list, description="Time points array")
     node_data: Dict[str, Dict[str, Union[str, List[float]]]] = Field(
+        default_factory=dict,
         description="Node data: {node_id: {parameter: [values] or label: string}}"
     )
     edge_data: Dict[str, Dict[str, List[float]]] = Field(
+        default_factory=dict,
         description="Edge data: {edge_id: {parameter: [values]}}"
     )
     segment_markers: Optional[List[float]] = None
@@ -218,8 +300,11 @@ class MaterialBalanceResult(BaseModel):
         description="Calculation summary (total_time, steps, convergence_status, etc.)"
     )
     error_message: Optional[str] = None
+    # 数组形式的结果（未物化为 JSON 列表时 timestamps/node_data/edge_data 为空）
+    frame: Optional[ResultFrame] = Field(default=None, exclude=True)
 
     model_config = ConfigDict(
+        arbitrary_types_allowed=True,
         json_schema_extra={
             "example": {
                 "job_id": "calc_123",
@@ -0,0 +1,321 @@
+"""Time-varying edge flows and a/b factors evaluated inside the ODE RHS.
+
+``MaterialBalanceInput.edge_profiles`` gives each edge piecewise-linear or
+step time series for its flow and concentration factors. All series of a
+plant are packed into one table of ``P`` rows (one per edge channel) with
+knots padded to a common length, so a single batched ``torch.searchsorted``
+interpolates every row at solver time ``t``. A 24-point daily profile over
+30 days is then one integration rather than 720 segment restarts.
+
+Periodic rows get the last knot prepended one period earlier and the first
+knot appended one period later, so interpolation wraps across the period
+boundary. Outside the knots a non-periodic row holds its end values.
+
+Time segments stay the mechanism for discrete switches: inside a segment an
+edge override replaces the profile of the channel it sets.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+from .exceptions import InvalidInputError
+from .transport import EdgeBundle
+
+FLOW, FACTOR_A, FACTOR_B = 0, 1, 2
+
+
+def _field(source: Any, name: str, default: Any = None) -> Any:
+    if isinstance(source, dict):
+        return source.get(name, default)
+    return getattr(source, name, default)
+
+
+class EdgeProfiles:
+    """Table of edge time series, one row per (edge, channel, component).
+
+    Rows are sorted by channel, so the flow, a and b rows are contiguous
+    slices. Each knot interval stores its line ``intercept + slope * hour``
+    (slope 0 for step rows and past the last knot), so evaluating a row is a
+    lookup plus one multiply-add. The table is float64 so that absolute hours
+    resolve a step one float32 ulp before its knot; values come out in
+    ``dtype``.
+    """
+
+    def __init__(
+        self,
+        edge_index: torch.Tensor,  # [P]
+        channel: torch.Tensor,  # [P], FLOW / FACTOR_A / FACTOR_B, sorted
+        component: torch.Tensor,  # [P], 0 for flow rows
+        knots: torch.Tensor,  # [P, K], +inf padded
+        intercepts: torch.Tensor,  # [P, K]
+        slopes: torch.Tensor,  # [P, K]
+        period: torch.Tensor,  # [P], inf when not periodic
+        dtype: torch.dtype,
+    ):
+        self.dtype = dtype
+        self.edge_index = edge_index
+        self.channel = channel
+        self.component = component
+        self.knots = knots
+        self.intercepts = intercepts
+        self.slopes = slopes
+        self.period = period
+        self._linear = bool(slopes.any())
+        self._period = period.unsqueeze(1)
+        self._first = knots[:, :1].contiguous()
+        self._periodic = bool(torch.isfinite(period).any())
+        counts = torch.bincount(channel, minlength=3).tolist()
+        self.slices = [
+            slice(sum(counts[:kind]), sum(counts[: kind + 1])) for kind in (FLOW, FACTOR_A, FACTOR_B)
+        ]
+
+    @classmethod
+    def from_input(
+        cls,
+        input_data: Any,
+        parameter_names: Sequence[str],
+        *,
+        dtype: torch.dtype,
+        device: torch.device,
+    ) -> Optional["EdgeProfiles"]:
+        """Pack ``input_data.edge_profiles``; ``None`` when there are none."""
+        raw_profiles = getattr(input_data, "edge_profiles", None) or {}
+        if not raw_profiles:
+            return None
+        edge_positions = {edge.edge_id: index for index, edge in enumerate(input_data.edges)}
+        component_positions = {name: index for index, name in enumerate(parameter_names)}
+
+        rows: List[Tuple[int, int, int, List[float], List[float], List[float], float]] = []
+        for edge_id, profile in raw_profiles.items():
+            if edge_id not in edge_positions:
+                raise InvalidInputError(f"Edge profile references unknown edge: {edge_id}")
+            edge = edge_positions[edge_id]
+            hours = [float(hour) for hour in _field(profile, "hours")]
+            period = _field(profile, "period_hours")
+            period = math.inf if period is None else float(period)
+            interpolation = _field(profile, "interpolation", "linear")
+            step = str(getattr(interpolation, "value", interpolation)) == "step"
+
+            series: List[Tuple[int, int, Sequence[float]]] = []
+            flow = _field(profile, "flow")
+            if flow is not None:
+                series.append((FLOW, 0, flow))
+            for name, factor in (_field(profile, "factors", {}) or {}).items():
+                if name not in component_positions:
+                    raise InvalidInputError(
+                        f"Edge profile {edge_id} references unknown parameter: {name}"
+                    )
+                for channel, key in ((FACTOR_A, "a"), (FACTOR_B, "b")):
+                    values = _field(factor, key)
+                    if values is not None:
+                        series.append((channel, component_positions[name], values))
+
+            for channel, component, values in series:
+                values = [float(value) for value in values]
+                knots = list(hours)
+                if math.isfinite(period):
+                    knots = [hours[-1] - period, *knots, hours[0] + period]
+                    values = [values[-1], *values, values[0]]
+                slopes = [
+                    0.0 if step else (v_hi - v_lo) / (k_hi - k_lo)
+                    for k_lo, k_hi, v_lo, v_hi in zip(knots, knots[1:], values, values[1:], strict=False)
+                ]
+                slopes.append(0.0)
+                intercepts = [
+                    value - slope * knot for knot, value, slope in zip(knots, values, slopes, strict=True)
+                ]
+                rows.append((channel, edge, component, knots, intercepts, slopes, period))
+
+        if not rows:
+            return None
+        rows.sort(key=lambda row: row[0])
+        width = max(len(row[3]) for row in rows)
+
+        def _padded(items: List[float], fill: float) -> List[float]:
+            return items + [fill] * (width - len(items))
+
+        def _tensor(items: List[Any], tensor_dtype: torch.dtype) -> torch.Tensor:
+            return torch.tensor(items, dtype=tensor_dtype, device=device)
+
+        return cls(
+            edge_index=_tensor([row[1] for row in rows], torch.long),
+            channel=_tensor([row[0] for row in rows], torch.long),
+            component=_tensor([row[2] for row in rows], torch.long),
+            knots=_tensor([_padded(row[3], math.inf) for row in rows], torch.float64),
+            intercepts=_tensor([_padded(row[4], row[4][-1]) for row in rows], torch.float64),
+            slopes=_tensor([_padded(row[5], 0.0) for row in rows], torch.float64),
+            period=_tensor([row[6] for row in rows], torch.float64),
+            dtype=dtype,
+        )
+
+    def select(self, keep: torch.Tensor) -> Optional["EdgeProfiles"]:
+        """Rows where ``keep`` [P] is true; ``None`` if no row is left."""
+        if not bool(keep.any()):
+            return None
+        return EdgeProfiles(
+            self.edge_index[keep],
+            self.channel[keep],
+            self.component[keep],
+            self.knots[keep],
+            self.intercepts[keep],
+            self.slopes[keep],
+            self.period[keep],
+            self.dtype,
+        )
+
+    def without_overrides(
+        self, segment: Dict[str, Any], input_data: Any, parameter_names: Sequence[str]
+    ) -> Optional["EdgeProfiles"]:
+        """Drop the rows that the edge overrides of ``segment`` set to a constant."""
+        edge_overrides = segment.get("edge_overrides", {}) or {}
+        if not edge_overrides:
+            return self
+        component_positions = {name: index for index, name in enumerate(parameter_names)}
+        overridden = set()
+        for edge_index, edge in enumerate(input_data.edges):
+            override = edge_overrides.get(edge.edge_id)
+            if override is None:
+                continue
+            if _field(override, "flow") is not None:
+                overridden.add((edge_index, FLOW, 0))
+            for name, factor in (_field(override, "factors", {}) or {}).items():
+                component = component_positions.get(str(name))
+                if component is None:
+                    continue
+                if _field(factor, "a") is not None:
+                    overridden.add((edge_index, FACTOR_A, component))
+                if _field(factor, "b") is not None:
+                    overridden.add((edge_index, FACTOR_B, component))
+        if not overridden:
+            return self
+        keep = [
+            row not in overridden
+            for row in zip(
+                self.edge_index.tolist(),
+                self.channel.tolist(),
+                self.component.tolist(),
+                strict=True,
+            )
+        ]
+        return self.select(torch.tensor(keep, dtype=torch.bool, device=self.knots.device))
+
+    def evaluate(self, hours: torch.Tensor) -> torch.Tensor:
+        """Values of every row at absolute ``hours`` [T] -> [P, T]."""
+        x = hours.to(torch.float64).reshape(1, -1)
+        if self._periodic:
+            # fmod by an infinite period leaves non-periodic rows unchanged
+            x = torch.fmod(x, self._period)
+        # Hold the first value before the first knot
+        x = torch.maximum(x, self._first)
+        lower = torch.searchsorted(self.knots, x, right=True).sub_(1)  # knots[lower] <= x
+        values = self.intercepts.gather(1, lower)
+        if self._linear:
+            values = values.addcmul_(self.slopes.gather(1, lower), x)
+        return values.to(self.dtype)
+
+
+class ProfiledEdges:
+    """Edge values ``(q, a, b, delta_Q)`` of one segment at solver time ``t``.
+
+    ``t`` is relative to the segment start; the profiles use absolute hours.
+    The net node flow is updated with one ``addmv`` over the signed incidence
+    of the profiled edges instead of re-summing every edge.
+    """
+
+    def __init__(self, bundle: EdgeBundle, profiles: EdgeProfiles, start_hour: float):
+        self.src = bundle["src"]
+        self.dst = bundle["dst"]
+        self.q = bundle["q"]
+        self.a = bundle["a"]
+        self.b = bundle["b"]
+        self.delta_Q = bundle["delta_Q"]
+        self.profiles = profiles
+        self.start_hour = float(start_hour)
+        self._slices = profiles.slices
+        self._has = [part.stop > part.start for part in self._slices]
+        self._edges = [profiles.edge_index[part] for part in self._slices]
+        self._components = [profiles.component[part] for part in self._slices]
+        self._table_rows: Dict[float, int] = {}
+        self._table: Optional[torch.Tensor] = None
+
+        flow_edges = self._edges[FLOW]
+        incidence = torch.zeros(
+            self.delta_Q.shape[0], flow_edges.shape[0], dtype=self.q.dtype, device=self.q.device
+        )
+        columns = torch.arange(flow_edges.shape[0], device=self.q.device)
+        ones = torch.ones(flow_edges.shape[0], dtype=self.q.dtype, device=self.q.device)
+        incidence.index_put_((self.dst[flow_edges], columns), ones, accumulate=True)
+        incidence.index_put_((self.src[flow_edges], columns), -ones, accumulate=True)
+        self._incidence = incidence  # [N, P_flow]
+        self._static_delta_Q = self.delta_Q - incidence @ self.q[flow_edges]
+
+    def __call__(
+        self, t: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        row = self._table_rows.get(float(t)) if self._table_rows else None
+        if row is not None:
+            values = self._table[row]
+        else:
+            values = self.profiles.evaluate(t.double() + self.start_hour).squeeze(1)
+        q, a, b, delta_Q = self.q, self.a, self.b, self.delta_Q
+        slices, edges, components = self._slices, self._edges, self._components
+        if self._has[FLOW]:
+            flow = values[slices[FLOW]]
+            q = q.index_put((edges[FLOW],), flow)
+            delta_Q = torch.addmv(self._static_delta_Q, self._incidence, flow)
+        if self._has[FACTOR_A]:
+            a = a.index_put((edges[FACTOR_A], components[FACTOR_A]), values[slices[FACTOR_A]])
+        if self._has[FACTOR_B]:
+            b = b.index_put((edges[FACTOR_B], components[FACTOR_B]), values[slices[FACTOR_B]])
+        return q, a, b, delta_Q
+
+    def tabulate(self, times: torch.Tensor) -> None:
+        """Evaluate the profiles at every RHS time ``times`` [T] in one batch.
+
+        For fixed-grid solvers the RHS times are known before integrating;
+        calls at exactly these times then only look up a row. Other times are
+        still interpolated on the fly.
+        """
+        values = self.profiles.evaluate(times.double() + self.start_hour)
+        self._table = values.transpose(0, 1).contiguous()  # [T, P]
+        self._table_rows = {time: row for row, time in enumerate(times.tolist())}
+
+    def bundle_at(self, t: float) -> EdgeBundle:
+        """Constant edge bundle frozen at segment time ``t``."""
+        q, a, b, delta_Q = self(torch.tensor(float(t)))
+        return {
+            "src": self.src,
+            "dst": self.dst,
+            "q": q,
+            "a": a,
+            "b": b,
+            "delta_Q": delta_Q,
+            "shape": (self.delta_Q.shape[0], self.delta_Q.shape[0]),
+        }
+
+    def breakpoints(self, duration: float) -> torch.Tensor:
+        """Knot times in ``(0, duration)`` relative to the segment start.
+
+        The profiles are not smooth at their knots; adaptive and implicit
+        solvers end a step there instead of rejecting steps that straddle one.
+        """
+        start, end = self.start_hour, self.start_hour + float(duration)
+        times = set()
+        for knots, period in zip(self.profiles.knots.tolist(), self.profiles.period.tolist(), strict=True):
+            knots = [knot for knot in knots if math.isfinite(knot)]
+            if math.isfinite(period):
+                first_cycle = math.floor(start / period)
+                cycles = range(first_cycle, math.ceil(end / period) + 1)
+                knots = [knot + cycle * period for cycle in cycles for knot in knots]
+            times.update(knot - start for knot in knots if start < knot < end)
+        return torch.tensor(sorted(times), dtype=torch.float64, device=self.q.device)
+
+    def flows(self, hours: torch.Tensor) -> torch.Tensor:
+        """Edge flows at absolute ``hours`` [T] -> [T, E], for reporting."""
+        flows = self.q.unsqueeze(0).repeat(hours.shape[0], 1)
+        if self._has[FLOW]:
+            values = self.profiles.evaluate(hours)[self._slices[FLOW]]
+            flows[:, self._edges[FLOW]] = values.transpose(0, 1)
+        return flows
@@ -0,0 +1,211 @@
+"""Live progress of running calculations.
+
+A ``ProgressTracker`` follows one transient run. It wraps the ODE
+right-hand side like the cancellation checkpoint does: it counts
+evaluations and reads the solver time, so progress also moves inside one
+long span. After every span (segment or checkpoint chunk) it records the
+simulated hours completed.
+
+At most every ``min_interval`` seconds it publishes a dict:
+
+- ``fraction`` of the simulated hours done and ``simulated_hours`` /
+  ``total_hours``;
+- ``rhs_evaluations`` so far;
+- ``elapsed_seconds`` and ``eta_seconds``, extrapolated from the wall time
+  per simulated hour.
+
+With ``partial_points`` set, every finished span is also streamed as a
+partial result: a delta frame with a sequence number ``seq``, up to
+``partial_points`` evenly spaced rows of the span, and the states as
+base64 little-endian float32 ``[rows, nodes, parameters]``. Frame 0 also
+carries the node ids and parameter names. Frames are appended to
+``<partial_dir>/<job_id>.jsonl`` before they are published, so a client
+that joins late, or sees a gap in ``seq``, can read the prefix it missed
+from the job's ``/result/{job_id}/partial`` route. A job resumed after its
+worker was lost streams again from ``seq`` 0, so ``start_stream`` drops the
+frames the earlier attempt wrote.
+
+Publishing goes through the process-wide ``progress_publisher``; the
+calculation queue points it at the websocket manager, directly or through
+the worker pool. Without a configured ``send`` no tracker is created.
+"""
+
+import base64
+import json
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ProgressSend = Callable[[str, Dict[str, Any]], None]
+
+
+class ProgressTracker:
+    """Progress of one calculation over ``total_hours`` simulated hours."""
+
+    def __init__(
+        self,
+        job_id: str,
+        total_hours: float,
+        send: ProgressSend,
+        min_interval: float,
+        partial_points: int = 0,
+        partial_path: Optional[Path] = None,
+    ) -> None:
+        self.job_id = job_id
+        self.total_hours = float(total_hours)
+        self.rhs_evaluations = 0
+        self.simulated_hours = 0.0
+        self.partial_seq = 0
+        self._send = send
+        self._min_interval = min_interval
+        self._partial_points = partial_points
+        self._partial_path = partial_path
+        self._partial_header: Optional[Dict[str, Any]] = None
+        self._span_start = 0.0
+        self._started = time.monotonic()
+        self._last_published = -math.inf
+
+    def start_span(self, start_hour: float) -> None:
+        """A solver span starts ``start_hour`` hours into the run."""
+        self._span_start = float(start_hour)
+
+    def advance(self, hours: float) -> None:
+        """``hours`` of the run are done (a span finished or was reused)."""
+        self.simulated_hours = max(self.simulated_hours, float(hours))
+        self._maybe_publish()
+
+    def finish(self) -> None:
+        self.simulated_hours = self.total_hours
+        self._maybe_publish(force=True)
+
+    def start_stream(self, node_ids: List[str], parameter_names: List[str]) -> None:
+        """Describe the state columns; partial results are streamed from here on."""
+        if self._partial_points > 0:
+            self._partial_header = {"node_ids": node_ids, "parameter_names": parameter_names}
+            if self._partial_path is not None:
+                try:
+                    self._partial_path.unlink(missing_ok=True)
+                except OSError:
+                    logger.debug(
+                        "stale partial results not removed", exc_info=True, extra={"job_id": self.job_id}
+                    )
+
+    def span_result(self, timestamps: Sequence[float], states: Any) -> None:
+        """Stream the reported rows of a finished span as one delta frame."""
+        if self._partial_header is None or not len(timestamps):
+            return
+        rows = np.unique(
+            np.linspace(0, len(timestamps) - 1, min(self._partial_points, len(timestamps))).round()
+        ).astype(np.int64)
+        block = np.asarray(states[rows].detach().cpu().numpy(), dtype="<f4")
+        frame: Dict[str, Any] = {
+            "seq": self.partial_seq,
+            "timestamps": [float(timestamps[row]) for row in rows],
+            "shape": list(block.shape),
+            "states": base64.b64encode(block.tobytes()).decode("ascii"),
+        }
+        if self.partial_seq == 0:
+            frame.update(self._partial_header)
+        self.partial_seq += 1
+        try:
+            if self._partial_path is not None:
+                self._partial_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self._partial_path, "a", encoding="utf-8") as handle:
+                    handle.write(json.dumps(frame) + "\n")
+            self._send(self.job_id, {"status": "partial", "frame": frame})
+        except Exception:
+            logger.debug("partial result publish failed", exc_info=True, extra={"job_id": self.job_id})
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Return the RHS ``fn`` counting its calls and tracking solver time."""
+
+        def _tracked(t: Any, *args: Any, **kwargs: Any) -> Any:
+            self.rhs_evaluations += 1
+            if time.monotonic() - self._last_published >= self._min_interval:
+                # Adaptive solvers probe ahead; only a finished span is final
+                self.simulated_hours = max(
+                    self.simulated_hours, min(self._span_start + float(t), self.total_hours)
+                )
+                self._maybe_publish()
+            return fn(t, *args, **kwargs)
+
+        return _tracked
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started
+        fraction = min(self.simulated_hours / self.total_hours, 1.0) if self.total_hours > 0 else 1.0
+        return {
+            "status": "running",
+            "fraction": fraction,
+            "simulated_hours": self.simulated_hours,
+            "total_hours": self.total_hours,
+            "rhs_evaluations": self.rhs_evaluations,
+            "elapsed_seconds": elapsed,
+            "eta_seconds": elapsed * (1.0 - fraction) / fraction if fraction > 0 else None,
+        }
+
+    def _maybe_publish(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_published < self._min_interval:
+            return
+        self._last_published = now
+        try:
+            self._send(self.job_id, self.snapshot())
+        except Exception:
+            # Progress is best effort; never fail the calculation for it
+            logger.debug("progress publish failed", exc_info=True, extra={"job_id": self.job_id})
+
+
+class ProgressPublisher:
+    """Where trackers send their updates; disabled until ``configure`` gives a ``send``."""
+
+    def __init__(
+        self,
+        send: Optional[ProgressSend] = None,
+        min_interval: float = 1.0,
+        partial_points: int = 0,
+        partial_dir: Optional[str] = None,
+    ) -> None:
+        self.configure(send, min_interval, partial_points, partial_dir)
+
+    def configure(
+        self,
+        send: Optional[ProgressSend],
+        min_interval: float,
+        partial_points: int = 0,
+        partial_dir: Optional[str] = None,
+    ) -> None:
+        self.send = send
+        self.min_interval = min_interval
+        self.partial_points = partial_points
+        self.partial_dir = Path(partial_dir) if partial_dir else None
+
+    def tracker(self, job_id: Optional[str], total_hours: float) -> Optional[ProgressTracker]:
+        if self.send is None or not job_id:
+            return None
+        return ProgressTracker(
+            job_id,
+            total_hours,
+            self.send,
+            self.min_interval,
+            partial_points=self.partial_points,
+            partial_path=self.partial_dir / f"{job_id}.jsonl" if self.partial_dir else None,
+        )
+
+    def publish_status(self, job_id: str, status: str, message: Optional[str] = None) -> None:
+        """Final status of a job (success, failed or cancelled)."""
+        if self.send is None:
+            return
+        try:
+            self.send(job_id, {"status": status, "message": message})
+        except Exception:
+            logger.debug("progress publish failed", exc_info=True, extra={"job_id": job_id})
+
+
+progress_publisher = ProgressPublisher()
@@ -0,0 +1,179 @@
+"""Reaction-model registry and the fused material balance RHS.
+
+Every kinetics model registers a ``ReactionModel``. For one plant,
+``build_reaction_modules`` binds each model to the rows of the nodes that
+use it. ``FusedBalance`` then evaluates the ODE right-hand side:
+
+1. transport and dilution are computed once for all nodes;
+2. every module adds its reaction term in place on its own rows;
+3. one precomputed mask zeroes inlets/outlets and frozen components.
+
+So a plant can mix ASM1, ASM1-slim, ASM3 and UDM reactors, and no model
+repeats the transport math or the ``zeros_like``/``where`` scaffolding.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+from .asm import asm1, asm1slim, asm3
+from .udm_engine import UDMBatchRuntime, UDMNodeRuntime, build_udm_batch_runtime
+
+# (t, C [N, M]) -> (delta_m [N, M], delta_Q [N]); t matters for time-varying edges only
+Transport = Callable[[torch.Tensor, torch.Tensor], Tuple[torch.Tensor, torch.Tensor]]
+
+
+@dataclass(frozen=True)
+class ReactionModel:
+    """Native kinetics selected by ``NodeData.node_type``."""
+
+    node_type: str
+    kinetics: Callable[[Any, torch.Tensor], torch.Tensor]  # (prepared, C [G, M]) -> [G, M]
+    n_parameters: int
+    # Component held constant (dissolved oxygen, set by the aeration control)
+    frozen_component: Optional[int] = None
+    # params [G, P] -> per-node constants, run once per segment rather than per RHS call
+    prepare: Callable[[torch.Tensor], Any] = lambda params: params
+
+
+REACTION_MODELS: Dict[str, ReactionModel] = {}
+
+
+def register_reaction_model(model: ReactionModel) -> ReactionModel:
+    REACTION_MODELS[model.node_type] = model
+    return model
+
+
+register_reaction_model(
+    ReactionModel("asm1slim", asm1slim.reaction_prepared, 7, frozen_component=0, prepare=asm1slim.prepare)
+)
+register_reaction_model(
+    ReactionModel("asm1", asm1.reaction_prepared, 19, frozen_component=5, prepare=asm1.prepare)
+)
+register_reaction_model(
+    ReactionModel("asm3", asm3.reaction_prepared, 37, frozen_component=6, prepare=asm3.prepare)
+)
+
+
+class ReactionModule:
+    """Reaction term of one model, bound to the nodes that use it."""
+
+    name: str
+    mask: torch.Tensor  # [N], bool
+
+    def add_reaction(self, concentrations: torch.Tensor, change: torch.Tensor) -> None:
+        """Add this module's dC/dt to ``change`` [N, M] in place."""
+        raise NotImplementedError
+
+
+class KineticsModule(ReactionModule):
+    def __init__(self, model: ReactionModel, mask: torch.Tensor, params: torch.Tensor):
+        self.name = model.node_type
+        self.model = model
+        self.kinetics = model.kinetics
+        self.mask = mask
+        self.node_indices = mask.nonzero().flatten()
+        # Only the rows of this model's nodes, gathered and prepared once
+        self.params = model.prepare(params.index_select(0, self.node_indices))
+
+    def add_reaction(self, concentrations: torch.Tensor, change: torch.Tensor) -> None:
+        rates = self.kinetics(self.params, concentrations.index_select(0, self.node_indices))
+        change.index_add_(0, self.node_indices, rates)
+
+
+class UDMModule(ReactionModule):
+    name = "udm"
+
+    def __init__(self, mask: torch.Tensor, runtime: UDMBatchRuntime):
+        self.mask = mask
+        self.runtime = runtime
+
+    def add_reaction(self, concentrations: torch.Tensor, change: torch.Tensor) -> None:
+        self.runtime.accumulate_reaction(concentrations, change)
+
+
+def build_reaction_modules(
+    kinetics: Dict[str, Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]],
+    *,
+    n_components: int,
+    udm_mask: Optional[torch.Tensor] = None,
+    udm_runtime_payload: Optional[List[UDMNodeRuntime]] = None,
+    udm_batch_runtime: Optional[UDMBatchRuntime] = None,
+) -> List[ReactionModule]:
+    """Bind every model that has at least one node in this plant.
+
+    Args:
+        kinetics: ``{node_type: (mask [N], params [N, P])}`` of registered models
+        n_components: number of concentration columns
+        udm_mask: UDM node mask
+        udm_runtime_payload: per-node UDM runtimes
+        udm_batch_runtime: batched UDM runtime, built from the payload if missing
+    """
+    modules: List[ReactionModule] = []
+    for node_type, (mask, params) in kinetics.items():
+        if mask is not None and params is not None and bool(mask.any()):
+            modules.append(KineticsModule(REACTION_MODELS[node_type], mask, params))
+
+    if udm_mask is not None and bool(udm_mask.any()) and udm_runtime_payload:
+        if udm_batch_runtime is None:
+            udm_batch_runtime = build_udm_batch_runtime(
+                udm_runtime_payload,
+                n_nodes=udm_mask.shape[0],
+                n_components=n_components,
+                device=udm_mask.device,
+                dtype=udm_runtime_payload[0].stoich_matrix.dtype,
+            )
+        modules.append(UDMModule(udm_mask, udm_batch_runtime))
+    return modules
+
+
+def _held_constant(
+    modules: Sequence[ReactionModule], compute_mask: torch.Tensor, n_components: int
+) -> torch.Tensor:
+    """[N, M] mask of concentrations whose dC/dt is forced to zero."""
+    held = (~compute_mask).unsqueeze(-1).repeat(1, n_components)
+    for module in modules:
+        if isinstance(module, KineticsModule) and module.model.frozen_component is not None:
+            # A model's frozen component is held on its own nodes and on plain
+            # transport nodes, but not on nodes that belong to another model.
+            others = [other.mask for other in modules if other is not module]
+            rows = ~torch.stack(others).any(dim=0) if others else torch.ones_like(module.mask)
+            held[rows, module.model.frozen_component] = True
+        elif isinstance(module, UDMModule) and module.runtime.has_fixed_components:
+            held |= module.runtime.fixed_component_mask
+    return held
+
+
+class FusedBalance:
+    """ODE right-hand side ``f(t, y)`` shared by all reaction models.
+
+    ``y`` is ``[N, M + 1]`` with the liquid volume in the last column.
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        compute_mask: torch.Tensor,
+        modules: Sequence[ReactionModule],
+        n_components: int,
+    ):
+        self.transport = transport
+        self.modules = list(modules)
+        self.held = _held_constant(self.modules, compute_mask, n_components)
+        self.boundary = ~compute_mask
+
+    def __call__(self, t: torch.Tensor, y_extended: torch.Tensor) -> torch.Tensor:
+        y = torch.clamp(y_extended[:, :-1], min=0)
+        V_liq = torch.clamp(y_extended[:, -1], min=1e-6).unsqueeze(-1)
+
+        delta_m, delta_Q = self.transport(t, y)
+        # delta_m / V - y * delta_Q / V, evaluated in place on fresh buffers
+        change = delta_m.div_(V_liq)
+        change.add_(torch.mul(y, delta_Q.unsqueeze(-1)).neg_().div_(V_liq))
+        for module in self.modules:
+            module.add_reaction(y, change)
+
+        change.masked_fill_(self.held, 0.0)
+        delta_Q = delta_Q.masked_fill(self.boundary, 0.0)
+        return torch.cat((change, delta_Q.unsqueeze(-1)), dim=1)
@@ -0,0 +1,84 @@
+"""Array-backed calculation result.
+
+``ResultFrame`` keeps the solver output as one contiguous array instead of
+``{node_id: {parameter: [floats]}}`` dicts:
+
+- ``states``: ``[T, nodes, components + 1]`` in ``parameter_names`` order,
+  volume last like the ODE state (usually a view of the solver output);
+- ``edge_flows``: ``[T, edges]`` flow rate series.
+
+Index maps resolve node ids and parameter names to array positions. The
+nested-list form is only built by ``node_data()``/``edge_data()`` when a
+caller actually needs JSON.
+
+A spilled trajectory (see ``trajectory_sink.py``) is backed by memory-mapped
+files in ``spill_dir``; ``save_result`` moves those into the result store.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+VOLUME_PARAMETER = "volume"
+FLOW_RATE_PARAMETER = "flow_rate"
+
+
+@dataclass
+class ResultFrame:
+    timestamps: np.ndarray
+    states: np.ndarray
+    node_ids: List[str]
+    node_labels: List[str]
+    parameter_names: List[str]
+    edge_ids: List[str]
+    edge_flows: np.ndarray
+    spill_dir: Optional[str] = None
+    node_index: Dict[str, int] = field(init=False, repr=False)
+    parameter_index: Dict[str, int] = field(init=False, repr=False)
+    edge_index: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.node_index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.parameter_index = {name: j for j, name in enumerate(self.parameter_names)}
+        self.edge_index = {edge_id: k for k, edge_id in enumerate(self.edge_ids)}
+
+    @property
+    def time_points(self) -> int:
+        return int(self.timestamps.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.timestamps.nbytes + self.states.nbytes + self.edge_flows.nbytes)
+
+    @property
+    def node_fields(self) -> List[str]:
+        """Parameter names in ``node_data()`` order (volume first)."""
+        return [VOLUME_PARAMETER, *(name for name in self.parameter_names if name != VOLUME_PARAMETER)]
+
+    def series(self, node_id: str, parameter: str) -> np.ndarray:
+        """View of one node parameter over time (no copy)."""
+        return self.states[:, self.node_index[node_id], self.parameter_index[parameter]]
+
+    def timestamps_list(self) -> List[float]:
+        return self.timestamps.tolist()
+
+    def node_data(self) -> Dict[str, Dict[str, Any]]:
+        """Materialize ``MaterialBalanceResult.node_data``."""
+        volume = self.parameter_index[VOLUME_PARAMETER]
+        node_data: Dict[str, Dict[str, Any]] = {}
+        for i, node_id in enumerate(self.node_ids):
+            columns = self.states[:, i, :].T.tolist()
+            node_data[node_id] = {
+                "label": self.node_labels[i],
+                VOLUME_PARAMETER: columns[volume],
+                **dict(zip(self.parameter_names, columns, strict=True)),
+            }
+        return node_data
+
+    def edge_data(self) -> Dict[str, Dict[str, List[float]]]:
+        """Materialize ``MaterialBalanceResult.edge_data``."""
+        return {
+            edge_id: {FLOW_RATE_PARAMETER: series}
+            for edge_id, series in zip(self.edge_ids, self.edge_flows.T.tolist(), strict=True)
+        }
@@ -0,0 +1,100 @@
+"""Per-process cache of converted simulation runtimes.
+
+``MaterialBalanceCalculator._convert_to_tensors`` builds the node and edge
+tensors and compiles every UDM rate and stoichiometry expression. None of
+that depends on ``CalculationParameters``, so a flowchart resubmitted with
+only ``hours`` (or the solver settings) changed can reuse it. The bundle is
+keyed by a SHA-256 of the canonical JSON of the structural inputs (nodes
+with their model parameters and UDM snapshots, edges, component names) plus
+dtype and device.
+
+The cache lives in the worker process and evicts least recently used
+bundles beyond ``max_entries``. Cached bundles are shared between jobs and
+must be treated as read-only; the solver only ever clones them.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Sequence
+
+import torch
+
+
+def structural_key(
+    nodes: Iterable[Any],
+    edges: Iterable[Any],
+    parameter_names: Sequence[str],
+    *,
+    dtype: torch.dtype,
+    device: torch.device,
+) -> str:
+    """Canonical hash of everything ``_convert_to_tensors`` reads."""
+    payload = {
+        "nodes": [node.model_dump(mode="json") for node in nodes],
+        "edges": [edge.model_dump(mode="json") for edge in edges],
+        "parameter_names": list(parameter_names),
+        "dtype": str(dtype),
+        "device": str(device),
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RuntimeCache:
+    """Thread-safe LRU of runtime bundles with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: str, build: Callable[[], Any]) -> Any:
+        """Return the bundle cached under ``key``, building it on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # Build outside the lock; a concurrent miss on the same key builds twice
+        value = build()
+        if self.max_entries <= 0:
+            return value
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+        return value
+
+    def resize(self, max_entries: int) -> None:
+        with self._lock:
+            self.max_entries = max_entries
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self) -> None:
+        while len(self._entries) > max(self.max_entries, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+runtime_cache = RuntimeCache()
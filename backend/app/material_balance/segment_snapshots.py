@@ -0,0 +1,180 @@
+"""Persisted per-segment trajectories for incremental re-simulation.
+
+With ``time_segments``, each segment's integration depends only on the
+flowsheet, the solver settings and the segments before it. After every
+segment ``_run_calculation`` saves the segment's trajectory under a chain
+key:
+
+- ``base_key`` hashes everything except the segments and ``hours``;
+- ``chain_key`` then folds in one segment at a time.
+
+A rerun that only edits segment k finds segments 0..k-1 under unchanged
+keys. It loads them instead of integrating, and computes from the last
+unchanged boundary on. Timestamps, flows and events are cheap and are
+always rebuilt, so only the solver output is stored.
+
+With ``checkpoint_hours`` set, long segments are also integrated in chunks of
+about that many simulated hours, each stored under its own chain key. The
+chunks are checkpoints: a job that dies mid-run (worker crash, restart) is
+requeued, and the rerun loads every finished chunk and integrates only from
+the last one on.
+
+Files live in one directory shared by all workers. Writes are atomic
+renames, and the least recently used files are removed beyond
+``max_bytes``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+import torch
+
+from .runtime_cache import structural_key
+
+logger = logging.getLogger(__name__)
+
+
+def base_key(
+    input_data: Any,
+    parameter_names: Sequence[str],
+    *,
+    dtype: torch.dtype,
+    device: torch.device,
+) -> str:
+    """Hash of every input a segment's integration reads, except the segments."""
+    parameters = input_data.parameters.model_dump(mode="json", exclude={"hours"})
+    payload = {
+        "structure": structural_key(
+            input_data.nodes, input_data.edges, parameter_names, dtype=dtype, device=device
+        ),
+        "parameters": parameters,
+        "edge_profiles": {
+            edge_id: profile.model_dump(mode="json")
+            for edge_id, profile in (getattr(input_data, "edge_profiles", None) or {}).items()
+        },
+        "warm_start_state": (
+            input_data.warm_start_state.model_dump(mode="json")
+            if getattr(input_data, "warm_start_state", None) is not None
+            else None
+        ),
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def chain_key(previous: str, segment: Dict[str, Any]) -> str:
+    """Key of the trajectory up to the end of ``segment``."""
+    overrides = {
+        edge_id: override.model_dump(mode="json") if hasattr(override, "model_dump") else override
+        for edge_id, override in (segment.get("edge_overrides") or {}).items()
+    }
+    raw = json.dumps(
+        [previous, float(segment["start_hour"]), float(segment["end_hour"]), overrides],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SegmentSnapshotStore:
+    """Directory of segment trajectories keyed by ``chain_key``; disabled without one."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = 1 << 30,
+        checkpoint_hours: Optional[float] = None,
+    ):
+        self.directory = Path(directory) if directory else None
+        self.max_bytes = max_bytes
+        self.checkpoint_hours = checkpoint_hours
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None and self.max_bytes > 0
+
+    def configure(
+        self, directory: Optional[str], max_bytes: int, checkpoint_hours: Optional[float] = None
+    ) -> None:
+        self.directory = Path(directory) if directory else None
+        self.max_bytes = max_bytes
+        self.checkpoint_hours = checkpoint_hours
+
+    def load(self, key: str, device: torch.device) -> Optional[torch.Tensor]:
+        """Stored trajectory of ``key``, or None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            states = torch.load(path, map_location=device, weights_only=True)
+            os.utime(path)
+        except FileNotFoundError:
+            states = None
+        except Exception:
+            logger.warning("unreadable segment snapshot, recomputing", extra={"snapshot": key})
+            path.unlink(missing_ok=True)
+            states = None
+        with self._lock:
+            if states is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return states
+
+    def save(self, key: str, states: torch.Tensor) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        temporary = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            torch.save(states.detach().contiguous().clone(), temporary)
+            os.replace(temporary, path)
+        except OSError as exc:
+            temporary.unlink(missing_ok=True)
+            logger.warning(
+                "segment snapshot write failed", extra={"snapshot": key, "error_message": str(exc)}
+            )
+            return
+        self._prune()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{key}.pt"
+
+    def _prune(self) -> None:
+        """Remove the least recently used snapshots beyond ``max_bytes``."""
+        try:
+            entries = [
+                (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith(".pt") and not entry.name.startswith(".")
+            ]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+
+segment_snapshots = SegmentSnapshotStore()
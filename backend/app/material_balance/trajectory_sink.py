@@ -0,0 +1,217 @@
+"""Trajectory sinks: where ``_run_calculation`` puts the solver output.
+
+Each integration span (a segment or a checkpoint chunk) is appended as soon
+as it is solved and then dropped by the calculator:
+
+- ``MemorySink`` keeps the spans and concatenates them once at the end,
+  which suits the usual small job;
+- ``SpillSink`` appends each span to ``.npy`` files and returns read-only
+  memory maps of them. Peak RSS is then about one span, whatever the
+  trajectory length, because the mapped pages are file-backed.
+
+The spill files use the result store layout (``timestamps.npy`` float64
+``[T]``, ``nodes.npy`` float32 ``[T, nodes, components + 1]``,
+``edges.npy`` float32 ``[T, edges, 1]``), so ``save_result`` moves them
+into the job directory instead of writing a copy. ``TrajectorySinks.open``
+picks the sink from the estimated trajectory size.
+
+A spill directory is named after the host and pid of the process writing
+it. A process that dies without cleaning up (a hard kill, the OOM killer)
+leaves its directories behind; ``sweep_stale_spills`` removes those whose
+process is gone and runs when the worker pool or a worker starts.
+"""
+
+import logging
+import os
+import shutil
+import socket
+import uuid
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Fixed .npy header size: the shape is only known once the last span is in
+_NPY_HEADER_BYTES = 256
+
+
+@dataclass
+class Trajectory:
+    timestamps: np.ndarray
+    states: np.ndarray
+    edge_flows: np.ndarray
+    # Directory holding the spill files behind the arrays, if spilled
+    spill_dir: Optional[str] = None
+
+
+class MemorySink:
+    """Keep the spans in memory and concatenate them in ``finish``."""
+
+    spills = False
+
+    def __init__(self) -> None:
+        self._states: List[torch.Tensor] = []
+        self._timestamps: List[float] = []
+        self._flows: List[np.ndarray] = []
+
+    def append(self, states: torch.Tensor, timestamps: Sequence[float], edge_flows: np.ndarray) -> None:
+        self._states.append(states)
+        self._timestamps.extend(timestamps)
+        self._flows.append(edge_flows)
+
+    def finish(self) -> Trajectory:
+        return Trajectory(
+            timestamps=np.asarray(self._timestamps, dtype=np.float64),
+            states=torch.cat(self._states, dim=0).detach().cpu().numpy(),
+            edge_flows=np.concatenate(self._flows, axis=0).astype(np.float64, copy=False),
+        )
+
+    def discard(self) -> None:
+        self._states.clear()
+        self._flows.clear()
+
+
+class _NpyAppender:
+    """Append rows to a ``.npy`` file whose header is written on close."""
+
+    def __init__(self, path: Path, dtype: np.dtype, row_shape: Tuple[int, ...]) -> None:
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_shape = row_shape
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._file.write(b"\0" * _NPY_HEADER_BYTES)
+
+    def append(self, rows: np.ndarray) -> None:
+        rows = np.ascontiguousarray(rows, dtype=self.dtype).reshape(-1, *self.row_shape)
+        rows.tofile(self._file)
+        self.rows += rows.shape[0]
+
+    def close(self) -> None:
+        header = repr(
+            {
+                "descr": np.lib.format.dtype_to_descr(self.dtype),
+                "fortran_order": False,
+                "shape": (self.rows, *self.row_shape),
+            }
+        ).encode("latin1")
+        # magic (6) + version (2) + header length (2) + header + padding + newline
+        padding = _NPY_HEADER_BYTES - 10 - len(header) - 1
+        if padding < 0:
+            raise ValueError(f"shape {(self.rows, *self.row_shape)} does not fit the .npy header")
+        self._file.seek(0)
+        self._file.write(np.lib.format.MAGIC_PREFIX + bytes([1, 0]))
+        self._file.write((_NPY_HEADER_BYTES - 10).to_bytes(2, "little"))
+        self._file.write(header + b" " * padding + b"\n")
+        self._file.close()
+
+    def abort(self) -> None:
+        self._file.close()
+
+
+class SpillSink:
+    """Append the spans to ``.npy`` files under a fresh directory."""
+
+    spills = True
+
+    def __init__(self, directory: Path, n_nodes: int, n_state: int, n_edges: int) -> None:
+        self.directory = directory / f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex}"
+        self.directory.mkdir(parents=True)
+        self._timestamps = _NpyAppender(self.directory / "timestamps.npy", np.float64, ())
+        self._states = _NpyAppender(self.directory / "nodes.npy", np.float32, (n_nodes, n_state))
+        self._flows = _NpyAppender(self.directory / "edges.npy", np.float32, (n_edges, 1))
+
+    def append(self, states: torch.Tensor, timestamps: Sequence[float], edge_flows: np.ndarray) -> None:
+        self._states.append(states.detach().cpu().numpy())
+        self._timestamps.append(np.asarray(timestamps, dtype=np.float64))
+        self._flows.append(edge_flows)
+
+    def finish(self) -> Trajectory:
+        for appender in (self._timestamps, self._states, self._flows):
+            appender.close()
+        states = np.load(self._states.path, mmap_mode="r")
+        # The files go when the frame does, unless save_result moved them
+        weakref.finalize(states, shutil.rmtree, self.directory, ignore_errors=True)
+        return Trajectory(
+            timestamps=np.load(self._timestamps.path, mmap_mode="r"),
+            states=states,
+            edge_flows=np.load(self._flows.path, mmap_mode="r")[:, :, 0],
+            spill_dir=str(self.directory),
+        )
+
+    def discard(self) -> None:
+        for appender in (self._timestamps, self._states, self._flows):
+            appender.abort()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+TrajectorySink = MemorySink | SpillSink
+
+
+class TrajectorySinks:
+    """Choose between memory and spill sinks; spilling is off without a directory."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        threshold_bytes: int = 256 << 20,
+        chunk_bytes: int = 32 << 20,
+    ):
+        self.configure(directory, threshold_bytes, chunk_bytes)
+
+    def configure(self, directory: Optional[str], threshold_bytes: int, chunk_bytes: int) -> None:
+        self.directory = Path(directory) if directory else None
+        self.threshold_bytes = threshold_bytes
+        self.chunk_bytes = chunk_bytes
+
+    def open(self, rows: int, n_nodes: int, n_state: int, n_edges: int) -> TrajectorySink:
+        """Sink for a trajectory of about ``rows`` reported time points."""
+        row_bytes = 4 * (n_nodes * n_state + n_edges) + 8
+        if self.directory is None or rows * row_bytes <= self.threshold_bytes:
+            return MemorySink()
+        return SpillSink(self.directory, n_nodes, n_state, n_edges)
+
+    def chunk_rows(self, n_nodes: int, n_state: int) -> int:
+        """Reported rows per span that keep one span within ``chunk_bytes``."""
+        return max(self.chunk_bytes // (4 * n_nodes * n_state), 1)
+
+
+trajectory_sinks = TrajectorySinks()
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process with ``pid`` exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_stale_spills(directory: Optional[str]) -> int:
+    """Remove spill directories of dead processes on this host; returns the count.
+
+    Directories of other hosts sharing the store are left alone.
+    """
+    if not directory or not os.path.isdir(directory):
+        return 0
+    host = socket.gethostname()
+    removed = 0
+    for entry in os.scandir(directory):
+        owner = entry.name.rpartition("-")[0]
+        owner_host, _, pid = owner.rpartition("-")
+        if not entry.is_dir() or owner_host != host or not pid.isdigit():
+            continue
+        if int(pid) != os.getpid() and not process_alive(int(pid)):
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info("removed stale spill directories", extra={"directory": directory, "removed": removed})
+    return removed
@@ -1,9 +1,25 @@
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Iterable, List
+from typing import Any, Callable, Dict, Iterable, List, Sequence
 
 import torch
 
-from app.services.udm_expression import compile_expression
+from app.services.udm_expression import (
+    CompiledKernel,
+    compile_expression,
+    compile_expression_kernel,
+)
+
+
+def _stack_rates(rates: Sequence[Any], reference: torch.Tensor) -> torch.Tensor:
+    """Stack kernel outputs along the last dim, broadcasting scalar rates."""
+    columns: List[torch.Tensor] = []
+    for value in rates:
+        if not torch.is_tensor(value):
+            value = torch.as_tensor(value, dtype=reference.dtype, device=reference.device)
+        if value.shape != reference.shape:
+            value = value.expand_as(reference)
+        columns.append(value)
+    return torch.stack(columns, dim=-1)
 
 
 @dataclass
@@ -15,7 +31,8 @@ class UDMNodeRuntime:
     local_component_names: List[str]
     local_to_global_indices: torch.Tensor  # [L], long
     parameter_values: Dict[str, float]
-    rate_evaluators: List[Callable[[Dict[str, Any]], Any]]
+    rate_expressions: List[str]
+    rate_kernel: CompiledKernel  # slots: local components, parameters folded
     stoich_matrix: torch.Tensor  # [P, L]
     fixed_component_mask: torch.Tensor  # [M], bool (global component space)
 
@@ -25,39 +42,19 @@ class UDMNodeRuntime:
 
         Args:
             concentrations: canonical concentration vector for this node [M]
+                (leading batch dimensions are allowed, e.g. [N, M])
         Returns:
-            torch.Tensor: reaction term vector in canonical space [M]
+            torch.Tensor: reaction term in canonical space, same shape as input
         """
-        env: Dict[str, Any] = {}
-        for local_idx, component_name in enumerate(self.local_component_names):
-            canonical_idx = int(self.local_to_global_indices[local_idx].item())
-            if canonical_idx < 0 or canonical_idx >= concentrations.shape[0]:
-                continue
-            env[component_name] = concentrations[canonical_idx]
-        for parameter_name, parameter_value in self.parameter_values.items():
-            env[parameter_name] = parameter_value
-
-        rates: List[torch.Tensor] = []
-        for evaluator in self.rate_evaluators:
-            value = evaluator(env)
-            if torch.is_tensor(value):
-                rates.append(value)
-            else:
-                rates.append(
-                    torch.as_tensor(
-                        value,
-                        dtype=concentrations.dtype,
-                        device=concentrations.device,
-                    )
-                )
-
-        if len(rates) == 0:
+        if self.rate_kernel.output_count == 0:
             return torch.zeros_like(concentrations)
 
-        rates_tensor = torch.stack(rates)  # [P]
-        local_reaction = torch.matmul(self.stoich_matrix.transpose(0, 1), rates_tensor)  # [L]
+        local_values = concentrations.index_select(-1, self.local_to_global_indices)
+        rates = self.rate_kernel.fn(local_values.unbind(-1))
+        rates_tensor = _stack_rates(rates, local_values[..., 0])  # [..., P]
+        local_reaction = torch.matmul(rates_tensor, self.stoich_matrix)  # [..., L]
         global_reaction = torch.zeros_like(concentrations)
-        global_reaction.index_add_(0, self.local_to_global_indices, local_reaction)
+        global_reaction.index_add_(-1, self.local_to_global_indices, local_reaction)
         return global_reaction
 
 
@@ -245,7 +242,7 @@ def build_udm_runtime_payload(
         if len(process_rows) == 0:
             continue
 
-        rate_evaluators: List[Callable[[Dict[str, Any]], Any]] = []
+        rate_expressions: List[str] = []
         stoich_rows: List[List[float]] = []
 
         for process in process_rows:
@@ -257,8 +254,7 @@ def build_udm_runtime_payload(
             if not rate_expr:
                 continue
 
-            evaluator = compile_expression(str(rate_expr))
-            rate_evaluators.append(evaluator)
+            rate_expressions.append(str(rate_expr))
 
             stoich_map = process.get("stoich", {}) or {}
             stoich_expr_map = process.get("stoich_expr")
@@ -294,9 +290,14 @@ def build_udm_runtime_payload(
                     row.append(0.0)
             stoich_rows.append(row)
 
-        if len(rate_evaluators) == 0:
+        if len(rate_expressions) == 0:
             continue
 
+        rate_kernel = compile_expression_kernel(
+            rate_expressions,
+            slot_names=local_component_names,
+            constants=parameter_values,
+        )
         stoich_matrix = torch.tensor(stoich_rows, dtype=dtype, device=device)  # [P, L]
 
         runtimes.append(
@@ -306,10 +307,179 @@ def build_udm_runtime_payload(
                 local_component_names=local_component_names,
                 local_to_global_indices=local_to_global_indices,
                 parameter_values=parameter_values,
-                rate_evaluators=rate_evaluators,
+                rate_expressions=rate_expressions,
+                rate_kernel=rate_kernel,
                 stoich_matrix=stoich_matrix,
                 fixed_component_mask=fixed_component_mask,
             )
         )
 
     return runtimes
+
+
+@dataclass
+class UDMBatchGroup:
+    """UDM nodes sharing one model definition, evaluated as a single batch."""
+
+    node_indices: torch.Tensor  # [G], long
+    local_slot_indices: torch.Tensor  # [S_c], canonical indices feeding kernel slots
+    parameter_slots: torch.Tensor  # [G, S_p], per-node values of varying parameters
+    rate_kernel: CompiledKernel  # slots: local components then varying parameters
+    stoich_matrix: torch.Tensor  # [P, L] shared or [G, P, L] per node
+    scatter_index: torch.Tensor  # [G * L], flat index into [N * M]
+
+    def evaluate(self, concentrations: torch.Tensor) -> torch.Tensor:
+        """Return the flattened local reaction terms [G * L] for this group."""
+        node_values = concentrations.index_select(0, self.node_indices)
+        slot_values = list(
+            node_values.index_select(1, self.local_slot_indices).unbind(-1)
+        )
+        slot_values.extend(self.parameter_slots.unbind(-1))
+        rates = _stack_rates(
+            self.rate_kernel.fn(slot_values),
+            node_values[:, 0],
+        )  # [G, P]
+        if self.stoich_matrix.dim() == 2:
+            local_reaction = torch.matmul(rates, self.stoich_matrix)  # [G, L]
+        else:
+            local_reaction = torch.bmm(rates.unsqueeze(1), self.stoich_matrix).squeeze(1)
+        return local_reaction.reshape(-1)
+
+
+@dataclass
+class UDMBatchRuntime:
+    """All UDM reactors of a plant, grouped so each group costs one tensor pass."""
+
+    groups: List[UDMBatchGroup]
+    scatter_index: torch.Tensor  # [sum(G * L)], flat index into [N * M]
+    fixed_component_mask: torch.Tensor  # [N, M], bool
+    has_fixed_components: bool
+
+    def evaluate_reaction(self, concentrations: torch.Tensor) -> torch.Tensor:
+        """
+        Evaluate UDM reaction terms for every node at once.
+
+        Args:
+            concentrations: canonical concentrations for all nodes [N, M]
+        Returns:
+            torch.Tensor: reaction terms [N, M]; rows of non-UDM nodes are zero
+        """
+        return self.accumulate_reaction(concentrations, torch.zeros_like(concentrations))
+
+    def accumulate_reaction(self, concentrations: torch.Tensor, out: torch.Tensor) -> torch.Tensor:
+        """Add UDM reaction terms to the contiguous [N, M] ``out`` in place."""
+        if not self.groups:
+            return out
+        local_terms = [group.evaluate(concentrations) for group in self.groups]
+        flat_terms = local_terms[0] if len(local_terms) == 1 else torch.cat(local_terms)
+        out.view(-1).index_add_(0, self.scatter_index, flat_terms)
+        return out
+
+    def apply_fixed_components(self, concentration_change: torch.Tensor) -> torch.Tensor:
+        """Force dC/dt = 0 on fixed components of UDM nodes."""
+        if not self.has_fixed_components:
+            return concentration_change
+        return concentration_change.masked_fill(self.fixed_component_mask, 0.0)
+
+
+def _batch_group_key(runtime: UDMNodeRuntime) -> tuple:
+    return (
+        tuple(runtime.rate_expressions),
+        tuple(runtime.local_component_names),
+        tuple(int(idx) for idx in runtime.local_to_global_indices.tolist()),
+        tuple(sorted(runtime.parameter_values)),
+    )
+
+
+def _build_batch_group(
+    members: List[UDMNodeRuntime],
+    *,
+    n_components: int,
+    device: torch.device,
+    dtype: torch.dtype,
+) -> UDMBatchGroup:
+    first = members[0]
+    parameter_names = sorted(first.parameter_values)
+    shared_parameters = {
+        name: first.parameter_values[name]
+        for name in parameter_names
+        if all(member.parameter_values[name] == first.parameter_values[name] for member in members)
+    }
+    varying_parameters = [name for name in parameter_names if name not in shared_parameters]
+
+    # Parameters shadow component names (same precedence as the kernel constants).
+    component_slots = [
+        (local_idx, name)
+        for local_idx, name in enumerate(first.local_component_names)
+        if name not in first.parameter_values
+    ]
+    rate_kernel = compile_expression_kernel(
+        first.rate_expressions,
+        slot_names=[name for _, name in component_slots] + varying_parameters,
+        constants=shared_parameters,
+    )
+    local_slot_indices = first.local_to_global_indices[
+        torch.tensor([local_idx for local_idx, _ in component_slots], dtype=torch.long, device=device)
+    ]
+    parameter_slots = torch.tensor(
+        [[member.parameter_values[name] for name in varying_parameters] for member in members],
+        dtype=dtype,
+        device=device,
+    ).reshape(len(members), len(varying_parameters))
+
+    if all(torch.equal(member.stoich_matrix, first.stoich_matrix) for member in members[1:]):
+        stoich_matrix = first.stoich_matrix
+    else:
+        stoich_matrix = torch.stack([member.stoich_matrix for member in members])
+
+    node_indices = torch.tensor(
+        [member.node_index for member in members], dtype=torch.long, device=device
+    )
+    scatter_index = (
+        node_indices.unsqueeze(1) * n_components
+        + first.local_to_global_indices.unsqueeze(0)
+    ).reshape(-1)
+
+    return UDMBatchGroup(
+        node_indices=node_indices,
+        local_slot_indices=local_slot_indices,
+        parameter_slots=parameter_slots,
+        rate_kernel=rate_kernel,
+        stoich_matrix=stoich_matrix,
+        scatter_index=scatter_index,
+    )
+
+
+def build_udm_batch_runtime(
+    runtimes: Iterable[UDMNodeRuntime],
+    *,
+    n_nodes: int,
+    n_components: int,
+    device: torch.device,
+    dtype: torch.dtype,
+) -> UDMBatchRuntime:
+    """Group per-node UDM runtimes that share a model definition into batches."""
+    grouped: Dict[tuple, List[UDMNodeRuntime]] = {}
+    fixed_component_mask = torch.zeros(n_nodes, n_components, dtype=torch.bool, device=device)
+    for runtime in runtimes:
+        if runtime.node_index < 0 or runtime.node_index >= n_nodes:
+            continue
+        grouped.setdefault(_batch_group_key(runtime), []).append(runtime)
+        if runtime.fixed_component_mask is not None and runtime.fixed_component_mask.numel() == n_components:
+            fixed_component_mask[runtime.node_index] = runtime.fixed_component_mask
+
+    groups = [
+        _build_batch_group(members, n_components=n_components, device=device, dtype=dtype)
+        for members in grouped.values()
+    ]
+    scatter_index = (
+        torch.cat([group.scatter_index for group in groups])
+        if groups
+        else torch.empty(0, dtype=torch.long, device=device)
+    )
+    return UDMBatchRuntime(
+        groups=groups,
+        scatter_index=scatter_index,
+        fixed_component_mask=fixed_component_mask,
+        has_fixed_components=bool(fixed_component_mask.any().item()),
+    )
@@ -1,17 +1,17 @@
-from typing import Any, Callable, List
+from typing import Any, Callable, List, Optional
 
 import torch
 
-from .udm_engine import UDMNodeRuntime
+from .udm_engine import UDMBatchRuntime, UDMNodeRuntime
 
 
 def udm_ode_balance(
     t: float,
     y_extended: torch.Tensor,
     m: int,
-    prop_a: torch.Tensor,
-    prop_b: torch.Tensor,
-    Q_out: torch.Tensor,
+    prop_a: Optional[torch.Tensor],
+    prop_b: Optional[torch.Tensor],
+    Q_out: Optional[torch.Tensor],
     compute_mask: torch.Tensor,
     udm_mask: torch.Tensor,
     udm_runtime_payload: List[UDMNodeRuntime],
@@ -19,6 +19,7 @@ def udm_ode_balance(
     *,
     balance_param: Callable[[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor], Any],
     balance_param_sparse: Callable[[torch.Tensor, dict], Any],
+    udm_batch_runtime: Optional[UDMBatchRuntime] = None,
 ) -> torch.Tensor:
     _ = t
     _ = m
@@ -39,30 +40,35 @@ def udm_ode_balance(
     dilution_term = -y * delta_Q.unsqueeze(-1) / V_liq.unsqueeze(-1)
     concentration_change = delta_m / V_liq.unsqueeze(-1) + dilution_term
 
-    udm_reaction_change = torch.zeros_like(concentration_change)
-    for runtime in udm_runtime_payload:
-        node_idx = runtime.node_index
-        if node_idx < 0 or node_idx >= y.shape[0]:
-            continue
-        if udm_mask is not None and not bool(udm_mask[node_idx].item()):
-            continue
-        reaction = runtime.evaluate_reaction(y[node_idx])
-        udm_reaction_change[node_idx, :] = reaction
+    if udm_batch_runtime is not None:
+        concentration_change = concentration_change + udm_batch_runtime.evaluate_reaction(y)
+        # Freeze configured component rows by forcing dC/dt = 0.
+        concentration_change = udm_batch_runtime.apply_fixed_components(concentration_change)
+    else:
+        udm_reaction_change = torch.zeros_like(concentration_change)
+        for runtime in udm_runtime_payload:
+            node_idx = runtime.node_index
+            if node_idx < 0 or node_idx >= y.shape[0]:
+                continue
+            if udm_mask is not None and not bool(udm_mask[node_idx].item()):
+                continue
+            reaction = runtime.evaluate_reaction(y[node_idx])
+            udm_reaction_change[node_idx, :] = reaction
 
-    concentration_change = concentration_change + udm_reaction_change
+        concentration_change = concentration_change + udm_reaction_change
 
-    # Freeze configured component rows by forcing dC/dt = 0.
-    for runtime in udm_runtime_payload:
-        node_idx = runtime.node_index
-        if node_idx < 0 or node_idx >= concentration_change.shape[0]:
-            continue
-        if udm_mask is not None and not bool(udm_mask[node_idx].item()):
-            continue
-        fixed_mask = runtime.fixed_component_mask
-        if fixed_mask is None or fixed_mask.numel() == 0:
-            continue
-        if bool(fixed_mask.any().item()):
-            concentration_change[node_idx, fixed_mask] = 0.0
+        # Freeze configured component rows by forcing dC/dt = 0.
+        for runtime in udm_runtime_payload:
+            node_idx = runtime.node_index
+            if node_idx < 0 or node_idx >= concentration_change.shape[0]:
+                continue
+            if udm_mask is not None and not bool(udm_mask[node_idx].item()):
+                continue
+            fixed_mask = runtime.fixed_component_mask
+            if fixed_mask is None or fixed_mask.numel() == 0:
+                continue
+            if bool(fixed_mask.any().item()):
+                concentration_change[node_idx, fixed_mask] = 0.0
 
     mask_expanded = compute_mask.unsqueeze(-1).expand_as(concentration_change)
     dy_extended[:, :-1] = torch.where(
@@ -25,6 +25,7 @@ from .models import (
     CalculationParameters
 )
 from .exceptions import InvalidInputError, DimensionMismatchError
+from .transport import transport_state_bytes
 
 
 def validate_tensor_dimensions(tensors: Dict[str, torch.Tensor]) -> None:
@@ -67,6 +68,24 @@ def validate_tensor_dimensions(tensors: Dict[str, torch.Tensor]) -> None:
                     f"{prop_name} shape {tensors[prop_name].shape} doesn't match expected {expected_shape}"
                 )
 
+    # Check edge bundle dimensions
+    bundle = tensors.get('sparse_bundle')
+    if bundle is not None:
+        n_edges = bundle['src'].shape[0]
+        expected = {
+            'dst': (n_edges,),
+            'q': (n_edges,),
+            'a': (n_edges, n_components),
+            'b': (n_edges, n_components),
+            'delta_Q': (n_nodes,),
+        }
+        for name, expected_shape in expected.items():
+            if tuple(bundle[name].shape) != expected_shape:
+                raise DimensionMismatchError(
+                    f"sparse_bundle['{name}'] shape {tuple(bundle[name].shape)} "
+                    f"doesn't match expected {expected_shape}"
+                )
+
 
 def convert_flowchart_json_to_input(flowchart_data: Dict[str, Any]) -> MaterialBalanceInput:
     """将流程图JSON数据转换为MaterialBalanceInput格式。
@@ -283,18 +302,18 @@ def estimate_memory_usage(input_data: MaterialBalanceInput) -> Dict[str, float]:
         Dict: 以MB为单位的内存使用估算
     """
     n_nodes = len(input_data.nodes)
+    n_edges = len(input_data.edges)
     n_components = len(input_data.nodes[0].initial_concentrations)
     n_steps = int(input_data.parameters.hours * input_data.parameters.steps_per_hour) + 1
     
     # Estimate tensor sizes (float32 = 4 bytes)
     bytes_per_float = 4
     
-    # Input tensors
+    # Input tensors; transport is held as edge lists, O(E * n_components)
     input_memory = (
         n_nodes * bytes_per_float +  # V_liq
         n_nodes * n_components * bytes_per_float +  # x0
-        n_nodes * n_nodes * bytes_per_float +  # Q_out
-        2 * n_nodes * n_nodes * n_components * bytes_per_float  # prop_a, prop_b
+        transport_state_bytes(n_nodes, n_edges, n_components, bytes_per_float)
     )
     
     # Result tensor
@@ -310,6 +329,7 @@ def estimate_memory_usage(input_data: MaterialBalanceInput) -> Dict[str, float]:
         'result_tensor_mb': result_mb,
         'total_estimated_mb': total_mb,
         'n_nodes': n_nodes,
+        'n_edges': n_edges,
         'n_components': n_components,
         'n_steps': n_steps
     }
@@ -1,9 +1,10 @@
 ﻿import uuid
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Literal, Optional
 from enum import Enum
 
 from pydantic import EmailStr, Field as PydanticField, validator
+from pydantic.json_schema import SkipJsonSchema
 from sqlmodel import Field, Relationship, SQLModel, Column, JSON
 
 
@@ -77,6 +78,10 @@ class User(UserBase, table=True):
     udm_hybrid_configs: list["UDMHybridConfig"] = Relationship(back_populates="owner", cascade_delete=True)
     udm_flowcharts: list["UDMFlowChart"] = Relationship(back_populates="owner", cascade_delete=True)
     udm_jobs: list["UDMJob"] = Relationship(back_populates="owner", cascade_delete=True)
+    # 参数扫描任务
+    scenario_sweep_jobs: list["ScenarioSweepJob"] = Relationship(back_populates="owner", cascade_delete=True)
+    # 计算任务队列
+    calculation_queue_entries: list["CalculationQueueEntry"] = Relationship(back_populates="owner", cascade_delete=True)
 
 
 # Properties to return via API, id is always required
@@ -209,6 +214,21 @@ class SolverMethod(str, Enum):
     euler = "euler"
     rk4 = "rk4"
     adaptive_heun = "adaptive_heun"
+    bdf = "bdf"
+    rosenbrock = "rosenbrock"
+
+
+class RHSBackend(str, Enum):
+    """ODE右端函数执行后端"""
+    eager = "eager"
+    torchscript = "torchscript"
+    inductor = "inductor"
+
+
+class ProfileInterpolation(str, Enum):
+    """时间序列插值方式"""
+    linear = "linear"
+    step = "step"
 
 
 class HybridUDMVariableMapItem(SQLModel):
@@ -374,6 +394,66 @@ class TimeSegment(SQLModel):
         return v
 
 
+class EdgeProfileFactor(SQLModel):
+    """边参数系数时间序列（与 hours 等长）。"""
+
+    a: Optional[List[float]] = Field(default=None, description="系数 a 时间序列")
+    b: Optional[List[float]] = Field(default=None, description="系数 b 时间序列")
+
+
+class EdgeProfile(SQLModel):
+    """边流量/系数时间序列，在 ODE 右端函数内插值，无需按时段重启积分。"""
+
+    hours: List[float] = Field(description="时间节点 (小时)，严格递增")
+    flow: Optional[List[float]] = Field(default=None, description="流量时间序列 (m³/h)")
+    factors: Dict[str, EdgeProfileFactor] = Field(
+        default_factory=dict, description="系数时间序列（键为参数名）"
+    )
+    interpolation: ProfileInterpolation = Field(
+        default=ProfileInterpolation.linear, description="插值方式：linear 分段线性，step 阶跃"
+    )
+    period_hours: Optional[float] = Field(
+        default=None, gt=0, description="重复周期 (小时)，如 24 表示日变化曲线"
+    )
+
+    @validator("hours")
+    def validate_hours(cls, v):
+        if not v:
+            raise ValueError("Profile hours cannot be empty")
+        if v[0] < 0:
+            raise ValueError("Profile hours must be >= 0")
+        if any(later <= earlier for earlier, later in zip(v, v[1:], strict=False)):
+            raise ValueError("Profile hours must be strictly increasing")
+        return v
+
+    @validator("flow")
+    def validate_flow(cls, v, values):
+        hours = values.get("hours")
+        if v is not None and hours is not None:
+            if len(v) != len(hours):
+                raise ValueError("Profile flow must have one value per hour")
+            if any(flow < 0 for flow in v):
+                raise ValueError("Profile flow must be >= 0")
+        return v
+
+    @validator("factors")
+    def validate_factors(cls, v, values):
+        hours = values.get("hours")
+        if hours is not None:
+            for name, factor in v.items():
+                for series in (factor.a, factor.b):
+                    if series is not None and len(series) != len(hours):
+                        raise ValueError(f"Profile factor {name} must have one value per hour")
+        return v
+
+    @validator("period_hours")
+    def validate_period(cls, v, values):
+        hours = values.get("hours")
+        if v is not None and hours and hours[-1] >= v:
+            raise ValueError("Profile hours must lie within one period")
+        return v
+
+
 class CalculationParameters(SQLModel):
     """计算参数"""
     hours: float = Field(gt=0, le=1000, default=4.0, description="模拟时间 (小时)")
@@ -383,9 +463,33 @@ class CalculationParameters(SQLModel):
     max_iterations: int = Field(gt=0, le=100000, default=1000, description="最大迭代次数")
     max_memory_mb: int = Field(gt=0, le=10000, default=1000, description="最大内存使用 (MB)")
     sampling_interval_hours: Optional[float] = Field(default=None, description="采样间隔 (小时)，用于数据存储优化")
+    rhs_backend: RHSBackend = Field(default=RHSBackend.eager, description="右端函数执行后端（torchscript/inductor 为编译加速）")
 
 
 # Input model for Material Balance calculation
+class WarmStartState(SQLModel):
+    """热启动初始状态：已完成任务最后时刻的节点体积与浓度"""
+    source_job_id: str = Field(description="来源任务ID")
+    start_hour: float = Field(ge=0, description="来源任务的结束时刻 (小时)，新任务从该时刻继续")
+    node_ids: List[str] = Field(description="节点ID列表")
+    parameter_names: List[str] = Field(description="组分名称列表")
+    volumes: List[float] = Field(description="各节点体积")
+    concentrations: List[List[float]] = Field(description="各节点组分浓度 [节点, 组分]")
+
+    @validator("concentrations")
+    def validate_shape(cls, v, values):
+        node_ids = values.get("node_ids")
+        parameter_names = values.get("parameter_names")
+        volumes = values.get("volumes")
+        if node_ids is None or parameter_names is None or volumes is None:
+            return v
+        if len(volumes) != len(node_ids) or len(v) != len(node_ids):
+            raise ValueError("Warm start state needs one volume and one concentration row per node")
+        if any(len(row) != len(parameter_names) for row in v):
+            raise ValueError("Warm start concentrations must have one value per component")
+        return v
+
+
 class MaterialBalanceInput(SQLModel):
     """物料平衡计算输入数据模型"""
     nodes: List[NodeData] = Field(description="节点数据列表")
@@ -394,10 +498,22 @@ class MaterialBalanceInput(SQLModel):
     time_segments: List[TimeSegment] = Field(
         default_factory=list, description="多时段边参数覆盖配置"
     )
+    edge_profiles: Dict[str, EdgeProfile] = Field(
+        default_factory=dict, description="边参数时间序列（键为边ID）"
+    )
     hybrid_config: Optional[HybridUDMConfig] = Field(
         default=None, description="Hybrid UDM 配置（可选）"
     )
     original_flowchart_data: Optional[Dict[str, Any]] = Field(default=None, description="原始流程图数据，用于保留原始参数名称")
+    warm_start_from_job_id: Optional[str] = Field(
+        default=None, description="热启动：以该任务的最终状态作为反应器节点的初始状态"
+    )
+    # 仅由服务端解析：不出现在 API 文档与 model_dump 中，客户端传入的值在提交时被丢弃，只随队列载荷传给工作进程
+    warm_start_state: SkipJsonSchema[Optional[WarmStartState]] = Field(
+        default=None,
+        exclude=True,
+        description="热启动初始状态（提交任务时由 warm_start_from_job_id 解析）",
+    )
     
     @validator('nodes')
     def validate_nodes(cls, v):
@@ -437,6 +553,17 @@ class MaterialBalanceInput(SQLModel):
         
         return v
 
+    @validator('edge_profiles')
+    def validate_edge_profiles(cls, v, values):
+        if 'edges' not in values:
+            return v
+
+        edge_ids = {edge.edge_id for edge in values['edges']}
+        for edge_id in v:
+            if edge_id not in edge_ids:
+                raise ValueError(f"Edge profile references unknown edge {edge_id}")
+        return v
+
 
 # Result models for Material Balance calculation
 class MaterialBalanceResult(SQLModel):
@@ -475,6 +602,9 @@ class MaterialBalanceResultSummary(SQLModel):
     parameter_change_event_count: Optional[int] = Field(
         default=None, description="参数变更事件总数"
     )
+    profile: Optional[Dict[str, Any]] = Field(
+        default=None, description="求解器性能剖析（RHS调用、步数、分项耗时、峰值内存）"
+    )
     error_message: Optional[str] = Field(default=None, description="错误信息")
 
 
@@ -497,6 +627,33 @@ class MaterialBalanceTimeSeriesResponse(SQLModel):
     pagination: Dict[str, Any] = Field(description="分页信息")
 
 
+class ResultExportFormat(str, Enum):
+    """时间序列导出格式"""
+    ndjson = "ndjson"
+    csv = "csv"
+    arrow = "arrow"
+
+
+class ResultDownsampleMethod(str, Enum):
+    """导出时的降采样方法"""
+    lttb = "lttb"
+    minmax = "minmax"
+
+
+class MaterialBalanceExportQuery(SQLModel):
+    """时间序列流式导出参数"""
+    format: ResultExportFormat = Field(default=ResultExportFormat.ndjson, description="导出格式")
+    start_time: Optional[float] = Field(default=None, description="开始时间 (小时)")
+    end_time: Optional[float] = Field(default=None, description="结束时间 (小时)")
+    node_ids: Optional[List[str]] = Field(default=None, description="指定节点ID列表")
+    edge_ids: Optional[List[str]] = Field(default=None, description="指定边ID列表")
+    parameters: Optional[List[str]] = Field(default=None, description="指定参数名列表")
+    target_points: Optional[int] = Field(default=None, ge=3, description="降采样目标点数")
+    downsample: ResultDownsampleMethod = Field(
+        default=ResultDownsampleMethod.lttb, description="降采样方法"
+    )
+
+
 # Database model for Material Balance Job
 class MaterialBalanceJob(SQLModel, table=True):
     """物料平衡计算任务数据库模型"""
@@ -508,6 +665,7 @@ class MaterialBalanceJob(SQLModel, table=True):
     result_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算结果")
     summary_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算摘要数据，用于快速查询和显示")
     error_message: Optional[str] = Field(default=None, description="错误信息")
+    input_fingerprint: Optional[str] = Field(default=None, index=True, max_length=64, description="输入指纹：任务类型与计算输入的 SHA-256，用于复用相同输入的结果")
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
     started_at: Optional[datetime] = Field(default=None, description="开始计算时间")
     completed_at: Optional[datetime] = Field(default=None, description="完成时间")
@@ -572,6 +730,11 @@ class MaterialBalanceJobInputDataResponse(SQLModel):
     status: MaterialBalanceJobStatus = Field(description="任务状态")
 
 
+class CalculationJobExtendRequest(SQLModel):
+    """延续计算请求：从已完成任务的最终状态继续模拟"""
+    hours: float = Field(gt=0, le=1000, description="继续模拟的时长 (小时)")
+
+
 # ============================================================================
 # ASM1slim 相关模型 - 复用物料平衡的数据模型，只定义任务状态枚举
 # ============================================================================
@@ -620,6 +783,7 @@ class ASM1SlimJob(SQLModel, table=True):
     result_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算结果")
     summary_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算摘要数据，用于快速查询和显示")
     error_message: Optional[str] = Field(default=None, description="错误信息")
+    input_fingerprint: Optional[str] = Field(default=None, index=True, max_length=64, description="输入指纹：任务类型与计算输入的 SHA-256，用于复用相同输入的结果")
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
     started_at: Optional[datetime] = Field(default=None, description="开始计算时间")
     completed_at: Optional[datetime] = Field(default=None, description="完成时间")
@@ -755,6 +919,7 @@ class ASM1Job(SQLModel, table=True):
     result_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算结果")
     summary_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算摘要数据，用于快速查询和显示")
     error_message: Optional[str] = Field(default=None, description="错误信息")
+    input_fingerprint: Optional[str] = Field(default=None, index=True, max_length=64, description="输入指纹：任务类型与计算输入的 SHA-256，用于复用相同输入的结果")
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
     started_at: Optional[datetime] = Field(default=None, description="开始计算时间")
     completed_at: Optional[datetime] = Field(default=None, description="完成时间")
@@ -873,6 +1038,7 @@ class ASM3Job(SQLModel, table=True):
     result_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算结果")
     summary_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算摘要数据，用于快速查询和显示")
     error_message: Optional[str] = Field(default=None, description="错误信息")
+    input_fingerprint: Optional[str] = Field(default=None, index=True, max_length=64, description="输入指纹：任务类型与计算输入的 SHA-256，用于复用相同输入的结果")
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
     started_at: Optional[datetime] = Field(default=None, description="开始计算时间")
     completed_at: Optional[datetime] = Field(default=None, description="完成时间")
@@ -1271,6 +1437,7 @@ class UDMJob(SQLModel, table=True):
     result_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算结果")
     summary_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="计算摘要数据")
     error_message: Optional[str] = Field(default=None, description="错误信息")
+    input_fingerprint: Optional[str] = Field(default=None, index=True, max_length=64, description="输入指纹：任务类型与计算输入的 SHA-256，用于复用相同输入的结果")
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
     started_at: Optional[datetime] = Field(default=None, description="开始计算时间")
     completed_at: Optional[datetime] = Field(default=None, description="完成时间")
@@ -1307,4 +1474,127 @@ class UDMJobInputDataResponse(SQLModel):
     status: MaterialBalanceJobStatus = Field(description="任务状态")
 
 
+# ========== Scenario Sweep Models ==========
+
+class ScenarioSweepMode(str, Enum):
+    """参数扫描采样方式"""
+    grid = "grid"
+    latin_hypercube = "latin_hypercube"
+
+
+class ScenarioSweepParameter(SQLModel):
+    """单个扫描参数（扫描维度）"""
+    target: Literal["node", "edge"] = Field(description="参数所属对象类型")
+    target_id: str = Field(description="节点ID或边ID")
+    name: str = Field(
+        description=(
+            "参数名：节点为动力学参数名（如 u_H、mu_H 或 UDM 参数名）；"
+            "边为 flow_rate、a.<组分名> 或 b.<组分名>"
+        )
+    )
+    values: Optional[List[float]] = Field(default=None, description="网格扫描取值列表（grid 模式）")
+    low: Optional[float] = Field(default=None, description="采样下限（latin_hypercube 模式）")
+    high: Optional[float] = Field(default=None, description="采样上限（latin_hypercube 模式）")
+
+    @property
+    def label(self) -> str:
+        return f"{self.target_id}.{self.name}"
+
+
+class ScenarioSweepRequest(SQLModel):
+    """参数扫描请求：一个流程图 + 参数网格/拉丁超立方采样"""
+    flowchart_data: Dict[str, Any] = Field(description="流程图数据，与 calculate-from-flowchart 相同")
+    parameters: List[ScenarioSweepParameter] = Field(description="扫描参数列表")
+    mode: ScenarioSweepMode = Field(default=ScenarioSweepMode.grid, description="采样方式")
+    samples: Optional[int] = Field(default=None, gt=0, description="拉丁超立方采样数量")
+    seed: Optional[int] = Field(default=None, description="拉丁超立方随机种子")
+    include_trajectories: bool = Field(default=False, description="是否保存每个变体的完整时间序列")
+
+    @validator("parameters")
+    def validate_parameters(cls, v, values):
+        if not v:
+            raise ValueError("At least one sweep parameter is required")
+        labels = [param.label for param in v]
+        if len(labels) != len(set(labels)):
+            raise ValueError("Sweep parameters must be unique")
+        return v
+
+
+class ScenarioSweepJob(SQLModel, table=True):
+    """参数扫描任务数据库模型"""
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    job_id: str = Field(unique=True, index=True, description="任务唯一标识符")
+    job_name: str = Field(description="任务名称，格式：流程图名称+年月日时分")
+    status: MaterialBalanceJobStatus = Field(default=MaterialBalanceJobStatus.pending, description="任务状态")
+    variant_count: int = Field(default=0, description="变体数量")
+    input_data: dict = Field(sa_column=Column(JSON), description="输入数据（流程图与扫描定义）")
+    result_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="各变体结果")
+    summary_data: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="变体汇总表")
+    error_message: Optional[str] = Field(default=None, description="错误信息")
+    input_fingerprint: Optional[str] = Field(default=None, index=True, max_length=64, description="输入指纹：任务类型与计算输入的 SHA-256，用于复用相同输入的结果")
+    created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
+    started_at: Optional[datetime] = Field(default=None, description="开始计算时间")
+    completed_at: Optional[datetime] = Field(default=None, description="完成时间")
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE"
+    )
+    owner: User | None = Relationship(back_populates="scenario_sweep_jobs")
+
+
+class ScenarioSweepJobPublic(SQLModel):
+    """参数扫描任务公开信息"""
+    id: uuid.UUID
+    job_id: str
+    job_name: str
+    status: MaterialBalanceJobStatus
+    variant_count: int
+    created_at: datetime
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    error_message: Optional[str]
+    summary_data: Optional[Dict[str, Any]] = Field(default=None, description="变体汇总表")
+
+
+class ScenarioSweepJobsPublic(SQLModel):
+    """参数扫描任务列表"""
+    data: List[ScenarioSweepJobPublic]
+    count: int
 
+
+class ScenarioSweepVariantResponse(SQLModel):
+    """单个变体结果"""
+    job_id: str = Field(description="扫描任务ID")
+    variant_index: int = Field(description="变体序号")
+    overrides: Dict[str, float] = Field(description="该变体的参数取值")
+    final_values: Dict[str, Dict[str, float]] = Field(description="各节点最终值")
+    timestamps: Optional[List[float]] = Field(default=None, description="时间点")
+    node_data: Optional[Dict[str, Dict[str, List[float]]]] = Field(default=None, description="各节点时间序列")
+
+
+# ========== Calculation Queue Models ==========
+
+class CalculationQueueStatus(str, Enum):
+    """计算队列条目状态（完成后条目即删除，结果以各任务表为准）"""
+    queued = "queued"
+    running = "running"
+
+
+class CalculationQueueEntry(SQLModel, table=True):
+    """计算任务队列：由独立工作进程按优先级领取执行"""
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    job_id: str = Field(unique=True, index=True, description="对应任务表的任务ID")
+    job_kind: str = Field(description="任务类型：material_balance/asm1/asm1slim/asm3/udm/scenario_sweep")
+    status: CalculationQueueStatus = Field(default=CalculationQueueStatus.queued, index=True, description="队列状态")
+    priority: int = Field(default=0, description="优先级，数值越大越先执行")
+    max_concurrency: int = Field(default=1, description="该用户同时运行的任务数上限")
+    payload: dict = Field(sa_column=Column(JSON), description="计算输入（MaterialBalanceInput）")
+    options: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="服务调用参数")
+    worker_id: Optional[str] = Field(default=None, description="执行该任务的工作进程（主机名:PID）")
+    created_at: datetime = Field(default_factory=datetime.now, description="入队时间")
+    started_at: Optional[datetime] = Field(default=None, description="开始执行时间")
+    heartbeat_at: Optional[datetime] = Field(default=None, description="工作进程最近一次心跳时间")
+    attempts: int = Field(default=0, description="因工作进程退出而重新排队续算的次数")
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE"
+    )
+    owner: User | None = Relationship(back_populates="calculation_queue_entries")
@@ -0,0 +1,709 @@
+"""Microbenchmarks for the material balance solver hot paths.
+
+Run from backend directory with virtual environment activated:
+    python -m app.scripts.benchmark_material_balance udm-rhs --reactors 20
+    python -m app.scripts.benchmark_material_balance udm-batch --reactors 40
+    python -m app.scripts.benchmark_material_balance stiff-solver --reactors 5 --hours 24
+    python -m app.scripts.benchmark_material_balance steady-state --template asm1slim --hours 240
+    python -m app.scripts.benchmark_material_balance scenario-sweep --reactors 3 --variants 32
+    python -m app.scripts.benchmark_material_balance result-conversion --reactors 48 --hours 120
+    python -m app.scripts.benchmark_material_balance fused-rhs --reactors 20
+    python -m app.scripts.benchmark_material_balance compiled-rhs --template asm1 --backend torchscript
+    python -m app.scripts.benchmark_material_balance prepared-kinetics --reactors 20
+    python -m app.scripts.benchmark_material_balance sparse-transport --reactors 298
+    python -m app.scripts.benchmark_material_balance edge-profiles --template asm1slim --reactors 5 --hours 240
+    python -m app.scripts.benchmark_material_balance runtime-cache --reactors 20 --hours 1
+    python -m app.scripts.benchmark_material_balance segment-snapshots --template asm1slim --reactors 5 --hours 384
+    python -m app.scripts.benchmark_material_balance --list
+"""
+
+import argparse
+import ast
+import math
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+
+from app.core.config import settings
+from app.material_balance.asm import asm1, asm1slim, asm3
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.runtime_cache import RuntimeCache
+from app.material_balance.segment_snapshots import SegmentSnapshotStore
+from app.material_balance.sweep import (
+    apply_variant,
+    generate_variants,
+    run_scenario_sweep,
+)
+from app.material_balance.transport import dense_edge_tensors
+from app.material_balance.udm_engine import UDMBatchRuntime, UDMNodeRuntime
+from app.material_balance.udm_ode import udm_ode_balance
+from app.models import (
+    CalculationParameters,
+    EdgeData,
+    EdgeProfile,
+    MaterialBalanceInput,
+    NodeData,
+    ScenarioSweepMode,
+    ScenarioSweepParameter,
+    TimeSegment,
+)
+from app.services.result_store import save_result
+from app.services.udm_expression import _evaluate_ast
+from app.services.udm_seed_templates import get_udm_seed_template
+
+
+def _time_calls(fn: Callable[[], Any], *, repeat: int, warmup: int = 3) -> float:
+    """Return calls per second of ``fn`` over ``repeat`` timed calls."""
+    for _ in range(warmup):
+        fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.perf_counter() - started
+    return repeat / elapsed if elapsed > 0 else float("inf")
+
+
+def _print_comparison(title: str, before: float, after: float, unit: str) -> None:
+    print(title)
+    print(f"  before: {before:12.3f} {unit}")
+    print(f"  after:  {after:12.3f} {unit}")
+    print(f"  speedup: {after / before:.2f}x" if before > 0 else "  speedup: n/a")
+
+
+# Native ASM3 parameter order with the Gujer et al. (1999) values at 20 C; the
+# seed template only carries 22 of them.
+_ASM3_DEFAULTS: Dict[str, float] = {
+    "k_H": 3.0, "K_X": 1.0, "k_STO": 5.0, "ny_NOX": 0.6, "K_O2": 0.2, "K_NOX": 0.5,
+    "K_S": 2.0, "K_STO": 1.0, "mu_H": 2.0, "K_NH4": 0.01, "K_ALK": 0.1, "b_HO2": 0.2,
+    "b_HNOX": 0.1, "b_STOO2": 0.2, "b_STONOX": 0.1, "mu_A": 1.0, "K_ANH4": 1.0,
+    "K_AO2": 0.5, "K_AALK": 0.5, "b_AO2": 0.15, "b_ANOX": 0.05, "f_SI": 0.0,
+    "Y_STOO2": 0.85, "Y_STONOX": 0.80, "Y_HO2": 0.63, "Y_HNOX": 0.54, "Y_A": 0.24,
+    "f_XI": 0.2, "i_NSI": 0.01, "i_NSS": 0.03, "i_NXI": 0.02, "i_NXS": 0.04,
+    "i_NBM": 0.07, "i_SSXI": 0.75, "i_SSXS": 0.75, "i_SSBM": 0.90, "i_SSSTO": 0.60,
+}
+
+
+def build_chain_input(
+    *,
+    reactors: int,
+    model: str = "udm",
+    template_key: str = "asm1",
+    hours: float = 1.0,
+    steps_per_hour: int = 60,
+    flow_rate: float = 10.0,
+    solver_method: str = "rk4",
+) -> MaterialBalanceInput:
+    """Build influent -> N reactors in series -> effluent from a seed template.
+
+    ``model`` selects the reactor node type: ``udm`` binds the template as a
+    UDM model, ``asm1``/``asm1slim``/``asm3`` use the native kinetics with the
+    template's default parameters (same parameter order; ASM3 parameters the
+    template lacks come from ``_ASM3_DEFAULTS``).
+    """
+    template = get_udm_seed_template(template_key)
+    components = list(template["components"])
+    component_names = [str(component["name"]) for component in components]
+    initial = [float(component.get("default_value") or 0.0) for component in components]
+    parameter_values = {
+        str(param["name"]): float(param.get("default_value") or 0.0)
+        for param in template["parameters"]
+    }
+
+    nodes: List[NodeData] = [
+        NodeData(
+            node_id="influent",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=initial,
+            is_inlet=True,
+        )
+    ]
+    for index in range(reactors):
+        if model == "udm":
+            model_fields: Dict[str, Any] = {
+                "udm_component_names": component_names,
+                "udm_processes": list(template["processes"]),
+                "udm_parameter_values": dict(parameter_values),
+                "udm_model_id": template_key,
+                "udm_model_version": 1,
+            }
+        elif model == "asm3":
+            model_fields = {
+                "asm3_parameters": [
+                    parameter_values.get(name, default) for name, default in _ASM3_DEFAULTS.items()
+                ]
+            }
+        else:
+            model_fields = {f"{model}_parameters": list(parameter_values.values())}
+        nodes.append(
+            NodeData(
+                node_id=f"reactor_{index + 1}",
+                node_type=model,
+                initial_volume=100.0,
+                initial_concentrations=initial,
+                **model_fields,
+            )
+        )
+    nodes.append(
+        NodeData(
+            node_id="effluent",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=initial,
+            is_outlet=True,
+        )
+    )
+
+    edges = [
+        EdgeData(
+            edge_id=f"edge_{index + 1}",
+            source_node_id=nodes[index].node_id,
+            target_node_id=nodes[index + 1].node_id,
+            flow_rate=flow_rate,
+        )
+        for index in range(len(nodes) - 1)
+    ]
+
+    return MaterialBalanceInput(
+        nodes=nodes,
+        edges=edges,
+        parameters=CalculationParameters(
+            hours=hours,
+            steps_per_hour=steps_per_hour,
+            solver_method=solver_method,
+        ),
+        original_flowchart_data={
+            "customParameters": [{"name": name, "label": name} for name in component_names]
+        },
+    )
+
+
+@dataclass
+class _InterpretedUDMRuntime:
+    """Pre-compiler reference: walks the expression AST on every RHS call."""
+
+    runtime: UDMNodeRuntime
+    parsed: List[ast.AST]
+
+    @property
+    def node_index(self) -> int:
+        return self.runtime.node_index
+
+    @property
+    def fixed_component_mask(self) -> torch.Tensor:
+        return self.runtime.fixed_component_mask
+
+    def evaluate_reaction(self, concentrations: torch.Tensor) -> torch.Tensor:
+        env: Dict[str, Any] = {}
+        for local_idx, component_name in enumerate(self.runtime.local_component_names):
+            canonical_idx = int(self.runtime.local_to_global_indices[local_idx].item())
+            env[component_name] = concentrations[canonical_idx]
+        env.update(self.runtime.parameter_values)
+        rates = [
+            torch.as_tensor(_evaluate_ast(tree, env), dtype=concentrations.dtype)
+            for tree in self.parsed
+        ]
+        local_reaction = torch.matmul(
+            self.runtime.stoich_matrix.transpose(0, 1), torch.stack(rates)
+        )
+        global_reaction = torch.zeros_like(concentrations)
+        global_reaction.index_add_(0, self.runtime.local_to_global_indices, local_reaction)
+        return global_reaction
+
+
+def _udm_rhs(
+    tensors: Dict[str, Any],
+    runtimes: List[Any],
+    calculator: MaterialBalanceCalculator,
+    batch_runtime: Optional[UDMBatchRuntime] = None,
+) -> Callable[[], Any]:
+    y_extended = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+
+    def _call() -> Any:
+        return udm_ode_balance(
+            0.0,
+            y_extended,
+            y_extended.shape[1] - 1,
+            None,
+            None,
+            None,
+            tensors["compute_mask"],
+            tensors["udm_mask"],
+            runtimes,
+            tensors["sparse_bundle"],
+            balance_param=calculator._balance_param,
+            balance_param_sparse=calculator._balance_param_sparse,
+            udm_batch_runtime=batch_runtime,
+        )
+
+    return _call
+
+
+def benchmark_udm_rhs(args: argparse.Namespace) -> None:
+    """RHS evaluations per second: AST interpreter vs compiled UDM kernels."""
+    calculator = MaterialBalanceCalculator()
+    input_data = build_chain_input(reactors=args.reactors, template_key=args.template)
+    tensors = calculator._convert_to_tensors(input_data)
+    compiled = tensors["udm_runtime_payload"]
+    interpreted = [
+        _InterpretedUDMRuntime(
+            runtime=runtime,
+            parsed=[ast.parse(expr, mode="eval") for expr in runtime.rate_expressions],
+        )
+        for runtime in compiled
+    ]
+
+    with torch.no_grad():
+        before = _time_calls(_udm_rhs(tensors, interpreted, calculator), repeat=args.repeat)
+        after = _time_calls(_udm_rhs(tensors, compiled, calculator), repeat=args.repeat)
+    _print_comparison(
+        f"UDM RHS ({args.template}, {args.reactors} reactors)",
+        before,
+        after,
+        "evals/s",
+    )
+
+
+def benchmark_udm_batch(args: argparse.Namespace) -> None:
+    """RHS evaluations per second: per-node UDM loop vs batched groups."""
+    calculator = MaterialBalanceCalculator()
+    for reactors in sorted({max(args.reactors // 4, 1), max(args.reactors // 2, 1), args.reactors}):
+        input_data = build_chain_input(reactors=reactors, template_key=args.template)
+        tensors = calculator._convert_to_tensors(input_data)
+        runtimes = tensors["udm_runtime_payload"]
+        with torch.no_grad():
+            before = _time_calls(_udm_rhs(tensors, runtimes, calculator), repeat=args.repeat)
+            after = _time_calls(
+                _udm_rhs(tensors, runtimes, calculator, tensors["udm_batch_runtime"]),
+                repeat=args.repeat,
+            )
+        _print_comparison(
+            f"UDM RHS per-node vs batched ({args.template}, {reactors} reactors)",
+            before,
+            after,
+            "evals/s",
+        )
+
+
+def _wall_time(fn: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def benchmark_stiff_solver(args: argparse.Namespace) -> None:
+    """Wall time: explicit rk4 at 60 steps/h vs implicit rosenbrock at 1 step/h."""
+    calculator = MaterialBalanceCalculator()
+    for model in ("asm1", "udm"):
+        explicit = build_chain_input(
+            reactors=args.reactors,
+            model=model,
+            template_key=args.template,
+            hours=args.hours,
+            steps_per_hour=60,
+        )
+        implicit = build_chain_input(
+            reactors=args.reactors,
+            model=model,
+            template_key=args.template,
+            hours=args.hours,
+            steps_per_hour=1,
+            solver_method="rosenbrock",
+        )
+        before = _wall_time(partial(calculator.calculate, explicit))
+        after = _wall_time(partial(calculator.calculate, implicit))
+        _print_comparison(
+            f"{model} chain, {args.reactors} reactors, {args.hours:g} h",
+            1.0 / before,
+            1.0 / after,
+            "runs/s",
+        )
+
+
+def benchmark_steady_state(args: argparse.Namespace) -> None:
+    """Wall time: rk4 transient over --hours vs the direct steady-state solve."""
+    calculator = MaterialBalanceCalculator()
+    input_data = build_chain_input(
+        reactors=args.reactors,
+        model=args.template,
+        template_key=args.template,
+        hours=args.hours,
+    )
+    before = _wall_time(lambda: calculator.calculate(input_data))
+    after = _wall_time(lambda: calculator.calculate_steady_state(input_data))
+    _print_comparison(
+        f"{args.template} chain, {args.reactors} reactors, {args.hours:g} h transient",
+        1.0 / before,
+        1.0 / after,
+        "runs/s",
+    )
+
+
+def benchmark_scenario_sweep(args: argparse.Namespace) -> None:
+    """Variants per second: one calculate() per variant vs one batched sweep."""
+    calculator = MaterialBalanceCalculator()
+    input_data = build_chain_input(
+        reactors=args.reactors,
+        model=args.template,
+        template_key=args.template,
+        hours=args.hours,
+    )
+    first_component = input_data.original_flowchart_data["customParameters"][0]["name"]
+    parameters = [
+        ScenarioSweepParameter(target="edge", target_id="edge_1", name="flow_rate", low=5.0, high=20.0),
+        ScenarioSweepParameter(
+            target="edge", target_id="edge_1", name=f"a.{first_component}", low=0.5, high=1.5
+        ),
+    ]
+    variants = generate_variants(
+        parameters, ScenarioSweepMode.latin_hypercube, samples=args.variants, seed=0
+    )
+
+    def _sequential() -> None:
+        for values in variants:
+            calculator.calculate(apply_variant(input_data, parameters, values))
+
+    before = _wall_time(_sequential)
+    after = _wall_time(lambda: run_scenario_sweep(calculator, input_data, parameters, variants))
+    _print_comparison(
+        f"{args.template} chain, {args.reactors} reactors, {len(variants)} variants, {args.hours:g} h",
+        len(variants) / before,
+        len(variants) / after,
+        "variants/s",
+    )
+
+
+def _traced(fn: Callable[[], Any]) -> tuple[float, float]:
+    """Return (wall seconds, peak traced MiB) of one ``fn`` call."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def benchmark_result_conversion(args: argparse.Namespace) -> None:
+    """Result conversion + storage: per-node JSON lists vs the ResultFrame path."""
+    calculator = MaterialBalanceCalculator()
+    input_data = build_chain_input(
+        reactors=args.reactors,
+        model=args.template,
+        template_key=args.template,
+        hours=args.hours,
+    )
+    n_steps = int(args.hours * input_data.parameters.steps_per_hour) + 1
+    width = len(input_data.nodes[0].initial_concentrations) + 1
+    result_tensor = torch.rand(n_steps, len(input_data.nodes), width)
+    calculation_output = {"result_tensor": result_tensor}
+
+    def _convert_and_store(materialize: bool) -> None:
+        result = calculator._convert_results(
+            calculation_output, input_data, "bench", time.time(), materialize=materialize
+        )
+        output_data = {"summary": result.summary}
+        if materialize:
+            output_data.update(
+                timestamps=result.timestamps, node_data=result.node_data, edge_data=result.edge_data
+            )
+            save_result("before", output_data)
+        else:
+            save_result("after", output_data, frame=result.frame)
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        settings.RESULT_STORE_DIR = store_dir
+        before_seconds, before_mib = _traced(lambda: _convert_and_store(True))
+        after_seconds, after_mib = _traced(lambda: _convert_and_store(False))
+
+    print(
+        f"{len(input_data.nodes)} nodes x {width - 1} components x {n_steps} steps "
+        f"(solver output {result_tensor.nbytes / (1024 * 1024):.1f} MiB)"
+    )
+    print(f"  before: {before_seconds:8.3f} s  peak {before_mib:9.1f} MiB")
+    print(f"  after:  {after_seconds:8.3f} s  peak {after_mib:9.1f} MiB")
+    print(f"  speedup: {before_seconds / after_seconds:.2f}x, memory: {before_mib / after_mib:.2f}x less")
+
+
+def _allocations_per_call(fn: Callable[[], Any]) -> int:
+    """Number of tensor allocations made by one ``fn`` call."""
+    fn()
+    with torch.profiler.profile(
+        activities=[torch.profiler.ProfilerActivity.CPU], profile_memory=True
+    ) as prof:
+        fn()
+    return sum(1 for event in prof.events() if event.self_cpu_memory_usage > 0)
+
+
+def benchmark_fused_rhs(args: argparse.Namespace) -> None:
+    """RHS evaluations per second and allocations: per-model UDM RHS vs the fused RHS."""
+    calculator = MaterialBalanceCalculator()
+    input_data = build_chain_input(reactors=args.reactors, template_key=args.template)
+    tensors = calculator._convert_to_tensors(input_data)
+    legacy = _udm_rhs(tensors, tensors["udm_runtime_payload"], calculator, tensors["udm_batch_runtime"])
+
+    fused_fn, _ = calculator._build_ode_function(
+        m=len(input_data.nodes),
+        compute_mask=tensors["compute_mask"],
+        udm_mask=tensors["udm_mask"],
+        udm_runtime_payload=tensors["udm_runtime_payload"],
+        udm_batch_runtime=tensors["udm_batch_runtime"],
+        sparse_bundle=tensors["sparse_bundle"],
+    )
+    y_extended = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+    t = torch.tensor(0.0)
+
+    def fused() -> Any:
+        return fused_fn(t, y_extended)
+
+    before = _time_calls(legacy, repeat=args.repeat)
+    after = _time_calls(fused, repeat=args.repeat)
+    _print_comparison(f"RHS ({args.template}, {args.reactors} reactors)", before, after, "evals/s")
+    print(f"  allocations per RHS: {_allocations_per_call(legacy)} -> {_allocations_per_call(fused)}")
+
+
+def _compiled_rhs(
+    calculator: MaterialBalanceCalculator,
+    tensors: Dict[str, Any],
+    template: str,
+    n_nodes: int,
+    backend: str,
+) -> Callable[[], Any]:
+    """One RHS evaluation at ``t = 0`` from the initial state, built for ``backend``."""
+    ode_fn, _ = calculator._build_ode_function(
+        m=n_nodes,
+        compute_mask=tensors["compute_mask"],
+        **{
+            f"{template}_params": tensors[f"{template}_params"],
+            f"{template}_mask": tensors[f"{template}_mask"],
+        },
+        sparse_bundle=tensors["sparse_bundle"],
+        rhs_backend=backend,
+    )
+    y_extended = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+    return partial(ode_fn, torch.tensor(0.0), y_extended)
+
+
+def benchmark_compiled_rhs(args: argparse.Namespace) -> None:
+    """Per-RHS latency on 5, 20 and 100-node plants: eager vs a compiled backend."""
+    for n_nodes in (5, 20, 100):
+        calculator = MaterialBalanceCalculator()
+        input_data = build_chain_input(
+            reactors=n_nodes - 2, model=args.template, template_key=args.template
+        )
+        tensors = calculator._convert_to_tensors(input_data)
+        rhs = partial(_compiled_rhs, calculator, tensors, args.template, n_nodes)
+
+        build_seconds = _wall_time(partial(rhs, args.backend))
+        before = 1e6 / _time_calls(rhs("eager"), repeat=args.repeat)
+        after = 1e6 / _time_calls(rhs(args.backend), repeat=args.repeat)
+        print(f"{args.template} RHS, {n_nodes} nodes: eager vs {args.backend} (build {build_seconds:.2f} s)")
+        print(f"  before: {before:12.1f} us/eval")
+        print(f"  after:  {after:12.1f} us/eval")
+        print(f"  speedup: {before / after:.2f}x")
+
+
+def benchmark_prepared_kinetics(args: argparse.Namespace) -> None:
+    """Kinetics evaluations per second: parameter math per call vs prepared once."""
+    for name, kinetics in (("asm1slim", asm1slim), ("asm1", asm1), ("asm3", asm3)):
+        calculator = MaterialBalanceCalculator()
+        input_data = build_chain_input(reactors=args.reactors, model=name, template_key=name)
+        tensors = calculator._convert_to_tensors(input_data)
+        rows = tensors[f"{name}_mask"].nonzero().flatten()
+        params = tensors[f"{name}_params"].index_select(0, rows)
+        concentrations = tensors["x0"].index_select(0, rows)
+        prepared = kinetics.prepare(params)
+
+        before = _time_calls(partial(kinetics.reaction, params, concentrations), repeat=args.repeat)
+        after = _time_calls(
+            partial(kinetics.reaction_prepared, prepared, concentrations), repeat=args.repeat
+        )
+        _print_comparison(f"{name} kinetics ({args.reactors} reactors)", before, after, "evals/s")
+
+
+def benchmark_sparse_transport(args: argparse.Namespace) -> None:
+    """Transport state size and RHS evaluations per second: dense N x N tensors vs edge lists."""
+    calculator = MaterialBalanceCalculator()
+    input_data = build_chain_input(reactors=args.reactors, model="default", template_key=args.template)
+    tensors = calculator._convert_to_tensors(input_data)
+    bundle = tensors["sparse_bundle"]
+    n_components = tensors["x0"].shape[1]
+    y_extended = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+    t = torch.tensor(0.0)
+
+    def _rhs(dense: bool) -> Callable[[], Any]:
+        calculator.dense_transport = dense
+        ode_fn, _ = calculator._build_ode_function(
+            m=len(input_data.nodes), compute_mask=tensors["compute_mask"], sparse_bundle=bundle
+        )
+        return lambda: ode_fn(t, y_extended)
+
+    dense_bytes = sum(tensor.nbytes for tensor in dense_edge_tensors(bundle, n_components))
+    sparse_bytes = sum(value.nbytes for value in bundle.values() if isinstance(value, torch.Tensor))
+    title = f"transport, {len(input_data.nodes)} nodes x {n_components} components"
+    print(f"{title}: state {dense_bytes / 1024:.1f} KiB -> {sparse_bytes / 1024:.1f} KiB")
+    before = _time_calls(_rhs(True), repeat=args.repeat)
+    after = _time_calls(_rhs(False), repeat=args.repeat)
+    _print_comparison(f"RHS ({title})", before, after, "evals/s")
+
+
+def benchmark_edge_profiles(args: argparse.Namespace) -> None:
+    """Wall time: a diurnal influent as one segment per hour vs one periodic edge profile."""
+    daily = [10.0 * (1.0 + 0.5 * math.sin(2.0 * math.pi * hour / 24.0)) for hour in range(24)]
+    n_hours = int(args.hours)
+    calculator = MaterialBalanceCalculator()
+    for method in ("rk4", "adaptive_heun"):
+        input_data = build_chain_input(
+            reactors=args.reactors,
+            model=args.template,
+            template_key=args.template,
+            hours=n_hours,
+            solver_method=method,
+        )
+        influent = input_data.edges[0].edge_id
+        segmented = input_data.model_copy(
+            update={
+                "time_segments": [
+                    TimeSegment(
+                        id=f"hour_{hour}",
+                        start_hour=float(hour),
+                        end_hour=float(hour + 1),
+                        edge_overrides={influent: {"flow": daily[hour % 24]}},
+                    )
+                    for hour in range(n_hours)
+                ]
+            }
+        )
+        profiled = input_data.model_copy(
+            update={
+                "edge_profiles": {
+                    influent: EdgeProfile(
+                        hours=[float(hour) for hour in range(24)],
+                        flow=daily,
+                        interpolation="step",
+                        period_hours=24.0,
+                    )
+                }
+            }
+        )
+        before = _wall_time(partial(calculator.calculate, segmented, materialize=False))
+        after = _wall_time(partial(calculator.calculate, profiled, materialize=False))
+        _print_comparison(
+            f"{method}, {args.template} chain, {args.reactors} reactors, "
+            f"{n_hours} segments vs 1 profile",
+            1.0 / before,
+            1.0 / after,
+            "runs/s",
+        )
+
+
+def benchmark_runtime_cache(args: argparse.Namespace) -> None:
+    """Resubmission latency with only ``hours`` changed: cold conversion vs cached runtime."""
+    first = build_chain_input(reactors=args.reactors, template_key=args.template, hours=args.hours)
+    resubmitted = first.model_copy(
+        update={"parameters": first.parameters.model_copy(update={"hours": 2 * args.hours})}
+    )
+    calculator = MaterialBalanceCalculator()
+
+    calculator.runtime_cache = None
+    before = _wall_time(lambda: calculator.calculate(resubmitted, materialize=False))
+    calculator.runtime_cache = RuntimeCache()
+    calculator.calculate(first, materialize=False)
+    after = _wall_time(lambda: calculator.calculate(resubmitted, materialize=False))
+    _print_comparison(
+        f"udm chain ({args.template}), {args.reactors} reactors, resubmitted at {2 * args.hours:g} h",
+        1.0 / before,
+        1.0 / after,
+        "runs/s",
+    )
+    print(f"  cache: {calculator.runtime_cache.stats()}")
+
+
+def benchmark_segment_snapshots(args: argparse.Namespace) -> None:
+    """Rerun after editing the last 48 h segment: full recompute vs resume from snapshots."""
+    n_days = max(int(args.hours // 24), 3)
+    base = build_chain_input(
+        reactors=args.reactors, model=args.template, template_key=args.template, hours=24 * n_days
+    )
+    influent = base.edges[0].edge_id
+    flow = base.edges[0].flow_rate
+
+    def _scenario(tweak: float) -> MaterialBalanceInput:
+        segments = [
+            TimeSegment(id=f"day_{day}", start_hour=24.0 * day, end_hour=24.0 * (day + 1))
+            for day in range(n_days - 2)
+        ]
+        segments.append(
+            TimeSegment(
+                id="tweak",
+                start_hour=24.0 * (n_days - 2),
+                end_hour=24.0 * n_days,
+                edge_overrides={influent: {"flow": flow * tweak}},
+            )
+        )
+        return base.model_copy(update={"time_segments": segments})
+
+    calculator = MaterialBalanceCalculator()
+    calculator.segment_snapshots = None
+    calculator.calculate(_scenario(1.2), materialize=False)
+    before = _wall_time(lambda: calculator.calculate(_scenario(1.5), materialize=False))
+    with tempfile.TemporaryDirectory() as directory:
+        calculator.segment_snapshots = SegmentSnapshotStore(directory)
+        # Baseline run: stores one snapshot per segment
+        calculator.calculate(_scenario(1.2), materialize=False)
+        after = _wall_time(lambda: calculator.calculate(_scenario(1.5), materialize=False))
+        stats = calculator.segment_snapshots.stats()
+    _print_comparison(
+        f"{args.template} chain, {args.reactors} reactors, {n_days - 2} x 24 h baseline + 48 h tweak",
+        1.0 / before,
+        1.0 / after,
+        "runs/s",
+    )
+    print(f"  snapshots: {stats}")
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], None]] = {
+    "udm-rhs": benchmark_udm_rhs,
+    "udm-batch": benchmark_udm_batch,
+    "stiff-solver": benchmark_stiff_solver,
+    "steady-state": benchmark_steady_state,
+    "scenario-sweep": benchmark_scenario_sweep,
+    "result-conversion": benchmark_result_conversion,
+    "fused-rhs": benchmark_fused_rhs,
+    "compiled-rhs": benchmark_compiled_rhs,
+    "prepared-kinetics": benchmark_prepared_kinetics,
+    "sparse-transport": benchmark_sparse_transport,
+    "edge-profiles": benchmark_edge_profiles,
+    "runtime-cache": benchmark_runtime_cache,
+    "segment-snapshots": benchmark_segment_snapshots,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmark", nargs="?", choices=sorted(BENCHMARKS))
+    parser.add_argument("--list", action="store_true", help="list available benchmarks")
+    parser.add_argument("--reactors", type=int, default=20)
+    parser.add_argument("--template", default="asm1")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--variants", type=int, default=32)
+    parser.add_argument("--backend", default="torchscript", choices=["torchscript", "inductor"])
+    args = parser.parse_args(argv)
+
+    if args.list or not args.benchmark:
+        for name, fn in sorted(BENCHMARKS.items()):
+            print(f"{name:16s} {(fn.__doc__ or '').strip()}")
+        return
+
+    torch.set_grad_enabled(False)
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
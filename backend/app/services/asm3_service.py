@@ -11,9 +11,19 @@ from app.models import (
     ASM3Job,
     MaterialBalanceJobStatus,
 )
+from app.services.calculation_queue import (
+    cancel_running_job,
+    failure_summary,
+    register_cancel_token,
+    release_cancel_token,
+)
 from app.services.data_conversion_service import DataConversionService
+from app.services.result_store import save_result
+from app.material_balance.cancellation import CancellationToken
 from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import CalculationCancelledError
 from app.material_balance.models import MaterialBalanceResult
+from app.material_balance.profiling import log_profile, record_persistence
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +41,8 @@ class ASM3Service:
         self,
         session: Session,
         job_id: str,
-        input_data: MaterialBalanceInput
+        input_data: MaterialBalanceInput,
+        steady_state: bool = False,
     ) -> None:
         """
         异步执行ASM3计算
@@ -44,6 +55,8 @@ class ASM3Service:
         
         if not job:
             raise ValueError(f"ASM3 job {job_id} not found")
+
+        cancel_token = register_cancel_token(job_id)
         
         try:
             # Update job status to running
@@ -81,11 +94,15 @@ class ASM3Service:
                     asyncio.get_event_loop().run_in_executor(
                         None,
                         self._run_calculation_sync,
-                        input_data
+                        input_data,
+                        steady_state,
+                        cancel_token,
                     ),
                     timeout=timeout_seconds
                 )
             except asyncio.TimeoutError:
+                # Stop the solver thread instead of letting it run to completion
+                cancel_token.cancel(f"Timed out after {timeout_seconds:.1f} seconds")
                 raise Exception(f"ASM3 calculation timed out after {timeout_seconds:.1f} seconds. Try reducing simulation time or steps per hour.")
             
             # Calculate execution time
@@ -102,9 +119,6 @@ class ASM3Service:
             output_data = {
                 "job_id": result.job_id,
                 "status": result.status,
-                "timestamps": result.timestamps,
-                "node_data": result.node_data,
-                "edge_data": result.edge_data,
                 "segment_markers": result.segment_markers,
                 "parameter_change_events": result.parameter_change_events,
                 "summary": result.summary,
@@ -113,11 +127,24 @@ class ASM3Service:
             # Update job with results
             job.status = MaterialBalanceJobStatus.success
             job.completed_at = datetime.now()
-            job.result_data = output_data
+            persist_started = time.perf_counter()
+            job.result_data = save_result(job_id, output_data, frame=result.frame)
+            record_persistence(result.summary, time.perf_counter() - persist_started)
             job.summary_data = result.summary  # Save summary separately for optimized queries
             job.error_message = None
             
+        except CalculationCancelledError:
+            logger.warning(
+                "asm3 calculation stopped after cancel",
+                extra={"job_id": job_id, **cancel_token.metrics()},
+            )
+            job.status = MaterialBalanceJobStatus.cancelled
+            job.completed_at = datetime.now()
+            job.error_message = "ASM3 calculation cancelled by user"
+            job.result_data = None
+            job.summary_data = {"cancellation": cancel_token.metrics()}
         except asyncio.CancelledError:
+            cancel_token.cancel("Calculation cancelled due to server shutdown")
             # Handle cancellation (e.g., server shutdown)
             logger.warning("asm3 calculation cancelled", extra={"job_id": job_id})
             job.status = MaterialBalanceJobStatus.cancelled
@@ -138,19 +165,30 @@ class ASM3Service:
             job.completed_at = datetime.now()
             job.error_message = error_message
             job.result_data = None
+            job.summary_data = failure_summary(e)
         
         finally:
+            release_cancel_token(job_id)
             # Save job state
             session.add(job)
+            commit_started = time.perf_counter()
             session.commit()
+            log_profile(job_id, job.summary_data, time.perf_counter() - commit_started)
     
-    def _run_calculation_sync(self, input_data: MaterialBalanceInput) -> MaterialBalanceResult:
+    def _run_calculation_sync(
+        self,
+        input_data: MaterialBalanceInput,
+        steady_state: bool = False,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> MaterialBalanceResult:
         """
         同步执行ASM3计算（在线程池中运行）
         """
         # Run calculation with MaterialBalanceInput object
         # The MaterialBalanceCalculator already supports ASM3 calculations
-        result = self.calculator.calculate(input_data)
+        if steady_state:
+            return self.calculator.calculate_steady_state(input_data, cancel_token, materialize=False)
+        result = self.calculator.calculate(input_data, cancel_token, materialize=False)
         
         return result
     
@@ -227,6 +265,8 @@ class ASM3Service:
             job.error_message = "ASM3 calculation cancelled by user"
             session.add(job)
             session.commit()
+            # Stop the solver if the job runs in this process; workers poll the job row
+            cancel_running_job(job_id)
             return True
         
         return False
@@ -0,0 +1,988 @@
+"""Persistent calculation queue and the worker processes that drain it.
+
+Routes call ``submit_calculation`` instead of ``BackgroundTasks.add_task``.
+The job is written to the ``calculationqueueentry`` table, and a pool of
+spawned worker processes claims entries by priority. Each worker has its
+own torch thread settings, so long integrations no longer share the web
+process's GIL and default executor. Each worker then runs the model
+service's unchanged ``run_calculation`` coroutine. The service still owns
+job status, timeouts and result storage.
+
+With ``CALCULATION_WORKERS = 0`` jobs run in-process as before, which is
+what local development without worker processes expects.
+
+Cancellation: services register a ``CancellationToken`` per running job in
+this process. ``cancel_running_job`` trips it, and the solver stops at its
+next checkpoint. Workers also watch the job row, so a cancel issued from
+the web process reaches them. A worker whose job ignores the cancel for
+``CALCULATION_CANCEL_GRACE_SECONDS`` exits, and the pool restarts it.
+
+Recovery: a running entry's worker writes ``heartbeat_at`` every
+``CALCULATION_HEARTBEAT_SECONDS``. At startup and on every monitor pass,
+``recover_lost_entries`` requeues the running entries whose worker on this
+host no longer exists, and those of any host whose heartbeat is older than
+``CALCULATION_HEARTBEAT_TIMEOUT_SECONDS``. A requeued job resumes from its
+last checkpoint.
+
+Progress: the calculator publishes throttled progress (simulated hours,
+RHS evaluations, ETA) of every job run with a cancel token, and the runner
+publishes its final status. In-process jobs hand these to
+``simple_websocket_manager`` directly. Workers put them on a queue that a
+thread of the web process forwards, so clients can follow a job over
+``/simple-ws/task/{job_id}`` instead of polling its status. Finished
+integration chunks are streamed the same way as downsampled partial
+results; the frames a client missed are read back from the result store.
+
+Deduplication: ``submit_calculation`` stores a fingerprint of the job kind,
+input and options on the job row. A job whose fingerprint matches a
+finished job takes that result without computing. One that matches a job
+still pending or running stays pending without a queue entry. When that
+leader finishes, ``settle_followers`` gives its followers the result or, for
+invalid input and solver divergence, the failure. If the leader was
+cancelled, deleted or failed for any other reason, the earliest follower
+computes instead.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import BackgroundTasks
+from sqlalchemy import text
+from sqlmodel import Session, delete, func, select, update
+
+from app.core.config import settings
+from app.models import (
+    ASM1Job,
+    ASM1SlimJob,
+    ASM3Job,
+    CalculationQueueEntry,
+    CalculationQueueStatus,
+    MaterialBalanceInput,
+    MaterialBalanceJob,
+    MaterialBalanceJobStatus,
+    ScenarioSweepJob,
+    ScenarioSweepParameter,
+    UDMJob,
+    User,
+)
+
+if TYPE_CHECKING:
+    from app.material_balance.cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+# Serializes claims so per-user concurrency limits hold across workers
+_CLAIM_LOCK_KEY = 0x6D62_7175  # "mbqu"
+
+# How long a worker waits for room in the progress queue for a final status
+_FINAL_STATUS_PUT_TIMEOUT_SECONDS = 5.0
+
+JOB_MODELS: Dict[str, Any] = {
+    "material_balance": MaterialBalanceJob,
+    "asm1": ASM1Job,
+    "asm1slim": ASM1SlimJob,
+    "asm3": ASM3Job,
+    "udm": UDMJob,
+    "scenario_sweep": ScenarioSweepJob,
+}
+
+# Tokens of the jobs running in this process, by job_id
+_active_tokens: Dict[str, "CancellationToken"] = {}
+_active_tokens_lock = threading.Lock()
+
+Runner = Callable[[Session, str, MaterialBalanceInput, Dict[str, Any]], Awaitable[None]]
+
+
+def input_fingerprint(job_kind: str, payload: Dict[str, Any], options: Dict[str, Any]) -> str:
+    """SHA-256 of the canonical JSON of everything a job's result depends on."""
+    raw = json.dumps(
+        {"job_kind": job_kind, "input": payload, "options": options},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def queue_payload(input_data: MaterialBalanceInput) -> Dict[str, Any]:
+    """JSON payload a worker rebuilds ``input_data`` from.
+
+    Unlike ``model_dump`` it keeps the server-resolved ``warm_start_state``.
+    """
+    payload = input_data.model_dump(mode="json")
+    if input_data.warm_start_state is not None:
+        payload["warm_start_state"] = input_data.warm_start_state.model_dump(mode="json")
+    return payload
+
+
+def _spill_dir() -> Optional[str]:
+    if settings.CALCULATION_SPILL_THRESHOLD_MB <= 0:
+        return None
+    return str(Path(settings.RESULT_STORE_DIR) / ".spill")
+
+
+def _sweep_spills() -> None:
+    """Remove spill directories left behind by killed calculation processes."""
+    from app.material_balance.trajectory_sink import sweep_stale_spills
+
+    try:
+        sweep_stale_spills(_spill_dir())
+    except OSError:
+        logger.exception("failed to sweep stale spill directories")
+
+
+@lru_cache(maxsize=None)
+def _get_service(job_kind: str) -> Any:
+    # Imported lazily: worker processes set torch thread counts before torch loads
+    from app.material_balance.runtime_cache import runtime_cache
+    from app.material_balance.segment_snapshots import segment_snapshots
+    from app.material_balance.trajectory_sink import trajectory_sinks
+
+    runtime_cache.resize(settings.CALCULATION_RUNTIME_CACHE_SIZE)
+    segment_snapshots.configure(
+        settings.CALCULATION_SNAPSHOT_DIR,
+        settings.CALCULATION_SNAPSHOT_MAX_MB * 1024 * 1024,
+        settings.CALCULATION_CHECKPOINT_HOURS,
+    )
+    trajectory_sinks.configure(
+        _spill_dir(),
+        settings.CALCULATION_SPILL_THRESHOLD_MB * 1024 * 1024,
+        settings.CALCULATION_SPILL_CHUNK_MB * 1024 * 1024,
+    )
+    if job_kind == "material_balance":
+        from app.services.material_balance_service import MaterialBalanceService
+
+        return MaterialBalanceService()
+    if job_kind == "asm1":
+        from app.services.asm1_service import ASM1Service
+
+        return ASM1Service()
+    if job_kind == "asm1slim":
+        from app.services.asm1slim_service import ASM1SlimService
+
+        return ASM1SlimService()
+    if job_kind == "asm3":
+        from app.services.asm3_service import ASM3Service
+
+        return ASM3Service()
+    if job_kind == "udm":
+        from app.services.udm_service import UDMService
+
+        return UDMService()
+    if job_kind == "scenario_sweep":
+        from app.services.scenario_sweep_service import ScenarioSweepService
+
+        return ScenarioSweepService()
+    raise ValueError(f"Unknown calculation job kind: {job_kind}")
+
+
+def get_runner(job_kind: str) -> Runner:
+    """Return the coroutine that executes one job of ``job_kind``."""
+    service = _get_service(job_kind)
+
+    if job_kind == "scenario_sweep":
+
+        async def _calculate(
+            session: Session, job_id: str, input_data: MaterialBalanceInput, options: Dict[str, Any]
+        ) -> None:
+            await service.run_sweep(
+                session,
+                job_id,
+                input_data,
+                [ScenarioSweepParameter.model_validate(param) for param in options["parameters"]],
+                options["variants"],
+                options.get("include_trajectories", False),
+            )
+
+    else:
+
+        async def _calculate(
+            session: Session, job_id: str, input_data: MaterialBalanceInput, options: Dict[str, Any]
+        ) -> None:
+            await service.run_calculation(session, job_id, input_data, **options)
+
+    async def _run(
+        session: Session, job_id: str, input_data: MaterialBalanceInput, options: Dict[str, Any]
+    ) -> None:
+        from app.services.result_store import delete_partial_results
+
+        await _calculate(session, job_id, input_data, options)
+        job_model = JOB_MODELS[job_kind]
+        job = session.exec(select(job_model).where(job_model.job_id == job_id)).first()
+        if job is not None:
+            _publish_final_status(job)
+        # The final result supersedes the streamed frames
+        delete_partial_results(job_id)
+        next_job_id = hand_off_followers(
+            session,
+            job_kind=job_kind,
+            job_id=job_id,
+            payload=queue_payload(input_data),
+            options=options,
+        )
+        # Without workers the follower computes right here
+        if next_job_id is not None:
+            await _run(session, next_job_id, input_data, options)
+
+    return _run
+
+
+def submit_calculation(
+    session: Session,
+    background_tasks: BackgroundTasks,
+    *,
+    job_kind: str,
+    job_id: str,
+    owner: User,
+    input_data: MaterialBalanceInput,
+    **options: Any,
+) -> None:
+    """
+    将计算任务加入队列；未配置工作进程时退回到 Web 进程内后台执行
+    """
+    if job_kind not in JOB_MODELS:
+        raise ValueError(f"Unknown calculation job kind: {job_kind}")
+
+    from app.services.warm_start import WarmStartError, resolve_warm_start
+
+    try:
+        input_data = resolve_warm_start(session, owner=owner, input_data=input_data)
+    except WarmStartError as exc:
+        _fail_job(session, job_kind, job_id, str(exc))
+        return
+
+    payload = queue_payload(input_data)
+    if settings.CALCULATION_DEDUPLICATE_RESULTS and _deduplicate(
+        session, job_kind, job_id, input_fingerprint(job_kind, payload, options)
+    ):
+        return
+
+    if settings.CALCULATION_WORKERS <= 0:
+        background_tasks.add_task(get_runner(job_kind), session, job_id, input_data, options)
+        return
+
+    _enqueue(
+        session, job_kind=job_kind, job_id=job_id, owner=owner, payload=payload, options=options
+    )
+
+
+def _enqueue(
+    session: Session,
+    *,
+    job_kind: str,
+    job_id: str,
+    owner: User,
+    payload: Dict[str, Any],
+    options: Dict[str, Any],
+) -> None:
+    user_type = getattr(owner.user_type, "value", owner.user_type)
+    priority = settings.CALCULATION_USER_PRIORITY.get(user_type, 0)
+    max_concurrency = settings.CALCULATION_USER_CONCURRENCY.get(user_type, 1)
+    if owner.is_superuser:
+        priority = max(settings.CALCULATION_USER_PRIORITY.values(), default=priority)
+        max_concurrency = max(settings.CALCULATION_USER_CONCURRENCY.values(), default=max_concurrency)
+
+    session.add(
+        CalculationQueueEntry(
+            job_id=job_id,
+            job_kind=job_kind,
+            priority=priority,
+            max_concurrency=max_concurrency,
+            payload=payload,
+            options=options,
+            owner_id=owner.id,
+        )
+    )
+    session.commit()
+
+
+def _fail_job(session: Session, job_kind: str, job_id: str, reason: str) -> None:
+    job_model = JOB_MODELS[job_kind]
+    job = session.exec(select(job_model).where(job_model.job_id == job_id)).first()
+    if job is None:
+        return
+    job.status = MaterialBalanceJobStatus.failed
+    job.completed_at = datetime.now()
+    job.error_message = f"Calculation failed: {reason}"
+    session.add(job)
+    session.commit()
+
+
+def _deduplicate(session: Session, job_kind: str, job_id: str, fingerprint: str) -> bool:
+    """
+    记录任务输入指纹；相同输入已有完成结果时直接复用，已有相同任务排队或计算中时合并到该任务
+    """
+    job_model = JOB_MODELS[job_kind]
+    job = session.exec(select(job_model).where(job_model.job_id == job_id)).first()
+    if job is None:
+        return False
+    # Committed before the lookup, so a leader finishing in between still finds this job
+    job.input_fingerprint = fingerprint
+    session.add(job)
+    session.commit()
+
+    completed = session.exec(
+        select(job_model)
+        .where(
+            job_model.input_fingerprint == fingerprint,
+            job_model.status == MaterialBalanceJobStatus.success,
+            job_model.job_id != job_id,
+        )
+        .order_by(job_model.completed_at.desc())
+        .limit(1)
+    ).first()
+    if completed is not None and _reuse_result(session, job, completed):
+        session.commit()
+        logger.info(
+            "calculation reused the result of an identical job",
+            extra={"job_id": job_id, "source_job_id": completed.job_id},
+        )
+        return True
+
+    # The earliest unfinished job computes; later identical ones wait for it
+    leader = session.exec(
+        select(job_model)
+        .where(
+            job_model.input_fingerprint == fingerprint,
+            job_model.status.in_([MaterialBalanceJobStatus.pending, MaterialBalanceJobStatus.running]),
+        )
+        .order_by(job_model.created_at, job_model.job_id)
+        .limit(1)
+    ).first()
+    if leader is not None and leader.job_id != job_id:
+        logger.info(
+            "calculation coalesced onto an identical job",
+            extra={"job_id": job_id, "source_job_id": leader.job_id},
+        )
+        return True
+    return False
+
+
+def _reuse_result(session: Session, job: Any, source: Any) -> bool:
+    """Give ``job`` the result of ``source``; False leaves it pending to compute."""
+    from app.services.result_store import link_result
+
+    try:
+        result_data = link_result(source.result_data, job.job_id)
+    except OSError:
+        logger.warning(
+            "stored result of an identical job is unreadable, computing instead",
+            exc_info=True,
+            extra={"job_id": job.job_id, "source_job_id": source.job_id},
+        )
+        return False
+    now = datetime.now()
+    job.status = MaterialBalanceJobStatus.success
+    job.started_at = job.started_at or now
+    job.completed_at = now
+    job.result_data = result_data
+    job.summary_data = source.summary_data
+    job.error_message = None
+    session.add(job)
+    return True
+
+
+def settle_followers(session: Session, *, job_kind: str, job_id: str, fingerprint: str) -> Optional[Any]:
+    """
+    相同输入的领头任务结束后处理等待中的任务：成功则复用结果，因输入无效或不收敛而失败则同样标记失败；
+    领头任务被取消、删除或因超时、工作进程丢失等其他原因失败时返回最早的等待任务，由调用方安排它重新计算；
+    领头任务的结果文件无法读取时同样返回一个等待任务
+    """
+    job_model = JOB_MODELS[job_kind]
+    leader = session.exec(select(job_model).where(job_model.job_id == job_id)).first()
+    if leader is not None and leader.status in (
+        MaterialBalanceJobStatus.pending,
+        MaterialBalanceJobStatus.running,
+    ):
+        return None
+
+    followers = session.exec(
+        select(job_model)
+        .where(
+            job_model.input_fingerprint == fingerprint,
+            job_model.status == MaterialBalanceJobStatus.pending,
+            job_model.job_id != job_id,
+            job_model.job_id.not_in(select(CalculationQueueEntry.job_id)),
+        )
+        .order_by(job_model.created_at, job_model.job_id)
+    ).all()
+    if not followers:
+        return None
+
+    # Followers the leader's result could not be linked to compute it themselves
+    stranded = []
+    if leader is not None and leader.status == MaterialBalanceJobStatus.success:
+        stranded = [follower for follower in followers if not _reuse_result(session, follower, leader)]
+    elif leader is not None and _failed_deterministically(leader):
+        # Same input, same failure: recomputing would fail again
+        for follower in followers:
+            follower.status = MaterialBalanceJobStatus.failed
+            follower.completed_at = datetime.now()
+            follower.error_message = leader.error_message
+            session.add(follower)
+    else:
+        return followers[0]
+    session.commit()
+    settled = [follower for follower in followers if follower not in stranded]
+    for follower in settled:
+        _publish_final_status(follower)
+    logger.info(
+        "identical jobs settled from their leader",
+        extra={"job_id": job_id, "followers": len(settled), "status": leader.status.value},
+    )
+    return stranded[0] if stranded else None
+
+
+def failure_summary(error: BaseException) -> Dict[str, Any]:
+    """Summary of a job that failed with ``error``.
+
+    ``deterministic`` marks invalid input and solver divergence, anywhere in
+    the cause chain: the same input fails the same way, so its followers fail
+    too. Timeouts, lost workers and I/O errors leave it false.
+    """
+    from app.material_balance.exceptions import ConvergenceError, InvalidInputError
+
+    cause: Optional[BaseException] = error
+    while cause is not None and not isinstance(cause, (InvalidInputError, ConvergenceError)):
+        cause = cause.__cause__
+    return {"failure": {"error": type(error).__name__, "deterministic": cause is not None}}
+
+
+def _failed_deterministically(job: Any) -> bool:
+    if job.status != MaterialBalanceJobStatus.failed:
+        return False
+    failure = (job.summary_data or {}).get("failure") or {}
+    return bool(failure.get("deterministic"))
+
+
+def hand_off_followers(
+    session: Session,
+    *,
+    job_kind: str,
+    job_id: str,
+    payload: Dict[str, Any],
+    options: Dict[str, Any],
+) -> Optional[str]:
+    """Settle the followers of a finished job and queue the one that must compute.
+
+    Returns that follower's ``job_id`` when there are no worker processes to
+    queue it for, so the caller can run it in-process.
+    """
+    if not settings.CALCULATION_DEDUPLICATE_RESULTS:
+        return None
+    try:
+        job_model = JOB_MODELS[job_kind]
+        fingerprint = session.exec(
+            select(job_model.input_fingerprint).where(job_model.job_id == job_id)
+        ).first()
+        if fingerprint is None:
+            # Deleted while running: the stored fingerprint went with the row
+            fingerprint = input_fingerprint(job_kind, payload, options)
+        follower = settle_followers(session, job_kind=job_kind, job_id=job_id, fingerprint=fingerprint)
+        if follower is None:
+            return None
+        if settings.CALCULATION_WORKERS <= 0:
+            return follower.job_id
+        owner = session.get(User, follower.owner_id)
+        if owner is not None:
+            _enqueue(
+                session,
+                job_kind=job_kind,
+                job_id=follower.job_id,
+                owner=owner,
+                payload=payload,
+                options=options,
+            )
+    except Exception:
+        session.rollback()
+        logger.exception("failed to settle identical jobs", extra={"job_id": job_id})
+    return None
+
+
+def _publish_final_status(job: Any) -> None:
+    from app.material_balance.progress import progress_publisher
+
+    if job.status in (MaterialBalanceJobStatus.pending, MaterialBalanceJobStatus.running):
+        return
+    progress_publisher.publish_status(job.job_id, job.status.value, job.error_message)
+
+
+def _publish_progress(job_id: str, data: Dict[str, Any]) -> None:
+    """Hand a progress update or final status to this process's websocket manager."""
+    from app.core.simple_websocket_manager import simple_websocket_manager
+
+    status = data.get("status")
+    if status == "partial":
+        simple_websocket_manager.send_partial_result_from_thread(job_id, data["frame"])
+    elif status == MaterialBalanceJobStatus.success.value:
+        simple_websocket_manager.send_task_complete_from_thread(job_id, data)
+    elif status in (MaterialBalanceJobStatus.failed.value, MaterialBalanceJobStatus.cancelled.value):
+        simple_websocket_manager.send_task_error_from_thread(job_id, data)
+    else:
+        simple_websocket_manager.send_progress_from_thread(
+            job_id,
+            round(100.0 * data["fraction"], 1),
+            f"{data['simulated_hours']:.2f} / {data['total_hours']:.2f} h simulated",
+            details=data,
+        )
+
+
+def _queue_progress(progress_queue: Any, job_id: str, data: Dict[str, Any]) -> None:
+    """Worker side: pass progress to the web process.
+
+    Running and partial updates are dropped when the queue is full, the next
+    one supersedes them. A final status is the only message a subscriber gets
+    about the outcome, so it waits up to ``_FINAL_STATUS_PUT_TIMEOUT_SECONDS``
+    for room.
+    """
+    if data.get("status") in ("running", "partial"):
+        try:
+            progress_queue.put_nowait((job_id, data))
+        except queue.Full:
+            pass
+        return
+    try:
+        progress_queue.put((job_id, data), timeout=_FINAL_STATUS_PUT_TIMEOUT_SECONDS)
+    except queue.Full:
+        logger.warning(
+            "progress queue full, final status not forwarded",
+            extra={"job_id": job_id, "status": data.get("status")},
+        )
+
+
+def _forward_progress(progress_queue: Any) -> None:
+    """Web process thread: forward worker progress until ``None`` arrives."""
+    while True:
+        item = progress_queue.get()
+        if item is None:
+            return
+        try:
+            _publish_progress(*item)
+        except Exception:
+            logger.exception("failed to forward calculation progress")
+
+
+def _configure_progress(send: Optional[Callable[[str, Dict[str, Any]], None]]) -> None:
+    from app.material_balance.progress import progress_publisher
+    from app.services.result_store import partial_results_dir
+
+    interval = settings.CALCULATION_PROGRESS_INTERVAL_SECONDS
+    progress_publisher.configure(
+        send if interval > 0 else None,
+        interval,
+        partial_points=settings.CALCULATION_PARTIAL_RESULT_POINTS,
+        partial_dir=str(partial_results_dir()),
+    )
+
+
+def register_cancel_token(job_id: str) -> "CancellationToken":
+    """Create and track the cancellation token of a job starting in this process."""
+    from app.material_balance.cancellation import CancellationToken
+
+    token = CancellationToken(job_id)
+    with _active_tokens_lock:
+        _active_tokens[job_id] = token
+    return token
+
+
+def release_cancel_token(job_id: str) -> None:
+    with _active_tokens_lock:
+        _active_tokens.pop(job_id, None)
+
+
+def cancel_running_job(job_id: str, reason: str = "Calculation cancelled by user") -> bool:
+    """Trip the token of ``job_id`` if it is running in this process."""
+    with _active_tokens_lock:
+        token = _active_tokens.get(job_id)
+    if token is None:
+        return False
+    token.cancel(reason)
+    return True
+
+
+def cancel_calculation(session: Session, *, job_kind: str, job_id: str) -> bool:
+    """Cancel a pending or running job: flip its status and stop the solver."""
+    return _get_service(job_kind).cancel_calculation(job_id, session)
+
+
+def claim_next_entry(session: Session, worker_id: str) -> Optional[CalculationQueueEntry]:
+    """
+    领取优先级最高、且所属用户未达到并发上限的排队任务
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(:key)").bindparams(key=_CLAIM_LOCK_KEY))
+
+    running = session.exec(
+        select(
+            CalculationQueueEntry.owner_id,
+            func.count(),
+            func.min(CalculationQueueEntry.max_concurrency),
+        )
+        .where(CalculationQueueEntry.status == CalculationQueueStatus.running)
+        .group_by(CalculationQueueEntry.owner_id)
+    ).all()
+    saturated = [owner_id for owner_id, count, limit in running if count >= limit]
+
+    statement = select(CalculationQueueEntry).where(
+        CalculationQueueEntry.status == CalculationQueueStatus.queued
+    )
+    if saturated:
+        statement = statement.where(CalculationQueueEntry.owner_id.not_in(saturated))
+    entry = session.exec(
+        statement.order_by(
+            CalculationQueueEntry.priority.desc(), CalculationQueueEntry.created_at
+        ).limit(1)
+    ).first()
+
+    if entry is not None:
+        entry.status = CalculationQueueStatus.running
+        entry.worker_id = worker_id
+        entry.started_at = entry.heartbeat_at = datetime.now()
+        session.add(entry)
+    # Commit also releases the advisory lock
+    session.commit()
+    return entry
+
+
+def run_entry(session: Session, entry: CalculationQueueEntry) -> None:
+    """Execute a claimed entry and remove it from the queue."""
+    job_model = JOB_MODELS[entry.job_kind]
+    stop_watching = threading.Event()
+    try:
+        status = session.exec(
+            select(job_model.status).where(job_model.job_id == entry.job_id)
+        ).first()
+        if status != MaterialBalanceJobStatus.pending:
+            # Cancelled or deleted while queued
+            hand_off_followers(
+                session,
+                job_kind=entry.job_kind,
+                job_id=entry.job_id,
+                payload=entry.payload,
+                options=entry.options or {},
+            )
+            return
+
+        watchdog = threading.Thread(
+            target=_watch_for_cancellation,
+            args=(job_model, entry.job_id, stop_watching),
+            name=f"cancel-watchdog-{entry.job_id}",
+            daemon=True,
+        )
+        watchdog.start()
+        input_data = MaterialBalanceInput.model_validate(entry.payload)
+        runner = get_runner(entry.job_kind)
+        asyncio.run(runner(session, entry.job_id, input_data, entry.options or {}))
+    finally:
+        stop_watching.set()
+        session.exec(delete(CalculationQueueEntry).where(CalculationQueueEntry.id == entry.id))
+        session.commit()
+
+
+def _record_heartbeat(job_id: str) -> None:
+    from app.core.db import engine
+
+    try:
+        with Session(engine) as session:
+            session.exec(
+                update(CalculationQueueEntry)
+                .where(CalculationQueueEntry.job_id == job_id)
+                .values(heartbeat_at=datetime.now())
+            )
+            session.commit()
+    except Exception:
+        logger.exception("failed to record calculation heartbeat", extra={"job_id": job_id})
+
+
+def _watch_for_cancellation(job_model: Any, job_id: str, stop: threading.Event) -> None:
+    """
+    工作进程内的取消监视线程：定期记录心跳；发现任务被取消时触发取消令牌；超出宽限期仍未停止则退出进程
+    """
+    from app.core.db import engine
+
+    token: Optional["CancellationToken"] = None
+    last_heartbeat = time.monotonic()
+    while not stop.wait(settings.CALCULATION_CANCEL_POLL_SECONDS):
+        if time.monotonic() - last_heartbeat >= settings.CALCULATION_HEARTBEAT_SECONDS:
+            last_heartbeat = time.monotonic()
+            _record_heartbeat(job_id)
+
+        # Keep the reference: the service releases it before the solver thread stops on timeout
+        if token is None:
+            with _active_tokens_lock:
+                token = _active_tokens.get(job_id)
+            if token is None:
+                continue
+
+        if not token.cancelled:
+            try:
+                with Session(engine) as session:
+                    status = session.exec(
+                        select(job_model.status).where(job_model.job_id == job_id)
+                    ).first()
+            except Exception:
+                logger.exception("cancel watchdog failed to read job status", extra={"job_id": job_id})
+                continue
+            if status in (None, MaterialBalanceJobStatus.cancelled):
+                token.cancel("Calculation cancelled by user")
+        elif time.monotonic() - token.cancelled_at > settings.CALCULATION_CANCEL_GRACE_SECONDS:
+            logger.error(
+                "calculation ignored cancel, terminating worker",
+                extra={"job_id": job_id, "worker_id": _worker_id()},
+            )
+            os._exit(1)
+
+
+def requeue_entries(session: Session, entries: List[CalculationQueueEntry], reason: str) -> None:
+    """
+    工作进程丢失时的任务恢复：未超过重试次数的任务重新排队，从最后一个检查点续算；其余标记失败
+    """
+    from app.services.result_store import delete_partial_results
+
+    exhausted = []
+    for entry in entries:
+        job_model = JOB_MODELS.get(entry.job_kind)
+        if job_model is None or entry.attempts >= settings.CALCULATION_MAX_RESUMES:
+            exhausted.append(entry)
+            continue
+        job = session.exec(select(job_model).where(job_model.job_id == entry.job_id)).first()
+        if job is not None and job.status == MaterialBalanceJobStatus.running:
+            job.status = MaterialBalanceJobStatus.pending
+            session.add(job)
+        entry.status = CalculationQueueStatus.queued
+        entry.worker_id = None
+        entry.started_at = None
+        entry.heartbeat_at = None
+        entry.attempts += 1
+        session.add(entry)
+        # The resumed run streams its frames again from seq 0
+        delete_partial_results(entry.job_id)
+        logger.warning(
+            "calculation requeued to resume from its last checkpoint",
+            extra={"job_id": entry.job_id, "attempt": entry.attempts, "reason": reason},
+        )
+    session.commit()
+    if exhausted:
+        fail_entries(session, exhausted, reason)
+
+
+def recover_lost_entries(session: Session) -> None:
+    """
+    重新排队失去工作进程的运行中任务：本机任务的工作进程已不存在，或任意主机的任务心跳超时
+    """
+    from app.material_balance.trajectory_sink import process_alive
+
+    hostname = socket.gethostname()
+    silent_since = datetime.now() - timedelta(seconds=settings.CALCULATION_HEARTBEAT_TIMEOUT_SECONDS)
+    running = session.exec(
+        select(CalculationQueueEntry).where(CalculationQueueEntry.status == CalculationQueueStatus.running)
+    ).all()
+    lost = []
+    for entry in running:
+        host, _, pid = (entry.worker_id or "").rpartition(":")
+        if host == hostname and pid.isdigit() and not process_alive(int(pid)):
+            lost.append(entry)
+        elif (entry.heartbeat_at or entry.started_at or entry.created_at) < silent_since:
+            # Another host, or a reused PID on this one
+            lost.append(entry)
+    if lost:
+        requeue_entries(session, lost, "worker stopped before the calculation finished")
+
+
+def fail_entries(session: Session, entries: List[CalculationQueueEntry], reason: str) -> None:
+    """Mark the jobs behind lost entries failed and drop the entries."""
+    settled = [
+        (entry.job_kind, entry.job_id, entry.payload, entry.options or {})
+        for entry in entries
+        if entry.job_kind in JOB_MODELS
+    ]
+    for entry in entries:
+        job_model = JOB_MODELS.get(entry.job_kind)
+        job = (
+            session.exec(select(job_model).where(job_model.job_id == entry.job_id)).first()
+            if job_model is not None
+            else None
+        )
+        if job is not None and job.status in (
+            MaterialBalanceJobStatus.pending,
+            MaterialBalanceJobStatus.running,
+        ):
+            job.status = MaterialBalanceJobStatus.failed
+            job.completed_at = datetime.now()
+            job.error_message = f"Calculation failed: {reason}"
+            session.add(job)
+        session.delete(entry)
+    session.commit()
+    for job_kind, job_id, payload, options in settled:
+        hand_off_followers(session, job_kind=job_kind, job_id=job_id, payload=payload, options=options)
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _configure_worker_threads(worker_index: int) -> None:
+    threads = max(settings.CALCULATION_TORCH_THREADS, 1)
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+
+    if settings.CALCULATION_PIN_CPUS and hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        start = (worker_index * threads) % len(cpus)
+        os.sched_setaffinity(0, {cpus[(start + offset) % len(cpus)] for offset in range(threads)})
+
+    import torch
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+
+def _worker_main(worker_index: int, stop_event: Any, progress_queue: Any) -> None:
+    """Worker process loop: claim, run, repeat until ``stop_event`` is set."""
+    _configure_worker_threads(worker_index)
+    _configure_progress(partial(_queue_progress, progress_queue))
+    _sweep_spills()
+
+    from app.core.db import engine
+    from app.material_balance.profiling import reset_peak_rss_per_job
+
+    # One job at a time here, so the process peak is the job's
+    reset_peak_rss_per_job()
+
+    worker_id = _worker_id()
+    poll_seconds = settings.CALCULATION_QUEUE_POLL_SECONDS
+    logger.info("calculation worker started", extra={"worker_id": worker_id})
+
+    while not stop_event.is_set():
+        try:
+            with Session(engine) as session:
+                entry = claim_next_entry(session, worker_id)
+                if entry is None:
+                    stop_event.wait(poll_seconds)
+                    continue
+                logger.info(
+                    "calculation worker claimed job",
+                    extra={"worker_id": worker_id, "job_id": entry.job_id, "job_kind": entry.job_kind},
+                )
+                run_entry(session, entry)
+        except Exception:
+            logger.exception("calculation worker loop failed", extra={"worker_id": worker_id})
+            stop_event.wait(poll_seconds)
+
+
+class CalculationWorkerPool:
+    """
+    计算工作进程池：在 Web 进程启动时创建，负责监控并重启退出的工作进程
+    """
+
+    def __init__(self) -> None:
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event: Any = None
+        self._progress_queue: Any = None
+        self._progress_thread: Optional[threading.Thread] = None
+        self._processes: List[Any] = []
+        self._monitor_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._processes:
+            return
+        _sweep_spills()
+        if settings.CALCULATION_WORKERS <= 0:
+            # Jobs run in this process and report to the websocket manager directly
+            _configure_progress(_publish_progress)
+            return
+
+        from app.core.db import engine
+
+        try:
+            with Session(engine) as session:
+                recover_lost_entries(session)
+        except Exception:
+            logger.exception("failed to recover lost calculation queue entries")
+
+        self._stop_event = self._context.Event()
+        self._progress_queue = self._context.Queue(maxsize=1000)
+        self._progress_thread = threading.Thread(
+            target=_forward_progress,
+            args=(self._progress_queue,),
+            name="calculation-progress",
+            daemon=True,
+        )
+        self._progress_thread.start()
+        self._processes = [self._spawn(index) for index in range(settings.CALCULATION_WORKERS)]
+        self._monitor_task = asyncio.create_task(self._monitor())
+        logger.info("calculation worker pool started", extra={"workers": len(self._processes)})
+
+    def _spawn(self, worker_index: int) -> Any:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_index, self._stop_event, self._progress_queue),
+            name=f"calculation-worker-{worker_index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    async def _monitor(self) -> None:
+        from app.core.db import engine
+
+        while True:
+            await asyncio.sleep(settings.CALCULATION_QUEUE_POLL_SECONDS * 5)
+            for index, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                worker_id = f"{socket.gethostname()}:{process.pid}"
+                logger.warning(
+                    "calculation worker exited, restarting",
+                    extra={"worker_id": worker_id, "exitcode": process.exitcode},
+                )
+                try:
+                    with Session(engine) as session:
+                        lost = session.exec(
+                            select(CalculationQueueEntry).where(
+                                CalculationQueueEntry.worker_id == worker_id
+                            )
+                        ).all()
+                        requeue_entries(session, list(lost), "calculation worker exited unexpectedly")
+                except Exception:
+                    logger.exception("failed to release calculation queue entries", extra={"worker_id": worker_id})
+                self._processes[index] = self._spawn(index)
+                _sweep_spills()
+            try:
+                with Session(engine) as session:
+                    recover_lost_entries(session)
+            except Exception:
+                logger.exception("failed to recover lost calculation queue entries")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if not self._processes:
+            return
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        self._stop_event.set()
+
+        loop = asyncio.get_event_loop()
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._progress_queue.put(None)
+        await loop.run_in_executor(None, self._progress_thread.join, timeout)
+        logger.info("calculation worker pool stopped")
+
+
+calculation_worker_pool = CalculationWorkerPool()
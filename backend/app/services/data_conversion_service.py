@@ -13,10 +13,12 @@ from app.models import (
 )
 
 
+from app.material_balance.transport import edge_bundle
 from app.services.time_segment_validation import (
     convert_time_segments_to_input,
     normalize_time_segments,
 )
+from app.services.result_store import ResultReader, open_result
 from app.services.hybrid_udm_validation import (
     HybridRuntimeInfo,
     build_hybrid_runtime_info,
@@ -135,10 +137,18 @@ class DataConversionService:
                 edges=edges,
                 parameters=parameters,
                 time_segments=converted_time_segments,
+                edge_profiles=flowchart_data.get(
+                    "edgeProfiles",
+                    flowchart_data.get("edge_profiles", {}),
+                ),
                 hybrid_config=flowchart_data.get(
                     "hybrid_config",
                     flowchart_data.get("hybridConfig"),
                 ),
+                warm_start_from_job_id=flowchart_data.get(
+                    "warmStartFromJobId",
+                    flowchart_data.get("warm_start_from_job_id"),
+                ),
             )
             
             # 淇濆瓨鍘熷flowchart鏁版嵁浠ヤ究鍦ㄧ粨鏋滆浆鎹㈡椂浣跨敤
@@ -794,7 +804,8 @@ class DataConversionService:
             tolerance=params.get('tolerance', 1e-3),
             max_iterations=params.get('max_iterations', 1000),
             max_memory_mb=params.get('max_memory_mb', 1024),
-            sampling_interval_hours=params.get('sampling_interval_hours')
+            sampling_interval_hours=params.get('sampling_interval_hours'),
+            rhs_backend=params.get('rhs_backend', 'eager')
         )
     
     def validate_flowchart_data(
@@ -895,9 +906,6 @@ class DataConversionService:
         # Initialize tensors
         V_liq = torch.zeros(num_nodes, dtype=torch.float32)
         x0 = torch.zeros(num_nodes, num_components, dtype=torch.float32)
-        Q_out = torch.zeros(num_nodes, num_nodes, dtype=torch.float32)
-        prop_a = torch.zeros(num_nodes, num_nodes, num_components, dtype=torch.float32)
-        prop_b = torch.zeros(num_nodes, num_nodes, num_components, dtype=torch.float32)
         
         # Fill node data
         for i, node in enumerate(nodes):
@@ -913,14 +921,13 @@ class DataConversionService:
             for j, conc in enumerate(node.initial_concentrations):
                 x0[i, j] = conc
         
-        # Fill edge data
+        # Fill edge data (edge lists only, see app.material_balance.transport)
+        src, dst, q_vals, a_rows, b_rows = [], [], [], [], []
         for edge in edges:
-            source_idx = node_map[edge.source_node_id]
-            target_idx = node_map[edge.target_node_id]
-            
-            # Set flow rate
-            Q_out[source_idx, target_idx] = edge.flow_rate
-            
+            src.append(node_map[edge.source_node_id])
+            dst.append(node_map[edge.target_node_id])
+            q_vals.append(edge.flow_rate)
+
             # Set concentration factors
             if edge.concentration_factor_a:
                 if len(edge.concentration_factor_a) != num_components:
@@ -928,28 +935,35 @@ class DataConversionService:
                         f"Edge {edge.edge_id} concentration_factor_a has "
                         f"{len(edge.concentration_factor_a)} components, expected {num_components}"
                     )
-                for j, factor in enumerate(edge.concentration_factor_a):
-                    prop_a[source_idx, target_idx, j] = factor
+                a_rows.append(list(edge.concentration_factor_a))
             else:
                 # Default to 1.0 for all components
-                prop_a[source_idx, target_idx, :] = 1.0
-            
+                a_rows.append([1.0] * num_components)
+
             if edge.concentration_factor_b:
                 if len(edge.concentration_factor_b) != num_components:
                     raise ValueError(
                         f"Edge {edge.edge_id} concentration_factor_b has "
                         f"{len(edge.concentration_factor_b)} components, expected {num_components}"
                     )
-                for j, factor in enumerate(edge.concentration_factor_b):
-                    prop_b[source_idx, target_idx, j] = factor
-            # prop_b defaults to 0.0
-        
+                b_rows.append(list(edge.concentration_factor_b))
+            else:
+                # prop_b defaults to 0.0
+                b_rows.append([0.0] * num_components)
+
+        sparse_bundle = edge_bundle(
+            torch.tensor(src, dtype=torch.long),
+            torch.tensor(dst, dtype=torch.long),
+            torch.tensor(q_vals, dtype=torch.float32),
+            torch.tensor(a_rows, dtype=torch.float32).reshape(-1, num_components),
+            torch.tensor(b_rows, dtype=torch.float32).reshape(-1, num_components),
+            n_nodes=num_nodes,
+        )
+
         return {
             "V_liq": V_liq,
             "x0": x0,
-            "Q_out": Q_out,
-            "prop_a": prop_a,
-            "prop_b": prop_b,
+            "sparse_bundle": sparse_bundle,
             "hours": params.hours,
             "steps_per_hour": params.steps_per_hour,
             "node_map": node_map,
@@ -1126,19 +1140,18 @@ class DataConversionService:
         """
         浠庣粨鏋滄暟鎹腑鎻愬彇鏃堕棿搴忓垪鏁版嵁锛堟敮鎸佸垎椤碉級
         """
-        timestamps = result_data["timestamps"]
-        node_data = result_data["node_data"]
-        edge_data = result_data["edge_data"]
+        # Only the requested page is read from the (memory-mapped) result store
+        reader = open_result(result_data)
         
         # Apply time range filter
         start_idx = 0
-        end_idx = len(timestamps)
+        end_idx = reader.time_points
         
         if query.start_time is not None:
-            start_idx = self._find_time_index(timestamps, query.start_time)
+            start_idx = self._find_time_index(reader, query.start_time)
         
         if query.end_time is not None:
-            end_idx = self._find_time_index(timestamps, query.end_time) + 1
+            end_idx = self._find_time_index(reader, query.end_time) + 1
         
         # Apply pagination
         total_points = end_idx - start_idx
@@ -1146,25 +1159,22 @@ class DataConversionService:
         
         page_start = start_idx + (query.page - 1) * query.page_size
         page_end = min(start_idx + query.page * query.page_size, end_idx)
+        rows = slice(page_start, page_end)
         
         # Extract paginated data
-        paginated_timestamps = timestamps[page_start:page_end]
+        paginated_timestamps = reader.timestamps_slice(page_start, page_end)
         
         # Filter node data
         filtered_node_data = {}
-        for node_id, data in node_data.items():
+        for node_id in reader.node_ids:
             if query.node_ids is None or node_id in query.node_ids:
-                filtered_node_data[node_id] = {}
-                for param_name, values in data.items():
-                    filtered_node_data[node_id][param_name] = values[page_start:page_end]
+                filtered_node_data[node_id] = reader.node_values(node_id, rows)
         
         # Filter edge data
         filtered_edge_data = {}
-        for edge_id, data in edge_data.items():
+        for edge_id in reader.edge_ids:
             if query.edge_ids is None or edge_id in query.edge_ids:
-                filtered_edge_data[edge_id] = {}
-                for param_name, values in data.items():
-                    filtered_edge_data[edge_id][param_name] = values[page_start:page_end]
+                filtered_edge_data[edge_id] = reader.edge_values(edge_id, rows)
         
         # Pagination info
         pagination = {
@@ -1184,14 +1194,11 @@ class DataConversionService:
             pagination=pagination,
         )
     
-    def _find_time_index(self, timestamps: List[float], target_time: float) -> int:
+    def _find_time_index(self, reader: ResultReader, target_time: float) -> int:
         """
         鎵惧埌鏈€鎺ヨ繎鐩爣鏃堕棿鐨勭储寮?
         """
-        for i, t in enumerate(timestamps):
-            if t >= target_time:
-                return i
-        return len(timestamps) - 1
+        return min(reader.search_time(target_time), reader.time_points - 1)
     
     def validate_input_data(self, input_data: MaterialBalanceInput) -> Dict[str, Any]:
         """
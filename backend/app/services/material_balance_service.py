@@ -11,8 +11,18 @@ from app.models import (
     MaterialBalanceJob,
     MaterialBalanceJobStatus,
 )
+from app.services.calculation_queue import (
+    cancel_running_job,
+    failure_summary,
+    register_cancel_token,
+    release_cancel_token,
+)
 from app.services.data_conversion_service import DataConversionService
+from app.services.result_store import save_result
+from app.material_balance.cancellation import CancellationToken
 from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import CalculationCancelledError
+from app.material_balance.profiling import log_profile, record_persistence
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +40,8 @@ class MaterialBalanceService:
         self,
         session: Session,
         job_id: str,
-        input_data: MaterialBalanceInput
+        input_data: MaterialBalanceInput,
+        steady_state: bool = False,
     ) -> None:
         """
         异步执行物料平衡计算
@@ -43,6 +54,8 @@ class MaterialBalanceService:
         
         if not job:
             return
+
+        cancel_token = register_cancel_token(job_id)
         
         try:
             # Update job status to running
@@ -80,11 +93,15 @@ class MaterialBalanceService:
                     asyncio.get_event_loop().run_in_executor(
                         None,
                         self._run_calculation_sync,
-                        input_data
+                        input_data,
+                        steady_state,
+                        cancel_token,
                     ),
                     timeout=timeout_seconds
                 )
             except asyncio.TimeoutError:
+                # Stop the solver thread instead of letting it run to completion
+                cancel_token.cancel(f"Timed out after {timeout_seconds:.1f} seconds")
                 raise Exception(f"Calculation timed out after {timeout_seconds:.1f} seconds. Try reducing simulation time or steps per hour.")
             
             # Calculate execution time
@@ -101,9 +118,6 @@ class MaterialBalanceService:
             output_data = {
                 "job_id": result.job_id,
                 "status": result.status,
-                "timestamps": result.timestamps,
-                "node_data": result.node_data,
-                "edge_data": result.edge_data,
                 "segment_markers": result.segment_markers,
                 "parameter_change_events": result.parameter_change_events,
                 "summary": result.summary,
@@ -112,12 +126,25 @@ class MaterialBalanceService:
             # Update job with results
             job.status = MaterialBalanceJobStatus.success
             job.completed_at = datetime.now()
-            job.result_data = output_data
+            persist_started = time.perf_counter()
+            job.result_data = save_result(job_id, output_data, frame=result.frame)
+            record_persistence(result.summary, time.perf_counter() - persist_started)
             # 单独保存摘要数据以优化查询性能
             job.summary_data = result.summary
             job.error_message = None
             
+        except CalculationCancelledError:
+            logger.warning(
+                "material balance calculation stopped after cancel",
+                extra={"job_id": job_id, **cancel_token.metrics()},
+            )
+            job.status = MaterialBalanceJobStatus.cancelled
+            job.completed_at = datetime.now()
+            job.error_message = "Calculation cancelled by user"
+            job.result_data = None
+            job.summary_data = {"cancellation": cancel_token.metrics()}
         except asyncio.CancelledError:
+            cancel_token.cancel("Calculation cancelled due to server shutdown")
             # Handle cancellation (e.g., server shutdown)
             logger.warning(
                 "material balance calculation cancelled", extra={"job_id": job_id}
@@ -140,18 +167,29 @@ class MaterialBalanceService:
             job.completed_at = datetime.now()
             job.error_message = error_message
             job.result_data = None
+            job.summary_data = failure_summary(e)
         
         finally:
+            release_cancel_token(job_id)
             # Save job state
             session.add(job)
+            commit_started = time.perf_counter()
             session.commit()
+            log_profile(job_id, job.summary_data, time.perf_counter() - commit_started)
     
-    def _run_calculation_sync(self, input_data: MaterialBalanceInput) -> Dict[str, Any]:
+    def _run_calculation_sync(
+        self,
+        input_data: MaterialBalanceInput,
+        steady_state: bool = False,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Dict[str, Any]:
         """
         同步执行计算（在线程池中运行）
         """
         # Run calculation with MaterialBalanceInput object
-        result = self.calculator.calculate(input_data)
+        if steady_state:
+            return self.calculator.calculate_steady_state(input_data, cancel_token, materialize=False)
+        result = self.calculator.calculate(input_data, cancel_token, materialize=False)
         
         return result
     
@@ -228,6 +266,8 @@ class MaterialBalanceService:
             job.error_message = "Calculation cancelled by user"
             session.add(job)
             session.commit()
+            # Stop the solver if the job runs in this process; workers poll the job row
+            cancel_running_job(job_id)
             return True
         
         return False
@@ -0,0 +1,273 @@
+"""Streaming export of calculation time series.
+
+Rows are read from the result store in chunks of ``EXPORT_CHUNK_ROWS`` and
+encoded as they are produced. A 60-day run is never assembled in memory
+nor paginated through JSON dicts. Each row is ``time`` followed by one
+column per selected series, named ``<node_or_edge_id>.<parameter>``.
+
+Downsampling picks row indices before anything is streamed:
+
+- ``lttb``: Largest-Triangle-Three-Buckets, which keeps the visual shape
+  of a line chart;
+- ``minmax``: the minimum and maximum of every bucket, which keeps peaks.
+
+All series share the time axis, so they are downsampled together and never
+yield more than ``target_points`` rows. Each series is scaled to its range in
+the window first. ``minmax`` then keeps, per bucket, the rows of the largest
+rise and fall of any series against its bucket mean. ``lttb`` preselects
+candidates that way (MinMaxLTTB) and sums the triangle areas of all series.
+"""
+
+import csv
+import io
+import json
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from fastapi.responses import StreamingResponse
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from app.models import (
+    MaterialBalanceExportQuery,
+    ResultDownsampleMethod,
+    ResultExportFormat,
+)
+from app.services.result_store import ResultReader, open_result
+
+EXPORT_CHUNK_ROWS = 2048
+# Series scaled at a time while building the min/max envelope
+ENVELOPE_BLOCK_COLUMNS = 64
+# Candidate rows per output row preselected for multi-series LTTB
+LTTB_CANDIDATE_RATIO = 4
+
+MEDIA_TYPES = {
+    ResultExportFormat.ndjson: "application/x-ndjson",
+    ResultExportFormat.csv: "text/csv",
+    ResultExportFormat.arrow: "application/vnd.apache.arrow.stream",
+}
+
+
+def lttb_indices(times: np.ndarray, values: np.ndarray, target_points: int) -> np.ndarray:
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling.
+
+    ``values`` may be 2-D with one column per series, in which case the
+    triangle areas of the series are summed.
+    """
+    n = len(values)
+    if target_points >= n or target_points < 3:
+        return np.arange(n)
+
+    values = np.asarray(values, dtype=np.float64).reshape(n, -1)
+
+    edges = np.linspace(1, n - 1, target_points - 1).astype(int)
+    selected = np.empty(target_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(target_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_start = end if bucket + 2 < len(edges) else n - 1
+        mean_t = times[next_start:next_end].mean()
+        mean_v = values[next_start:next_end].mean(axis=0)
+        candidate_t = times[start:end, None]
+        candidate_v = values[start:end]
+        areas = np.abs(
+            (times[previous] - mean_t) * (candidate_v - values[previous])
+            - (times[previous] - candidate_t) * (mean_v - values[previous])
+        ).sum(axis=1)
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax_indices(values: np.ndarray, target_points: int) -> np.ndarray:
+    """Indices of the minimum and maximum of each of ``target_points // 2`` buckets."""
+    n = len(values)
+    buckets = target_points // 2
+    if target_points >= n or buckets < 1:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    selected = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:], strict=True):
+        if end > start:
+            window = values[start:end]
+            selected.append(start + int(np.argmin(window)))
+            selected.append(start + int(np.argmax(window)))
+    return np.unique(selected)
+
+
+def _scaled(column: np.ndarray, start: int, end: int) -> np.ndarray:
+    window = np.asarray(column[start:end], dtype=np.float64)
+    low, high = np.nanmin(window), np.nanmax(window)
+    if not high > low:
+        return np.zeros_like(window)
+    return (window - low) / (high - low)
+
+
+def _bucket_extreme(values: np.ndarray, edges: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """First index of the maximum of ``values`` within each bucket."""
+    peaks = np.repeat(np.maximum.reduceat(values, edges), counts)
+    hits = np.flatnonzero(values == peaks)
+    _, first = np.unique(np.searchsorted(edges, hits, side="right"), return_index=True)
+    return hits[first]
+
+
+def envelope_indices(columns: List[np.ndarray], start: int, end: int, buckets: int) -> np.ndarray:
+    """Window rows of the largest rise and fall of any series in each bucket.
+
+    Rise and fall are taken against the series' bucket mean after scaling
+    every series to its range, so no series dominates by its units. Series
+    are scaled ``ENVELOPE_BLOCK_COLUMNS`` at a time, keeping memory at a few
+    arrays of the window length. Returns at most ``2 * buckets + 2`` indices,
+    the first and last row included.
+    """
+    n = end - start
+    edges = np.linspace(0, n, buckets + 1).astype(int)[:-1]
+    counts = np.diff(np.append(edges, n))
+    rise = np.full(n, -np.inf)
+    fall = np.full(n, -np.inf)
+    for offset in range(0, len(columns), ENVELOPE_BLOCK_COLUMNS):
+        block = np.column_stack(
+            [_scaled(column, start, end) for column in columns[offset:offset + ENVELOPE_BLOCK_COLUMNS]]
+        )
+        means = np.add.reduceat(block, edges, axis=0) / counts[:, None]
+        deviation = block - np.repeat(means, counts, axis=0)
+        np.fmax(rise, np.nanmax(deviation, axis=1), out=rise)
+        np.fmax(fall, -np.nanmin(deviation, axis=1), out=fall)
+    peaks = [_bucket_extreme(envelope, edges, counts) for envelope in (rise, fall)]
+    return np.unique(np.concatenate([[0, n - 1], *peaks]))
+
+
+def _select_columns(
+    reader: ResultReader, query: MaterialBalanceExportQuery
+) -> List[Tuple[str, np.ndarray]]:
+    wanted = set(query.parameters) if query.parameters else None
+    columns: List[Tuple[str, np.ndarray]] = []
+    for node_id in reader.node_ids:
+        if query.node_ids is None or node_id in query.node_ids:
+            for name in reader.node_parameters(node_id):
+                if wanted is None or name in wanted:
+                    columns.append((f"{node_id}.{name}", reader.node_column(node_id, name)))
+    for edge_id in reader.edge_ids:
+        if query.edge_ids is None or edge_id in query.edge_ids:
+            for name in reader.edge_parameters(edge_id):
+                if wanted is None or name in wanted:
+                    columns.append((f"{edge_id}.{name}", reader.edge_column(edge_id, name)))
+    return columns
+
+
+def select_rows(
+    times: np.ndarray, columns: List[np.ndarray], query: MaterialBalanceExportQuery
+) -> np.ndarray:
+    """Row indices to export after time filtering and downsampling."""
+    start, end = 0, len(times)
+    if query.start_time is not None:
+        start = int(np.searchsorted(times, query.start_time, side="left"))
+    if query.end_time is not None:
+        end = int(np.searchsorted(times, query.end_time, side="right"))
+    rows = np.arange(start, max(start, end))
+    if query.target_points is None or len(rows) <= query.target_points:
+        return rows
+
+    target = query.target_points
+    columns = columns or [times]
+    if query.downsample == ResultDownsampleMethod.minmax and target >= 4:
+        return start + envelope_indices(columns, start, end, (target - 2) // 2)
+
+    # Below four points min/max buckets degenerate to the endpoints, so LTTB
+    candidates = np.arange(len(rows))
+    if len(rows) > LTTB_CANDIDATE_RATIO * target:
+        candidates = envelope_indices(columns, start, end, LTTB_CANDIDATE_RATIO * target // 2)
+    if len(candidates) <= target:
+        return start + candidates
+    values = np.column_stack([_scaled(column, start, end)[candidates] for column in columns])
+    return start + candidates[lttb_indices(times[start:end][candidates], values, target)]
+
+
+def _chunks(
+    times: np.ndarray, columns: List[np.ndarray], rows: np.ndarray
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    for offset in range(0, len(rows), EXPORT_CHUNK_ROWS):
+        index = rows[offset:offset + EXPORT_CHUNK_ROWS]
+        values = (
+            np.column_stack([column[index] for column in columns])
+            if columns
+            else np.empty((len(index), 0))
+        )
+        yield times[index], values
+
+
+def _ndjson(names: List[str], chunks: Iterator[Tuple[np.ndarray, np.ndarray]]) -> Iterator[bytes]:
+    for times, values in chunks:
+        lines = [
+            json.dumps({"time": t, **dict(zip(names, row, strict=True))})
+            for t, row in zip(times.tolist(), values.tolist(), strict=True)
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _csv(names: List[str], chunks: Iterator[Tuple[np.ndarray, np.ndarray]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["time", *names])
+    for times, values in chunks:
+        for t, row in zip(times.tolist(), values.tolist(), strict=True):
+            writer.writerow([t, *row])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow(names: List[str], chunks: Iterator[Tuple[np.ndarray, np.ndarray]]) -> Iterator[bytes]:
+    schema = pa.schema([("time", pa.float64()), *((name, pa.float32()) for name in names)])
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for times, values in chunks:
+            arrays = [
+                pa.array(times),
+                *(pa.array(values[:, j], type=pa.float32()) for j in range(len(names))),
+            ]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def build_export_response(
+    job_id: str, result_data: Optional[dict], query: MaterialBalanceExportQuery
+) -> StreamingResponse:
+    """Stream the filtered, optionally downsampled time series of a job.
+
+    Raises:
+        ValueError: when Arrow output is requested but pyarrow is missing
+    """
+    if query.format == ResultExportFormat.arrow and pa is None:
+        raise ValueError("Arrow export requires the pyarrow package")
+
+    reader = open_result(result_data)
+    times = np.asarray(reader.timestamps, dtype=np.float64)
+    selected = _select_columns(reader, query)
+    names = [name for name, _ in selected]
+    columns = [column for _, column in selected]
+    rows = select_rows(times, columns, query)
+    chunks = _chunks(times, columns, rows)
+
+    encoders = {
+        ResultExportFormat.ndjson: _ndjson,
+        ResultExportFormat.csv: _csv,
+        ResultExportFormat.arrow: _arrow,
+    }
+    return StreamingResponse(
+        encoders[query.format](names, chunks),
+        media_type=MEDIA_TYPES[query.format],
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.{query.format.value}"'},
+    )
@@ -0,0 +1,421 @@
+"""Columnar storage for calculation trajectories.
+
+A finished job used to keep ``timestamps``/``node_data``/``edge_data`` as
+nested JSON lists in ``result_data``, so every final-values or timeseries
+request deserialized the whole trajectory. Trajectories now go to
+``RESULT_STORE_DIR/<job_id>/``:
+
+- ``timestamps.npy``: float64 ``[T]``;
+- ``nodes.npy``: float32 ``[T, nodes, parameters]`` (volume + components);
+- ``edges.npy``: float32 ``[T, edges, parameters]``;
+- ``meta.json``: node/edge ids, parameter names and non-series fields such
+  as node labels.
+
+``result_data`` keeps the small JSON parts (summary, segment markers,
+events) plus a ``result_store`` descriptor. Readers memory-map the arrays
+and only touch the rows they slice. Jobs stored before this change still
+carry inline lists; ``open_result`` gives both the same reader interface.
+
+Trajectories spilled to disk during the calculation (``SpillSink``) are
+already in this layout and are moved into the job directory, not rewritten.
+While a job runs, its streamed partial-result frames are appended to
+``RESULT_STORE_DIR/.partial/<job_id>.jsonl`` (see ``progress.py``).
+"""
+
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.material_balance.result_frame import FLOW_RATE_PARAMETER, ResultFrame
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = "columnar-npy-v1"
+SERIES_KEYS = ("timestamps", "node_data", "edge_data")
+
+
+def _job_dir(job_id: str) -> Path:
+    return Path(settings.RESULT_STORE_DIR) / job_id
+
+
+def partial_results_dir() -> Path:
+    return Path(settings.RESULT_STORE_DIR) / ".partial"
+
+
+def read_partial_results(job_id: str, since: int = 0) -> List[Dict[str, Any]]:
+    """Streamed partial-result frames of a running job with ``seq >= since``."""
+    try:
+        lines = (partial_results_dir() / f"{job_id}.jsonl").read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return []
+    frames = []
+    for line in lines:
+        try:
+            frame = json.loads(line)
+        except json.JSONDecodeError:
+            # The writer may be halfway through the last line
+            continue
+        if frame["seq"] >= since:
+            frames.append(frame)
+    return frames
+
+
+def delete_partial_results(job_id: str) -> None:
+    (partial_results_dir() / f"{job_id}.jsonl").unlink(missing_ok=True)
+
+
+def _split_entities(
+    entities: Dict[str, Dict[str, Any]], time_points: int
+) -> tuple[List[str], List[str], Dict[str, List[str]], Dict[str, Dict[str, Any]], np.ndarray]:
+    """Split ``{id: {param: series | scalar}}`` into a ``[T, ids, params]`` block."""
+    ids = list(entities.keys())
+    params: List[str] = []
+    fields: Dict[str, List[str]] = {}
+    attrs: Dict[str, Dict[str, Any]] = {}
+    for entity_id, data in entities.items():
+        fields[entity_id] = []
+        for name, values in data.items():
+            if (
+                isinstance(values, (list, tuple, np.ndarray))
+                and len(values) == time_points
+                and np.asarray(values).dtype.kind in "fiub"
+            ):
+                fields[entity_id].append(name)
+                if name not in params:
+                    params.append(name)
+            else:
+                attrs.setdefault(entity_id, {})[name] = values
+
+    block = np.full((time_points, len(ids), len(params)), np.nan, dtype=np.float32)
+    column = {name: j for j, name in enumerate(params)}
+    for i, entity_id in enumerate(ids):
+        for name in fields[entity_id]:
+            block[:, i, column[name]] = np.asarray(entities[entity_id][name], dtype=np.float32)
+    return ids, params, fields, attrs, block
+
+
+def _frame_blocks(frame: ResultFrame) -> Dict[str, Any]:
+    """Store layout straight from the frame arrays, without Python lists."""
+    return {
+        "node_ids": frame.node_ids,
+        "node_params": frame.parameter_names,
+        "node_fields": {node_id: frame.node_fields for node_id in frame.node_ids},
+        "node_attrs": {
+            node_id: {"label": label} for node_id, label in zip(frame.node_ids, frame.node_labels, strict=True)
+        },
+        "nodes": frame.states,
+        "edge_ids": frame.edge_ids,
+        "edge_params": [FLOW_RATE_PARAMETER],
+        "edge_fields": {edge_id: [FLOW_RATE_PARAMETER] for edge_id in frame.edge_ids},
+        "edge_attrs": {},
+        "edges": frame.edge_flows[:, :, np.newaxis],
+    }
+
+
+def _dict_blocks(output_data: Dict[str, Any], time_points: int) -> Dict[str, Any]:
+    node_ids, node_params, node_fields, node_attrs, nodes = _split_entities(
+        output_data.get("node_data") or {}, time_points
+    )
+    edge_ids, edge_params, edge_fields, edge_attrs, edges = _split_entities(
+        output_data.get("edge_data") or {}, time_points
+    )
+    return {
+        "node_ids": node_ids,
+        "node_params": node_params,
+        "node_fields": node_fields,
+        "node_attrs": node_attrs,
+        "nodes": nodes,
+        "edge_ids": edge_ids,
+        "edge_params": edge_params,
+        "edge_fields": edge_fields,
+        "edge_attrs": edge_attrs,
+        "edges": edges,
+    }
+
+
+def save_result(
+    job_id: str, output_data: Dict[str, Any], frame: Optional[ResultFrame] = None
+) -> Dict[str, Any]:
+    """Write the trajectory of ``output_data`` (or of ``frame``) to disk.
+
+    Returns the JSON-sized ``result_data`` to persist on the job row. If the
+    store cannot be written the full inline payload is returned instead, so a
+    finished calculation is never lost to a disk problem.
+    """
+    if frame is not None:
+        timestamps = frame.timestamps
+    else:
+        timestamps = output_data.get("timestamps")
+        if timestamps is None:
+            return output_data
+
+    time_points = len(timestamps)
+    job_dir = _job_dir(job_id)
+    try:
+        blocks = _frame_blocks(frame) if frame is not None else _dict_blocks(output_data, time_points)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        nodes = blocks.pop("nodes")
+        edges = blocks.pop("edges")
+        if frame is None or not _adopt_spill(frame, job_dir):
+            np.save(job_dir / "timestamps.npy", np.asarray(timestamps, dtype=np.float64))
+            np.save(job_dir / "nodes.npy", nodes.astype(np.float32, copy=False))
+            np.save(job_dir / "edges.npy", edges.astype(np.float32, copy=False))
+        meta = {"format": STORE_FORMAT, **blocks}
+        (job_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    except (OSError, ValueError) as exc:
+        logger.warning(
+            "result store write failed, keeping inline result",
+            extra={"job_id": job_id, "error_message": str(exc)},
+        )
+        shutil.rmtree(job_dir, ignore_errors=True)
+        if frame is None:
+            return output_data
+        return {
+            **output_data,
+            "timestamps": frame.timestamps_list(),
+            "node_data": frame.node_data(),
+            "edge_data": frame.edge_data(),
+        }
+
+    result_data = {key: value for key, value in output_data.items() if key not in SERIES_KEYS}
+    result_data["result_store"] = {
+        "format": STORE_FORMAT,
+        "job_id": job_id,
+        "time_points": time_points,
+        "nodes": len(blocks["node_ids"]),
+        "edges": len(blocks["edge_ids"]),
+    }
+    return result_data
+
+
+def _adopt_spill(frame: ResultFrame, job_dir: Path) -> bool:
+    """Move the spill files behind ``frame`` into ``job_dir`` instead of copying them."""
+    if not frame.spill_dir:
+        return False
+    spill_dir = Path(frame.spill_dir)
+    if not spill_dir.is_dir() or spill_dir.stat().st_dev != job_dir.stat().st_dev:
+        # Another filesystem: write a copy from the maps
+        return False
+    for name in ("timestamps.npy", "nodes.npy", "edges.npy"):
+        os.replace(spill_dir / name, job_dir / name)
+    frame.spill_dir = None
+    shutil.rmtree(spill_dir, ignore_errors=True)
+    return True
+
+
+def link_result(result_data: Optional[Dict[str, Any]], job_id: str) -> Optional[Dict[str, Any]]:
+    """Give ``job_id`` its own copy of another job's stored result.
+
+    Used when a job reuses the result of an identical one. The array files
+    are hard-linked (copied if the store cannot link), so deleting either
+    job leaves the other readable. Returns the ``result_data`` for ``job_id``.
+
+    Raises:
+        OSError: when the source files cannot be read, e.g. the other job was
+            deleted meanwhile; the partial copy is removed first
+    """
+    if not result_data:
+        return result_data
+    linked = dict(result_data)
+    if "job_id" in linked:
+        linked["job_id"] = job_id
+    descriptor = result_data.get("result_store")
+    if not descriptor or descriptor["job_id"] == job_id:
+        return linked
+
+    source_dir = _job_dir(descriptor["job_id"])
+    job_dir = _job_dir(job_id)
+    job_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        for source in source_dir.iterdir():
+            target = job_dir / source.name
+            target.unlink(missing_ok=True)
+            try:
+                target.hardlink_to(source)
+            except OSError:
+                shutil.copy2(source, target)
+    except OSError:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    linked["result_store"] = {**descriptor, "job_id": job_id}
+    return linked
+
+
+def delete_result(job_id: str) -> None:
+    """Remove the stored trajectory of a deleted job, if any."""
+    shutil.rmtree(_job_dir(job_id), ignore_errors=True)
+    delete_partial_results(job_id)
+
+
+class StoredResult:
+    """Memory-mapped reader over a job's columnar result files."""
+
+    def __init__(self, job_id: str) -> None:
+        job_dir = _job_dir(job_id)
+        meta = json.loads((job_dir / "meta.json").read_text(encoding="utf-8"))
+        self.timestamps: np.ndarray = np.load(job_dir / "timestamps.npy", mmap_mode="r")
+        self._nodes: np.ndarray = np.load(job_dir / "nodes.npy", mmap_mode="r")
+        self._edges: np.ndarray = np.load(job_dir / "edges.npy", mmap_mode="r")
+        self.node_ids: List[str] = meta["node_ids"]
+        self.edge_ids: List[str] = meta["edge_ids"]
+        self._node_index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self._edge_index = {edge_id: i for i, edge_id in enumerate(self.edge_ids)}
+        self._node_columns = {name: j for j, name in enumerate(meta["node_params"])}
+        self._edge_columns = {name: j for j, name in enumerate(meta["edge_params"])}
+        self._node_fields: Dict[str, List[str]] = meta["node_fields"]
+        self._edge_fields: Dict[str, List[str]] = meta["edge_fields"]
+        self._node_attrs: Dict[str, Dict[str, Any]] = meta["node_attrs"]
+        self._edge_attrs: Dict[str, Dict[str, Any]] = meta["edge_attrs"]
+
+    @property
+    def time_points(self) -> int:
+        return int(self.timestamps.shape[0])
+
+    def timestamps_slice(self, start: int, end: int) -> List[float]:
+        return self.timestamps[start:end].tolist()
+
+    def search_time(self, target: float, side: str = "left") -> int:
+        return int(np.searchsorted(self.timestamps, target, side=side))
+
+    def _read(
+        self,
+        block: np.ndarray,
+        index: int,
+        fields: List[str],
+        columns: Dict[str, int],
+        rows: Union[slice, int],
+    ) -> Dict[str, Any]:
+        if isinstance(rows, int):
+            if not self.time_points:
+                return {name: 0.0 for name in fields}
+            values = np.asarray(block[rows, index, :])
+            return {name: float(values[columns[name]]) for name in fields}
+        values = np.asarray(block[rows, index, :])
+        return {name: values[:, columns[name]].tolist() for name in fields}
+
+    def node_values(
+        self, node_id: str, rows: Union[slice, int], include_attrs: bool = False
+    ) -> Dict[str, Any]:
+        data = dict(self._node_attrs.get(node_id, {})) if include_attrs else {}
+        data.update(
+            self._read(
+                self._nodes, self._node_index[node_id], self._node_fields[node_id], self._node_columns, rows
+            )
+        )
+        return data
+
+    def edge_values(
+        self, edge_id: str, rows: Union[slice, int], include_attrs: bool = False
+    ) -> Dict[str, Any]:
+        data = dict(self._edge_attrs.get(edge_id, {})) if include_attrs else {}
+        data.update(
+            self._read(
+                self._edges, self._edge_index[edge_id], self._edge_fields[edge_id], self._edge_columns, rows
+            )
+        )
+        return data
+
+    def node_parameters(self, node_id: str) -> List[str]:
+        return list(self._node_fields[node_id])
+
+    def edge_parameters(self, edge_id: str) -> List[str]:
+        return list(self._edge_fields[edge_id])
+
+    def node_column(self, node_id: str, parameter: str) -> np.ndarray:
+        """Memory-mapped view of one node series (no read until indexed)."""
+        return self._nodes[:, self._node_index[node_id], self._node_columns[parameter]]
+
+    def edge_column(self, edge_id: str, parameter: str) -> np.ndarray:
+        return self._edges[:, self._edge_index[edge_id], self._edge_columns[parameter]]
+
+
+class InlineResult:
+    """Same reader interface over a legacy ``result_data`` with inline lists."""
+
+    def __init__(self, result_data: Dict[str, Any]) -> None:
+        self.timestamps: Sequence[float] = result_data.get("timestamps") or []
+        self._node_data: Dict[str, Dict[str, Any]] = result_data.get("node_data") or {}
+        self._edge_data: Dict[str, Dict[str, Any]] = result_data.get("edge_data") or {}
+        self.node_ids = list(self._node_data.keys())
+        self.edge_ids = list(self._edge_data.keys())
+
+    @property
+    def time_points(self) -> int:
+        return len(self.timestamps)
+
+    def timestamps_slice(self, start: int, end: int) -> List[float]:
+        return list(self.timestamps[start:end])
+
+    def search_time(self, target: float, side: str = "left") -> int:
+        return int(np.searchsorted(np.asarray(self.timestamps, dtype=np.float64), target, side=side))
+
+    @staticmethod
+    def _read(data: Dict[str, Any], rows: Union[slice, int], include_attrs: bool) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        for name, series in data.items():
+            if not isinstance(series, list):
+                if include_attrs:
+                    values[name] = series
+                continue
+            if isinstance(rows, int):
+                values[name] = series[rows] if series else 0.0
+            else:
+                values[name] = series[rows]
+        return values
+
+    def node_values(
+        self, node_id: str, rows: Union[slice, int], include_attrs: bool = False
+    ) -> Dict[str, Any]:
+        return self._read(self._node_data[node_id], rows, include_attrs)
+
+    def edge_values(
+        self, edge_id: str, rows: Union[slice, int], include_attrs: bool = False
+    ) -> Dict[str, Any]:
+        return self._read(self._edge_data[edge_id], rows, include_attrs)
+
+    def node_parameters(self, node_id: str) -> List[str]:
+        return [name for name, series in self._node_data[node_id].items() if isinstance(series, list)]
+
+    def edge_parameters(self, edge_id: str) -> List[str]:
+        return [name for name, series in self._edge_data[edge_id].items() if isinstance(series, list)]
+
+    def node_column(self, node_id: str, parameter: str) -> np.ndarray:
+        return np.asarray(self._node_data[node_id][parameter], dtype=np.float64)
+
+    def edge_column(self, edge_id: str, parameter: str) -> np.ndarray:
+        return np.asarray(self._edge_data[edge_id][parameter], dtype=np.float64)
+
+
+ResultReader = Union[StoredResult, InlineResult]
+
+
+def open_result(result_data: Optional[Dict[str, Any]]) -> ResultReader:
+    """Return a reader for a job's ``result_data`` (stored or inline)."""
+    descriptor = (result_data or {}).get("result_store")
+    if descriptor:
+        return StoredResult(descriptor["job_id"])
+    return InlineResult(result_data or {})
+
+
+def load_result_data(result_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Materialize the full legacy ``result_data`` payload for API responses."""
+    if not result_data or "result_store" not in result_data:
+        return result_data
+
+    reader = open_result(result_data)
+    rows = slice(None)
+    payload = {key: value for key, value in result_data.items() if key != "result_store"}
+    payload["timestamps"] = reader.timestamps_slice(0, reader.time_points)
+    payload["node_data"] = {
+        node_id: reader.node_values(node_id, rows, include_attrs=True) for node_id in reader.node_ids
+    }
+    payload["edge_data"] = {
+        edge_id: reader.edge_values(edge_id, rows, include_attrs=True) for edge_id in reader.edge_ids
+    }
+    return payload
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+from sqlmodel import Session, select
+
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import CalculationCancelledError
+from app.material_balance.sweep import ScenarioSweepOutput, run_scenario_sweep
+from app.models import (
+    MaterialBalanceInput,
+    MaterialBalanceJobStatus,
+    ScenarioSweepJob,
+    ScenarioSweepParameter,
+)
+from app.services.calculation_queue import (
+    cancel_running_job,
+    failure_summary,
+    register_cancel_token,
+    release_cancel_token,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ScenarioSweepService:
+    """
+    参数扫描计算服务：所有变体合并为一次批量 ODE 求解
+    """
+
+    def __init__(self):
+        self.calculator = MaterialBalanceCalculator()
+
+    async def run_sweep(
+        self,
+        session: Session,
+        job_id: str,
+        input_data: MaterialBalanceInput,
+        parameters: List[ScenarioSweepParameter],
+        variants: List[List[float]],
+        include_trajectories: bool = False,
+    ) -> None:
+        """
+        异步执行参数扫描
+        """
+        statement = select(ScenarioSweepJob).where(ScenarioSweepJob.job_id == job_id)
+        job = session.exec(statement).first()
+
+        if not job:
+            return
+
+        cancel_token = register_cancel_token(job_id)
+
+        try:
+            job.status = MaterialBalanceJobStatus.running
+            job.started_at = datetime.now()
+            session.add(job)
+            session.commit()
+
+            # Same budget as a single calculation, scaled by the stacked problem size
+            total_steps = int(input_data.parameters.hours * input_data.parameters.steps_per_hour) + 1
+            num_nodes = len(input_data.nodes) * len(variants)
+            num_components = len(input_data.nodes[0].initial_concentrations) if input_data.nodes else 1
+            complexity_factor = (total_steps * num_nodes * num_components) / 1000
+            timeout_seconds = min(180 + complexity_factor * 10, 1800)
+
+            logger.info(
+                "scenario sweep started",
+                extra={
+                    "job_id": job_id,
+                    "variants": len(variants),
+                    "timeout_seconds": round(timeout_seconds, 2),
+                },
+            )
+
+            try:
+                output = await asyncio.wait_for(
+                    asyncio.get_event_loop().run_in_executor(
+                        None,
+                        run_scenario_sweep,
+                        self.calculator,
+                        input_data,
+                        parameters,
+                        variants,
+                        cancel_token,
+                    ),
+                    timeout=timeout_seconds,
+                )
+            except asyncio.TimeoutError:
+                cancel_token.cancel(f"Timed out after {timeout_seconds:.1f} seconds")
+                raise Exception(
+                    f"Scenario sweep timed out after {timeout_seconds:.1f} seconds. "
+                    "Try fewer variants or a shorter simulation time."
+                )
+
+            logger.info(
+                "scenario sweep completed",
+                extra={
+                    "job_id": job_id,
+                    "calculation_time_seconds": round(output.calculation_time_seconds, 2),
+                    "variants_per_second": round(output.variants_per_second, 2),
+                },
+            )
+
+            outlet_ids = [node.node_id for node in input_data.nodes if node.is_outlet]
+            job.status = MaterialBalanceJobStatus.success
+            job.completed_at = datetime.now()
+            job.result_data = build_sweep_result(output, include_trajectories)
+            job.summary_data = build_sweep_summary(output, outlet_ids)
+            job.error_message = None
+
+        except CalculationCancelledError:
+            logger.warning(
+                "scenario sweep stopped after cancel",
+                extra={"job_id": job_id, **cancel_token.metrics()},
+            )
+            job.status = MaterialBalanceJobStatus.cancelled
+            job.completed_at = datetime.now()
+            job.error_message = "Scenario sweep cancelled by user"
+            job.result_data = None
+            job.summary_data = {"cancellation": cancel_token.metrics()}
+        except asyncio.CancelledError:
+            cancel_token.cancel("Calculation cancelled due to server shutdown")
+            logger.warning("scenario sweep cancelled", extra={"job_id": job_id})
+            job.status = MaterialBalanceJobStatus.cancelled
+            job.completed_at = datetime.now()
+            job.error_message = "Calculation cancelled due to server shutdown"
+            job.result_data = None
+            raise
+        except Exception as e:
+            error_message = f"Calculation failed: {str(e)}"
+            logger.exception(
+                "scenario sweep failed",
+                extra={"job_id": job_id, "error_message": error_message},
+            )
+            job.status = MaterialBalanceJobStatus.failed
+            job.completed_at = datetime.now()
+            job.error_message = error_message
+            job.result_data = None
+            job.summary_data = failure_summary(e)
+
+        finally:
+            release_cancel_token(job_id)
+            session.add(job)
+            session.commit()
+
+    def cancel_calculation(self, job_id: str, session: Session) -> bool:
+        """
+        取消参数扫描任务
+        """
+        job = session.exec(select(ScenarioSweepJob).where(ScenarioSweepJob.job_id == job_id)).first()
+        if not job:
+            return False
+
+        if job.status in [MaterialBalanceJobStatus.pending, MaterialBalanceJobStatus.running]:
+            job.status = MaterialBalanceJobStatus.cancelled
+            job.completed_at = datetime.now()
+            job.error_message = "Scenario sweep cancelled by user"
+            session.add(job)
+            session.commit()
+            # Stop the solver if the job runs in this process; workers poll the job row
+            cancel_running_job(job_id)
+            return True
+
+        return False
+
+
+def _final_values(node_data: Dict[str, Dict[str, List[float]]]) -> Dict[str, Dict[str, float]]:
+    return {
+        node_id: {name: series[-1] for name, series in variables.items() if series}
+        for node_id, variables in node_data.items()
+    }
+
+
+def build_sweep_result(output: ScenarioSweepOutput, include_trajectories: bool) -> Dict[str, Any]:
+    """
+    每个变体只保存参数取值和最终值；完整时间序列按需保存
+    """
+    variants = []
+    for index, values in enumerate(output.variants):
+        variant: Dict[str, Any] = {
+            "index": index,
+            "overrides": dict(zip(output.parameter_labels, values, strict=True)),
+            "final_values": _final_values(output.node_data[index]),
+        }
+        if include_trajectories:
+            variant["node_data"] = output.node_data[index]
+        variants.append(variant)
+
+    return {
+        "parameter_labels": output.parameter_labels,
+        "timestamps": output.timestamps if include_trajectories else None,
+        "variants": variants,
+    }
+
+
+def build_sweep_summary(output: ScenarioSweepOutput, outlet_ids: Sequence[str]) -> Dict[str, Any]:
+    """
+    汇总表：每行一个变体，列为扫描参数取值和出水节点最终浓度
+    """
+    value_columns = [
+        (node_id, name)
+        for node_id in outlet_ids
+        for name in (output.node_data[0].get(node_id, {}) if output.node_data else {})
+    ]
+
+    rows = []
+    for index, values in enumerate(output.variants):
+        finals = _final_values(output.node_data[index])
+        row: List[Any] = [index, *values]
+        row.extend(finals.get(node_id, {}).get(name) for node_id, name in value_columns)
+        rows.append(row)
+
+    return {
+        "columns": [
+            "variant",
+            *output.parameter_labels,
+            *(f"{node_id}.{name}" for node_id, name in value_columns),
+        ],
+        "rows": rows,
+        "variant_count": len(output.variants),
+        "calculation_time_seconds": round(output.calculation_time_seconds, 3),
+        "variants_per_second": round(output.variants_per_second, 3),
+    }
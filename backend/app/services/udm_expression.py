@@ -2,7 +2,7 @@ import ast
 import math
 from dataclasses import dataclass
 from functools import reduce
-from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 
 import torch
 
@@ -520,15 +520,291 @@ def _evaluate_ast(node: ast.AST, variables: Dict[str, Any], _depth: int = 0) ->
     raise UnsafeExpressionError(f"Unsupported AST node: {type(node).__name__}")
 
 
-def compile_expression(expression: str) -> Callable[[Dict[str, Any]], Any]:
+def _scalar_or_tensor_unary(
+    value: Any,
+    tensor_fn: Callable[[torch.Tensor], torch.Tensor],
+    scalar_fn: Callable[[float], float],
+) -> Any:
+    if torch.is_tensor(value):
+        return tensor_fn(value)
+    try:
+        return scalar_fn(float(value))
+    except (OverflowError, ValueError):
+        return float(tensor_fn(torch.as_tensor(float(value), dtype=torch.float64)).item())
+
+
+def _k_exp(value: Any) -> Any:
+    return _scalar_or_tensor_unary(value, torch.exp, math.exp)
+
+
+def _k_log(value: Any) -> Any:
+    return _scalar_or_tensor_unary(
+        value,
+        lambda x: torch.log(torch.clamp(x, min=1e-12)),
+        lambda x: math.log(max(x, 1e-12)),
+    )
+
+
+def _k_sqrt(value: Any) -> Any:
+    return _scalar_or_tensor_unary(
+        value,
+        lambda x: torch.sqrt(torch.clamp(x, min=0)),
+        lambda x: math.sqrt(max(x, 0.0)),
+    )
+
+
+def _k_abs(value: Any) -> Any:
+    return _scalar_or_tensor_unary(value, torch.abs, abs)
+
+
+def _k_pow(base: Any, exponent: Any) -> Any:
+    if not torch.is_tensor(base) and not torch.is_tensor(exponent):
+        result = torch.pow(
+            torch.as_tensor(float(base), dtype=torch.float64),
+            torch.as_tensor(float(exponent), dtype=torch.float64),
+        )
+        return float(result.item())
+    ref = _first_tensor([base, exponent])
+    return torch.pow(_ensure_tensor(base, ref), _ensure_tensor(exponent, ref))
+
+
+def _k_div(numerator: Any, denominator: Any) -> Any:
+    if torch.is_tensor(denominator):
+        return numerator / torch.clamp(denominator, min=1e-12)
+    if denominator == 0:
+        denominator = 1e-12
+    return numerator / denominator
+
+
+def _k_clip(value: Any, lower: Any, upper: Any = None) -> Any:
+    if not any(torch.is_tensor(item) for item in (value, lower, upper)):
+        clipped = max(float(value), float(lower))
+        return clipped if upper is None else min(clipped, float(upper))
+    ref = _first_tensor([value, lower, upper])
+    tensor_value = _ensure_tensor(value, ref)
+    if upper is None:
+        return torch.clamp(tensor_value, min=lower)
+    return torch.clamp(tensor_value, min=lower, max=upper)
+
+
+def _k_min(*values: Any) -> Any:
+    if not any(torch.is_tensor(item) for item in values):
+        return float(min(values))
+    ref = _first_tensor(list(values))
+    return reduce(
+        lambda acc, cur: torch.minimum(acc, _ensure_tensor(cur, acc)),
+        values[1:],
+        _ensure_tensor(values[0], ref),
+    )
+
+
+def _k_max(*values: Any) -> Any:
+    if not any(torch.is_tensor(item) for item in values):
+        return float(max(values))
+    ref = _first_tensor(list(values))
+    return reduce(
+        lambda acc, cur: torch.maximum(acc, _ensure_tensor(cur, acc)),
+        values[1:],
+        _ensure_tensor(values[0], ref),
+    )
+
+
+_KERNEL_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "exp": _k_exp,
+    "log": _k_log,
+    "sqrt": _k_sqrt,
+    "abs": _k_abs,
+    "pow": _k_pow,
+    "clip": _k_clip,
+    "min": _k_min,
+    "max": _k_max,
+}
+
+_KERNEL_BINOPS = {
+    ast.Add: "+",
+    ast.Sub: "-",
+    ast.Mult: "*",
+}
+
+
+@dataclass(frozen=True)
+class CompiledKernel:
+    """Flat callable produced by :func:`compile_expression_kernel`.
+
+    ``fn`` takes a sequence of slot values (floats or tensors, aligned with
+    ``slot_names``) and returns one value per compiled expression.
+    """
+
+    source: str
+    slot_names: Tuple[str, ...]
+    output_count: int
+    fn: Callable[[Sequence[Any]], Tuple[Any, ...]]
+
+    def __call__(self, values: Sequence[Any]) -> Tuple[Any, ...]:
+        return self.fn(values)
+
+
+class _KernelLowering:
+    """Lower a validated expression AST into Python source over slot values.
+
+    Sub-trees made only of literals, reserved constants and bound constants
+    are folded at compile time, so the generated code only touches slots.
+    """
+
+    def __init__(self, slot_index: Dict[str, int], constants: Mapping[str, float]):
+        self.slot_index = slot_index
+        self.constants = constants
+        self.used_slots: Set[str] = set()
+
+    def lower(self, node: ast.AST, depth: int = 0) -> Tuple[str, Optional[float]]:
+        """Return ``(source, folded_value)``; ``folded_value`` is set for constants."""
+        if depth > MAX_AST_DEPTH:
+            raise UnsafeExpressionError(f"Expression exceeds maximum nesting depth ({MAX_AST_DEPTH})")
+        if isinstance(node, ast.Expression):
+            return self.lower(node.body, depth + 1)
+        if _is_numeric_constant(node):
+            return self._constant(float(node.value))
+        if isinstance(node, ast.Name):
+            if node.id in RESERVED_CONSTANTS:
+                return self._constant(math.pi if node.id == "pi" else math.e)
+            if node.id in self.constants:
+                return self._constant(float(self.constants[node.id]))
+            if node.id not in self.slot_index:
+                raise UnsafeExpressionError(f"Unknown symbol: {node.id}")
+            self.used_slots.add(node.id)
+            return f"v[{self.slot_index[node.id]}]", None
+        if isinstance(node, ast.BinOp):
+            left, left_value = self.lower(node.left, depth + 1)
+            right, right_value = self.lower(node.right, depth + 1)
+            if left_value is not None and right_value is not None:
+                return self._constant(self._fold_binop(node.op, left_value, right_value))
+            if type(node.op) in _KERNEL_BINOPS:
+                return f"({left} {_KERNEL_BINOPS[type(node.op)]} {right})", None
+            if isinstance(node.op, ast.Div):
+                if right_value is not None:
+                    # A constant denominator is resolved now; only a zero needs guarding.
+                    denominator = right_value if right_value != 0 else 1e-12
+                    return f"({left} / {denominator!r})", None
+                return f"_div({left}, {right})", None
+            if isinstance(node.op, ast.Pow):
+                return f"_pow({left}, {right})", None
+            raise UnsafeExpressionError(f"Unsupported binary operator: {type(node.op).__name__}")
+        if isinstance(node, ast.UnaryOp):
+            operand, operand_value = self.lower(node.operand, depth + 1)
+            if isinstance(node.op, ast.UAdd):
+                return operand, operand_value
+            if isinstance(node.op, ast.USub):
+                if operand_value is not None:
+                    return self._constant(-operand_value)
+                return f"(-{operand})", None
+            raise UnsafeExpressionError(f"Unsupported unary operator: {type(node.op).__name__}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name):
+                raise UnsafeExpressionError("Only simple function calls are supported")
+            fn_name = node.func.id
+            if fn_name not in ALLOWED_FUNCTIONS:
+                raise UnsafeExpressionError(f"Function {fn_name} is not allowed")
+            if fn_name == "clip" and len(node.args) < 2:
+                raise UnsafeExpressionError("clip requires at least two arguments")
+            lowered = [self.lower(arg, depth + 1) for arg in node.args]
+            if fn_name == "clip":
+                lowered = lowered[:3]
+            if lowered and all(value is not None for _, value in lowered):
+                folded = _KERNEL_FUNCTIONS[fn_name](*[value for _, value in lowered])
+                return self._constant(float(folded))
+            args = ", ".join(source for source, _ in lowered)
+            return f"_{fn_name}({args})", None
+
+        raise UnsafeExpressionError(f"Unsupported AST node: {type(node).__name__}")
+
+    @staticmethod
+    def _constant(value: float) -> Tuple[str, Optional[float]]:
+        if math.isfinite(value):
+            return repr(float(value)), float(value)
+        return f"float({str(float(value))!r})", float(value)
+
+    @staticmethod
+    def _fold_binop(op: ast.operator, left: float, right: float) -> float:
+        if isinstance(op, ast.Add):
+            return left + right
+        if isinstance(op, ast.Sub):
+            return left - right
+        if isinstance(op, ast.Mult):
+            return left * right
+        if isinstance(op, ast.Div):
+            return float(_k_div(left, right))
+        if isinstance(op, ast.Pow):
+            return float(_k_pow(left, right))
+        raise UnsafeExpressionError(f"Unsupported binary operator: {type(op).__name__}")
+
+
+def _parse_validated(expression: str) -> ast.Expression:
     parsed = ast.parse(expression, mode="eval")
 
     # Reuse validation guard to block unsafe constructs before runtime.
     issues = _validate_ast(parsed, process_name="runtime")
     if issues:
         raise UnsafeExpressionError("; ".join(issue.message for issue in issues))
+    return parsed
+
+
+def _extract_variable_names(tree: ast.AST) -> List[str]:
+    call_names = {
+        id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)
+    }
+    names = {
+        node.id
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Name)
+        and id(node) not in call_names
+        and node.id not in RESERVED_CONSTANTS
+    }
+    return sorted(names)
+
+
+def compile_expression_kernel(
+    expressions: Sequence[str],
+    *,
+    slot_names: Sequence[str],
+    constants: Optional[Mapping[str, float]] = None,
+) -> CompiledKernel:
+    """Compile one or more expressions into a single flat callable.
+
+    Every expression is validated, lowered once and emitted into one generated
+    function ``fn(v) -> tuple``, where ``v[i]`` holds the value of
+    ``slot_names[i]``. Names listed in ``constants`` are folded into the
+    generated code. Semantics match the AST interpreter (guarded division,
+    clamped ``log``/``sqrt``, element-wise ``min``/``max``/``clip``).
+    """
+    slot_index = {str(name): idx for idx, name in enumerate(slot_names)}
+    lowering = _KernelLowering(slot_index, dict(constants or {}))
+    bodies = [lowering.lower(_parse_validated(str(expression))) for expression in expressions]
+
+    returned = ", ".join(source for source, _ in bodies)
+    source = f"def _kernel(v):\n    return ({returned}{',' if len(bodies) == 1 else ''})\n"
+    namespace: Dict[str, Any] = {"__builtins__": {"float": float}}
+    namespace.update({f"_{name}": fn for name, fn in _KERNEL_FUNCTIONS.items()})
+    namespace["_div"] = _k_div
+    exec(compile(source, "<udm-kernel>", "exec"), namespace)
+
+    return CompiledKernel(
+        source=source,
+        slot_names=tuple(str(name) for name in slot_names),
+        output_count=len(bodies),
+        fn=namespace["_kernel"],
+    )
+
+
+def compile_expression(expression: str) -> Callable[[Dict[str, Any]], Any]:
+    parsed = _parse_validated(expression)
+    variable_names = _extract_variable_names(parsed)
+    kernel = compile_expression_kernel([expression], slot_names=variable_names)
 
     def _executor(variables: Dict[str, Any]) -> Any:
-        return _evaluate_ast(parsed, variables)
+        try:
+            values = [variables[name] for name in variable_names]
+        except KeyError as ex:
+            raise UnsafeExpressionError(f"Unknown symbol: {ex.args[0]}") from None
+        return kernel.fn(values)[0]
 
     return _executor
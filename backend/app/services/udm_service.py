@@ -6,10 +6,20 @@ from typing import Any, Dict, Optional
 
 from sqlmodel import Session, select
 
+from app.material_balance.cancellation import CancellationToken
 from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import CalculationCancelledError
 from app.material_balance.models import MaterialBalanceResult
+from app.material_balance.profiling import log_profile, record_persistence
 from app.models import MaterialBalanceInput, MaterialBalanceJobStatus, UDMJob
+from app.services.calculation_queue import (
+    cancel_running_job,
+    failure_summary,
+    register_cancel_token,
+    release_cancel_token,
+)
 from app.services.data_conversion_service import DataConversionService
+from app.services.result_store import save_result
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +36,7 @@ class UDMService:
         session: Session,
         job_id: str,
         input_data: MaterialBalanceInput,
+        steady_state: bool = False,
     ) -> None:
         statement = select(UDMJob).where(UDMJob.job_id == job_id)
         job = session.exec(statement).first()
@@ -33,6 +44,8 @@ class UDMService:
         if not job:
             return
 
+        cancel_token = register_cancel_token(job_id)
+
         try:
             job.status = MaterialBalanceJobStatus.running
             job.started_at = datetime.now()
@@ -65,10 +78,14 @@ class UDMService:
                         None,
                         self._run_calculation_sync,
                         input_data,
+                        steady_state,
+                        cancel_token,
                     ),
                     timeout=timeout_seconds,
                 )
             except asyncio.TimeoutError:
+                # Stop the solver thread instead of letting it run to completion
+                cancel_token.cancel(f"Timed out after {timeout_seconds:.1f} seconds")
                 raise Exception(
                     f"UDM calculation timed out after {timeout_seconds:.1f} seconds. "
                     "Try reducing simulation time or steps per hour."
@@ -86,9 +103,6 @@ class UDMService:
             output_data = {
                 "job_id": result.job_id,
                 "status": result.status,
-                "timestamps": result.timestamps,
-                "node_data": result.node_data,
-                "edge_data": result.edge_data,
                 "segment_markers": result.segment_markers,
                 "parameter_change_events": result.parameter_change_events,
                 "summary": result.summary,
@@ -96,11 +110,24 @@ class UDMService:
 
             job.status = MaterialBalanceJobStatus.success
             job.completed_at = datetime.now()
-            job.result_data = output_data
+            persist_started = time.perf_counter()
+            job.result_data = save_result(job_id, output_data, frame=result.frame)
+            record_persistence(result.summary, time.perf_counter() - persist_started)
             job.summary_data = result.summary
             job.error_message = None
 
+        except CalculationCancelledError:
+            logger.warning(
+                "udm calculation stopped after cancel",
+                extra={"job_id": job_id, **cancel_token.metrics()},
+            )
+            job.status = MaterialBalanceJobStatus.cancelled
+            job.completed_at = datetime.now()
+            job.error_message = "UDM calculation cancelled by user"
+            job.result_data = None
+            job.summary_data = {"cancellation": cancel_token.metrics()}
         except asyncio.CancelledError:
+            cancel_token.cancel("Calculation cancelled due to server shutdown")
             logger.warning("udm calculation cancelled", extra={"job_id": job_id})
             job.status = MaterialBalanceJobStatus.cancelled
             job.completed_at = datetime.now()
@@ -118,13 +145,24 @@ class UDMService:
             job.completed_at = datetime.now()
             job.error_message = error_message
             job.result_data = None
+            job.summary_data = failure_summary(e)
 
         finally:
+            release_cancel_token(job_id)
             session.add(job)
+            commit_started = time.perf_counter()
             session.commit()
+            log_profile(job_id, job.summary_data, time.perf_counter() - commit_started)
 
-    def _run_calculation_sync(self, input_data: MaterialBalanceInput) -> MaterialBalanceResult:
-        return self.calculator.calculate(input_data)
+    def _run_calculation_sync(
+        self,
+        input_data: MaterialBalanceInput,
+        steady_state: bool = False,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> MaterialBalanceResult:
+        if steady_state:
+            return self.calculator.calculate_steady_state(input_data, cancel_token, materialize=False)
+        return self.calculator.calculate(input_data, cancel_token, materialize=False)
 
     def get_calculation_progress(self, job_id: str, session: Session) -> Optional[Dict[str, Any]]:
         statement = select(UDMJob).where(UDMJob.job_id == job_id)
@@ -185,6 +223,8 @@ class UDMService:
             job.error_message = "UDM calculation cancelled by user"
             session.add(job)
             session.commit()
+            # Stop the solver if the job runs in this process; workers poll the job row
+            cancel_running_job(job_id)
             return True
 
         return False
@@ -0,0 +1,141 @@
+"""Warm starts: run a job from the final state of an earlier job.
+
+A ``MaterialBalanceInput`` with ``warm_start_from_job_id`` gets its
+``warm_start_state`` here, when the job is submitted: the last stored row of
+the source job's trajectory (volumes and concentrations of every node) plus
+its end time. The state is never taken from the client; it is left out of
+the API schema and of ``model_dump``, and a submitted one is replaced. The calculator then seeds the reactor nodes from it and
+reports times on the continued clock. The state travels inside the queued
+payload, so workers need no database access and identical continuations
+deduplicate like any other input.
+
+``continuation_flowchart`` builds the flowchart of an "extend" request: the
+source job's own flowchart, run for more hours from its final state.
+"""
+
+import copy
+from typing import Any, Dict
+
+from sqlmodel import Session, select
+
+from app.material_balance.result_frame import VOLUME_PARAMETER
+from app.models import (
+    ASM1Job,
+    ASM1SlimJob,
+    ASM3Job,
+    MaterialBalanceInput,
+    MaterialBalanceJob,
+    MaterialBalanceJobStatus,
+    UDMJob,
+    User,
+    WarmStartState,
+)
+from app.services.result_store import open_result
+
+# Jobs whose results hold a trajectory to start from
+WARM_START_JOB_MODELS = (MaterialBalanceJob, ASM1Job, ASM1SlimJob, ASM3Job, UDMJob)
+
+
+class WarmStartError(ValueError):
+    """The requested warm start cannot be served."""
+
+
+def load_warm_start_state(job: Any) -> WarmStartState:
+    """Final state of a finished job, read from its stored result."""
+    if job.status != MaterialBalanceJobStatus.success or not job.result_data:
+        raise WarmStartError(f"Job {job.job_id} has no completed result to start from")
+
+    try:
+        reader = open_result(job.result_data)
+    except (OSError, KeyError, ValueError) as exc:
+        raise WarmStartError(f"Result of job {job.job_id} cannot be read: {exc}") from exc
+    if reader.time_points == 0 or not reader.node_ids:
+        raise WarmStartError(f"Result of job {job.job_id} is empty")
+
+    parameter_names = [
+        name for name in reader.node_parameters(reader.node_ids[0]) if name != VOLUME_PARAMETER
+    ]
+    volumes = []
+    concentrations = []
+    for node_id in reader.node_ids:
+        final = reader.node_values(node_id, -1)
+        try:
+            volumes.append(float(final[VOLUME_PARAMETER]))
+            concentrations.append([float(final[name]) for name in parameter_names])
+        except KeyError as exc:
+            raise WarmStartError(
+                f"Result of job {job.job_id} has no {exc.args[0]} for node {node_id}"
+            ) from exc
+
+    end = reader.time_points
+    return WarmStartState(
+        source_job_id=job.job_id,
+        start_hour=float(reader.timestamps_slice(end - 1, end)[0]),
+        node_ids=list(reader.node_ids),
+        parameter_names=parameter_names,
+        volumes=volumes,
+        concentrations=concentrations,
+    )
+
+
+def resolve_warm_start(
+    session: Session, *, owner: User, input_data: MaterialBalanceInput
+) -> MaterialBalanceInput:
+    """Attach ``warm_start_state`` for ``input_data.warm_start_from_job_id``.
+
+    Any state already on ``input_data`` is discarded, so only a job the owner
+    may read can seed the calculation.
+    """
+    source_job_id = input_data.warm_start_from_job_id
+    if not source_job_id:
+        return input_data.model_copy(update={"warm_start_state": None})
+
+    for job_model in WARM_START_JOB_MODELS:
+        statement = select(job_model).where(job_model.job_id == source_job_id)
+        if not owner.is_superuser:
+            statement = statement.where(job_model.owner_id == owner.id)
+        job = session.exec(statement).first()
+        if job is not None:
+            state = load_warm_start_state(job)
+            return input_data.model_copy(update={"warm_start_state": state})
+    raise WarmStartError(f"Warm start job {source_job_id} not found")
+
+
+def continuation_flowchart(flowchart_data: Dict[str, Any], job_id: str, hours: float) -> Dict[str, Any]:
+    """Flowchart that continues job ``job_id`` for ``hours`` more hours.
+
+    The flow conditions of the source job's last time segment hold for the
+    whole continuation. Edge profiles carry over unchanged; they are
+    evaluated on the continued clock.
+    """
+    if not isinstance(flowchart_data, dict) or "calculationParameters" not in flowchart_data:
+        raise WarmStartError(
+            f"Job {job_id} was not created from a flowchart; submit its input "
+            "with warm_start_from_job_id instead"
+        )
+
+    continued = copy.deepcopy(flowchart_data)
+    for key in ("warm_start_from_job_id", "time_segments"):
+        continued.pop(key, None)
+    continued["warmStartFromJobId"] = job_id
+    continued["calculationParameters"] = {
+        **(continued.get("calculationParameters") or {}),
+        "hours": hours,
+    }
+
+    segments = flowchart_data.get("timeSegments", flowchart_data.get("time_segments")) or []
+    segments = [segment for segment in segments if isinstance(segment, dict)]
+    if segments:
+        last = max(
+            segments,
+            key=lambda segment: float(segment.get("startHour", segment.get("start_hour")) or 0.0),
+        )
+        continued["timeSegments"] = [
+            {
+                "id": str(last.get("id") or "continuation"),
+                "startHour": 0.0,
+                "endHour": hours,
+                "edgeOverrides": last.get("edgeOverrides", last.get("edge_overrides", {})),
+            }
+        ]
+    return continued
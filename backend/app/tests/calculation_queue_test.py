@@ -0,0 +1,388 @@
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, delete, select
+
+from app.core.config import settings
+from app.material_balance.exceptions import CalculationError, ConvergenceError
+from app.material_balance.progress import progress_publisher
+from app.material_balance.segment_snapshots import segment_snapshots
+from app.material_balance.trajectory_sink import trajectory_sinks
+from app.models import (
+    CalculationQueueEntry,
+    CalculationQueueStatus,
+    MaterialBalanceInput,
+    MaterialBalanceJob,
+    MaterialBalanceJobStatus,
+    User,
+    UserType,
+    WarmStartState,
+)
+from app.services.calculation_queue import (
+    JOB_MODELS,
+    _queue_progress,
+    failure_summary,
+    get_runner,
+    hand_off_followers,
+    queue_payload,
+    recover_lost_entries,
+    requeue_entries,
+    submit_calculation,
+)
+from app.services.result_store import delete_result, open_result, save_result
+from app.tests.material_balance_implicit_solver_test import _chain_input
+
+
+@pytest.fixture(autouse=True)
+def _snapshot_dir(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    # Building the services configures the process-wide snapshot store
+    monkeypatch.setattr(settings, "CALCULATION_SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    yield
+    segment_snapshots.configure(None, 0)
+    trajectory_sinks.configure(None, 0, 0)
+
+
+def test_every_job_kind_has_a_runner() -> None:
+    for job_kind in JOB_MODELS:
+        assert callable(get_runner(job_kind))
+    with pytest.raises(ValueError):
+        get_runner("unknown")
+
+
+def test_inline_fallback_without_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "CALCULATION_WORKERS", 0)
+    monkeypatch.setattr(settings, "CALCULATION_DEDUPLICATE_RESULTS", False)
+    owner = User(email="inline@example.com", hashed_password="x", user_type=UserType.basic)
+    background_tasks = BackgroundTasks()
+    submit_calculation(
+        None,
+        background_tasks,
+        job_kind="udm",
+        job_id="inline-1",
+        owner=owner,
+        input_data=_chain_input("rk4", 60),
+        steady_state=True,
+    )
+
+    assert len(background_tasks.tasks) == 1
+    assert background_tasks.tasks[0].args[1:] == ("inline-1", _chain_input("rk4", 60), {"steady_state": True})
+
+
+@pytest.fixture
+def queue_session(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "CALCULATION_WORKERS", 2)
+    monkeypatch.setattr(settings, "CALCULATION_DEDUPLICATE_RESULTS", True)
+    monkeypatch.setattr(settings, "RESULT_STORE_DIR", str(tmp_path))
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(
+        engine,
+        tables=[
+            User.__table__,
+            CalculationQueueEntry.__table__,
+            *(job_model.__table__ for job_model in JOB_MODELS.values()),
+        ],
+    )
+    with Session(engine) as session:
+        yield session
+
+
+def _submit(session: Session, job_id: str, owner: User) -> MaterialBalanceJob:
+    job = MaterialBalanceJob(job_id=job_id, job_name=job_id, input_data={}, owner_id=owner.id)
+    session.add(job)
+    session.commit()
+    submit_calculation(
+        session,
+        BackgroundTasks(),
+        job_kind="material_balance",
+        job_id=job_id,
+        owner=owner,
+        input_data=_chain_input("rk4", 60),
+    )
+    session.refresh(job)
+    return job
+
+
+def _students(session: Session, count: int) -> list[User]:
+    users = [
+        User(email=f"student{index}@example.com", hashed_password="x", user_type=UserType.basic)
+        for index in range(count)
+    ]
+    session.add_all(users)
+    session.commit()
+    return users
+
+
+def _queued(session: Session) -> list[str]:
+    return [entry.job_id for entry in session.exec(select(CalculationQueueEntry)).all()]
+
+
+def test_identical_input_reuses_the_finished_result(queue_session: Session) -> None:
+    first, second = _students(queue_session, 2)
+    done = _submit(queue_session, "job-1", first)
+    queue_session.exec(delete(CalculationQueueEntry))
+    done.status = MaterialBalanceJobStatus.success
+    done.result_data = save_result(
+        "job-1",
+        {"job_id": "job-1", "timestamps": [0.0, 1.0], "node_data": {"n1": {"volume": [1.0, 2.0]}}},
+    )
+    done.summary_data = {"total_steps": 2}
+    queue_session.add(done)
+    queue_session.commit()
+
+    reused = _submit(queue_session, "job-2", second)
+
+    assert reused.status == MaterialBalanceJobStatus.success
+    assert reused.input_fingerprint == done.input_fingerprint
+    assert reused.summary_data == {"total_steps": 2}
+    assert _queued(queue_session) == []
+    delete_result("job-1")
+    assert open_result(reused.result_data).node_column("n1", "volume").tolist() == [1.0, 2.0]
+
+
+def test_unreadable_finished_result_is_computed_again(
+    queue_session: Session, tmp_path
+) -> None:
+    first, second = _students(queue_session, 2)
+    done = _submit(queue_session, "job-1", first)
+    queue_session.exec(delete(CalculationQueueEntry))
+    done.status = MaterialBalanceJobStatus.success
+    done.result_data = save_result(
+        "job-1",
+        {"job_id": "job-1", "timestamps": [0.0, 1.0], "node_data": {"n1": {"volume": [1.0, 2.0]}}},
+    )
+    queue_session.add(done)
+    queue_session.commit()
+    # Deleted between the lookup and the link
+    delete_result("job-1")
+
+    job = _submit(queue_session, "job-2", second)
+
+    assert job.status == MaterialBalanceJobStatus.pending
+    assert job.result_data is None
+    assert _queued(queue_session) == ["job-2"]
+    assert not (tmp_path / "job-2").exists()
+
+
+def test_client_supplied_warm_start_state_is_discarded(queue_session: Session) -> None:
+    owner, other = _students(queue_session, 2)
+    queue_session.add(
+        MaterialBalanceJob(
+            job_id="other-job",
+            job_name="other-job",
+            input_data={},
+            owner_id=other.id,
+            status=MaterialBalanceJobStatus.success,
+        )
+    )
+    forged = WarmStartState(
+        source_job_id="other-job",
+        start_hour=12.0,
+        node_ids=["n1"],
+        parameter_names=["S"],
+        volumes=[1.0],
+        concentrations=[[1.0]],
+    )
+    assert "warm_start_state" not in MaterialBalanceInput.model_json_schema()["properties"]
+    # Only the queued payload carries a server-resolved state to the worker
+    resolved = _chain_input("rk4", 60).model_copy(update={"warm_start_state": forged})
+    assert "warm_start_state" not in resolved.model_dump(mode="json")
+    assert MaterialBalanceInput.model_validate(queue_payload(resolved)).warm_start_state == forged
+
+    jobs = {}
+    for job_id, source_job_id in (("plain", None), ("borrowed", "other-job")):
+        jobs[job_id] = MaterialBalanceJob(
+            job_id=job_id, job_name=job_id, input_data={}, owner_id=owner.id
+        )
+        queue_session.add(jobs[job_id])
+        queue_session.commit()
+        input_data = _chain_input("rk4", 60).model_copy(
+            update={"warm_start_from_job_id": source_job_id, "warm_start_state": forged}
+        )
+        submit_calculation(
+            queue_session,
+            BackgroundTasks(),
+            job_kind="material_balance",
+            job_id=job_id,
+            owner=owner,
+            input_data=input_data,
+        )
+
+    entry = queue_session.exec(select(CalculationQueueEntry)).one()
+    assert entry.job_id == "plain"
+    assert "warm_start_state" not in entry.payload
+    queue_session.refresh(jobs["borrowed"])
+    assert jobs["borrowed"].status == MaterialBalanceJobStatus.failed
+    assert jobs["borrowed"].error_message == "Calculation failed: Warm start job other-job not found"
+
+
+def test_concurrent_identical_jobs_share_one_computation(
+    queue_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    published = []
+    monkeypatch.setattr(progress_publisher, "send", lambda job_id, data: published.append((job_id, data)))
+    students = _students(queue_session, 3)
+    leader, *followers = [
+        _submit(queue_session, f"job-{index}", owner) for index, owner in enumerate(students)
+    ]
+    assert _queued(queue_session) == ["job-0"]
+
+    try:
+        raise CalculationError("ODE calculation failed: diverged") from ConvergenceError("diverged")
+    except CalculationError as error:
+        leader.summary_data = failure_summary(error)
+    leader.status = MaterialBalanceJobStatus.failed
+    leader.error_message = "Calculation failed: diverged"
+    queue_session.add(leader)
+    queue_session.commit()
+    hand_off_followers(
+        queue_session, job_kind="material_balance", job_id="job-0", payload={}, options={}
+    )
+
+    for follower in followers:
+        queue_session.refresh(follower)
+        assert follower.status == MaterialBalanceJobStatus.failed
+        assert follower.error_message == "Calculation failed: diverged"
+    assert published == [
+        (follower.job_id, {"status": "failed", "message": "Calculation failed: diverged"})
+        for follower in followers
+    ]
+
+
+def test_cancelled_leader_hands_off_to_the_earliest_follower(queue_session: Session) -> None:
+    students = _students(queue_session, 3)
+    jobs = [_submit(queue_session, f"job-{index}", owner) for index, owner in enumerate(students)]
+    queue_session.exec(delete(CalculationQueueEntry))
+    jobs[0].status = MaterialBalanceJobStatus.cancelled
+    queue_session.add(jobs[0])
+    queue_session.commit()
+
+    hand_off_followers(
+        queue_session,
+        job_kind="material_balance",
+        job_id="job-0",
+        payload=_chain_input("rk4", 60).model_dump(mode="json"),
+        options={},
+    )
+
+    assert _queued(queue_session) == ["job-1"]
+    queue_session.refresh(jobs[2])
+    assert jobs[2].status == MaterialBalanceJobStatus.pending
+
+
+def test_leader_failing_for_other_reasons_hands_off_to_the_earliest_follower(
+    queue_session: Session,
+) -> None:
+    students = _students(queue_session, 3)
+    jobs = [_submit(queue_session, f"job-{index}", owner) for index, owner in enumerate(students)]
+    queue_session.exec(delete(CalculationQueueEntry))
+    jobs[0].status = MaterialBalanceJobStatus.failed
+    jobs[0].error_message = "Calculation failed: Calculation timed out after 5.0 seconds."
+    jobs[0].summary_data = failure_summary(Exception("Calculation timed out after 5.0 seconds."))
+    queue_session.add(jobs[0])
+    queue_session.commit()
+
+    hand_off_followers(
+        queue_session,
+        job_kind="material_balance",
+        job_id="job-0",
+        payload=_chain_input("rk4", 60).model_dump(mode="json"),
+        options={},
+    )
+
+    assert _queued(queue_session) == ["job-1"]
+    for job in jobs[1:]:
+        queue_session.refresh(job)
+        assert job.status == MaterialBalanceJobStatus.pending
+
+
+def test_lost_entries_resume_until_the_retry_limit(
+    queue_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "CALCULATION_MAX_RESUMES", 1)
+    (owner,) = _students(queue_session, 1)
+    job = _submit(queue_session, "job-0", owner)
+    entry = queue_session.exec(select(CalculationQueueEntry)).one()
+
+    for attempt in range(2):
+        job.status = MaterialBalanceJobStatus.running
+        entry.status = CalculationQueueStatus.running
+        entry.worker_id = "host:1"
+        queue_session.add_all([job, entry])
+        queue_session.commit()
+        requeue_entries(queue_session, [entry], "calculation worker exited unexpectedly")
+        queue_session.refresh(job)
+        if attempt == 0:
+            assert job.status == MaterialBalanceJobStatus.pending
+            assert (entry.status, entry.worker_id, entry.attempts) == (
+                CalculationQueueStatus.queued,
+                None,
+                1,
+            )
+
+    assert job.status == MaterialBalanceJobStatus.failed
+    assert job.error_message == "Calculation failed: calculation worker exited unexpectedly"
+    assert _queued(queue_session) == []
+
+
+def test_lost_entries_are_recovered_by_pid_here_and_by_heartbeat_elsewhere(
+    queue_session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "CALCULATION_DEDUPLICATE_RESULTS", False)
+    students = _students(queue_session, 5)
+    jobs = [_submit(queue_session, f"job-{index}", owner) for index, owner in enumerate(students)]
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    here = socket.gethostname()
+    now = datetime.now()
+    silent = now - timedelta(seconds=settings.CALCULATION_HEARTBEAT_TIMEOUT_SECONDS + 1)
+    workers = {
+        "job-0": (f"{here}:{exited.pid}", now),
+        "job-1": (f"{here}:{exited.pid}", silent),
+        "job-2": (f"{here}:{os.getpid()}", now),
+        "job-3": ("elsewhere:1", now),
+        "job-4": ("elsewhere:1", silent),
+    }
+    for job in jobs:
+        job.status = MaterialBalanceJobStatus.running
+    for entry in queue_session.exec(select(CalculationQueueEntry)).all():
+        entry.status = CalculationQueueStatus.running
+        entry.worker_id, entry.heartbeat_at = workers[entry.job_id]
+        queue_session.add(entry)
+    queue_session.add_all(jobs)
+    queue_session.commit()
+
+    recover_lost_entries(queue_session)
+
+    requeued = queue_session.exec(
+        select(CalculationQueueEntry.job_id).where(
+            CalculationQueueEntry.status == CalculationQueueStatus.queued
+        )
+    ).all()
+    assert sorted(requeued) == ["job-0", "job-1", "job-4"]
+
+
+def test_full_progress_queue_drops_updates_but_waits_for_final_status() -> None:
+    progress_queue: queue.Queue = queue.Queue(maxsize=1)
+    progress_queue.put(("job-0", {"status": "running"}))
+
+    _queue_progress(progress_queue, "job-0", {"status": "running", "fraction": 0.5})
+    _queue_progress(progress_queue, "job-0", {"status": "partial", "frame": {}})
+    assert progress_queue.qsize() == 1
+
+    # The web process drains the queue a moment later
+    drain = threading.Timer(0.2, progress_queue.get)
+    drain.start()
+    _queue_progress(progress_queue, "job-0", {"status": "success", "message": None})
+    drain.join()
+
+    assert progress_queue.get_nowait() == ("job-0", {"status": "success", "message": None})
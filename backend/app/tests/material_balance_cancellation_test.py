@@ -0,0 +1,42 @@
+import threading
+import time
+
+import pytest
+
+from app.material_balance.cancellation import CancellationToken
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import CalculationCancelledError
+from app.tests.material_balance_implicit_solver_test import _chain_input
+
+
+@pytest.mark.parametrize("solver_method", ["rk4", "adaptive_heun", "rosenbrock"])
+def test_cancel_stops_running_solver_promptly(solver_method: str) -> None:
+    input_data = _chain_input(solver_method, 60)
+    input_data.parameters.hours = 2000.0
+    token = CancellationToken("job-1")
+    outcome = {}
+
+    def _run() -> None:
+        try:
+            MaterialBalanceCalculator().calculate(input_data, token)
+        except CalculationCancelledError as exc:
+            outcome["error"] = exc
+
+    worker = threading.Thread(target=_run)
+    worker.start()
+    time.sleep(0.5)
+    token.cancel("Calculation cancelled by user")
+    worker.join(timeout=5.0)
+
+    assert not worker.is_alive()
+    assert str(outcome["error"]) == "Calculation cancelled by user"
+    assert token.cancel_latency_seconds < 1.0
+
+
+def test_cancelled_token_stops_before_integration() -> None:
+    token = CancellationToken()
+    token.cancel()
+
+    with pytest.raises(CalculationCancelledError):
+        MaterialBalanceCalculator().calculate_steady_state(_chain_input("rk4", 60), token)
+    assert token.metrics()["wasted_cpu_seconds"] is not None
@@ -0,0 +1,55 @@
+import pytest
+import torch
+
+from app.material_balance import compiled
+from app.material_balance.core import MaterialBalanceCalculator
+from app.tests.material_balance_reactions_test import _mixed_input, _ode_function
+
+
+@pytest.fixture(autouse=True)
+def _empty_kernel_cache():
+    compiled.clear_kernel_cache()
+    yield
+    compiled.clear_kernel_cache()
+
+
+def _rhs(rhs_backend: str):
+    calculator = MaterialBalanceCalculator()
+    tensors = calculator._convert_to_tensors(_mixed_input())
+    y = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+    ode_fn, _ = _ode_function(calculator, tensors, rhs_backend)
+    return ode_fn, y
+
+
+def test_torchscript_rhs_matches_eager_values_and_jacobian() -> None:
+    eager, y = _rhs("eager")
+    traced, _ = _rhs("torchscript")
+    t = torch.tensor(0.0)
+
+    assert torch.equal(traced(t, y), eager(t, y))
+    torch.testing.assert_close(
+        torch.autograd.functional.jacobian(lambda state: traced(t, state), y),
+        torch.autograd.functional.jacobian(lambda state: eager(t, state), y),
+    )
+
+
+def test_kernels_are_reused_for_plants_of_the_same_size() -> None:
+    first, _ = _rhs("torchscript")
+    cached = dict(compiled._KERNEL_CACHE)
+    second, _ = _rhs("torchscript")
+
+    assert {key[1] for key in cached} == {"transport", "asm1slim"}
+    assert compiled._KERNEL_CACHE == cached
+    assert second.modules[0].kinetics is first.modules[0].kinetics
+
+
+def test_failed_compilation_falls_back_to_eager(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _broken_build(backend, _fn, _example_inputs):
+        raise RuntimeError(f"no {backend} compiler")
+
+    monkeypatch.setattr(compiled, "_build", _broken_build)
+    eager, y = _rhs("eager")
+    fallback, _ = _rhs("inductor")
+    t = torch.tensor(0.0)
+
+    assert torch.equal(fallback(t, y), eager(t, y))
@@ -0,0 +1,200 @@
+from collections import defaultdict
+
+import pytest
+import torch
+
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import ConvergenceError
+from app.material_balance.implicit import (
+    assemble_jacobian,
+    build_jacobian_structure,
+    odeint_implicit,
+)
+from app.material_balance.udm_ode import udm_ode_balance
+from app.models import CalculationParameters, EdgeData, MaterialBalanceInput, NodeData
+
+
+def _chain_input(solver_method: str, steps_per_hour: int) -> MaterialBalanceInput:
+    def _reactor(node_id: str) -> NodeData:
+        return NodeData(
+            node_id=node_id,
+            node_type="udm",
+            initial_volume=50.0,
+            initial_concentrations=[10.0, 2.0, 1.0],
+            udm_component_names=["S", "X", "O"],
+            udm_processes=[
+                {
+                    "name": "growth",
+                    "rate_expr": "mu * S / (K + S) * X",
+                    "stoich_expr": {"S": "-1/Y", "X": "1", "O": "1 - 1/Y"},
+                },
+                {"name": "decay", "rate_expr": "b * X", "stoich": {"X": -1.0}},
+            ],
+            udm_parameter_values={"mu": 40.0, "K": 5.0, "Y": 0.5, "b": 0.1},
+        )
+
+    nodes = [
+        NodeData(
+            node_id="inlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[10.0, 2.0, 1.0],
+            is_inlet=True,
+        ),
+        _reactor("r1"),
+        _reactor("r2"),
+        NodeData(
+            node_id="outlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[10.0, 2.0, 1.0],
+            is_outlet=True,
+        ),
+    ]
+    edges = [
+        EdgeData(
+            edge_id=f"e{index}",
+            source_node_id=nodes[index].node_id,
+            target_node_id=nodes[index + 1].node_id,
+            flow_rate=5.0,
+        )
+        for index in range(len(nodes) - 1)
+    ]
+    return MaterialBalanceInput(
+        nodes=nodes,
+        edges=edges,
+        parameters=CalculationParameters(
+            hours=4.0,
+            steps_per_hour=steps_per_hour,
+            solver_method=solver_method,
+            tolerance=1e-5,
+        ),
+        original_flowchart_data={
+            "customParameters": [{"name": name, "label": name} for name in ("S", "X", "O")]
+        },
+    )
+
+
+def test_sparse_jacobian_matches_dense_autograd() -> None:
+    calculator = MaterialBalanceCalculator()
+    tensors = calculator._convert_to_tensors(_chain_input("rk4", 60))
+    y = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+    y = y + torch.rand_like(y)
+
+    def rhs(t: torch.Tensor, state: torch.Tensor) -> torch.Tensor:
+        return udm_ode_balance(
+            t,
+            state,
+            state.shape[1] - 1,
+            None,
+            None,
+            None,
+            tensors["compute_mask"],
+            tensors["udm_mask"],
+            tensors["udm_runtime_payload"],
+            tensors["sparse_bundle"],
+            balance_param=calculator._balance_param,
+            balance_param_sparse=calculator._balance_param_sparse,
+            udm_batch_runtime=tensors["udm_batch_runtime"],
+        )
+
+    structure = build_jacobian_structure(
+        tensors["sparse_bundle"],
+        n_nodes=y.shape[0],
+        n_state=y.shape[1],
+        device=y.device,
+    )
+    sparse = assemble_jacobian(rhs, torch.tensor(0.0), y, structure)
+    dense = torch.autograd.functional.jacobian(lambda state: rhs(torch.tensor(0.0), state), y)
+
+    # A chain colors into fewer VJP groups than there are nodes.
+    assert len(structure.colors) < y.shape[0]
+    torch.testing.assert_close(
+        torch.as_tensor(sparse.toarray(), dtype=dense.dtype),
+        dense.reshape(structure.size, structure.size),
+    )
+
+
+@pytest.mark.parametrize("solver_method", ["rosenbrock", "bdf"])
+def test_implicit_solvers_match_explicit_reference(solver_method: str) -> None:
+    calculator = MaterialBalanceCalculator()
+    reference = calculator.calculate(_chain_input("rk4", 240))
+    implicit = calculator.calculate(_chain_input(solver_method, 2))
+
+    for node_id in ("r1", "r2"):
+        for name in ("S", "X", "O"):
+            assert implicit.node_data[node_id][name][-1] == pytest.approx(
+                reference.node_data[node_id][name][-1], rel=1e-2, abs=1e-2
+            )
+
+
+def test_steady_state_matches_long_transient() -> None:
+    calculator = MaterialBalanceCalculator()
+    transient_input = _chain_input("bdf", 1)
+    transient_input.parameters.hours = 300.0
+    transient = calculator.calculate(transient_input)
+    steady = calculator.calculate_steady_state(_chain_input("rk4", 60))
+
+    assert steady.timestamps == [0.0, 4.0]
+    assert steady.summary["steady_state"]["scaled_residual"] <= 1.0
+    for node_id in ("r1", "r2"):
+        for name in ("S", "X", "O", "volume"):
+            assert steady.node_data[node_id][name][-1] == pytest.approx(
+                transient.node_data[node_id][name][-1], rel=1e-3, abs=1e-3
+            )
+
+
+def test_rosenbrock_reuses_factorizations_and_reports_floor_steps() -> None:
+    result = MaterialBalanceCalculator().calculate(_chain_input("rosenbrock", 2), materialize=False)
+    profile = result.summary["profile"]
+
+    assert profile["lu_decompositions"] < profile["accepted_steps"]
+    # The Monod switch of this chain is only passed at the step floor
+    assert 0 < profile["floor_accepted_steps"] < profile["accepted_steps"]
+    assert result.summary["floor_accepted_steps"] == profile["floor_accepted_steps"]
+    assert result.summary["convergence_status"] == "converged_at_step_floor"
+
+
+def test_rosenbrock_rides_a_switching_term_at_tight_tolerance() -> None:
+    def rhs(t: torch.Tensor, state: torch.Tensor) -> torch.Tensor:
+        # Like the thresholds in the ASM kinetics: the state slides along 5
+        return torch.where(state < 5.0, 24.0, -60.0) + 0.0 * t
+
+    y0 = torch.tensor([[4.0, 6.0]], dtype=torch.float64)
+    structure = build_jacobian_structure(None, n_nodes=1, n_state=2, device=y0.device)
+    stats = defaultdict(int)
+    states = odeint_implicit(
+        rhs,
+        y0,
+        torch.linspace(0.0, 4.0, 5, dtype=torch.float64),
+        method="rosenbrock",
+        rtol=1e-6,
+        atol=1e-6,
+        structure=structure,
+        stats=stats,
+    )
+
+    assert stats["floor_accepted_steps"] > 0
+    torch.testing.assert_close(states[-1], torch.full((1, 2), 5.0, dtype=torch.float64), rtol=0, atol=0.5)
+
+
+def test_rosenbrock_fails_instead_of_accepting_gross_errors_at_the_step_floor() -> None:
+    def rhs(t: torch.Tensor, state: torch.Tensor) -> torch.Tensor:
+        # No step size resolves this forcing
+        return state * 0.0 + 1e9 * torch.sin(1e7 * t)
+
+    y0 = torch.ones(1, 2, dtype=torch.float64)
+    structure = build_jacobian_structure(None, n_nodes=1, n_state=2, device=y0.device)
+    stats = defaultdict(int)
+    with pytest.raises(ConvergenceError, match="minimum step"):
+        odeint_implicit(
+            rhs,
+            y0,
+            torch.linspace(0.0, 1.0, 3, dtype=torch.float64),
+            method="rosenbrock",
+            rtol=1e-3,
+            atol=1e-3,
+            structure=structure,
+            stats=stats,
+        )
+    assert stats["rejected_steps"] > 0
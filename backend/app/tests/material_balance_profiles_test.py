@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+import torch
+
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.profiles import EdgeProfiles
+from app.models import (
+    CalculationParameters,
+    EdgeData,
+    EdgeProfile,
+    MaterialBalanceInput,
+    NodeData,
+    TimeSegment,
+)
+
+COMPONENTS = ["S", "X"]
+
+
+def _tank_input(**update) -> MaterialBalanceInput:
+    nodes = [
+        NodeData(
+            node_id="inlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[100.0, 10.0],
+            is_inlet=True,
+        ),
+        NodeData(
+            node_id="tank",
+            node_type="default",
+            initial_volume=50.0,
+            initial_concentrations=[0.0, 0.0],
+        ),
+        NodeData(
+            node_id="outlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[0.0, 0.0],
+            is_outlet=True,
+        ),
+    ]
+    edges = [
+        EdgeData(edge_id="feed", source_node_id="inlet", target_node_id="tank", flow_rate=10.0),
+        EdgeData(edge_id="effluent", source_node_id="tank", target_node_id="outlet", flow_rate=10.0),
+    ]
+    return MaterialBalanceInput(
+        nodes=nodes,
+        edges=edges,
+        parameters=CalculationParameters(hours=4.0, steps_per_hour=60, solver_method="rk4"),
+        original_flowchart_data={"customParameters": [{"name": name, "label": name} for name in COMPONENTS]},
+        **update,
+    )
+
+
+def _segment(segment_id: str, start: float, end: float, flow: float) -> TimeSegment:
+    return TimeSegment(
+        id=segment_id,
+        start_hour=start,
+        end_hour=end,
+        edge_overrides={"feed": {"flow": flow}, "effluent": {"flow": flow}},
+    )
+
+
+def test_step_profile_matches_segment_restarts() -> None:
+    step = EdgeProfile(hours=[0.0, 2.0], flow=[10.0, 20.0], interpolation="step")
+    profiled = MaterialBalanceCalculator().calculate(
+        _tank_input(edge_profiles={"feed": step, "effluent": step}), materialize=False
+    )
+    segmented = MaterialBalanceCalculator().calculate(
+        _tank_input(time_segments=[_segment("low", 0.0, 2.0, 10.0), _segment("high", 2.0, 4.0, 20.0)]),
+        materialize=False,
+    )
+
+    np.testing.assert_allclose(profiled.frame.timestamps, segmented.frame.timestamps, atol=1e-6)
+    np.testing.assert_allclose(profiled.frame.states, segmented.frame.states, rtol=2e-3, atol=1e-3)
+    feed = profiled.frame.edge_flows[:, 0]
+    assert feed[0] == 10.0 and feed[-1] == 20.0
+
+
+def test_periodic_profile_wraps_linearly() -> None:
+    daily = EdgeProfile(
+        hours=[6.0, 18.0],
+        flow=[20.0, 8.0],
+        factors={"S": {"a": [1.0, 0.5]}},
+        period_hours=24.0,
+    )
+    input_data = _tank_input(edge_profiles={"feed": daily})
+    profiles = EdgeProfiles.from_input(input_data, COMPONENTS, dtype=torch.float32, device=torch.device("cpu"))
+
+    values = profiles.evaluate(torch.tensor([0.0, 6.0, 12.0, 18.0, 24.0, 30.0, 48.0]))
+
+    torch.testing.assert_close(values[0], torch.tensor([14.0, 20.0, 14.0, 8.0, 14.0, 20.0, 14.0]))
+    torch.testing.assert_close(values[1], torch.tensor([0.75, 1.0, 0.75, 0.5, 0.75, 1.0, 0.75]))
+
+
+def test_segment_override_replaces_profile_inside_segment() -> None:
+    ramp = EdgeProfile(hours=[0.0, 4.0], flow=[10.0, 30.0])
+    result = MaterialBalanceCalculator().calculate(
+        _tank_input(
+            edge_profiles={"feed": ramp},
+            time_segments=[
+                TimeSegment(id="ramp", start_hour=0.0, end_hour=2.0),
+                TimeSegment(
+                    id="hold", start_hour=2.0, end_hour=4.0, edge_overrides={"feed": {"flow": 5.0}}
+                ),
+            ],
+        ),
+        materialize=False,
+    )
+    frame = result.frame
+    feed, effluent = frame.edge_flows[:, 0], frame.edge_flows[:, 1]
+    one_hour = int(np.argmin(np.abs(frame.timestamps - 1.0)))
+
+    assert feed[one_hour] == pytest.approx(15.0)
+    assert feed[-1] == 5.0
+    assert effluent[-1] == 10.0
+
+
+def test_profile_for_unknown_edge_is_rejected() -> None:
+    with pytest.raises(ValueError, match="unknown edge"):
+        _tank_input(edge_profiles={"bypass": EdgeProfile(hours=[0.0], flow=[1.0])})
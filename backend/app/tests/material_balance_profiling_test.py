@@ -0,0 +1,90 @@
+import logging
+import warnings
+
+import pytest
+
+from app.material_balance import profiling
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.profiling import (
+    SolverProfile,
+    log_profile,
+    record_persistence,
+    reset_peak_rss_per_job,
+)
+from app.tests.material_balance_reactions_test import _mixed_input
+from app.tests.material_balance_segment_snapshots_test import _segmented_input
+
+
+def _profile(input_data, steady_state: bool = False) -> dict:
+    calculator = MaterialBalanceCalculator()
+    calculator.segment_snapshots = None
+    with warnings.catch_warnings():
+        # torchdiffeq warns about step callbacks its solver does not support
+        warnings.simplefilter("error")
+        if steady_state:
+            result = calculator.calculate_steady_state(input_data, materialize=False)
+        else:
+            result = calculator.calculate(input_data, materialize=False)
+    return result.summary["profile"]
+
+
+def test_fixed_grid_profile_splits_transport_and_kinetics_per_model() -> None:
+    profile = _profile(_mixed_input())
+
+    # rk4 (3/8 rule) evaluates the RHS four times per step, 60 steps in 1 h
+    assert profile["accepted_steps"] == 60
+    assert profile["rejected_steps"] == 0
+    assert profile["rhs_evaluations"] == 4 * 60
+    assert set(profile["kinetics_by_model"]) == {"asm1slim", "udm"}
+    # Each section is rounded to the microsecond on its own
+    assert profile["kinetics_seconds"] == pytest.approx(
+        sum(profile["kinetics_by_model"].values()), abs=1e-5
+    )
+    assert 0 < profile["transport_seconds"] + profile["kinetics_seconds"] < profile["rhs_seconds"]
+    assert profile["rhs_seconds"] < profile["integration_seconds"]
+    assert profile["conversion_seconds"] > 0
+    assert profile["peak_rss_mb"] > 0
+    assert profile["peak_rss_scope"] == "process"
+
+
+@pytest.mark.parametrize("solver_method", ["adaptive_heun", "rosenbrock"])
+def test_adaptive_solvers_count_accepted_and_rejected_steps(solver_method: str) -> None:
+    profile = _profile(_segmented_input([10.0, 14.0], solver_method=solver_method))
+
+    assert profile["accepted_steps"] > 0
+    assert profile["rejected_steps"] >= 0
+    assert profile["rhs_evaluations"] >= profile["accepted_steps"]
+    if solver_method == "rosenbrock":
+        assert profile["jacobian_evaluations"] > 0
+        assert profile["lu_decompositions"] >= profile["jacobian_evaluations"]
+
+
+def test_solvers_without_step_counts_report_none_and_persistence_is_logged(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    summary = {"profile": _profile(_segmented_input([10.0]), steady_state=True)}
+    record_persistence(summary, 0.25)
+    with caplog.at_level(logging.INFO, logger="app.material_balance.profiling"):
+        log_profile("job-1", summary, 0.125)
+        log_profile("job-2", {"cancellation": {}}, 0.125)
+
+    assert summary["profile"]["accepted_steps"] is None
+    assert summary["profile"]["rhs_evaluations"] > 0
+    assert summary["profile"]["persistence_seconds"] == 0.25
+    [record] = caplog.records
+    assert (record.job_id, record.persistence_seconds, record.db_commit_seconds) == ("job-1", 0.25, 0.125)
+
+
+def test_peak_rss_is_only_reset_where_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    resets = []
+    monkeypatch.setattr(profiling, "_reset_peak_rss", lambda: resets.append(True))
+
+    assert SolverProfile().report()["peak_rss_scope"] == "process"
+    assert resets == []
+
+    reset_peak_rss_per_job()
+    try:
+        assert SolverProfile().report()["peak_rss_scope"] == "job"
+    finally:
+        reset_peak_rss_per_job(False)
+    assert resets == [True]
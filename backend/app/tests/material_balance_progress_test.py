@@ -0,0 +1,134 @@
+import asyncio
+import base64
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.core.simple_websocket_manager import SimpleWebSocketManager
+from app.material_balance.cancellation import CancellationToken
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import CalculationError
+from app.material_balance.progress import ProgressPublisher
+from app.material_balance.segment_snapshots import SegmentSnapshotStore
+from app.services.result_store import partial_results_dir, read_partial_results
+from app.tests.material_balance_segment_snapshots_test import _segmented_input
+
+
+def _calculator(min_interval: float, **partial):
+    messages = []
+    calculator = MaterialBalanceCalculator()
+    calculator.segment_snapshots = None
+    calculator.progress_publisher = ProgressPublisher(
+        lambda job_id, data: messages.append((job_id, data)), min_interval, **partial
+    )
+    return calculator, messages
+
+
+def test_progress_reports_simulated_hours_rhs_calls_and_eta() -> None:
+    calculator, messages = _calculator(min_interval=0.0)
+    calculator.calculate(_segmented_input([10.0, 12.0]), CancellationToken("job-1"), materialize=False)
+    messages = [message for message in messages if message[1]["status"] == "running"]
+
+    assert {job_id for job_id, _ in messages} == {"job-1"}
+    fractions = [data["fraction"] for _, data in messages]
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+    assert 2.0 in [data["simulated_hours"] for _, data in messages]
+    final = messages[-1][1]
+    assert final["total_hours"] == 4.0 and final["eta_seconds"] == 0.0
+    # rk4 on 80 steps: 4 evaluations per step
+    assert final["rhs_evaluations"] == 320
+
+
+def test_progress_is_throttled_and_needs_a_job() -> None:
+    calculator, messages = _calculator(min_interval=3600.0)
+    calculator.calculate(_segmented_input([10.0, 12.0]), CancellationToken("job-1"), materialize=False)
+    calculator.calculate(_segmented_input([10.0, 12.0]), materialize=False)
+
+    assert [data["fraction"] for _, data in messages] == [pytest.approx(0.0), 1.0]
+
+
+def test_progress_from_a_worker_thread_reaches_the_websocket_queue() -> None:
+    async def _roundtrip():
+        manager = SimpleWebSocketManager()
+        manager._loop = asyncio.get_running_loop()
+        sender = threading.Thread(
+            target=manager.send_progress_from_thread,
+            args=("job-1", 50.0, "2.00 / 4.00 h simulated"),
+            kwargs={"details": {"eta_seconds": 3.0}},
+        )
+        sender.start()
+        sender.join()
+        return await asyncio.wait_for(manager._message_queue.get(), timeout=1.0)
+
+    message = asyncio.run(_roundtrip())
+
+    assert message["task_id"] == "job-1"
+    assert message["data"] == {
+        "eta_seconds": 3.0,
+        "progress": 50.0,
+        "message": "2.00 / 4.00 h simulated",
+        "status": "running",
+    }
+
+
+def test_finished_spans_stream_as_sequenced_partial_frames(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "RESULT_STORE_DIR", str(tmp_path))
+    calculator, messages = _calculator(
+        min_interval=3600.0, partial_points=5, partial_dir=str(partial_results_dir())
+    )
+    result = calculator.calculate(
+        _segmented_input([10.0, 12.0, 14.0]), CancellationToken("job-1"), materialize=False
+    )
+
+    frames = [data["frame"] for _, data in messages if data["status"] == "partial"]
+    assert [frame["seq"] for frame in frames] == [0, 1, 2]
+    assert frames[0]["node_ids"] == ["inlet", "tank", "outlet"]
+    assert "node_ids" not in frames[1]
+    assert len(frames[1]["timestamps"]) == 5 and frames[1]["timestamps"][-1] == pytest.approx(4.0)
+
+    for frame in frames:
+        states = np.frombuffer(base64.b64decode(frame["states"]), dtype="<f4").reshape(frame["shape"])
+        rows = [int(np.abs(result.frame.timestamps - t).argmin()) for t in frame["timestamps"]]
+        np.testing.assert_array_equal(states, result.frame.states[rows])
+
+    assert read_partial_results("job-1", since=1) == frames[1:]
+    assert read_partial_results("unknown-job") == []
+
+
+def test_resumed_job_restarts_its_partial_stream(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "RESULT_STORE_DIR", str(tmp_path))
+    calculator, messages = _calculator(
+        min_interval=3600.0, partial_points=5, partial_dir=str(partial_results_dir())
+    )
+    calculator.segment_snapshots = SegmentSnapshotStore(str(tmp_path / "snapshots"), checkpoint_hours=0.5)
+    input_data = _segmented_input([10.0])
+    run_hours = calculator._run_hours
+    chunks_run = []
+
+    def crash_on_third_chunk(*args, **kwargs):
+        if len(chunks_run) == 2:
+            raise MemoryError("worker killed")
+        chunks_run.append(args[0])
+        return run_hours(*args, **kwargs)
+
+    monkeypatch.setattr(calculator, "_run_hours", crash_on_third_chunk)
+    with pytest.raises(CalculationError, match="worker killed"):
+        calculator.calculate(input_data, CancellationToken("job-1"), materialize=False)
+    assert [frame["seq"] for frame in read_partial_results("job-1")] == [0, 1]
+    monkeypatch.setattr(calculator, "_run_hours", run_hours)
+    messages.clear()
+
+    calculator.calculate(input_data, CancellationToken("job-1"), materialize=False)
+
+    frames = read_partial_results("job-1")
+    assert [frame["seq"] for frame in frames] == list(range(len(frames)))
+    assert len(frames) > 2
+    assert [frame for frame in frames if "node_ids" in frame] == frames[:1]
+    assert frames == [data["frame"] for _, data in messages if data["status"] == "partial"]
@@ -0,0 +1,158 @@
+import torch
+
+from app.material_balance.asm import asm1slim, asm1slim_reaction
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.reactions import FusedBalance
+from app.material_balance.udm_ode import udm_ode_balance
+from app.models import CalculationParameters, EdgeData, MaterialBalanceInput, NodeData
+from app.tests.material_balance_implicit_solver_test import _chain_input
+
+COMPONENTS = ["S_O", "S_S", "S_NO", "S_NH", "S_ALK"]
+INITIAL = [0.2, 40.0, 8.0, 20.0, 5.0]
+
+
+def _mixed_input() -> MaterialBalanceInput:
+    nodes = [
+        NodeData(
+            node_id="inlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=INITIAL,
+            is_inlet=True,
+        ),
+        NodeData(
+            node_id="anoxic",
+            node_type="asm1slim",
+            initial_volume=50.0,
+            initial_concentrations=INITIAL,
+            asm1slim_parameters=[2.0, 1.5, 4.0, 10.0, 0.5, 0.8, 1.0],
+        ),
+        NodeData(
+            node_id="custom",
+            node_type="udm",
+            initial_volume=50.0,
+            initial_concentrations=INITIAL,
+            udm_component_names=COMPONENTS,
+            udm_processes=[
+                {"name": "uptake", "rate_expr": "k * S_S", "stoich": {"S_S": -1.0, "S_O": -0.5}},
+            ],
+            udm_parameter_values={"k": 0.3},
+        ),
+        NodeData(
+            node_id="outlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=INITIAL,
+            is_outlet=True,
+        ),
+    ]
+    edges = [
+        EdgeData(
+            edge_id=f"e{index}",
+            source_node_id=nodes[index].node_id,
+            target_node_id=nodes[index + 1].node_id,
+            flow_rate=5.0,
+        )
+        for index in range(len(nodes) - 1)
+    ]
+    return MaterialBalanceInput(
+        nodes=nodes,
+        edges=edges,
+        parameters=CalculationParameters(hours=1.0, steps_per_hour=60, solver_method="rk4"),
+        original_flowchart_data={"customParameters": [{"name": name, "label": name} for name in COMPONENTS]},
+    )
+
+
+def _ode_function(
+    calculator: MaterialBalanceCalculator, tensors: dict, rhs_backend: str = "eager"
+):
+    return calculator._build_ode_function(
+        m=tensors["x0"].shape[0],
+        compute_mask=tensors["compute_mask"],
+        asm1slim_params=tensors["asm1slim_params"],
+        asm1slim_mask=tensors["asm1slim_mask"],
+        asm1_params=tensors["asm1_params"],
+        asm1_mask=tensors["asm1_mask"],
+        asm3_params=tensors["asm3_params"],
+        asm3_mask=tensors["asm3_mask"],
+        udm_mask=tensors["udm_mask"],
+        udm_runtime_payload=tensors["udm_runtime_payload"],
+        udm_batch_runtime=tensors["udm_batch_runtime"],
+        sparse_bundle=tensors["sparse_bundle"],
+        rhs_backend=rhs_backend,
+    )
+
+
+def test_fused_rhs_matches_udm_balance() -> None:
+    calculator = MaterialBalanceCalculator()
+    tensors = calculator._convert_to_tensors(_chain_input("rk4", 60))
+    y = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+    t = torch.tensor(0.0)
+
+    fused, clamp_output = _ode_function(calculator, tensors)
+    expected = udm_ode_balance(
+        t,
+        y,
+        y.shape[0],
+        None,
+        None,
+        None,
+        tensors["compute_mask"],
+        tensors["udm_mask"],
+        tensors["udm_runtime_payload"],
+        tensors["sparse_bundle"],
+        balance_param=calculator._balance_param,
+        balance_param_sparse=calculator._balance_param_sparse,
+        udm_batch_runtime=tensors["udm_batch_runtime"],
+    )
+
+    assert clamp_output
+    assert torch.equal(fused(t, y), expected)
+
+
+def test_mixed_plant_adds_each_model_on_its_own_nodes() -> None:
+    calculator = MaterialBalanceCalculator()
+    tensors = calculator._convert_to_tensors(_mixed_input())
+    y = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+    t = torch.tensor(0.0)
+
+    fused, _ = _ode_function(calculator, tensors)
+    transport_only = FusedBalance(
+        lambda t, state: calculator._balance_param_sparse(state, tensors["sparse_bundle"]),
+        tensors["compute_mask"],
+        [],
+        len(COMPONENTS),
+    )
+    dy = fused(t, y)
+    transport = transport_only(t, y)
+
+    asm_rates = asm1slim_reaction(tensors["asm1slim_params"][1:2], y[1:2, :-1])[0]
+    torch.testing.assert_close(dy[1, 1:-1], transport[1, 1:-1] + asm_rates[1:])
+    assert dy[1, 0] == 0.0  # dissolved oxygen is held on ASM1-slim nodes only
+    uptake = 0.3 * y[2, 1]
+    torch.testing.assert_close(dy[2, :2], transport[2, :2] + torch.stack([-0.5 * uptake, -uptake]))
+    assert torch.all(dy[[0, 3]] == 0.0)
+
+
+def test_kinetics_parameters_are_prepared_once_per_plant() -> None:
+    calculator = MaterialBalanceCalculator()
+    tensors = calculator._convert_to_tensors(_mixed_input())
+    y = calculator._merge_tensors(tensors["V_liq"], tensors["x0"])
+
+    fused, _ = _ode_function(calculator, tensors)
+    module = fused.modules[0]
+    params = tensors["asm1slim_params"][1:2]
+
+    assert isinstance(module.params, asm1slim.ASM1SlimParams)
+    assert torch.equal(module.params.neg_dSNOmax, -params[:, 0])
+    assert torch.equal(
+        asm1slim.reaction_prepared(module.params, y[1:2, :-1]),
+        asm1slim_reaction(params, y[1:2, :-1]),
+    )
+
+
+def test_mixed_plant_runs_end_to_end() -> None:
+    result = MaterialBalanceCalculator().calculate(_mixed_input(), materialize=False)
+
+    assert result.frame.time_points == 61
+    assert torch.isfinite(torch.as_tensor(result.frame.states)).all()
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.material_balance.core import MaterialBalanceCalculator
+from app.services.result_store import load_result_data, save_result
+from app.tests.material_balance_implicit_solver_test import _chain_input
+
+
+def test_unmaterialized_result_keeps_only_the_frame() -> None:
+    calculator = MaterialBalanceCalculator()
+    input_data = _chain_input("rk4", 60)
+
+    materialized = calculator.calculate(input_data)
+    lazy = calculator.calculate(input_data, materialize=False)
+
+    assert lazy.node_data == {} and lazy.timestamps == []
+    frame = lazy.frame
+    assert frame.states.shape[:2] == (frame.time_points, len(input_data.nodes))
+    assert frame.timestamps_list() == materialized.timestamps
+    assert frame.edge_data() == materialized.edge_data
+    for node_id, data in materialized.node_data.items():
+        assert list(frame.node_data()[node_id]) == list(data)
+        for name, values in data.items():
+            if name != "label":
+                assert frame.series(node_id, name).tolist() == pytest.approx(values)
+
+
+def test_frame_is_stored_without_json_lists(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RESULT_STORE_DIR", str(tmp_path))
+    result = MaterialBalanceCalculator().calculate(_chain_input("rk4", 60), materialize=False)
+
+    result_data = save_result("job-1", {"summary": result.summary}, frame=result.frame)
+    payload = load_result_data(result_data)
+
+    assert payload["timestamps"] == result.frame.timestamps_list()
+    assert payload["edge_data"] == result.frame.edge_data()
+    for node_id, data in result.frame.node_data().items():
+        assert list(payload["node_data"][node_id]) == list(data)
+        assert payload["node_data"][node_id]["label"] == data["label"]
+        assert payload["node_data"][node_id]["volume"] == pytest.approx(data["volume"])
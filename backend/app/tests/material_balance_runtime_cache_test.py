@@ -0,0 +1,81 @@
+import numpy as np
+
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.runtime_cache import RuntimeCache
+from app.models import CalculationParameters, EdgeData, MaterialBalanceInput, NodeData
+
+
+def _chain_input(hours: float = 1.0, tank_volume: float = 50.0) -> MaterialBalanceInput:
+    nodes = [
+        NodeData(
+            node_id="inlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[100.0, 10.0],
+            is_inlet=True,
+        ),
+        NodeData(
+            node_id="tank",
+            node_type="default",
+            initial_volume=tank_volume,
+            initial_concentrations=[0.0, 0.0],
+        ),
+        NodeData(
+            node_id="outlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[0.0, 0.0],
+            is_outlet=True,
+        ),
+    ]
+    edges = [
+        EdgeData(edge_id="feed", source_node_id="inlet", target_node_id="tank", flow_rate=10.0),
+        EdgeData(edge_id="effluent", source_node_id="tank", target_node_id="outlet", flow_rate=10.0),
+    ]
+    return MaterialBalanceInput(
+        nodes=nodes,
+        edges=edges,
+        parameters=CalculationParameters(hours=hours, steps_per_hour=20, solver_method="rk4"),
+    )
+
+
+def _calculator(max_entries: int = 4) -> MaterialBalanceCalculator:
+    calculator = MaterialBalanceCalculator()
+    calculator.runtime_cache = RuntimeCache(max_entries=max_entries)
+    return calculator
+
+
+def test_resubmission_with_new_hours_reuses_the_runtime() -> None:
+    calculator = _calculator()
+    calculator.calculate(_chain_input(hours=1.0), materialize=False)
+    cached = calculator.calculate(_chain_input(hours=2.0), materialize=False)
+    fresh = _calculator().calculate(_chain_input(hours=2.0), materialize=False)
+
+    assert calculator.runtime_cache.stats() == {
+        "entries": 1,
+        "max_entries": 4,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+    }
+    np.testing.assert_array_equal(cached.frame.states, fresh.frame.states)
+
+
+def test_structural_change_misses_and_lru_evicts() -> None:
+    calculator = _calculator(max_entries=1)
+    calculator.calculate(_chain_input(tank_volume=50.0), materialize=False)
+    calculator.calculate(_chain_input(tank_volume=60.0), materialize=False)
+    calculator.calculate(_chain_input(tank_volume=50.0), materialize=False)
+
+    stats = calculator.runtime_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (0, 3, 2)
+    assert stats["entries"] == 1
+
+
+def test_disabled_cache_converts_every_time() -> None:
+    calculator = _calculator(max_entries=0)
+    calculator.calculate(_chain_input(), materialize=False)
+    calculator.calculate(_chain_input(), materialize=False)
+
+    assert calculator.runtime_cache.stats()["entries"] == 0
+    assert calculator.runtime_cache.misses == 2
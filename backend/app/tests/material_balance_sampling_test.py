@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from app.material_balance.core import MaterialBalanceCalculator
+from app.tests.material_balance_implicit_solver_test import _chain_input
+
+
+@pytest.mark.parametrize("solver_method", ["rk4", "adaptive_heun", "rosenbrock"])
+def test_sampled_run_only_stores_sample_points(solver_method: str) -> None:
+    calculator = MaterialBalanceCalculator()
+    dense_input = _chain_input(solver_method, 60)
+    dense_input.parameters.hours = 12.0
+    sampled_input = dense_input.model_copy(deep=True)
+    sampled_input.parameters.sampling_interval_hours = 1.0
+
+    dense = calculator.calculate(dense_input, materialize=False).frame
+    sampled = calculator.calculate(sampled_input, materialize=False).frame
+
+    assert dense.time_points == 12 * 60 + 1
+    assert sampled.time_points == 13
+    indices = np.searchsorted(dense.timestamps, sampled.timestamps)
+    assert np.array_equal(sampled.timestamps, dense.timestamps[indices])
+    tolerance = 0.0 if solver_method != "rosenbrock" else 1e-3
+    np.testing.assert_allclose(sampled.states, dense.states[indices], rtol=tolerance, atol=tolerance)
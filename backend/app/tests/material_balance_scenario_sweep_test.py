@@ -0,0 +1,56 @@
+import pytest
+
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import InvalidInputError
+from app.material_balance.sweep import (
+    apply_variant,
+    generate_variants,
+    run_scenario_sweep,
+)
+from app.models import ScenarioSweepMode, ScenarioSweepParameter
+from app.tests.material_balance_implicit_solver_test import _chain_input
+
+
+def test_batched_sweep_matches_sequential_runs() -> None:
+    calculator = MaterialBalanceCalculator()
+    input_data = _chain_input("rk4", 60)
+    parameters = [
+        ScenarioSweepParameter(target="node", target_id="r1", name="mu", values=[10.0, 40.0]),
+        ScenarioSweepParameter(target="edge", target_id="e0", name="flow_rate", values=[2.0, 8.0]),
+        ScenarioSweepParameter(target="edge", target_id="e1", name="a.X", values=[0.5]),
+    ]
+    variants = generate_variants(parameters)
+    output = run_scenario_sweep(calculator, input_data, parameters, variants)
+
+    assert len(variants) == 4
+    assert output.parameter_labels == ["r1.mu", "e0.flow_rate", "e1.a.X"]
+    for index, values in enumerate(variants):
+        expected = calculator.calculate(apply_variant(input_data, parameters, values))
+        assert output.timestamps == expected.timestamps
+        for node_id in ("r1", "r2", "outlet"):
+            for name in ("S", "X", "O", "volume"):
+                assert output.node_data[index][node_id][name] == pytest.approx(
+                    expected.node_data[node_id][name], rel=1e-6, abs=1e-9
+                )
+
+
+def test_latin_hypercube_samples_one_value_per_stratum() -> None:
+    parameters = [
+        ScenarioSweepParameter(target="edge", target_id="e0", name="flow_rate", low=2.0, high=10.0),
+        ScenarioSweepParameter(target="node", target_id="r1", name="mu", low=0.0, high=1.0),
+    ]
+    variants = generate_variants(parameters, ScenarioSweepMode.latin_hypercube, samples=8, seed=3)
+
+    assert len(variants) == 8
+    assert variants == generate_variants(
+        parameters, ScenarioSweepMode.latin_hypercube, samples=8, seed=3
+    )
+    for column, (low, high) in enumerate([(2.0, 10.0), (0.0, 1.0)]):
+        strata = sorted(int((row[column] - low) / (high - low) * 8) for row in variants)
+        assert strata == list(range(8))
+
+
+def test_unknown_sweep_parameter_is_rejected() -> None:
+    parameters = [ScenarioSweepParameter(target="node", target_id="r1", name="nope", values=[1.0])]
+    with pytest.raises(InvalidInputError):
+        apply_variant(_chain_input("rk4", 60), parameters, [1.0])
@@ -0,0 +1,149 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import CalculationError
+from app.material_balance.segment_snapshots import SegmentSnapshotStore
+from app.models import (
+    CalculationParameters,
+    EdgeData,
+    MaterialBalanceInput,
+    NodeData,
+    TimeSegment,
+)
+
+
+def _segmented_input(flows, solver_method: str = "rk4") -> MaterialBalanceInput:
+    nodes = [
+        NodeData(
+            node_id="inlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[100.0, 10.0],
+            is_inlet=True,
+        ),
+        NodeData(node_id="tank", node_type="default", initial_volume=50.0, initial_concentrations=[0.0, 0.0]),
+        NodeData(
+            node_id="outlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[0.0, 0.0],
+            is_outlet=True,
+        ),
+    ]
+    edges = [
+        EdgeData(edge_id="feed", source_node_id="inlet", target_node_id="tank", flow_rate=10.0),
+        EdgeData(edge_id="effluent", source_node_id="tank", target_node_id="outlet", flow_rate=10.0),
+    ]
+    segments = [
+        TimeSegment(
+            id=f"day_{index}",
+            start_hour=2.0 * index,
+            end_hour=2.0 * (index + 1),
+            edge_overrides={"feed": {"flow": flow}, "effluent": {"flow": flow}},
+        )
+        for index, flow in enumerate(flows)
+    ]
+    return MaterialBalanceInput(
+        nodes=nodes,
+        edges=edges,
+        parameters=CalculationParameters(
+            hours=2.0 * len(flows), steps_per_hour=20, solver_method=solver_method
+        ),
+        time_segments=segments,
+    )
+
+
+def _calculator(directory: Path, checkpoint_hours=None) -> MaterialBalanceCalculator:
+    calculator = MaterialBalanceCalculator()
+    calculator.segment_snapshots = SegmentSnapshotStore(
+        str(directory), checkpoint_hours=checkpoint_hours
+    )
+    return calculator
+
+
+def test_rerun_resumes_from_the_last_unchanged_boundary(tmp_path: Path) -> None:
+    calculator = _calculator(tmp_path)
+    calculator.calculate(_segmented_input([10.0, 12.0, 14.0, 16.0]), materialize=False)
+    tweaked = _segmented_input([10.0, 12.0, 14.0, 30.0])
+
+    spliced = calculator.calculate(tweaked, materialize=False)
+    fresh = MaterialBalanceCalculator().calculate(tweaked, materialize=False)
+
+    assert spliced.summary["reused_segments"] == 3
+    assert "reused_segments" not in fresh.summary
+    np.testing.assert_array_equal(spliced.frame.timestamps, fresh.frame.timestamps)
+    np.testing.assert_array_equal(spliced.frame.states, fresh.frame.states)
+    np.testing.assert_array_equal(spliced.frame.edge_flows, fresh.frame.edge_flows)
+    assert spliced.parameter_change_events == fresh.parameter_change_events
+
+
+def test_earlier_edit_or_solver_change_recomputes(tmp_path: Path) -> None:
+    calculator = _calculator(tmp_path)
+    calculator.calculate(_segmented_input([10.0, 12.0, 14.0]), materialize=False)
+
+    first_changed = calculator.calculate(_segmented_input([11.0, 12.0, 14.0]), materialize=False)
+    other_solver = calculator.calculate(
+        _segmented_input([10.0, 12.0, 14.0], solver_method="euler"), materialize=False
+    )
+
+    assert "reused_segments" not in first_changed.summary
+    assert "reused_segments" not in other_solver.summary
+
+
+def test_store_keeps_recently_used_snapshots_within_budget(tmp_path: Path) -> None:
+    store = SegmentSnapshotStore(str(tmp_path), max_bytes=10_000)
+    block = torch.zeros(100, 4, dtype=torch.float32)
+    for index in range(6):
+        store.save(f"k{index}", block + index)
+
+    kept = sorted(path.stem for path in tmp_path.glob("*.pt"))
+    assert 0 < len(kept) < 6 and kept[-1] == "k5"
+    assert torch.equal(store.load("k5", torch.device("cpu")), block + 5)
+    assert store.load("k0", torch.device("cpu")) is None
+    assert store.stats() == {"hits": 1, "misses": 1}
+
+
+def test_checkpoint_chunks_report_the_unsplit_trajectory(tmp_path: Path) -> None:
+    input_data = _segmented_input([10.0, 14.0])
+    input_data.parameters.sampling_interval_hours = 0.25
+
+    chunked = _calculator(tmp_path, checkpoint_hours=0.5).calculate(input_data, materialize=False)
+    unsplit = MaterialBalanceCalculator().calculate(input_data, materialize=False)
+
+    assert len(list(tmp_path.glob("*.pt"))) == 8
+    np.testing.assert_allclose(chunked.frame.timestamps, unsplit.frame.timestamps, atol=1e-6)
+    np.testing.assert_allclose(chunked.frame.states, unsplit.frame.states, rtol=1e-5, atol=1e-5)
+    assert chunked.segment_markers == unsplit.segment_markers
+    assert chunked.parameter_change_events == unsplit.parameter_change_events
+
+
+def test_interrupted_run_resumes_from_the_last_checkpoint(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    input_data = _segmented_input([10.0])
+    calculator = _calculator(tmp_path, checkpoint_hours=0.5)
+    run_hours = calculator._run_hours
+    chunks_run = []
+
+    def crash_on_third_chunk(*args, **kwargs):
+        if len(chunks_run) == 2:
+            raise MemoryError("worker killed")
+        chunks_run.append(args[0])
+        return run_hours(*args, **kwargs)
+
+    monkeypatch.setattr(calculator, "_run_hours", crash_on_third_chunk)
+    with pytest.raises(CalculationError, match="worker killed"):
+        calculator.calculate(input_data, materialize=False)
+    monkeypatch.setattr(calculator, "_run_hours", run_hours)
+
+    resumed = calculator.calculate(input_data, materialize=False)
+    fresh = _calculator(tmp_path / "fresh", checkpoint_hours=0.5).calculate(
+        input_data, materialize=False
+    )
+
+    assert resumed.summary["reused_segments"] == 2
+    np.testing.assert_array_equal(resumed.frame.states, fresh.frame.states)
@@ -0,0 +1,124 @@
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import CalculationError
+from app.material_balance.segment_snapshots import SegmentSnapshotStore
+from app.material_balance.trajectory_sink import TrajectorySinks, sweep_stale_spills
+from app.services.result_store import open_result, save_result
+from app.tests.material_balance_segment_snapshots_test import _segmented_input
+
+
+@pytest.fixture(autouse=True)
+def _result_store_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RESULT_STORE_DIR", str(tmp_path / "results"))
+
+
+def _spilling_calculator(directory: Path, chunk_bytes: int = 32 << 20) -> MaterialBalanceCalculator:
+    calculator = MaterialBalanceCalculator()
+    calculator.segment_snapshots = None
+    calculator.trajectory_sinks = TrajectorySinks(str(directory), threshold_bytes=0, chunk_bytes=chunk_bytes)
+    return calculator
+
+
+def test_spilled_trajectory_is_stored_without_a_copy(tmp_path: Path) -> None:
+    spill_dir = tmp_path / "results" / ".spill"
+    input_data = _segmented_input([10.0, 14.0])
+
+    spilled = _spilling_calculator(spill_dir).calculate(input_data, materialize=False)
+    in_memory = MaterialBalanceCalculator().calculate(input_data, materialize=False)
+
+    assert isinstance(spilled.frame.states, np.memmap)
+    np.testing.assert_array_equal(spilled.frame.timestamps, in_memory.frame.timestamps)
+    np.testing.assert_array_equal(spilled.frame.states, in_memory.frame.states)
+    np.testing.assert_array_equal(spilled.frame.edge_flows, in_memory.frame.edge_flows)
+
+    result_data = save_result("job-1", {"job_id": "job-1"}, frame=spilled.frame)
+
+    assert list(spill_dir.iterdir()) == []
+    reader = open_result(result_data)
+    np.testing.assert_array_equal(
+        reader.node_column("tank", "volume"), in_memory.frame.series("tank", "volume")
+    )
+    assert reader.edge_values("feed", slice(None))["flow_rate"] == in_memory.frame.edge_data()["feed"]["flow_rate"]
+
+
+def test_spilling_bounds_each_solver_span(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # 3 nodes x 3 state columns x 4 bytes: 360 bytes are 10 reported rows
+    calculator = _spilling_calculator(tmp_path, chunk_bytes=360)
+    run_hours = calculator._run_hours
+    span_rows = []
+
+    def recording_run_hours(*args, **kwargs):
+        states = run_hours(*args, **kwargs)
+        span_rows.append(states.shape[0])
+        return states
+
+    monkeypatch.setattr(calculator, "_run_hours", recording_run_hours)
+    result = calculator.calculate(_segmented_input([10.0, 14.0]), materialize=False)
+
+    assert span_rows == [11] * 8
+    assert result.frame.time_points == 81
+    assert result.segment_markers == [2.0]
+
+
+def test_failed_run_removes_its_spill_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calculator = _spilling_calculator(tmp_path, chunk_bytes=360)
+    run_hours = calculator._run_hours
+    calls = []
+
+    def failing_run_hours(*args, **kwargs):
+        calls.append(args[0])
+        if len(calls) == 3:
+            raise MemoryError("out of memory")
+        return run_hours(*args, **kwargs)
+
+    monkeypatch.setattr(calculator, "_run_hours", failing_run_hours)
+    with pytest.raises(CalculationError):
+        calculator.calculate(_segmented_input([10.0, 14.0]), materialize=False)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_spans_are_not_written_to_the_snapshot_store(tmp_path: Path) -> None:
+    # 4 h segments; spill spans of 10 reported rows (0.5 h) split both
+    calculator = _spilling_calculator(tmp_path / "spill", chunk_bytes=360)
+    calculator.segment_snapshots = SegmentSnapshotStore(str(tmp_path / "snapshots"))
+    input_data = _segmented_input([10.0, 14.0])
+    input_data.parameters.hours = 8.0
+    for index, segment in enumerate(input_data.time_segments):
+        segment.start_hour, segment.end_hour = 4.0 * index, 4.0 * (index + 1)
+
+    spilled = calculator.calculate(input_data, materialize=False)
+    in_memory = MaterialBalanceCalculator().calculate(input_data, materialize=False)
+
+    assert list((tmp_path / "snapshots").glob("*.pt")) == []
+    np.testing.assert_allclose(spilled.frame.states, in_memory.frame.states, rtol=1e-5, atol=1e-5)
+    assert spilled.segment_markers == in_memory.segment_markers == [4.0]
+
+
+def test_sweep_removes_spill_directories_of_dead_processes(tmp_path: Path) -> None:
+    host = socket.gethostname()
+    # A spawned process that has exited: its pid is free
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    for name in (
+        f"{host}-{finished.pid}-dead",
+        f"{host}-{os.getpid()}-live",
+        f"other-host-{finished.pid}-remote",
+    ):
+        (tmp_path / name).mkdir()
+
+    assert sweep_stale_spills(str(tmp_path)) == 1
+    assert {path.name for path in tmp_path.iterdir()} == {
+        f"{host}-{os.getpid()}-live",
+        f"other-host-{finished.pid}-remote",
+    }
+    assert sweep_stale_spills(str(tmp_path / "missing")) == 0
@@ -0,0 +1,119 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.material_balance.core import MaterialBalanceCalculator
+from app.material_balance.exceptions import InvalidInputError
+from app.models import (
+    CalculationParameters,
+    EdgeData,
+    MaterialBalanceInput,
+    MaterialBalanceJobStatus,
+    NodeData,
+    WarmStartState,
+)
+from app.services.result_store import save_result
+from app.services.warm_start import continuation_flowchart, load_warm_start_state
+
+
+@pytest.fixture(autouse=True)
+def _result_store_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RESULT_STORE_DIR", str(tmp_path))
+
+
+def _two_tank_input(hours: float, components=("S", "X"), **update) -> MaterialBalanceInput:
+    nodes = [
+        NodeData(
+            node_id="inlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[100.0, 10.0],
+            is_inlet=True,
+        ),
+        NodeData(node_id="tank_1", node_type="default", initial_volume=40.0, initial_concentrations=[0.0, 0.0]),
+        NodeData(node_id="tank_2", node_type="default", initial_volume=60.0, initial_concentrations=[0.0, 0.0]),
+        NodeData(
+            node_id="outlet",
+            node_type="default",
+            initial_volume=1e-3,
+            initial_concentrations=[0.0, 0.0],
+            is_outlet=True,
+        ),
+    ]
+    edges = [
+        EdgeData(edge_id="feed", source_node_id="inlet", target_node_id="tank_1", flow_rate=10.0),
+        EdgeData(edge_id="transfer", source_node_id="tank_1", target_node_id="tank_2", flow_rate=10.0),
+        EdgeData(edge_id="effluent", source_node_id="tank_2", target_node_id="outlet", flow_rate=10.0),
+    ]
+    return MaterialBalanceInput(
+        nodes=nodes,
+        edges=edges,
+        parameters=CalculationParameters(hours=hours, steps_per_hour=20, solver_method="rk4"),
+        original_flowchart_data={"customParameters": [{"name": name, "label": name} for name in components]},
+        **update,
+    )
+
+
+def _finished_job(job_id: str, input_data: MaterialBalanceInput) -> SimpleNamespace:
+    result = MaterialBalanceCalculator().calculate(input_data, materialize=False)
+    return SimpleNamespace(
+        job_id=job_id,
+        status=MaterialBalanceJobStatus.success,
+        result_data=save_result(job_id, {"job_id": job_id}, frame=result.frame),
+    )
+
+
+def test_continuation_matches_one_long_run() -> None:
+    state = load_warm_start_state(_finished_job("first-half", _two_tank_input(hours=2.0)))
+    continued = MaterialBalanceCalculator().calculate(
+        _two_tank_input(hours=2.0, warm_start_from_job_id="first-half", warm_start_state=state),
+        materialize=False,
+    )
+    full = MaterialBalanceCalculator().calculate(_two_tank_input(hours=4.0), materialize=False)
+
+    assert state.start_hour == pytest.approx(2.0)
+    np.testing.assert_allclose(continued.frame.timestamps, full.frame.timestamps[40:], atol=1e-5)
+    np.testing.assert_allclose(continued.frame.states[-1], full.frame.states[-1], rtol=1e-4)
+    assert continued.summary["warm_start"] == {"source_job_id": "first-half", "start_hour": state.start_hour}
+
+
+def test_state_is_mapped_by_node_id_and_component_name() -> None:
+    state = WarmStartState(
+        source_job_id="previous",
+        start_hour=10.0,
+        node_ids=["tank_2", "tank_1", "retired_tank"],
+        parameter_names=["X", "S"],
+        volumes=[61.0, 41.0, 5.0],
+        concentrations=[[2.0, 20.0], [1.0, 10.0], [9.0, 9.0]],
+    )
+    input_data = _two_tank_input(hours=1.0, warm_start_state=state)
+    tensors = MaterialBalanceCalculator()._cached_tensors(input_data)
+
+    assert tensors["V_liq"].tolist() == pytest.approx([1e-3, 41.0, 61.0, 1e-3])
+    assert tensors["x0"].tolist() == [[100.0, 10.0], [10.0, 1.0], [20.0, 2.0], [0.0, 0.0]]
+
+    missing = state.model_copy(update={"parameter_names": ["X", "COD"]})
+    with pytest.raises(InvalidInputError, match="components: S"):
+        MaterialBalanceCalculator().calculate(_two_tank_input(hours=1.0, warm_start_state=missing))
+
+
+def test_extend_flowchart_holds_the_last_segment() -> None:
+    flowchart = {
+        "calculationParameters": {"hours": 48, "steps_per_hour": 10},
+        "timeSegments": [
+            {"id": "dry", "startHour": 0, "endHour": 24, "edgeOverrides": {}},
+            {"id": "storm", "startHour": 24, "endHour": 48, "edgeOverrides": {"feed": {"flow": 30}}},
+        ],
+    }
+
+    continued = continuation_flowchart(flowchart, "job-48h", 12.0)
+
+    assert continued["warmStartFromJobId"] == "job-48h"
+    assert continued["calculationParameters"] == {"hours": 12.0, "steps_per_hour": 10}
+    assert continued["timeSegments"] == [
+        {"id": "storm", "startHour": 0.0, "endHour": 12.0, "edgeOverrides": {"feed": {"flow": 30}}}
+    ]
+    assert flowchart["calculationParameters"]["hours"] == 48
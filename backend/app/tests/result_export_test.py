@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from app.models import (
+    MaterialBalanceExportQuery,
+    ResultDownsampleMethod,
+    ResultExportFormat,
+)
+from app.services.result_export import (
+    build_export_response,
+    lttb_indices,
+    minmax_indices,
+)
+
+
+def _result_data(points: int = 1000) -> dict:
+    timestamps = np.linspace(0.0, 10.0, points)
+    return {
+        "timestamps": timestamps.tolist(),
+        "node_data": {
+            "n1": {"label": "Tank", "volume": [1.0] * points, "COD": np.sin(timestamps).tolist()},
+            "n2": {"label": "Out", "volume": [2.0] * points, "COD": np.cos(timestamps).tolist()},
+        },
+        "edge_data": {"e1": {"flow_rate": [4.0] * points}},
+    }
+
+
+def _body(response) -> bytes:
+    async def _collect() -> bytes:
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    return asyncio.run(_collect())
+
+
+def test_lttb_keeps_endpoints_and_target_count() -> None:
+    times = np.linspace(0.0, 1.0, 500)
+    values = np.sin(times * 20)
+
+    indices = lttb_indices(times, values, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 499
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_minmax_keeps_spikes() -> None:
+    values = np.zeros(1000)
+    values[123] = 5.0
+    values[877] = -5.0
+
+    indices = minmax_indices(values, 20)
+
+    assert 123 in indices and 877 in indices
+    assert len(indices) <= 22
+
+
+def test_ndjson_export_filters_and_downsamples() -> None:
+    query = MaterialBalanceExportQuery(
+        node_ids=["n1"], edge_ids=[], parameters=["COD"], start_time=2.0, target_points=100
+    )
+
+    rows = [json.loads(line) for line in _body(build_export_response("job", _result_data(), query)).splitlines()]
+
+    assert 3 <= len(rows) <= 100
+    assert set(rows[0]) == {"time", "n1.COD"}
+    assert rows[0]["time"] >= 2.0
+    assert rows[-1]["time"] == pytest.approx(10.0)
+
+
+def test_csv_export_streams_all_rows_in_chunks() -> None:
+    query = MaterialBalanceExportQuery(format=ResultExportFormat.csv, downsample=ResultDownsampleMethod.minmax)
+
+    lines = _body(build_export_response("job", _result_data(5000), query)).decode().splitlines()
+
+    assert lines[0] == "time,n1.volume,n1.COD,n2.volume,n2.COD,e1.flow_rate"
+    assert len(lines) == 5001
+
+
+@pytest.mark.parametrize("method", list(ResultDownsampleMethod))
+def test_multi_column_export_honours_target_points(method: ResultDownsampleMethod) -> None:
+    data = _result_data(5000)
+    # Spikes in different series and buckets must both survive
+    data["node_data"]["n1"]["volume"][1234] = 50.0
+    data["edge_data"]["e1"]["flow_rate"][3210] = -50.0
+    query = MaterialBalanceExportQuery(downsample=method, target_points=60)
+
+    rows = [json.loads(line) for line in _body(build_export_response("job", data, query)).splitlines()]
+
+    assert 3 <= len(rows) <= 60
+    times = [row["time"] for row in rows]
+    assert times == sorted(set(times))
+    assert times[0] == 0.0 and times[-1] == pytest.approx(10.0)
+    assert max(row["n1.volume"] for row in rows) == 50.0
+    assert min(row["e1.flow_rate"] for row in rows) == -50.0
@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.models import MaterialBalanceTimeSeriesQuery
+from app.services.data_conversion_service import DataConversionService
+from app.services.result_store import (
+    StoredResult,
+    delete_result,
+    load_result_data,
+    open_result,
+    save_result,
+)
+
+
+def _output_data() -> dict:
+    return {
+        "job_id": "calc-1",
+        "status": "success",
+        "timestamps": [0.0, 0.5, 1.0, 1.5],
+        "node_data": {
+            "n1": {"label": "Inlet", "volume": [1.0, 1.0, 1.0, 1.0], "COD": [10.0, 9.0, 8.0, 7.0]},
+            "n2": {"label": "Tank", "volume": [2.0, 2.5, 3.0, 3.5], "COD": [0.0, 1.0, 2.0, 3.0]},
+        },
+        "edge_data": {"e1": {"flow_rate": [4.0, 4.0, 4.0, 4.0]}},
+        "segment_markers": [],
+        "summary": {"total_steps": 4},
+    }
+
+
+@pytest.fixture(autouse=True)
+def _result_store_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RESULT_STORE_DIR", str(tmp_path))
+
+
+def test_save_result_keeps_only_small_json_on_the_job(tmp_path: Path) -> None:
+    result_data = save_result("job-1", _output_data())
+
+    assert "node_data" not in result_data and "timestamps" not in result_data
+    assert result_data["summary"] == {"total_steps": 4}
+    assert result_data["result_store"]["time_points"] == 4
+    assert isinstance(open_result(result_data), StoredResult)
+    assert load_result_data(result_data) == _output_data()
+
+    delete_result("job-1")
+    assert not (tmp_path / "job-1").exists()
+
+
+def test_stored_and_inline_results_read_the_same_slices() -> None:
+    stored = open_result(save_result("job-2", _output_data()))
+    inline = open_result(_output_data())
+
+    for reader in (stored, inline):
+        assert reader.search_time(0.7) == 2
+        assert reader.timestamps_slice(1, 3) == [0.5, 1.0]
+        assert reader.node_values("n2", slice(1, 3)) == {"volume": [2.5, 3.0], "COD": [1.0, 2.0]}
+        assert reader.node_values("n1", -1) == {"volume": 1.0, "COD": 7.0}
+        assert reader.edge_values("e1", -1) == {"flow_rate": 4.0}
+
+
+def test_extract_timeseries_data_pages_stored_result() -> None:
+    result_data = save_result("job-3", _output_data())
+    query = MaterialBalanceTimeSeriesQuery(start_time=0.5, page=1, page_size=2, node_ids=["n2"])
+
+    response = DataConversionService().extract_timeseries_data(result_data, query)
+
+    assert response.timestamps == [0.5, 1.0]
+    assert response.node_data == {"n2": {"volume": [2.5, 3.0], "COD": [1.0, 2.0]}}
+    assert response.edge_data == {"e1": {"flow_rate": [4.0, 4.0]}}
+    assert response.pagination["total_points"] == 3
@@ -0,0 +1,84 @@
+import torch
+
+from app.material_balance.udm_engine import (
+    build_udm_batch_runtime,
+    build_udm_runtime_payload,
+)
+from app.models import NodeData
+
+
+def _udm_node(node_id: str, *, mu: float, fixed: bool = False) -> NodeData:
+    return NodeData(
+        node_id=node_id,
+        node_type="udm",
+        initial_volume=1.0,
+        initial_concentrations=[10.0, 2.0, 1.0],
+        udm_component_names=["S", "X", "O"],
+        udm_processes=[
+            {
+                "name": "growth",
+                "rate_expr": "mu * S / (K + S) * X",
+                "stoich_expr": {"S": "-1/Y", "X": "1", "O": "1 - 1/Y"},
+            },
+            {
+                "name": "decay",
+                "rate_expr": "b * X",
+                "stoich": {"X": -1.0},
+            },
+        ],
+        udm_parameter_values={"mu": mu, "K": 5.0, "Y": 0.5, "b": 0.1},
+        udm_model_snapshot={
+            "components": [
+                {"name": "S", "is_fixed": False},
+                {"name": "X", "is_fixed": False},
+                {"name": "O", "is_fixed": fixed},
+            ]
+        },
+    )
+
+
+def test_batched_udm_runtime_matches_per_node_evaluation() -> None:
+    nodes = [
+        NodeData(
+            node_id="inlet",
+            node_type="default",
+            initial_volume=1.0,
+            initial_concentrations=[10.0, 2.0, 1.0],
+            is_inlet=True,
+        ),
+        _udm_node("r1", mu=4.0),
+        _udm_node("r2", mu=6.0, fixed=True),
+        _udm_node("r3", mu=4.0),
+    ]
+    runtimes = build_udm_runtime_payload(
+        nodes=nodes,
+        global_component_names=["S", "X", "O"],
+        device=torch.device("cpu"),
+        dtype=torch.float32,
+    )
+    batch = build_udm_batch_runtime(
+        runtimes,
+        n_nodes=len(nodes),
+        n_components=3,
+        device=torch.device("cpu"),
+        dtype=torch.float32,
+    )
+    concentrations = torch.tensor(
+        [[1.0, 1.0, 1.0], [10.0, 2.0, 1.0], [3.0, 7.0, 0.5], [0.0, 4.0, 2.0]]
+    )
+
+    expected = torch.zeros_like(concentrations)
+    for runtime in runtimes:
+        expected[runtime.node_index] = runtime.evaluate_reaction(
+            concentrations[runtime.node_index]
+        )
+    batched = batch.evaluate_reaction(concentrations)
+
+    # Same definition, different parameter values -> a single batch group.
+    assert len(batch.groups) == 1
+    torch.testing.assert_close(batched, expected)
+    assert torch.all(batched[0] == 0)
+
+    frozen = batch.apply_fixed_components(batched)
+    assert frozen[2, 2].item() == 0.0
+    torch.testing.assert_close(frozen[1], batched[1])
@@ -0,0 +1,77 @@
+import ast
+
+import pytest
+import torch
+
+from app.services.udm_expression import (
+    UnsafeExpressionError,
+    _evaluate_ast,
+    compile_expression,
+    compile_expression_kernel,
+)
+
+EXPRESSIONS = [
+    "mu_H * S_S / (K_S + S_S) * X_BH",
+    "b_H * X_BH - S_O / 0",
+    "exp(-0.5 * S_S) + log(S_O) + sqrt(X_BH - 1)",
+    "pow(S_S, 2) + S_O ** 0.5",
+    "min(S_S, S_O, 1.5) - max(S_S, 0.25) + abs(-S_O)",
+    "clip(S_S - 1, 0) + clip(S_O, 0.1, 0.2)",
+    "pi * e * S_S / (S_O - S_O)",
+]
+
+
+def _interpret(expression: str, variables: dict) -> torch.Tensor:
+    return _evaluate_ast(ast.parse(expression, mode="eval"), variables)
+
+
+def test_compiled_kernel_matches_interpreter() -> None:
+    variables = {
+        "S_S": torch.tensor([0.0, 0.5, 2.0, 20.0]),
+        "S_O": torch.tensor([0.0, 0.15, 1.0, 3.0]),
+        "X_BH": torch.tensor([0.5, 1.0, 100.0, 2500.0]),
+        "mu_H": 6.0,
+        "K_S": 20.0,
+        "b_H": 0.62,
+    }
+    kernel = compile_expression_kernel(
+        EXPRESSIONS,
+        slot_names=["S_S", "S_O", "X_BH"],
+        constants={"mu_H": 6.0, "K_S": 20.0, "b_H": 0.62},
+    )
+    outputs = kernel([variables["S_S"], variables["S_O"], variables["X_BH"]])
+
+    assert kernel.output_count == len(EXPRESSIONS)
+    for expression, output in zip(EXPRESSIONS, outputs, strict=True):
+        expected = _interpret(expression, variables)
+        torch.testing.assert_close(output, expected)
+
+
+def test_compiled_kernel_folds_constants() -> None:
+    kernel = compile_expression_kernel(
+        ["k * exp(0) * 2 + S"],
+        slot_names=["S"],
+        constants={"k": 1.5},
+    )
+
+    assert "exp" not in kernel.source
+    assert "3.0" in kernel.source
+    assert kernel([torch.tensor(1.0)])[0].item() == pytest.approx(4.0)
+
+
+def test_compile_expression_accepts_plain_scalars() -> None:
+    executor = compile_expression("exp(T - 20) * theta")
+
+    assert executor({"T": 20.0, "theta": 1.07}) == pytest.approx(1.07)
+
+
+def test_compile_expression_rejects_unknown_and_unsafe_symbols() -> None:
+    executor = compile_expression("a + b")
+    with pytest.raises(UnsafeExpressionError):
+        executor({"a": 1.0})
+
+    with pytest.raises(UnsafeExpressionError):
+        compile_expression("__import__('os').getcwd()")
+
+    with pytest.raises(UnsafeExpressionError):
+        compile_expression_kernel(["a + unknown"], slot_names=["a"])
@@ -999,7 +999,7 @@ export type SegmentFactorAB = {
 /**
  * ODE求解器方法
  */
-export type SolverMethod = 'scipy_solver' | 'euler' | 'rk4' | 'adaptive_heun';
+export type SolverMethod = 'scipy_solver' | 'euler' | 'rk4' | 'adaptive_heun' | 'bdf' | 'rosenbrock';
 
 /**
  * 时段定义。
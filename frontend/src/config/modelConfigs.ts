@@ -250,7 +250,7 @@ export const ASM1_SLIM_CONFIG: ModelConfig = {
   availableVariables: ASM1_SLIM_AVAILABLE_VARIABLES,
   modelSpecific: {
     // ASM1Slim 特定配置可以在这里添加
-    supportedSolverMethods: ["rk4", "scipy_solver", "euler"],
+    supportedSolverMethods: ["rk4", "scipy_solver", "euler", "rosenbrock", "bdf"],
     defaultEdgeParameterConfigs: {
       // 默认边参数配置
     },
@@ -590,7 +590,7 @@ export const ASM1_CONFIG: ModelConfig = {
   nodeTypes: ["DefaultNode", "InputNode", "OutputNode", "ASM1Node"],
   availableVariables: ASM1_AVAILABLE_VARIABLES,
   modelSpecific: {
-    supportedSolverMethods: ["rk4", "scipy_solver", "euler"],
+    supportedSolverMethods: ["rk4", "scipy_solver", "euler", "rosenbrock", "bdf"],
     defaultEdgeParameterConfigs: {
       // ASM1特定的边参数配置
     },
@@ -1189,7 +1189,7 @@ export const ASM3_CONFIG: ModelConfig = {
   nodeTypes: ["DefaultNode", "InputNode", "OutputNode", "ASM3Node"],
   availableVariables: ASM3_AVAILABLE_VARIABLES,
   modelSpecific: {
-    supportedSolverMethods: ["rk4", "scipy_solver", "euler"],
+    supportedSolverMethods: ["rk4", "scipy_solver", "euler", "rosenbrock", "bdf"],
     defaultEdgeParameterConfigs: {
       // ASM3特定的边参数配置
     },
@@ -1214,7 +1214,7 @@ export const UDM_CONFIG: ModelConfig = {
   nodeTypes: ["DefaultNode", "InputNode", "OutputNode", "UDMNode", "udm"],
   availableVariables: UDM_AVAILABLE_VARIABLES,
   modelSpecific: {
-    supportedSolverMethods: ["rk4", "scipy_solver", "euler"],
+    supportedSolverMethods: ["rk4", "scipy_solver", "euler", "rosenbrock", "bdf"],
     seedTemplateKeys: ["asm1", "asm1slim", "asm3"],
     defaultEdgeParameterConfigs: {},
   },
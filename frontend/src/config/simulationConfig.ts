@@ -412,7 +412,7 @@ export const simulationConfigs: Record<string, SimulationConfig> = {
       hours: { min: 0.5, max: 120, required: true },
       steps_per_hour: { min: 10, max: 60, required: true },
       solver_method: {
-        allowedValues: ["rk4", "scipy_solver", "euler"],
+        allowedValues: ["rk4", "scipy_solver", "euler", "rosenbrock", "bdf"],
         required: true,
       },
       tolerance: { min: 1e-6, max: 1e-2, required: true },
@@ -499,7 +499,7 @@ export const simulationConfigs: Record<string, SimulationConfig> = {
       hours: { min: 0.5, max: 120, required: true },
       steps_per_hour: { min: 10, max: 60, required: true },
       solver_method: {
-        allowedValues: ["rk4", "scipy_solver", "euler"],
+        allowedValues: ["rk4", "scipy_solver", "euler", "rosenbrock", "bdf"],
         required: true,
       },
       tolerance: { min: 1e-6, max: 1e-2, required: true },
@@ -583,7 +583,7 @@ export const simulationConfigs: Record<string, SimulationConfig> = {
       hours: { min: 0.5, max: 120, required: true },
       steps_per_hour: { min: 10, max: 60, required: true },
       solver_method: {
-        allowedValues: ["rk4", "scipy_solver", "euler"],
+        allowedValues: ["rk4", "scipy_solver", "euler", "rosenbrock", "bdf"],
         required: true,
       },
       tolerance: { min: 1e-6, max: 1e-2, required: true },
@@ -667,7 +667,7 @@ export const simulationConfigs: Record<string, SimulationConfig> = {
       hours: { min: 0.5, max: 120, required: true },
       steps_per_hour: { min: 10, max: 60, required: true },
       solver_method: {
-        allowedValues: ["rk4", "scipy_solver", "euler"],
+        allowedValues: ["rk4", "scipy_solver", "euler", "rosenbrock", "bdf"],
         required: true,
       },
       tolerance: { min: 1e-6, max: 1e-2, required: true },